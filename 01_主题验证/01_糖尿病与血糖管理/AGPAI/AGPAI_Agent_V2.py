@@ -24,6 +24,9 @@ from enum import Enum
 import warnings
 warnings.filterwarnings('ignore')
 
+from Patient_History_Store import PatientHistoryStore, LazyPatientDatabase, DEFAULT_DB_FILENAME
+from Patient_Similarity_Index import PatientSimilarityIndex, DEFAULT_INDEX_FILENAME
+
 class ClinicalPhenotype(Enum):
     """临床表型分类"""
     STABLE_HYPERGLYCEMIC = "稳定性高血糖型"
@@ -109,13 +112,22 @@ class ClinicalRecommendation:
 class AGPAI_Agent_V2:
     """AGPAI智能分析代理 V2.0"""
     
-    def __init__(self, data_storage_path: str = "./agpai_patient_data/"):
+    def __init__(self, data_storage_path: str = "./agpai_patient_data/",
+                 similarity_index_mode: str = "exact"):
         """初始化AGPAI Agent V2.0"""
         self.data_storage_path = data_storage_path
-        self.patient_database = {}
         self.phenotype_patterns = self._initialize_phenotype_database()
         self._ensure_storage_directory()
+        self.history_store = PatientHistoryStore(
+            os.path.join(self.data_storage_path, DEFAULT_DB_FILENAME)
+        )
+        self.patient_database = LazyPatientDatabase(self.history_store)
         self._load_patient_database()
+        self.similarity_index = PatientSimilarityIndex(
+            os.path.join(self.data_storage_path, DEFAULT_INDEX_FILENAME),
+            mode=similarity_index_mode
+        )
+        self.similarity_index.sync_with_store(self.history_store)
         
     def _ensure_storage_directory(self):
         """确保数据存储目录存在"""
@@ -776,48 +788,36 @@ class AGPAI_Agent_V2:
         return recommendations
     
     def save_patient_data(self, patient_id: str, analysis_results: Dict):
-        """保存患者分析数据"""
-        patient_file = os.path.join(self.data_storage_path, f"{patient_id}_history.json")
-        
-        # 加载现有数据
-        if os.path.exists(patient_file):
-            with open(patient_file, 'r', encoding='utf-8') as f:
-                patient_history = json.load(f)
-        else:
-            patient_history = []
-        
-        # 添加新分析结果
-        analysis_record = {
-            'analysis_date': datetime.now().isoformat(),
-            'metrics': analysis_results
-        }
-        patient_history.append(analysis_record)
-        
-        # 保存更新后的数据
-        with open(patient_file, 'w', encoding='utf-8') as f:
-            json.dump(patient_history, f, ensure_ascii=False, indent=2)
-        
-        self.patient_database[patient_id] = patient_history
+        """保存患者分析数据（追加写入历史库）"""
+        analysis_record = self.history_store.append(patient_id, analysis_results)
+        self.patient_database.record_appended(patient_id, analysis_record)
+        self.similarity_index.sync_with_store(self.history_store)
+    
+    def find_similar_patients(self, analysis_results: Dict, k: int = 5,
+                              exclude_patient_id: Optional[str] = None) -> List[Dict]:
+        """
+        检索指标最相似的既往分析记录
+        
+        Args:
+            analysis_results: 当前分析指标（与 save_patient_data 保存的字段一致）
+            k: 返回记录数
+            exclude_patient_id: 排除的患者ID（通常为当前患者）
+        """
+        return self.similarity_index.search(analysis_results, k=k,
+                                            exclude_patient_id=exclude_patient_id)
     
     def load_patient_history(self, patient_id: str) -> List[Dict]:
         """加载患者历史数据"""
-        patient_file = os.path.join(self.data_storage_path, f"{patient_id}_history.json")
-        
-        if os.path.exists(patient_file):
-            with open(patient_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            return []
+        return self.history_store.load_history(patient_id)
     
     def _load_patient_database(self):
-        """加载所有患者数据库"""
-        if not os.path.exists(self.data_storage_path):
-            return
-        
-        for filename in os.listdir(self.data_storage_path):
-            if filename.endswith('_history.json'):
-                patient_id = filename.replace('_history.json', '')
-                self.patient_database[patient_id] = self.load_patient_history(patient_id)
+        """
+        准备患者数据库
+        历史记录按需懒加载；仅将尚未迁移的旧版 *_history.json 文件导入历史库
+        """
+        migrated = self.history_store.migrate_json_histories(self.data_storage_path)
+        if migrated:
+            print(f"📦 已迁移 {len(migrated)} 位患者的JSON历史记录至 {self.history_store.db_path}")
     
     def generate_comprehensive_report(self, 
                                     patient_id: str,
@@ -877,6 +877,14 @@ class AGPAI_Agent_V2:
             'glucose_cv': metrics.glucose_cv,
             'percentile_band_cv': metrics.percentile_band_cv,
             'tbr_level1': metrics.tbr_level1,
+            'tar_level1': metrics.tar_level1,
+            'mean_glucose': metrics.mean_glucose,
+            'gmi': metrics.gmi,
+            'mage': metrics.mage,
+            'conga': metrics.conga,
+            'j_index': metrics.j_index,
+            'lbgi': metrics.lbgi,
+            'hbgi': metrics.hbgi,
             'phenotype': phenotype.value,
             'dawn_phenomenon': circadian.dawn_phenomenon
         }
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+患者历史分析存储 - SQLite (WAL模式) 追加写入
+替代按患者重写整个 {patient_id}_history.json 的方式:
+1. 每次分析只追加一行，写入代价与历史长度无关
+2. (patient_id, analysis_time) 索引，按患者懒加载
+3. 启动时只打开数据库，不加载任何历史记录
+4. 提供从旧版JSON历史文件的迁移工具
+
+用法:
+    python3 Patient_History_Store.py <JSON历史目录> [数据库路径]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_DB_FILENAME = "patient_history.db"
+LEGACY_HISTORY_SUFFIX = "_history.json"
+
+
+class PatientHistoryStore:
+    """患者历史分析记录存储"""
+
+    def __init__(self, db_path: str):
+        """打开（必要时创建）历史数据库"""
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        """初始化表结构"""
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS analyses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    patient_id TEXT NOT NULL,
+                    analysis_time TEXT NOT NULL,
+                    metrics TEXT NOT NULL
+                )
+            ''')
+            self.conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_analyses_patient_time
+                ON analyses (patient_id, analysis_time)
+            ''')
+            # 已迁移的旧版JSON文件，保证迁移可重复执行
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS migrated_files (
+                    filename TEXT PRIMARY KEY,
+                    record_count INTEGER NOT NULL,
+                    migrated_at TEXT NOT NULL
+                )
+            ''')
+
+    def append(self, patient_id: str, metrics: Dict,
+               analysis_time: Optional[str] = None) -> Dict:
+        """追加一条分析记录，返回与旧版JSON一致的记录格式"""
+        record = {
+            'analysis_date': analysis_time or datetime.now().isoformat(),
+            'metrics': metrics
+        }
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO analyses (patient_id, analysis_time, metrics) VALUES (?, ?, ?)",
+                (patient_id, record['analysis_date'], json.dumps(metrics, ensure_ascii=False))
+            )
+        return record
+
+    def load_history(self, patient_id: str) -> List[Dict]:
+        """按时间顺序加载单个患者的全部历史记录"""
+        rows = self.conn.execute(
+            "SELECT analysis_time, metrics FROM analyses "
+            "WHERE patient_id = ? ORDER BY analysis_time, id",
+            (patient_id,)
+        ).fetchall()
+        return [{'analysis_date': row[0], 'metrics': json.loads(row[1])} for row in rows]
+
+    def iter_records(self, after_id: int = 0) -> Iterator[Tuple[int, str, str, Dict]]:
+        """按写入顺序遍历记录ID大于 after_id 的全部记录 (用于增量同步索引)"""
+        cursor = self.conn.execute(
+            "SELECT id, patient_id, analysis_time, metrics FROM analyses WHERE id > ? ORDER BY id",
+            (after_id,)
+        )
+        for record_id, patient_id, analysis_time, metrics in cursor:
+            yield record_id, patient_id, analysis_time, json.loads(metrics)
+
+    def has_patient(self, patient_id: str) -> bool:
+        """患者是否存在历史记录（索引查询）"""
+        row = self.conn.execute(
+            "SELECT 1 FROM analyses WHERE patient_id = ? LIMIT 1", (patient_id,)
+        ).fetchone()
+        return row is not None
+
+    def patient_ids(self) -> List[str]:
+        """所有有历史记录的患者ID"""
+        rows = self.conn.execute(
+            "SELECT DISTINCT patient_id FROM analyses ORDER BY patient_id"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def is_migrated(self, filename: str) -> bool:
+        """旧版JSON文件是否已迁移"""
+        row = self.conn.execute(
+            "SELECT 1 FROM migrated_files WHERE filename = ?", (filename,)
+        ).fetchone()
+        return row is not None
+
+    def migrate_json_histories(self, json_directory: str) -> Dict[str, int]:
+        """
+        从旧版 {patient_id}_history.json 文件迁移历史记录
+        已迁移的文件会被跳过，原JSON文件保持不变
+
+        Returns:
+            {patient_id: 迁移记录数}
+        """
+        migrated = {}
+        if not os.path.isdir(json_directory):
+            return migrated
+
+        for filename in sorted(os.listdir(json_directory)):
+            if not filename.endswith(LEGACY_HISTORY_SUFFIX) or self.is_migrated(filename):
+                continue
+
+            patient_id = filename[:-len(LEGACY_HISTORY_SUFFIX)]
+            with open(os.path.join(json_directory, filename), 'r', encoding='utf-8') as f:
+                history = json.load(f)
+
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO analyses (patient_id, analysis_time, metrics) VALUES (?, ?, ?)",
+                    [(patient_id, record.get('analysis_date', ''),
+                      json.dumps(record.get('metrics', {}), ensure_ascii=False))
+                     for record in history]
+                )
+                self.conn.execute(
+                    "INSERT INTO migrated_files (filename, record_count, migrated_at) VALUES (?, ?, ?)",
+                    (filename, len(history), datetime.now().isoformat())
+                )
+            migrated[patient_id] = len(history)
+
+        return migrated
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+
+
+class LazyPatientDatabase(Mapping):
+    """
+    按需加载的患者数据库视图
+    保持 patient_database[patient_id] -> 历史记录列表 的字典接口，
+    首次访问某患者时才从SQLite读取
+    """
+
+    def __init__(self, store: PatientHistoryStore):
+        self.store = store
+        self._cache: Dict[str, List[Dict]] = {}
+
+    def __getitem__(self, patient_id: str) -> List[Dict]:
+        if patient_id not in self._cache:
+            history = self.store.load_history(patient_id)
+            if not history:
+                raise KeyError(patient_id)
+            self._cache[patient_id] = history
+        return self._cache[patient_id]
+
+    def __contains__(self, patient_id) -> bool:
+        return patient_id in self._cache or self.store.has_patient(patient_id)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.patient_ids())
+
+    def __len__(self) -> int:
+        return len(self.store.patient_ids())
+
+    def record_appended(self, patient_id: str, record: Dict):
+        """同步已缓存患者的新记录，未缓存的患者下次访问时再加载"""
+        if patient_id in self._cache:
+            self._cache[patient_id].append(record)
+
+
+def main():
+    """命令行迁移工具"""
+    if len(sys.argv) < 2:
+        print("使用方法:")
+        print(f"  python3 {sys.argv[0]} <JSON历史目录> [数据库路径]")
+        return
+
+    json_directory = sys.argv[1]
+    db_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(json_directory, DEFAULT_DB_FILENAME)
+
+    store = PatientHistoryStore(db_path)
+    migrated = store.migrate_json_histories(json_directory)
+    store.close()
+
+    print(f"📦 迁移完成: {len(migrated)} 位患者, {sum(migrated.values())} 条记录 -> {db_path}")
+    for patient_id, count in migrated.items():
+        print(f"   {patient_id}: {count} 条")
+
+
+if __name__ == "__main__":
+    main()
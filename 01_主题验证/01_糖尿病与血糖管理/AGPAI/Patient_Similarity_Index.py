@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史患者表型相似度索引
+将每次分析的关键指标 (TIR、CV、MAGE、LBGI/HBGI 等) 组成向量，
+标准化后用于"哪些既往患者与当前患者相似"的最近邻检索:
+1. exact 模式: NumPy 矩阵暴力检索，结果精确
+2. balltree 模式: sklearn BallTree 索引（sklearn不可用时自动回退到 exact）
+索引以 .npz 文件保存在历史数据库旁，历史库是唯一数据源，
+索引落后时按记录ID增量追平，无需全量重建；索引文件损坏时视为不存在，由历史库重建。
+"""
+
+import numbers
+import os
+import tempfile
+import zipfile
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    from sklearn.neighbors import BallTree
+    BALLTREE_AVAILABLE = True
+except ImportError:
+    BALLTREE_AVAILABLE = False
+
+DEFAULT_INDEX_FILENAME = "patient_similarity_index.npz"
+
+# 参与相似度计算的指标（旧记录缺失的指标按总体均值处理）
+SIMILARITY_FEATURES = [
+    'tir', 'tar_level1', 'tbr_level1',
+    'glucose_cv', 'percentile_band_cv',
+    'mean_glucose', 'gmi', 'mage', 'conga', 'j_index',
+    'lbgi', 'hbgi', 'dawn_phenomenon'
+]
+
+
+class PatientSimilarityIndex:
+    """历史分析指标向量索引"""
+
+    def __init__(self, index_path: str, mode: str = 'exact', persist_every: int = 100):
+        """
+        初始化索引
+        index_path: 索引文件路径 (.npz)
+        mode: 'exact' 或 'balltree'
+        persist_every: 累计多少条新记录后自动落盘
+        """
+        if mode not in ('exact', 'balltree'):
+            raise ValueError(f"不支持的索引模式: {mode}")
+        if mode == 'balltree' and not BALLTREE_AVAILABLE:
+            print("Warning: sklearn not available. Similarity index falls back to exact search.")
+            mode = 'exact'
+
+        self.index_path = index_path
+        self.mode = mode
+        self.persist_every = persist_every
+        self.features = list(SIMILARITY_FEATURES)
+
+        self._vectors = np.empty((0, len(self.features)))
+        self._size = 0
+        self._patient_ids: List[str] = []
+        self._analysis_dates: List[str] = []
+        self.last_record_id = 0
+        self._unsaved = 0
+
+        # 标准化矩阵与树结构在新增记录后失效，查询时按需重建
+        self._normalized = None
+        self._center = None
+        self._scale = None
+        self._tree = None
+
+        self.load()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _to_vector(self, metrics: Dict) -> np.ndarray:
+        values = []
+        for feature in self.features:
+            value = metrics.get(feature)
+            is_number = isinstance(value, numbers.Real) and not isinstance(value, (bool, np.bool_))
+            values.append(float(value) if is_number else np.nan)
+        return np.array(values)
+
+    def add(self, record_id: int, patient_id: str, analysis_date: str, metrics: Dict):
+        """添加一条分析记录"""
+        if self._size == len(self._vectors):
+            capacity = max(1024, 2 * len(self._vectors))
+            grown = np.empty((capacity, len(self.features)))
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+
+        self._vectors[self._size] = self._to_vector(metrics)
+        self._size += 1
+        self._patient_ids.append(patient_id)
+        self._analysis_dates.append(analysis_date)
+        self.last_record_id = max(self.last_record_id, record_id)
+
+        self._normalized = None
+        self._tree = None
+        self._unsaved += 1
+        if self._unsaved >= self.persist_every:
+            self.save()
+
+    def sync_with_store(self, store) -> int:
+        """从历史库追平尚未入索引的记录，返回新增记录数"""
+        added = 0
+        for record_id, patient_id, analysis_date, metrics in store.iter_records(after_id=self.last_record_id):
+            self.add(record_id, patient_id, analysis_date, metrics)
+            added += 1
+        return added
+
+    def _prepare(self):
+        """z-score 标准化，缺失值置为 0（即总体均值）"""
+        if self._normalized is not None:
+            return
+
+        vectors = self._vectors[:self._size]
+        with np.errstate(invalid='ignore'):
+            center = np.nanmean(vectors, axis=0) if self._size else np.zeros(len(self.features))
+            scale = np.nanstd(vectors, axis=0) if self._size else np.ones(len(self.features))
+        center = np.nan_to_num(center)
+        scale = np.where(np.nan_to_num(scale) > 0, np.nan_to_num(scale), 1.0)
+
+        normalized = np.nan_to_num((vectors - center) / scale)
+        self._center, self._scale = center, scale
+        self._normalized = np.ascontiguousarray(normalized)
+        self._sq_norms = np.einsum('ij,ij->i', normalized, normalized)
+        # 患者ID编码为整数，排除本人时只需整数比较
+        self._patient_codes = {}
+        self._patient_code_array = np.fromiter(
+            (self._patient_codes.setdefault(pid, len(self._patient_codes)) for pid in self._patient_ids),
+            dtype=np.int64, count=self._size
+        )
+
+        if self.mode == 'balltree' and self._size:
+            self._tree = BallTree(self._normalized)
+
+    def search(self, metrics: Dict, k: int = 5,
+               exclude_patient_id: Optional[str] = None) -> List[Dict]:
+        """
+        查找指标最相似的历史分析记录
+
+        Args:
+            metrics: 当前分析指标（与保存到历史库的字段一致）
+            k: 返回数量
+            exclude_patient_id: 排除的患者（通常为当前患者本人）
+
+        Returns:
+            按距离升序的相似记录列表
+        """
+        if self._size == 0 or k <= 0:
+            return []
+
+        self._prepare()
+        query = np.nan_to_num((self._to_vector(metrics) - self._center) / self._scale)
+
+        if exclude_patient_id is not None:
+            excluded = self._patient_code_array == self._patient_codes.get(exclude_patient_id, -1)
+        else:
+            excluded = np.zeros(self._size, dtype=bool)
+        available = int(self._size - excluded.sum())
+        k = min(k, available)
+        if k == 0:
+            return []
+
+        if self.mode == 'balltree':
+            candidates = min(self._size, k + int(excluded.sum()))
+            dist, idx = self._tree.query(query[None, :], k=candidates)
+            pairs = [(d, i) for d, i in zip(dist[0], idx[0]) if not excluded[i]][:k]
+            order = np.array([i for _, i in pairs])
+            distances = np.array([d for d, _ in pairs])
+        else:
+            # ||x - q||² = ||x||² - 2 x·q + ||q||²
+            sq_dist = self._sq_norms - 2 * self._normalized @ query + query @ query
+            sq_dist[excluded] = np.inf
+            order = np.argpartition(sq_dist, k - 1)[:k]
+            order = order[np.argsort(sq_dist[order])]
+            distances = np.sqrt(np.maximum(sq_dist[order], 0))
+
+        return [
+            {
+                'patient_id': self._patient_ids[i],
+                'analysis_date': self._analysis_dates[i],
+                'distance': float(d),
+                'similarity': float(1 / (1 + d)),
+                'metrics': {feature: value for feature, value in zip(self.features, self._vectors[i].tolist())
+                            if not np.isnan(value)}
+            }
+            for i, d in zip(order, distances)
+        ]
+
+    def save(self):
+        """保存索引文件：先写同目录临时文件再原子替换，写入中断不会留下半个索引"""
+        directory = os.path.dirname(os.path.abspath(self.index_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".npz")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    vectors=self._vectors[:self._size],
+                    patient_ids=np.array(self._patient_ids, dtype=str),
+                    analysis_dates=np.array(self._analysis_dates, dtype=str),
+                    features=np.array(self.features, dtype=str),
+                    last_record_id=np.array(self.last_record_id)
+                )
+            os.replace(tmp_path, self.index_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._unsaved = 0
+
+    def load(self):
+        """加载索引文件；指标定义变化或文件损坏时丢弃旧索引，由历史库重建"""
+        if not os.path.exists(self.index_path):
+            return
+
+        try:
+            with np.load(self.index_path) as data:
+                if list(data['features']) != self.features:
+                    return
+                vectors = np.array(data['vectors'], dtype=float).reshape(-1, len(self.features))
+                patient_ids = data['patient_ids'].tolist()
+                analysis_dates = data['analysis_dates'].tolist()
+                last_record_id = int(data['last_record_id'])
+            if not len(vectors) == len(patient_ids) == len(analysis_dates):
+                raise ValueError("向量与记录数量不一致")
+        except (OSError, EOFError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            print(f"Warning: similarity index {self.index_path} is unreadable ({e}). Rebuilding from history.")
+            return
+
+        self._vectors = vectors
+        self._patient_ids = patient_ids
+        self._analysis_dates = analysis_dates
+        self.last_record_id = last_record_id
+        self._size = len(self._vectors)
+        self._normalized = None
+        self._tree = None
@@ -18,9 +18,15 @@ from scipy import signal
 from scipy.stats import entropy
 import json
 from datetime import datetime
+import os
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
+# 与HRV分析共用RR间期前缀和统计
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'HRV_Analysis'))
+from HRV_Window_Statistics import resolve_window
+
 class ECGBrittenessAnalyzer:
     """ECG脆性分析器 - 基于Agent2混沌动力学架构"""
     
@@ -207,25 +213,22 @@ class ECGBrittenessAnalyzer:
         except:
             return 0
     
-    def calculate_hrv_time_domain(self, rr_intervals):
-        """计算HRV时域指标"""
-        if len(rr_intervals) < 2:
+    def calculate_hrv_time_domain(self, rr_intervals=None, rr_stats=None, start=0, stop=None):
+        """
+        计算HRV时域指标
+        rr_intervals 与 rr_stats 二选一；传 rr_stats (如分段分析器已为整条序列建好的前缀和) 时，
+        start/stop 指定心拍区间 [start, stop)，只计算该区间，不再重复累加
+        """
+        rr_stats, start, stop = resolve_window(rr_intervals, rr_stats, start, stop)
+        if stop - start < 2:
             return {'RMSSD': 0, 'pNN50': 0, 'SDNN': 0}
-            
-        # RMSSD: 相邻RR间期差值的均方根
-        rmssd = np.sqrt(np.mean(np.diff(rr_intervals) ** 2))
-        
-        # pNN50: 相邻RR间期差值>50ms的百分比
-        nn50 = np.sum(np.abs(np.diff(rr_intervals)) > 50)
-        pnn50 = nn50 / len(rr_intervals) * 100
         
-        # SDNN: RR间期的标准差
-        sdnn = np.std(rr_intervals)
+        stats = rr_stats.window_stats(start, stop)
         
         return {
-            'RMSSD': rmssd,
-            'pNN50': pnn50,
-            'SDNN': sdnn
+            'RMSSD': stats['RMSSD'],                              # 相邻RR间期差值的均方根
+            'pNN50': stats['NN50'] / (stop - start) * 100,        # 相邻差值>50ms的心拍百分比
+            'SDNN': stats['SDNN']                                 # RR间期的标准差
         }
     
     def calculate_qt_variability(self, ecg_signal, r_peaks):
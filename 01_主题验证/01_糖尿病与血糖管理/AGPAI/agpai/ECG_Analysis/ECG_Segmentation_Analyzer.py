@@ -12,14 +12,21 @@ ECG智能分段分析器 - 基于Agent2 v5.0智能分段架构
 日期: 2025-08-28
 """
 
+import os
+import sys
 import numpy as np
 import pandas as pd
 from scipy import signal
+from scipy.ndimage import maximum_filter1d
 from scipy.stats import chi2_contingency
 import json
 from datetime import datetime, timedelta
 from enum import Enum
 
+# 与HRV分析共用RR间期前缀和统计
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'HRV_Analysis'))
+from HRV_Window_Statistics import RRPrefixStatistics
+
 class ECGDataStatus(Enum):
     """ECG数据状态"""
     REALTIME = "realtime"
@@ -30,6 +37,10 @@ class ECGDataStatus(Enum):
 class ECGSegmentationAnalyzer:
     """ECG智能分段分析器"""
     
+    # 分段特征的R波检测: 阈值取60秒邻域最大值的60%，最小R波间距0.4秒 (心率上限150 bpm)
+    SEGMENT_PEAK_WINDOW_SEC = 60
+    SEGMENT_PEAK_DISTANCE_SEC = 0.4
+    
     def __init__(self, sampling_rate=500):
         self.sampling_rate = sampling_rate
         self.segmentation_modes = {
@@ -100,41 +111,62 @@ class ECGSegmentationAnalyzer:
             print(f"变化点检测出错: {e}")
             return []
     
-    def extract_ecg_features(self, ecg_data, window_size_sec=60):
-        """提取ECG多维度特征"""
+    def extract_ecg_features(self, ecg_data, window_size_sec=60, step_sec=None):
+        """
+        提取ECG多维度特征
+        R波在全程只检测一次，各窗口的心率/RMSSD 由RR间期前缀和求得，
+        幅值均值/标准差由信号前缀和求得；step_sec 默认窗口长度的1/4
+        """
+        ecg_data = np.asarray(ecg_data, dtype=float)
         window_size = int(window_size_sec * self.sampling_rate)
-        features = []
+        step = int(step_sec * self.sampling_rate) if step_sec else window_size // 4
+        starts = np.arange(0, len(ecg_data) - window_size, max(step, 1))
+        if len(starts) == 0:
+            return []
+        stops = starts + window_size
         
-        for i in range(0, len(ecg_data) - window_size, window_size // 4):
-            window = ecg_data[i:i + window_size]
-            
-            # R波检测
-            r_peaks, _ = signal.find_peaks(window, 
-                                         height=np.max(window) * 0.6,
-                                         distance=self.sampling_rate * 0.6)
-            
-            if len(r_peaks) > 2:
-                rr_intervals = np.diff(r_peaks) / self.sampling_rate * 1000
+        r_peaks, rr_stats = self.detect_rr_statistics(ecg_data, window_size, min_distance_sec=0.6)
+        
+        # 每个窗口内的R波区间 [first, last)，相邻R波间的RR间期区间 [first, last-1)
+        first = np.searchsorted(r_peaks, starts)
+        last = np.searchsorted(r_peaks, stops)
+        enough_beats = last - first > 2
+        rr_window = rr_stats.window_stats(first, np.maximum(last - 1, first))
+        
+        # 信号幅值统计 (以全程均值为参考点累加，保证长记录的方差精度)
+        centered = ecg_data - ecg_data.mean()
+        abs_sum = np.concatenate(([0.0], np.cumsum(np.abs(ecg_data))))
+        value_sum = np.concatenate(([0.0], np.cumsum(centered)))
+        square_sum = np.concatenate(([0.0], np.cumsum(centered ** 2)))
+        amplitude_mean = (abs_sum[stops] - abs_sum[starts]) / window_size
+        window_mean = (value_sum[stops] - value_sum[starts]) / window_size
+        amplitude_std = np.sqrt(np.maximum((square_sum[stops] - square_sum[starts]) / window_size - window_mean ** 2, 0.0))
+        
+        features = []
+        for k, i in enumerate(starts):
+            if enough_beats[k]:
+                window = ecg_data[i:i + window_size]
+                window_peaks = r_peaks[first[k]:last[k]] - i
                 
                 feature_dict = {
-                    'timestamp_idx': i,
-                    'heart_rate_mean': 60000 / np.mean(rr_intervals) if len(rr_intervals) > 0 else 0,
-                    'heart_rate_std': np.std(60000 / rr_intervals) if len(rr_intervals) > 1 else 0,
-                    'rmssd': np.sqrt(np.mean(np.diff(rr_intervals) ** 2)) if len(rr_intervals) > 1 else 0,
-                    'signal_amplitude_mean': np.mean(np.abs(window)),
-                    'signal_amplitude_std': np.std(window),
+                    'timestamp_idx': int(i),
+                    'heart_rate_mean': float(rr_window['mean_HR'][k]),
+                    'heart_rate_std': float(rr_window['HR_std'][k]),
+                    'rmssd': float(rr_window['RMSSD'][k]),
+                    'signal_amplitude_mean': float(amplitude_mean[k]),
+                    'signal_amplitude_std': float(amplitude_std[k]),
                     'high_freq_power': self.calculate_high_frequency_power(window),
-                    'morphology_complexity': self.calculate_morphology_complexity(window, r_peaks)
+                    'morphology_complexity': self.calculate_morphology_complexity(window, window_peaks)
                 }
             else:
                 # 如果检测不到足够的R波，使用基本统计特征
                 feature_dict = {
-                    'timestamp_idx': i,
+                    'timestamp_idx': int(i),
                     'heart_rate_mean': 0,
                     'heart_rate_std': 0,
                     'rmssd': 0,
-                    'signal_amplitude_mean': np.mean(np.abs(window)),
-                    'signal_amplitude_std': np.std(window),
+                    'signal_amplitude_mean': float(amplitude_mean[k]),
+                    'signal_amplitude_std': float(amplitude_std[k]),
                     'high_freq_power': 0,
                     'morphology_complexity': 0
                 }
@@ -143,6 +175,23 @@ class ECGSegmentationAnalyzer:
         
         return features
     
+    def detect_rr_statistics(self, ecg_data, window_size, min_distance_sec):
+        """
+        全程一次R波检测并建RR间期前缀和 (ms)
+        阈值取 window_size 点邻域内最大值的60%，对应原先逐窗口 max×0.6 的自适应阈值
+        返回 (r_peaks, rr_stats)，第 k 个RR间期位于 r_peaks[k] 与 r_peaks[k+1] 之间
+        """
+        ecg_data = np.asarray(ecg_data, dtype=float)
+        local_max = maximum_filter1d(ecg_data, size=max(int(window_size), 1))
+        r_peaks, _ = signal.find_peaks(ecg_data, height=local_max * 0.6,
+                                       distance=self.sampling_rate * min_distance_sec)
+        return r_peaks, RRPrefixStatistics(np.diff(r_peaks) / self.sampling_rate * 1000)
+    
+    def segment_rr_statistics(self, ecg_data):
+        """分段特征共用的R波位置与RR前缀和统计 (每条记录检测一次)"""
+        return self.detect_rr_statistics(ecg_data, self.SEGMENT_PEAK_WINDOW_SEC * self.sampling_rate,
+                                         self.SEGMENT_PEAK_DISTANCE_SEC)
+    
     def calculate_high_frequency_power(self, signal_window):
         """计算高频功率"""
         try:
@@ -262,15 +311,16 @@ class ECGSegmentationAnalyzer:
     
     def analyze_pathophysiologic_segments(self, ecg_data, change_points):
         """病理生理分段分析"""
+        rhythm = self.segment_rr_statistics(ecg_data)
         if not change_points:
             # 如果没有检测到变化点，按固定时间分段
             duration_sec = len(ecg_data) / self.sampling_rate
             if duration_sec <= 3600:  # 1小时内
-                segments = self.create_fixed_time_segments(ecg_data, num_segments=3)
+                segments = self.create_fixed_time_segments(ecg_data, num_segments=3, rhythm=rhythm)
             else:
-                segments = self.create_fixed_time_segments(ecg_data, num_segments=6)
+                segments = self.create_fixed_time_segments(ecg_data, num_segments=6, rhythm=rhythm)
         else:
-            segments = self.create_adaptive_segments(ecg_data, change_points)
+            segments = self.create_adaptive_segments(ecg_data, change_points, rhythm=rhythm)
         
         return {
             "分段模式": "病理生理分段",
@@ -296,7 +346,8 @@ class ECGSegmentationAnalyzer:
         if detected_events:
             segments = self.create_event_based_segments(ecg_data, detected_events)
         else:
-            segments = self.create_fixed_time_segments(ecg_data, num_segments=4)
+            segments = self.create_fixed_time_segments(ecg_data, num_segments=4,
+                                                       rhythm=self.segment_rr_statistics(ecg_data))
         
         return {
             "分段模式": "临床事件分段",
@@ -389,8 +440,12 @@ class ECGSegmentationAnalyzer:
         
         return events
     
-    def create_adaptive_segments(self, ecg_data, change_points):
-        """基于变化点创建自适应分段"""
+    def create_adaptive_segments(self, ecg_data, change_points, rhythm=None):
+        """
+        基于变化点创建自适应分段
+        rhythm: 可选，segment_rr_statistics 的结果 (r_peaks, rr_stats)，各分段共用
+        """
+        r_peaks, rr_stats = rhythm if rhythm is not None else self.segment_rr_statistics(ecg_data)
         segments = []
         
         # 添加起始点
@@ -401,8 +456,7 @@ class ECGSegmentationAnalyzer:
             start_idx = boundaries[i]
             end_idx = boundaries[i + 1]
             
-            segment_data = ecg_data[start_idx:end_idx]
-            segment_features = self.analyze_segment_features(segment_data)
+            segment_features = self.analyze_segment_features(ecg_data, start_idx, end_idx, r_peaks, rr_stats)
             
             segments.append({
                 "段落编号": i + 1,
@@ -414,8 +468,12 @@ class ECGSegmentationAnalyzer:
         
         return segments
     
-    def create_fixed_time_segments(self, ecg_data, num_segments=4):
-        """创建固定时间分段"""
+    def create_fixed_time_segments(self, ecg_data, num_segments=4, rhythm=None):
+        """
+        创建固定时间分段
+        rhythm: 可选，segment_rr_statistics 的结果 (r_peaks, rr_stats)，各分段共用
+        """
+        r_peaks, rr_stats = rhythm if rhythm is not None else self.segment_rr_statistics(ecg_data)
         segments = []
         segment_length = len(ecg_data) // num_segments
         
@@ -423,8 +481,7 @@ class ECGSegmentationAnalyzer:
             start_idx = i * segment_length
             end_idx = (i + 1) * segment_length if i < num_segments - 1 else len(ecg_data)
             
-            segment_data = ecg_data[start_idx:end_idx]
-            segment_features = self.analyze_segment_features(segment_data)
+            segment_features = self.analyze_segment_features(ecg_data, start_idx, end_idx, r_peaks, rr_stats)
             
             segments.append({
                 "段落编号": i + 1,
@@ -436,27 +493,34 @@ class ECGSegmentationAnalyzer:
         
         return segments
     
-    def analyze_segment_features(self, segment_data):
-        """分析分段特征"""
+    def analyze_segment_features(self, ecg_data, start_idx, end_idx, r_peaks, rr_stats):
+        """
+        分析分段 [start_idx, end_idx) 的特征
+        r_peaks/rr_stats 为整条记录的R波与RR前缀和 (segment_rr_statistics)，
+        分段内R波区间 [first, last)，相邻R波间的RR间期区间 [first, last-1)
+        """
         try:
-            # R波检测
-            r_peaks, _ = signal.find_peaks(segment_data, 
-                                         height=np.max(segment_data) * 0.6,
-                                         distance=self.sampling_rate * 0.4)
+            segment_data = ecg_data[start_idx:end_idx]
+            first, last = np.searchsorted(r_peaks, [start_idx, end_idx])
             
-            if len(r_peaks) > 2:
-                rr_intervals = np.diff(r_peaks) / self.sampling_rate * 1000
-                mean_hr = 60000 / np.mean(rr_intervals) if len(rr_intervals) > 0 else 0
-                rmssd = np.sqrt(np.mean(np.diff(rr_intervals) ** 2)) if len(rr_intervals) > 1 else 0
+            if last - first > 2:
+                window = rr_stats.window_stats(first, last - 1)
+                mean_hr = window['mean_HR']
+                rmssd = window['RMSSD']
+                if window['n_beats'] < 5:
+                    regularity = "数据不足"
+                else:
+                    regularity = self.classify_rhythm_cv(window['SDNN'] / window['mean_RR'])
             else:
                 mean_hr = 0
                 rmssd = 0
+                regularity = "无法评估"
             
             return {
                 "平均心率": f"{mean_hr:.1f} bpm",
                 "心率变异性(RMSSD)": f"{rmssd:.1f} ms",
                 "信号质量": self.assess_signal_quality(segment_data),
-                "节律规整性": self.assess_rhythm_regularity(rr_intervals) if len(r_peaks) > 2 else "无法评估"
+                "节律规整性": regularity
             }
         except:
             return {
@@ -490,8 +554,10 @@ class ECGSegmentationAnalyzer:
         if len(rr_intervals) < 5:
             return "数据不足"
         
-        cv = np.std(rr_intervals) / np.mean(rr_intervals)
-        
+        return self.classify_rhythm_cv(np.std(rr_intervals) / np.mean(rr_intervals))
+    
+    def classify_rhythm_cv(self, cv):
+        """按RR间期变异系数分级心律规整性"""
         if cv < 0.05:
             return "非常规整"
         elif cv < 0.10:
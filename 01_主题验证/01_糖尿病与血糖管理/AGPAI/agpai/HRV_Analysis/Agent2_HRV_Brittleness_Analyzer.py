@@ -14,13 +14,15 @@ Agent2_HRV_Brittleness_Analyzer.py
 
 import numpy as np
 import pandas as pd
-from scipy import signal
 from scipy.stats import entropy
 import json
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+from HRV_Spectral_Engine import HRVSpectralEngine
+from HRV_Window_Statistics import resolve_window
+
 class HRVBrittenessAnalyzer:
     """HRV脆性分析器 - 基于Agent2混沌动力学架构"""
     
@@ -40,6 +42,9 @@ class HRVBrittenessAnalyzer:
             "SDNN": {"normal": 100, "warning": 50, "risk": 30},
             "LF_HF_ratio": {"balanced_min": 1.0, "balanced_max": 2.5}
         }
+        
+        # 频域分析引擎 (频率网格按参数缓存，多个分析器实例共用)
+        self.spectral_engine = HRVSpectralEngine()
     
     def preprocess_rr_data(self, rr_intervals):
         """RR间期数据预处理"""
@@ -59,86 +64,57 @@ class HRVBrittenessAnalyzer:
         
         return rr_data
     
-    def calculate_time_domain_hrv(self, rr_intervals):
-        """计算HRV时域指标"""
-        if len(rr_intervals) < 5:
+    def calculate_time_domain_hrv(self, rr_intervals=None, rr_stats=None, start=0, stop=None):
+        """
+        计算HRV时域指标
+        rr_intervals 与 rr_stats 二选一；传 rr_stats (如分段分析器已为整条序列建好的前缀和) 时，
+        start/stop 指定心拍区间 [start, stop)，只计算该区间，不再重复累加
+        """
+        rr_stats, start, stop = resolve_window(rr_intervals, rr_stats, start, stop)
+        n_beats = stop - start
+        if n_beats < 5:
             return {
                 'RMSSD': 0, 'pNN50': 0, 'SDNN': 0, 'SDANN': 0,
                 'mean_RR': 0, 'mean_HR': 0
             }
         
-        # 基础统计
-        mean_rr = np.mean(rr_intervals)
-        mean_hr = 60000 / mean_rr if mean_rr > 0 else 0
-        
-        # RMSSD: 相邻RR间期差值的均方根
-        rmssd = np.sqrt(np.mean(np.diff(rr_intervals) ** 2))
+        # RMSSD / pNN50 / SDNN / 平均心率: 心拍区间的前缀和统计
+        stats = rr_stats.window_stats(start, stop)
         
-        # pNN50: 相邻RR间期差值>50ms的百分比
-        nn50_count = np.sum(np.abs(np.diff(rr_intervals)) > 50)
-        pnn50 = (nn50_count / (len(rr_intervals) - 1)) * 100
-        
-        # SDNN: RR间期标准差
-        sdnn = np.std(rr_intervals)
-        
-        # SDANN: 5分钟段平均RR间期的标准差
-        if len(rr_intervals) > 100:
-            segment_size = len(rr_intervals) // 20  # 分为20段
-            segment_means = []
-            for i in range(0, len(rr_intervals) - segment_size, segment_size):
-                segment = rr_intervals[i:i + segment_size]
-                segment_means.append(np.mean(segment))
+        # SDANN: 分段平均RR间期的标准差
+        if n_beats > 100:
+            segment_means = rr_stats.segment_means(n_beats // 20, start, stop)  # 分为20段
             sdann = np.std(segment_means) if len(segment_means) > 1 else 0
         else:
             sdann = 0
         
         return {
-            'RMSSD': rmssd,
-            'pNN50': pnn50,
-            'SDNN': sdnn,
+            'RMSSD': stats['RMSSD'],
+            'pNN50': stats['pNN50'],
+            'SDNN': stats['SDNN'],
             'SDANN': sdann,
-            'mean_RR': mean_rr,
-            'mean_HR': mean_hr
+            'mean_RR': stats['mean_RR'],
+            'mean_HR': stats['mean_HR']
         }
     
     def calculate_frequency_domain_hrv(self, rr_intervals, sampling_rate=4):
-        """计算HRV频域指标"""
+        """
+        计算HRV频域指标
+        直接在非等间隔RR序列上做Lomb-Scargle谱估计 (HRV_Spectral_Engine)，不再插值重采样；
+        sampling_rate 仅为兼容旧调用保留
+        """
         try:
             if len(rr_intervals) < 50:
                 return {'LF': 0, 'HF': 0, 'LF_HF_ratio': 0, 'total_power': 0}
             
-            # RR间期插值到等间隔时间序列
-            time_points = np.cumsum(rr_intervals) / 1000  # 转换为秒
-            time_uniform = np.arange(0, time_points[-1], 1/sampling_rate)
-            
-            # 插值
-            rr_interpolated = np.interp(time_uniform, time_points[:-1], rr_intervals[:-1])
-            
-            # 去趋势
-            rr_detrended = signal.detrend(rr_interpolated)
-            
-            # 功率谱密度估计
-            f, psd = signal.welch(rr_detrended, fs=sampling_rate, nperseg=min(256, len(rr_detrended)))
-            
-            # 频段功率计算
-            vlf_mask = (f >= 0.003) & (f < 0.04)   # VLF: 0.003-0.04 Hz
-            lf_mask = (f >= 0.04) & (f < 0.15)     # LF: 0.04-0.15 Hz  
-            hf_mask = (f >= 0.15) & (f < 0.4)      # HF: 0.15-0.4 Hz
-            
-            vlf_power = np.sum(psd[vlf_mask])
-            lf_power = np.sum(psd[lf_mask])
-            hf_power = np.sum(psd[hf_mask])
-            total_power = np.sum(psd)
-            
-            # LF/HF比值
-            lf_hf_ratio = lf_power / hf_power if hf_power > 0 else 0
+            powers = self.spectral_engine.band_powers(rr_intervals)
             
             return {
-                'VLF': vlf_power,
-                'LF': lf_power,
-                'HF': hf_power,
-                'LF_HF_ratio': lf_hf_ratio,
-                'total_power': total_power
+                'VLF': powers['VLF'],
+                'LF': powers['LF'],
+                'HF': powers['HF'],
+                'LF_HF_ratio': powers['LF_HF_ratio'],
+                'total_power': powers['total_power']
             }
         except:
             return {'LF': 0, 'HF': 0, 'LF_HF_ratio': 0, 'total_power': 0}
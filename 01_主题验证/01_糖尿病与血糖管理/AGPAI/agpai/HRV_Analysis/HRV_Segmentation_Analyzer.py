@@ -14,12 +14,14 @@ HRV智能分段分析器 - 基于Agent2 v5.0智能分段架构
 
 import numpy as np
 import pandas as pd
-from scipy import signal
 from scipy.stats import chi2_contingency
 import json
 from datetime import datetime, timedelta
 from enum import Enum
 
+from HRV_Spectral_Engine import HRVSpectralEngine
+from HRV_Window_Statistics import RRPrefixStatistics
+
 class HRVDataStatus(Enum):
     """HRV数据状态"""
     TRAINING = "training"          # 训练监测数据
@@ -47,6 +49,9 @@ class HRVSegmentationAnalyzer:
             'LF_HF_ratio': 0.5,
             'heart_rate': 10   # bpm
         }
+        
+        # 频域分析引擎 (频率网格按参数缓存)
+        self.spectral_engine = HRVSpectralEngine()
     
     def detect_data_status(self, rr_intervals, timestamps=None, context_info=None):
         """智能检测HRV数据状态"""
@@ -99,61 +104,57 @@ class HRVSegmentationAnalyzer:
         }
         return recommendations.get(data_status, "autonomic_balance")
     
-    def extract_hrv_features_windowed(self, rr_intervals, window_size_minutes=5):
-        """提取滑动窗口HRV特征"""
+    def extract_hrv_features_windowed(self, rr_intervals, window_size_minutes=5, step_beats=None, rr_stats=None):
+        """
+        提取滑动窗口HRV特征
+        step_beats: 窗口步长 (心拍数)，默认窗口长度的1/4；时域指标由前缀和求得，步长为1也可覆盖整夜记录
+        rr_stats: 可选，调用方已为同一序列建好的 RRPrefixStatistics (与后续分段分析共用)
+        """
+        rr_intervals = np.asarray(rr_intervals, dtype=float)
         window_size_beats = int(window_size_minutes * 60 / (np.mean(rr_intervals) / 1000))
         window_size_beats = max(50, min(window_size_beats, len(rr_intervals) // 10))
+        step_beats = step_beats or window_size_beats // 4
         
-        features = []
+        starts = np.arange(0, len(rr_intervals) - window_size_beats, step_beats)
+        if len(starts) == 0:
+            return []
         
-        for i in range(0, len(rr_intervals) - window_size_beats, window_size_beats // 4):
-            window_rr = rr_intervals[i:i + window_size_beats]
-            
-            if len(window_rr) < 20:
-                continue
-            
-            # 时域HRV指标
-            rmssd = np.sqrt(np.mean(np.diff(window_rr) ** 2))
-            sdnn = np.std(window_rr)
-            pnn50 = (np.sum(np.abs(np.diff(window_rr)) > 50) / (len(window_rr) - 1)) * 100
-            mean_hr = 60000 / np.mean(window_rr)
-            
-            # 频域HRV指标 (简化版本)
-            try:
-                # 插值到等间隔时间序列
-                time_points = np.cumsum(window_rr) / 1000
-                time_uniform = np.arange(0, time_points[-1], 0.25)  # 4Hz采样
-                rr_interpolated = np.interp(time_uniform, time_points[:-1], window_rr[:-1])
-                
-                # 功率谱密度
-                f, psd = signal.welch(signal.detrend(rr_interpolated), fs=4, nperseg=min(64, len(rr_interpolated)))
-                
-                lf_mask = (f >= 0.04) & (f < 0.15)
-                hf_mask = (f >= 0.15) & (f < 0.4)
-                
-                lf_power = np.sum(psd[lf_mask])
-                hf_power = np.sum(psd[hf_mask])
-                lf_hf_ratio = lf_power / hf_power if hf_power > 0 else 0
-            except:
-                lf_hf_ratio = 0
-            
-            # 复杂性指标
-            complexity = self.calculate_simple_complexity(window_rr)
-            
-            feature_dict = {
-                'start_beat': i,
-                'window_center_time_min': (i + window_size_beats // 2) * np.mean(rr_intervals) / 1000 / 60,
-                'RMSSD': rmssd,
-                'SDNN': sdnn,
-                'pNN50': pnn50,
-                'mean_HR': mean_hr,
-                'LF_HF_ratio': lf_hf_ratio,
-                'complexity': complexity
-            }
-            
-            features.append(feature_dict)
+        # 时域HRV指标: 全部窗口由同一份前缀和求得
+        rr_stats = self._prefix_statistics(rr_intervals, rr_stats)
+        time_domain = rr_stats.window_stats(starts, starts + window_size_beats)
+        
+        # 频域HRV指标: 所有窗口一次批量做Lomb-Scargle谱估计，无需逐窗口插值
+        try:
+            _, powers = self.spectral_engine.sliding_band_powers(rr_intervals, window_size_beats, step_beats)
+            lf_hf_ratios = powers.get('LF_HF_ratio', np.zeros(0))[:len(starts)]
+        except:
+            lf_hf_ratios = np.zeros(len(starts))
         
-        return features
+        # 复杂性指标: 相邻差值标准差 / 平均RR
+        complexity = np.divide(time_domain['SDSD'], time_domain['mean_RR'],
+                               out=np.zeros(len(starts)), where=time_domain['mean_RR'] > 0)
+        center_time_min = (starts + window_size_beats // 2) * np.mean(rr_intervals) / 1000 / 60
+        
+        columns = {
+            'start_beat': starts.tolist(),
+            'window_center_time_min': center_time_min.tolist(),
+            'RMSSD': time_domain['RMSSD'].tolist(),
+            'SDNN': time_domain['SDNN'].tolist(),
+            'pNN50': time_domain['pNN50'].tolist(),
+            'mean_HR': time_domain['mean_HR'].tolist(),
+            'LF_HF_ratio': np.asarray(lf_hf_ratios, dtype=float).tolist(),
+            'complexity': complexity.tolist()
+        }
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+    
+    @staticmethod
+    def _prefix_statistics(rr_intervals, rr_stats=None):
+        """返回整条序列的前缀和统计: 复用调用方传入的一份，未传入时现场构建"""
+        if rr_stats is None:
+            return RRPrefixStatistics(rr_intervals)
+        if len(rr_stats) != len(rr_intervals):
+            raise ValueError(f"rr_stats 与RR序列长度不一致: {len(rr_stats)} != {len(rr_intervals)}")
+        return rr_stats
     
     def calculate_simple_complexity(self, rr_intervals):
         """计算简单的复杂性指标"""
@@ -261,11 +262,12 @@ class HRVSegmentationAnalyzer:
         else:
             return "综合调节变化"
     
-    def analyze_training_phases(self, rr_intervals, change_points):
-        """训练阶段分段分析"""
+    def analyze_training_phases(self, rr_intervals, change_points, rr_stats=None):
+        """训练阶段分段分析 (rr_stats: 可选的整条序列前缀和统计，各分段共用)"""
+        rr_stats = self._prefix_statistics(rr_intervals, rr_stats)
         if not change_points:
             # 默认训练三阶段：热身-主训练-恢复
-            segments = self.create_training_default_segments(rr_intervals)
+            segments = self.create_training_default_segments(rr_intervals, rr_stats)
         else:
             segments = self.create_training_adaptive_segments(rr_intervals, change_points)
         
@@ -276,8 +278,9 @@ class HRVSegmentationAnalyzer:
             "临床应用": "适用于运动员训练监测和运动处方制定"
         }
     
-    def create_training_default_segments(self, rr_intervals):
-        """创建默认训练阶段分段"""
+    def create_training_default_segments(self, rr_intervals, rr_stats=None):
+        """创建默认训练阶段分段，各分段指标由整条序列的前缀和按心拍区间求得"""
+        rr_stats = self._prefix_statistics(rr_intervals, rr_stats)
         total_duration_min = len(rr_intervals) * np.mean(rr_intervals) / 1000 / 60
         
         segments = []
@@ -301,23 +304,26 @@ class HRVSegmentationAnalyzer:
         for i in range(len(boundaries) - 1):
             start_idx = boundaries[i]
             end_idx = boundaries[i + 1]
-            segment_rr = rr_intervals[start_idx:end_idx]
+            window = rr_stats.window_stats(start_idx, end_idx)
             
             segments.append({
                 "阶段编号": i + 1,
                 "阶段名称": phase_names[i] if i < len(phase_names) else f"阶段{i+1}",
                 "开始时间": f"{start_idx * np.mean(rr_intervals) / 1000 / 60:.1f}分钟",
-                "持续时间": f"{len(segment_rr) * np.mean(segment_rr) / 1000 / 60:.1f}分钟",
-                "训练特征": self.analyze_training_segment(segment_rr)
+                "持续时间": f"{window['n_beats'] * window['mean_RR'] / 1000 / 60:.1f}分钟",
+                "训练特征": self.analyze_training_segment(rr_stats, start_idx, end_idx)
             })
         
         return segments
     
-    def analyze_training_segment(self, segment_rr):
-        """分析训练分段特征"""
+    def analyze_training_segment(self, rr_stats, start, stop):
+        """分析训练分段特征 (心拍区间 [start, stop)，rr_stats 为整条序列的前缀和统计)"""
         try:
-            mean_hr = 60000 / np.mean(segment_rr)
-            rmssd = np.sqrt(np.mean(np.diff(segment_rr) ** 2))
+            window = rr_stats.window_stats(start, stop)
+            if window['n_beats'] < 2:
+                return {"评估": "数据不足"}
+            mean_hr = window['mean_HR']
+            rmssd = window['RMSSD']
             
             # 训练强度评估
             if mean_hr >= 150:
@@ -369,9 +375,9 @@ class HRVSegmentationAnalyzer:
         else:
             return "需要评估"
     
-    def analyze_recovery_monitoring(self, rr_intervals, change_points):
-        """恢复监测分段分析"""
-        segments = self.create_recovery_segments(rr_intervals, change_points)
+    def analyze_recovery_monitoring(self, rr_intervals, change_points, rr_stats=None):
+        """恢复监测分段分析 (rr_stats: 可选的整条序列前缀和统计，各分段共用)"""
+        segments = self.create_recovery_segments(rr_intervals, change_points, rr_stats)
         
         return {
             "分段模式": "恢复监测分段",
@@ -380,8 +386,9 @@ class HRVSegmentationAnalyzer:
             "临床应用": "适用于运动恢复监测和疲劳评估"
         }
     
-    def create_recovery_segments(self, rr_intervals, change_points):
-        """创建恢复阶段分段"""
+    def create_recovery_segments(self, rr_intervals, change_points, rr_stats=None):
+        """创建恢复阶段分段，各分段指标由整条序列的前缀和按心拍区间求得"""
+        rr_stats = self._prefix_statistics(rr_intervals, rr_stats)
         total_duration_min = len(rr_intervals) * np.mean(rr_intervals) / 1000 / 60
         
         if not change_points or total_duration_min < 60:
@@ -403,24 +410,27 @@ class HRVSegmentationAnalyzer:
         for i in range(len(boundaries) - 1):
             start_idx = boundaries[i]
             end_idx = boundaries[i + 1]
-            segment_rr = rr_intervals[start_idx:end_idx]
+            window = rr_stats.window_stats(start_idx, end_idx)
             
             segments.append({
                 "恢复阶段": i + 1,
                 "阶段名称": phase_names[i] if i < len(phase_names) else f"恢复{i+1}",
                 "开始时间": f"{start_idx * np.mean(rr_intervals) / 1000 / 60:.1f}分钟",
-                "持续时间": f"{len(segment_rr) * np.mean(segment_rr) / 1000 / 60:.1f}分钟",
-                "恢复特征": self.analyze_recovery_segment(segment_rr)
+                "持续时间": f"{window['n_beats'] * window['mean_RR'] / 1000 / 60:.1f}分钟",
+                "恢复特征": self.analyze_recovery_segment(rr_stats, start_idx, end_idx)
             })
         
         return segments
     
-    def analyze_recovery_segment(self, segment_rr):
-        """分析恢复分段特征"""
+    def analyze_recovery_segment(self, rr_stats, start, stop):
+        """分析恢复分段特征 (心拍区间 [start, stop)，rr_stats 为整条序列的前缀和统计)"""
         try:
-            mean_hr = 60000 / np.mean(segment_rr)
-            rmssd = np.sqrt(np.mean(np.diff(segment_rr) ** 2))
-            hrv_trend = self.calculate_hrv_trend(segment_rr)
+            window = rr_stats.window_stats(start, stop)
+            if window['n_beats'] < 2:
+                return {"评估": "数据不足"}
+            mean_hr = window['mean_HR']
+            rmssd = window['RMSSD']
+            hrv_trend = self.calculate_hrv_trend(rr_stats, start, stop)
             
             # 恢复质量评估
             if mean_hr <= 70 and rmssd >= 40:
@@ -444,17 +454,16 @@ class HRVSegmentationAnalyzer:
         except:
             return {"评估": "数据不足"}
     
-    def calculate_hrv_trend(self, segment_rr):
-        """计算HRV趋势"""
-        if len(segment_rr) < 100:
+    def calculate_hrv_trend(self, rr_stats, start, stop):
+        """计算心拍区间 [start, stop) 的HRV趋势"""
+        if stop - start < 100:
             return "数据不足"
         
         # 分为前半段和后半段比较
-        mid_point = len(segment_rr) // 2
-        first_half_rmssd = np.sqrt(np.mean(np.diff(segment_rr[:mid_point]) ** 2))
-        second_half_rmssd = np.sqrt(np.mean(np.diff(segment_rr[mid_point:]) ** 2))
+        mid_point = start + (stop - start) // 2
+        halves_rmssd = rr_stats.window_stats([start, mid_point], [mid_point, stop])['RMSSD']
         
-        rmssd_change = second_half_rmssd - first_half_rmssd
+        rmssd_change = halves_rmssd[1] - halves_rmssd[0]
         
         if rmssd_change > 5:
             return "HRV上升"
@@ -497,8 +506,12 @@ def analyze_hrv_segmentation(rr_intervals, patient_id="Unknown", mode="auto", co
         mode = data_status['推荐分段模式']
         print(f"🧠 智能推荐模式: {mode}")
     
+    # 整条序列的RR前缀和统计: 特征窗口与各分段共用一份
+    rr_intervals = np.asarray(rr_intervals, dtype=float)
+    rr_stats = RRPrefixStatistics(rr_intervals)
+    
     # 提取HRV特征
-    hrv_features = analyzer.extract_hrv_features_windowed(rr_intervals)
+    hrv_features = analyzer.extract_hrv_features_windowed(rr_intervals, rr_stats=rr_stats)
     print(f"📈 提取了 {len(hrv_features)} 个HRV特征窗口")
     
     # 检测变化点
@@ -507,12 +520,12 @@ def analyze_hrv_segmentation(rr_intervals, patient_id="Unknown", mode="auto", co
     
     # 执行分段分析
     if mode == "training_phases":
-        segmentation_result = analyzer.analyze_training_phases(rr_intervals, change_points)
+        segmentation_result = analyzer.analyze_training_phases(rr_intervals, change_points, rr_stats)
     elif mode == "recovery_monitoring":
-        segmentation_result = analyzer.analyze_recovery_monitoring(rr_intervals, change_points)
+        segmentation_result = analyzer.analyze_recovery_monitoring(rr_intervals, change_points, rr_stats)
     else:
         # 默认使用训练阶段分析
-        segmentation_result = analyzer.analyze_training_phases(rr_intervals, change_points)
+        segmentation_result = analyzer.analyze_training_phases(rr_intervals, change_points, rr_stats)
     
     # 生成报告
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+HRV_Spectral_Engine.py
+
+HRV频域分析引擎 - Lomb-Scargle周期图
+直接在非等间隔的RR间期序列上计算功率谱，无需插值重采样到4Hz:
+- 固定频率网格 (按参数缓存)，VLF/LF/HF频段掩码随网格一起缓存
+- 多个窗口组成二维批量 (窗口 × 心拍) 一次向量化计算，按内存上限自动分块
+- 长度不同的窗口以 NaN 补齐，计算时自动屏蔽
+功率单位: PSD 为 ms²/Hz，频段功率为 ms² (按频率间隔积分，总功率≈RR方差)
+
+作者: AGPAI Team
+版本: v1.0
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# HRV标准频段 (Hz)
+HRV_BANDS = {
+    'VLF': (0.0033, 0.04),
+    'LF': (0.04, 0.15),
+    'HF': (0.15, 0.4)
+}
+
+
+@lru_cache(maxsize=16)
+def _frequency_grid(f_min, f_max, n_freqs, bands):
+    """
+    等间隔频率网格及各频段掩码 (缓存，所有窗口/分析器共用)
+    返回 (频率, 角频率, 频率间隔, {频段: 掩码})
+    """
+    freqs = np.linspace(f_min, f_max, n_freqs)
+    freqs.flags.writeable = False
+    omega = 2 * np.pi * freqs
+    omega.flags.writeable = False
+    df = float(freqs[1] - freqs[0]) if n_freqs > 1 else 0.0
+    masks = {}
+    for name, (low, high) in bands:
+        mask = (freqs >= low) & (freqs < high)
+        mask.flags.writeable = False
+        masks[name] = mask
+    return freqs, omega, df, masks
+
+
+def sliding_rr_windows(rr_intervals, window_beats, step_beats=1):
+    """按心拍数切分滑动窗口，返回二维只读视图 (窗口 × 心拍)，不复制数据"""
+    rr = np.asarray(rr_intervals, dtype=float)
+    if window_beats <= 0 or step_beats <= 0:
+        raise ValueError(f"窗口长度和步长必须为正整数: {window_beats}, {step_beats}")
+    if len(rr) < window_beats:
+        return np.empty((0, window_beats))
+    return sliding_window_view(rr, window_beats)[::step_beats]
+
+
+class HRVSpectralEngine:
+    """HRV Lomb-Scargle 频域分析引擎"""
+
+    def __init__(self, f_min=0.0033, f_max=0.4, n_freqs=256, bands=None,
+                 max_chunk_elements=4_000_000):
+        """
+        f_min/f_max/n_freqs: 频率网格 (Hz)，默认覆盖 VLF 下限到 HF 上限
+        bands: 频段定义，默认 HRV_BANDS
+        max_chunk_elements: 单次向量化计算的 窗口数×频点数×心拍数 上限 (控制峰值内存)
+        """
+        if n_freqs < 2 or not 0 < f_min < f_max:
+            raise ValueError(f"频率网格参数无效: f_min={f_min}, f_max={f_max}, n_freqs={n_freqs}")
+        self.bands = dict(HRV_BANDS if bands is None else bands)
+        self.freqs, self._omega, self.df, self.band_masks = _frequency_grid(
+            float(f_min), float(f_max), int(n_freqs), tuple(self.bands.items()))
+        self.max_chunk_elements = max_chunk_elements
+
+    def periodogram(self, rr_windows, detrend=True):
+        """
+        批量Lomb-Scargle功率谱
+        rr_windows: 一维RR序列 (ms) 或二维 (窗口 × 心拍)，不足长度以 NaN 补齐
+        detrend: 是否去除线性趋势 (否则仅去均值)
+        返回 (频率, PSD)；一维输入时 PSD 为一维
+        """
+        rr = np.asarray(rr_windows, dtype=float)
+        single = rr.ndim == 1
+        rr = np.atleast_2d(rr)
+        psd = np.zeros((rr.shape[0], len(self.freqs)))
+
+        rows_per_chunk = max(1, self.max_chunk_elements // max(1, len(self.freqs) * rr.shape[1]))
+        for start in range(0, rr.shape[0], rows_per_chunk):
+            psd[start:start + rows_per_chunk] = self._lomb_scargle(rr[start:start + rows_per_chunk], detrend)
+
+        return self.freqs, (psd[0] if single else psd)
+
+    def _lomb_scargle(self, rr, detrend):
+        """一个分块的 Lomb-Scargle 计算，rr: (窗口 × 心拍)"""
+        valid = ~np.isnan(rr)
+        n = valid.sum(axis=1)
+        values = np.where(valid, rr, 0.0)
+
+        # 心拍时刻 (秒)：窗口内RR间期累加，窗口起点为0
+        t = np.cumsum(values, axis=1) / 1000.0
+        t -= t[:, :1]
+        weights = valid.astype(float)
+
+        # 去均值 / 去线性趋势 (逐窗口最小二乘，向量化)
+        safe_n = np.maximum(n, 1)
+        t_mean = (t * weights).sum(axis=1) / safe_n
+        x_mean = values.sum(axis=1) / safe_n
+        t_centered = (t - t_mean[:, None]) * weights
+        x = (values - x_mean[:, None]) * weights
+        if detrend:
+            t_var = (t_centered ** 2).sum(axis=1)
+            slope = np.divide((t_centered * x).sum(axis=1), t_var, out=np.zeros_like(t_var), where=t_var > 0)
+            x = (x - slope[:, None] * t_centered) * weights
+
+        # 复指数形式: Z = Σ x·e^{iωt} (余弦/正弦投影), E2 = Σ e^{2iωt} (确定时间偏移 τ)
+        exp_wt = np.exp(1j * self._omega[None, :, None] * t[:, None, :]) * weights[:, None, :]
+        z = np.einsum('bfn,bn->bf', exp_wt, x)
+        e2 = np.einsum('bfn,bfn->bf', exp_wt, exp_wt)
+        return self._psd_from_sums(z, e2, n, x_mean)
+
+    @staticmethod
+    def _psd_from_sums(z, e2, n, x_mean):
+        """
+        由各窗口的复数和计算 Lomb-Scargle PSD
+        z: Σ x·e^{iωt}，e2: Σ e^{2iωt}，n: 有效心拍数，x_mean: 窗口平均RR (ms)
+        """
+        # 时间偏移 τ 使正弦/余弦项正交: 2ωτ = arg(E2)，旋转后分母为 (n ± |E2|)/2
+        rotated = z * np.exp(-0.5j * np.angle(e2))
+        e2_abs = np.abs(e2)
+        cos_den = 0.5 * (n[:, None] + e2_abs)
+        sin_den = 0.5 * (n[:, None] - e2_abs)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            power = 0.5 * (np.where(cos_den > 1e-9, rotated.real ** 2 / cos_den, 0.0) +
+                           np.where(sin_den > 1e-9, rotated.imag ** 2 / sin_den, 0.0))
+
+            # 换算为单边功率谱密度 (ms²/Hz)：除以平均心拍频率，使频谱积分≈方差
+            psd = 2 * power * (np.maximum(x_mean, 0.0) / 1000.0)[:, None]
+        psd[n < 3] = 0.0
+        return psd
+
+    def band_powers(self, rr_windows, detrend=True):
+        """
+        批量频段功率
+        返回字典，每项为与窗口数等长的数组 (一维输入时为标量):
+        VLF/LF/HF (ms²)、total_power、LF_HF_ratio、LF_peak/HF_peak (Hz)
+        """
+        rr = np.asarray(rr_windows, dtype=float)
+        single = rr.ndim == 1
+        _, psd = self.periodogram(np.atleast_2d(rr), detrend)
+        result = self._integrate_bands(psd)
+
+        if single:
+            return {key: float(value[0]) for key, value in result.items()}
+        return result
+
+    def _integrate_bands(self, psd):
+        """PSD (窗口 × 频点) 按频段积分"""
+        result = {name: psd[:, mask].sum(axis=1) * self.df for name, mask in self.band_masks.items()}
+        result['total_power'] = psd.sum(axis=1) * self.df
+        if 'LF' in result and 'HF' in result:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result['LF_HF_ratio'] = np.where(result['HF'] > 0, result['LF'] / result['HF'], 0.0)
+        for name in ('LF', 'HF'):
+            mask = self.band_masks.get(name)
+            if mask is not None and mask.any():
+                result[f'{name}_peak'] = self.freqs[mask][np.argmax(psd[:, mask], axis=1)]
+        return result
+
+    def sliding_band_powers(self, rr_intervals, window_beats, step_beats=1, detrend=True):
+        """
+        滑动窗口频段功率，返回 (各窗口起始心拍, 频段功率字典)
+        Lomb-Scargle 对时间平移不变，各窗口可共用全序列的心拍时刻:
+        每个心拍的 e^{iωt} 只计算一次，窗口内求和由前缀和相减得到，
+        重叠窗口不再重复计算三角函数
+        """
+        rr = np.asarray(rr_intervals, dtype=float)
+        windows = sliding_rr_windows(rr, window_beats, step_beats)
+        starts = np.arange(len(windows)) * step_beats
+        if len(windows) == 0:
+            return starts, {}
+        if np.isnan(rr).any():
+            return starts, self.band_powers(windows, detrend)
+
+        t = np.cumsum(rr) / 1000.0
+        t -= t[0]
+        t_windows = sliding_window_view(t, window_beats)[::step_beats]
+        n = np.full(len(windows), window_beats)
+
+        # 逐窗口均值与线性趋势 (只涉及 窗口数×心拍数 的实数运算)
+        x_mean = windows.mean(axis=1)
+        t_mean = t_windows.mean(axis=1)
+        slope = np.zeros(len(windows))
+        if detrend:
+            t_centered = t_windows - t_mean[:, None]
+            t_var = np.einsum('ij,ij->i', t_centered, t_centered)
+            covariance = np.einsum('ij,ij->i', t_centered, windows - x_mean[:, None])
+            np.divide(covariance, t_var, out=slope, where=t_var > 0)
+        # x_j = rr_j - offset - slope·t_j
+        offset = x_mean - slope * t_mean
+
+        stops = starts + window_beats
+        psd = np.empty((len(windows), len(self.freqs)))
+        freqs_per_chunk = max(1, self.max_chunk_elements // (4 * len(rr)))
+        for f0 in range(0, len(self.freqs), freqs_per_chunk):
+            omega = self._omega[f0:f0 + freqs_per_chunk]
+            exp_wt = np.exp(1j * omega[:, None] * t[None, :])
+
+            def window_sums(values):
+                prefix = np.zeros((len(omega), len(rr) + 1), dtype=complex)
+                np.cumsum(values, axis=1, out=prefix[:, 1:])
+                return (prefix[:, stops] - prefix[:, starts]).T
+
+            z = (window_sums(exp_wt * rr) - offset[:, None] * window_sums(exp_wt)
+                 - slope[:, None] * window_sums(exp_wt * t))
+            e2 = window_sums(exp_wt * exp_wt)
+            psd[:, f0:f0 + freqs_per_chunk] = self._psd_from_sums(z, e2, n, x_mean)
+
+        return starts, self._integrate_bands(psd)
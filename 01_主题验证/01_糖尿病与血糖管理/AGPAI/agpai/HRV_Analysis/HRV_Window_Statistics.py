@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+HRV_Window_Statistics.py
+
+RR间期前缀和统计 - 任意区间的时域HRV指标 O(1) 求得
+对 RR、RR²、相邻差值²、|相邻差值|>阈值 等序列各做一次累加，
+之后每个窗口/分段的 SDNN、RMSSD、pNN50、平均心率 等只需两次前缀和相减:
+- 滑动窗口可按 1 个心拍步长覆盖整夜记录
+- 分段分析器和脆性分型器共用同一份前缀和，不再重复切片计算
+
+作者: AGPAI Team
+版本: v1.0
+"""
+
+import numpy as np
+
+
+def _prefix(values):
+    """前缀和，首项补0: prefix[j] - prefix[i] 即区间 [i, j) 之和"""
+    prefix = np.zeros(len(values) + 1, dtype=np.result_type(values, np.float64))
+    np.cumsum(values, out=prefix[1:])
+    return prefix
+
+
+class RRPrefixStatistics:
+    """RR间期序列的前缀和统计"""
+
+    def __init__(self, rr_intervals, nn_threshold=50):
+        """
+        rr_intervals: RR间期序列 (ms)
+        nn_threshold: NNx 阈值 (ms)，默认 50 即 pNN50
+        """
+        rr = np.asarray(rr_intervals, dtype=float)
+        if rr.ndim != 1:
+            raise ValueError(f"RR间期必须为一维序列: shape={rr.shape}")
+        self.rr = rr
+        self.nn_threshold = nn_threshold
+
+        # 以全序列均值为参考点累加，避免长记录中 ΣRR² 过大导致方差相减时丢失精度
+        self._rr_ref = float(rr.mean()) if len(rr) else 0.0
+        centered = rr - self._rr_ref
+        self._rr_sum = _prefix(centered)
+        self._rr_sq_sum = _prefix(centered ** 2)
+
+        heart_rate = np.divide(60000.0, rr, out=np.zeros_like(rr), where=rr > 0)
+        self._hr_ref = float(heart_rate.mean()) if len(rr) else 0.0
+        hr_centered = heart_rate - self._hr_ref
+        self._hr_sum = _prefix(hr_centered)
+        self._hr_sq_sum = _prefix(hr_centered ** 2)
+
+        diff = np.diff(rr)
+        self._diff_sum = _prefix(diff)
+        self._diff_sq_sum = _prefix(diff ** 2)
+        self._nn_count = _prefix((np.abs(diff) > nn_threshold).astype(np.int64))
+
+    def __len__(self):
+        return len(self.rr)
+
+    def window_stats(self, starts, stops):
+        """
+        区间 [start, stop) 的时域指标 (心拍下标)，starts/stops 可为标量或数组
+        返回字典: n_beats, mean_RR, SDNN, mean_HR, HR_std, RMSSD, SDSD, NN50, pNN50
+        SDNN/HR_std/SDSD 为总体标准差 (与 np.std 一致)；pNN50 以相邻差值个数为分母
+        """
+        scalar = np.ndim(starts) == 0 and np.ndim(stops) == 0
+        starts, stops = np.broadcast_arrays(np.atleast_1d(np.asarray(starts, dtype=np.int64)),
+                                            np.atleast_1d(np.asarray(stops, dtype=np.int64)))
+        if np.any(starts < 0) or np.any(stops > len(self.rr)) or np.any(stops < starts):
+            raise ValueError(f"区间超出RR序列范围 [0, {len(self.rr)}]")
+
+        n = (stops - starts).astype(float)
+        # 相邻差值区间: [start, stop-1)
+        diff_stops = np.maximum(stops - 1, starts)
+        n_diff = (diff_stops - starts).astype(float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rr_mean = (self._rr_sum[stops] - self._rr_sum[starts]) / n
+            rr_var = (self._rr_sq_sum[stops] - self._rr_sq_sum[starts]) / n - rr_mean ** 2
+            hr_mean = (self._hr_sum[stops] - self._hr_sum[starts]) / n
+            hr_var = (self._hr_sq_sum[stops] - self._hr_sq_sum[starts]) / n - hr_mean ** 2
+
+            diff_mean = (self._diff_sum[diff_stops] - self._diff_sum[starts]) / n_diff
+            diff_sq_mean = (self._diff_sq_sum[diff_stops] - self._diff_sq_sum[starts]) / n_diff
+            nn_count = self._nn_count[diff_stops] - self._nn_count[starts]
+
+            mean_rr = rr_mean + self._rr_ref
+            stats = {
+                'n_beats': stops - starts,
+                'mean_RR': np.where(n > 0, mean_rr, 0.0),
+                'SDNN': np.where(n > 0, np.sqrt(np.maximum(rr_var, 0.0)), 0.0),
+                'mean_HR': np.where((n > 0) & (mean_rr > 0), 60000.0 / mean_rr, 0.0),
+                'HR_std': np.where(n > 0, np.sqrt(np.maximum(hr_var, 0.0)), 0.0),
+                'RMSSD': np.where(n_diff > 0, np.sqrt(diff_sq_mean), 0.0),
+                'SDSD': np.where(n_diff > 0, np.sqrt(np.maximum(diff_sq_mean - diff_mean ** 2, 0.0)), 0.0),
+                'NN50': nn_count,
+                'pNN50': np.where(n_diff > 0, nn_count / n_diff * 100, 0.0)
+            }
+
+        if scalar:
+            return {key: value[0].item() for key, value in stats.items()}
+        return stats
+
+    def sliding(self, window_beats, step_beats=1):
+        """按心拍滑动窗口计算时域指标，返回 (各窗口起始心拍, 指标字典)"""
+        if window_beats <= 0 or step_beats <= 0:
+            raise ValueError(f"窗口长度和步长必须为正整数: {window_beats}, {step_beats}")
+        starts = np.arange(0, len(self.rr) - window_beats + 1, step_beats)
+        return starts, self.window_stats(starts, starts + window_beats)
+
+    def segment_means(self, segment_beats, start=0, stop=None):
+        """心拍区间 [start, stop) 内连续不重叠分段的平均RR间期 (用于SDANN等指标)"""
+        if segment_beats <= 0:
+            raise ValueError(f"分段长度必须为正整数: {segment_beats}")
+        stop = len(self.rr) if stop is None else stop
+        starts = np.arange(start, stop - segment_beats, segment_beats)
+        return self.window_stats(starts, starts + segment_beats)['mean_RR']
+
+
+def resolve_window(rr_intervals=None, rr_stats=None, start=0, stop=None):
+    """
+    时域指标函数的参数约定: rr_intervals 与 rr_stats 二选一
+    - rr_intervals: RR间期序列，现场建前缀和
+    - rr_stats: 调用方已建好的 RRPrefixStatistics (如分段分析器在整条序列上共用的一份)
+    start/stop 为心拍区间 [start, stop)，stop 默认序列末尾
+    返回 (rr_stats, start, stop)
+    """
+    if (rr_intervals is None) == (rr_stats is None):
+        raise ValueError("rr_intervals 与 rr_stats 必须且只能提供一个")
+    if rr_stats is None:
+        rr_stats = RRPrefixStatistics(rr_intervals)
+    stop = len(rr_stats) if stop is None else int(stop)
+    start = int(start)
+    if not 0 <= start <= stop <= len(rr_stats):
+        raise ValueError(f"心拍区间 [{start}, {stop}) 超出RR序列范围 [0, {len(rr_stats)}]")
+    return rr_stats, start, stop
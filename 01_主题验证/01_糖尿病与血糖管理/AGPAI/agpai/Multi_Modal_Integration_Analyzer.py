@@ -30,7 +30,7 @@ warnings.filterwarnings('ignore')
 # 数值计算和信号处理
 from scipy import signal, stats
 from scipy.stats import pearsonr, spearmanr, entropy as scipy_entropy
-from scipy.fft import fft, fftfreq, hilbert
+from scipy.fft import fft, fftfreq
 from scipy.integrate import odeint
 from scipy.optimize import minimize
 
@@ -92,10 +92,13 @@ class MultiModalIntegrationAnalyzer:
             # 数据同步配置
             'synchronization': {
                 'target_frequency_min': 5,        # 目标采样频率(分钟)
-                'interpolation_method': 'cubic',   # 插值方法
+                'interpolation_method': 'pchip',   # 插值方法 (linear/pchip/cubic)
                 'alignment_tolerance_min': 2,      # 时间对齐容差
                 'min_overlap_hours': 4,            # 最小重叠时间
                 'outlier_detection': True,         # 异常值检测
+                'outlier_method': 'iqr',           # 异常值方法 (iqr/zscore/rolling_mad)
+                'outlier_smooth_window': 5,        # 异常值邻域平滑窗口
+                'chunk_points': 50000,             # 分块插值的网格点数(控制内存)
                 'quality_threshold': 0.7           # 数据质量阈值
             },
             
@@ -575,42 +578,14 @@ class MultiModalIntegrationAnalyzer:
                 print(f"Warning: No {modality} data in overlap period")
                 continue
             
-            # 对每个信号进行时间同步
-            modality_signals = {}
+            # 所有信号列按有效值模式分组后一次性插值
             data_columns = [col for col in overlap_data.columns if col != 'timestamp']
+            time_numeric = (overlap_data['timestamp'] - overlap_start).dt.total_seconds().values
+            grid_numeric = (time_grid - overlap_start).total_seconds().values
             
-            for col in data_columns:
-                # 创建插值函数
-                valid_indices = overlap_data[col].notna()
-                if valid_indices.sum() < 3:
-                    print(f"Warning: Insufficient valid data for {modality}.{col}")
-                    continue
-                
-                valid_data = overlap_data[valid_indices]
-                
-                # 时间转换为数值(秒)
-                time_numeric = (valid_data['timestamp'] - overlap_start).dt.total_seconds()
-                grid_numeric = (time_grid - overlap_start).total_seconds()
-                
-                # 高级插值
-                try:
-                    if self.config['synchronization']['interpolation_method'] == 'cubic':
-                        from scipy.interpolate import CubicSpline
-                        cs = CubicSpline(time_numeric.values, valid_data[col].values, bc_type='natural')
-                        interpolated_values = cs(grid_numeric)
-                    else:
-                        # 线性插值作为后备
-                        interpolated_values = np.interp(grid_numeric, time_numeric.values, valid_data[col].values)
-                    
-                    # 异常值检测和平滑
-                    if self.config['synchronization']['outlier_detection']:
-                        interpolated_values = self._detect_and_smooth_outliers(interpolated_values)
-                    
-                    modality_signals[f"{modality}_{col}"] = interpolated_values
-                    
-                except Exception as e:
-                    print(f"Warning: Interpolation failed for {modality}.{col}: {e}")
-                    continue
+            modality_signals = self._synchronize_columns(
+                modality, overlap_data, data_columns, time_numeric, grid_numeric
+            )
             
             # 添加同步信号到主数据框
             for signal_name, values in modality_signals.items():
@@ -643,37 +618,179 @@ class MultiModalIntegrationAnalyzer:
             'synchronized_signals': list(synchronized_df.columns[1:])
         }
     
+    def _synchronize_columns(self, modality, overlap_data, data_columns, time_numeric, grid_numeric):
+        """
+        将一个模态的全部信号列同步到统一网格
+        
+        有效值位置相同的列合并为一个矩阵，一次完成插值和异常值平滑
+        """
+        sync_config = self.config['synchronization']
+        values = overlap_data[data_columns].apply(pd.to_numeric, errors='coerce').values.astype(float)
+        valid_mask = ~np.isnan(values)
+        
+        # 按有效值模式分组，通常所有列同属一组
+        groups = {}
+        for col_idx, col in enumerate(data_columns):
+            if valid_mask[:, col_idx].sum() < 3:
+                print(f"Warning: Insufficient valid data for {modality}.{col}")
+                continue
+            groups.setdefault(valid_mask[:, col_idx].tobytes(), []).append(col_idx)
+        
+        modality_signals = {}
+        for col_indices in groups.values():
+            rows = valid_mask[:, col_indices[0]]
+            try:
+                interpolated = self._interpolate_to_grid(
+                    time_numeric[rows], values[rows][:, col_indices], grid_numeric,
+                    method=sync_config['interpolation_method'],
+                    chunk_points=sync_config.get('chunk_points', 50000)
+                )
+                
+                # 异常值检测和平滑
+                if sync_config['outlier_detection']:
+                    interpolated = self._detect_and_smooth_outliers(
+                        interpolated,
+                        method=sync_config.get('outlier_method', 'iqr'),
+                        smooth_window=sync_config.get('outlier_smooth_window', 5)
+                    )
+            except Exception as e:
+                names = ', '.join(data_columns[c] for c in col_indices)
+                print(f"Warning: Interpolation failed for {modality}.[{names}]: {e}")
+                continue
+            
+            for k, col_idx in enumerate(col_indices):
+                modality_signals[f"{modality}_{data_columns[col_idx]}"] = interpolated[:, k]
+        
+        # 保持原有列顺序
+        return {f"{modality}_{col}": modality_signals[f"{modality}_{col}"]
+                for col in data_columns if f"{modality}_{col}" in modality_signals}
+    
+    def _interpolate_to_grid(self, x, y, grid, method='pchip', chunk_points=50000):
+        """
+        多列插值到统一网格
+        
+        linear/pchip 基于 np.searchsorted 定位区间，按网格分块求值以限制临时内存；
+        网格超出采样范围的部分取端点值（与 np.interp 一致）
+        
+        Parameters:
+        -----------
+        x : (n,) 采样时间(秒)
+        y : (n, c) 各列采样值
+        grid : (m,) 目标网格时间(秒)
+        """
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+        # 重复时间戳保留首个样本
+        keep = np.concatenate(([True], np.diff(x) > 0))
+        x, y = x[keep], y[keep]
+        
+        if method == 'cubic':
+            from scipy.interpolate import CubicSpline
+            cs = CubicSpline(x, y, axis=0, bc_type='natural')
+            return np.vstack([cs(grid[start:start + chunk_points])
+                              for start in range(0, len(grid), chunk_points)])
+        
+        h = np.diff(x)
+        slopes = None
+        if method == 'pchip' and len(x) > 2:
+            slopes = self._pchip_slopes(h, np.diff(y, axis=0) / h[:, None])
+        
+        out = np.empty((len(grid), y.shape[1]))
+        for start in range(0, len(grid), chunk_points):
+            g = np.clip(grid[start:start + chunk_points], x[0], x[-1])
+            idx = np.clip(np.searchsorted(x, g, side='right') - 1, 0, len(x) - 2)
+            hk = h[idx][:, None]
+            t = (g - x[idx])[:, None] / hk
+            y0, y1 = y[idx], y[idx + 1]
+            
+            if slopes is None:
+                out[start:start + len(g)] = y0 + t * (y1 - y0)
+            else:
+                # 三次Hermite基函数
+                t2, t3 = t * t, t * t * t
+                out[start:start + len(g)] = (
+                    (2 * t3 - 3 * t2 + 1) * y0 + (t3 - 2 * t2 + t) * hk * slopes[idx]
+                    + (-2 * t3 + 3 * t2) * y1 + (t3 - t2) * hk * slopes[idx + 1]
+                )
+        return out
+    
+    @staticmethod
+    def _pchip_slopes(h, delta):
+        """PCHIP (Fritsch-Carlson) 节点导数，对所有列向量化计算"""
+        h = h[:, None]
+        slopes = np.zeros((len(h) + 1, delta.shape[1]))
+        
+        # 内部节点: 相邻割线同号时取加权调和平均，否则为0
+        w1 = 2 * h[1:] + h[:-1]
+        w2 = h[1:] + 2 * h[:-1]
+        same_sign = (np.sign(delta[:-1]) * np.sign(delta[1:])) > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            harmonic = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+        slopes[1:-1] = np.where(same_sign, harmonic, 0.0)
+        
+        # 端点: 三点单侧公式并保持单调
+        def edge(h0, h1, d0, d1):
+            d = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+            d = np.where(np.sign(d) != np.sign(d0), 0.0, d)
+            overshoot = (np.sign(d0) != np.sign(d1)) & (np.abs(d) > np.abs(3 * d0))
+            return np.where(overshoot, 3 * d0, d)
+        
+        slopes[0] = edge(h[0], h[1], delta[0], delta[1])
+        slopes[-1] = edge(h[-1], h[-2], delta[-1], delta[-2])
+        return slopes
+    
     def _detect_and_smooth_outliers(self, data, method='iqr', smooth_window=5):
-        """检测和平滑异常值"""
-        data_array = np.array(data)
+        """
+        检测和平滑异常值
+        
+        支持一维序列或 (时间点, 列) 矩阵，逐列独立判定；
+        异常点用邻域内非异常值的均值替换（卷积实现，无逐点循环）
+        """
+        data_array = np.asarray(data, dtype=float)
+        squeeze = data_array.ndim == 1
+        if squeeze:
+            data_array = data_array[:, None]
         
         if method == 'iqr':
-            Q1 = np.percentile(data_array, 25)
-            Q3 = np.percentile(data_array, 75)
+            Q1 = np.percentile(data_array, 25, axis=0)
+            Q3 = np.percentile(data_array, 75, axis=0)
             IQR = Q3 - Q1
             lower_bound = Q1 - 1.5 * IQR
             upper_bound = Q3 + 1.5 * IQR
             
             # 标记异常值
             outliers = (data_array < lower_bound) | (data_array > upper_bound)
+        elif method == 'rolling_mad':
+            # 滑动中位数绝对偏差
+            window = 2 * max(smooth_window, 5) + 1
+            half = window // 2
+            padded = np.pad(data_array, ((half, half), (0, 0)), mode='edge')
+            windows = np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+            rolling_median = np.median(windows, axis=-1)
+            rolling_mad = np.median(np.abs(windows - rolling_median[..., None]), axis=-1)
+            robust_sigma = 1.4826 * rolling_mad
+            outliers = (np.abs(data_array - rolling_median) > 3 * robust_sigma) & (robust_sigma > 0)
         else:
             # Z-score方法
-            z_scores = np.abs(stats.zscore(data_array))
+            z_scores = np.abs(stats.zscore(data_array, axis=0))
             outliers = z_scores > 3
         
-        # 平滑异常值
+        # 平滑异常值: 邻域 [i - w//2, i + w//2] 内非异常值的均值
+        half = smooth_window // 2
+        clean = ~outliers
+        
+        def window_sum(values):
+            csum = np.cumsum(np.pad(values, ((half + 1, half), (0, 0))), axis=0)
+            return csum[2 * half + 1:] - csum[:-(2 * half + 1)]
+        
+        clean_sum = window_sum(np.where(clean, data_array, 0.0))
+        clean_count = window_sum(clean.astype(float))
+        replace = outliers & (clean_count > 0)
+        
         smoothed_data = data_array.copy()
-        for i, is_outlier in enumerate(outliers):
-            if is_outlier:
-                # 使用邻域平均值替换
-                start_idx = max(0, i - smooth_window // 2)
-                end_idx = min(len(data_array), i + smooth_window // 2 + 1)
-                neighbors = data_array[start_idx:end_idx]
-                neighbors_clean = neighbors[~outliers[start_idx:end_idx]]
-                if len(neighbors_clean) > 0:
-                    smoothed_data[i] = np.mean(neighbors_clean)
-        
-        return smoothed_data
+        smoothed_data[replace] = clean_sum[replace] / clean_count[replace]
+        
+        return smoothed_data[:, 0] if squeeze else smoothed_data
     
     def analyze_physiological_coupling(self):
         """
@@ -4,8 +4,11 @@
 结合切点检测和脆性分析，专门用于胰腺外科等断崖式治疗调整场景
 """
 
+import itertools
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
+from scipy import stats
 from typing import List, Dict, Optional, Tuple
 import sys
 import os
@@ -14,6 +17,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from Treatment_Cutpoint_Detector import TreatmentCutpointDetector
 from Brittleness_Clinical_Advisor import BrittlenessClinicalAdvisor
 from Manual_Cutpoint_Manager import ManualCutpointManager
+from segment_statistics import SegmentPrefixStatistics
 
 class SegmentedBrittlenessAnalyzer:
     """
@@ -35,8 +39,15 @@ class SegmentedBrittlenessAnalyzer:
         self.analysis_params = {
             'min_segment_hours': 48,       # 最小分析段长度
             'cutpoint_methods': ['comprehensive'],  # 切点检测方法
-            'brittleness_confidence': 0.8   # 脆性分型置信度阈值
+            'brittleness_confidence': 0.8,  # 脆性分型置信度阈值
+            'min_segment_points': 20        # 拖动切点时允许的最短片段
         }
+        
+        # 每条序列的前缀统计表及片段脆性报告缓存 (series_key -> 缓存项)，LRU
+        self._prefix_statistics: "OrderedDict[str, Dict]" = OrderedDict()
+        self._series_versions = itertools.count(1)
+        self._max_cached_series = 8
+        self._max_cached_reports = 64
     
     def analyze_with_cutpoints(self, 
                               glucose_data: np.ndarray,
@@ -59,8 +70,11 @@ class SegmentedBrittlenessAnalyzer:
         Returns:
             完整的分段分析结果
         """
+        series_key, series = self._get_prefix_statistics(glucose_data, timestamps)
+        
         analysis_result = {
             'patient_info': patient_info,
+            'series_key': series_key,
             'analysis_timestamp': pd.Timestamp.now().isoformat(),
             'total_data_points': len(glucose_data),
             'time_range': {
@@ -120,30 +134,7 @@ class SegmentedBrittlenessAnalyzer:
         if final_cutpoints:
             # 分割数据段
             print(f"📊 基于 {len(final_cutpoints)} 个切点进行分段分析...")
-            segments = self.cutpoint_detector.analyze_segments(
-                glucose_data, timestamps, final_cutpoints
-            )
-            
-            # 3. 分段脆性分析
-            segment_analyses = []
-            for segment in segments:
-                segment_analysis = self._analyze_segment_brittleness(segment, patient_info)
-                segment_analyses.append(segment_analysis)
-            
-            analysis_result['segments'] = segment_analyses
-            analysis_result['segment_count'] = len(segments)
-            
-            # 4. 段间比较
-            if len(segments) > 1:
-                print("🆚 进行段间治疗效果比较...")
-                comparison = self.cutpoint_detector.compare_segments(segments)
-                segment_brittleness_comparison = self._compare_segment_brittleness(segment_analyses)
-                
-                analysis_result['segment_comparison'] = comparison
-                analysis_result['brittleness_comparison'] = segment_brittleness_comparison
-                analysis_result['treatment_effectiveness'] = self._assess_treatment_effectiveness(
-                    segment_analyses, comparison
-                )
+            self._analyze_segments(analysis_result, series)
         else:
             # 整段分析
             print("📈 进行整段脆性分析...")
@@ -152,61 +143,351 @@ class SegmentedBrittlenessAnalyzer:
         
         return analysis_result
     
-    def _analyze_segment_brittleness(self, segment: Dict, patient_info: Dict) -> Dict:
+    def _analyze_segments(self, analysis_result: Dict, series: Dict):
+        """按 analysis_result['cutpoints'] 分段，写入分段脆性分析及段间比较结果"""
+        patient_info = analysis_result['patient_info']
+        segments = self._build_segments(series, analysis_result['cutpoints'])
+        
+        # 3. 分段脆性分析
+        analysis_result['segments'] = [
+            self._analyze_segment_brittleness(segment, patient_info, series) for segment in segments
+        ]
+        analysis_result['segment_count'] = len(segments)
+        
+        # 4. 段间比较
+        if len(segments) > 1:
+            print("🆚 进行段间治疗效果比较...")
+            analysis_result['segment_comparison'] = self._compare_segments(segments)
+            self._update_brittleness_comparison(analysis_result)
+    
+    def _build_segments(self, series: Dict, cutpoints: List[Dict]) -> List[Dict]:
+        """
+        按切点分段 (分段规则与 TreatmentCutpointDetector.analyze_segments 一致)
+        各段统计量由前缀统计表查询，不扫描原始数据
+        """
+        n = series['stats'].n
+        cutpoint_indices = sorted(set([0] + [cp['index'] for cp in cutpoints] + [n]))
+        
+        segments = []
+        for i in range(len(cutpoint_indices) - 1):
+            start_idx, end_idx = cutpoint_indices[i], cutpoint_indices[i + 1]
+            if end_idx - start_idx < 20:  # 片段太短
+                continue
+            
+            if i == 0:
+                segment_type = 'pre_treatment'
+            elif i == len(cutpoint_indices) - 2:
+                segment_type = 'post_treatment'
+            else:
+                segment_type = f'intermediate_{i}'
+            
+            segment = self._make_segment(series, i, segment_type, start_idx, end_idx)
+            if i < len(cutpoints):
+                segment['cutpoint_info'] = cutpoints[i]
+            segments.append(segment)
+        
+        return segments
+    
+    def _make_segment(self, series: Dict, segment_id: int, segment_type: str,
+                      start_idx: int, end_idx: int) -> Dict:
+        """由前缀统计表构建片段描述 (原始数据只取视图，O(1))"""
+        timestamps = series['timestamps']
+        metrics = series['stats'].segment_metrics(start_idx, end_idx)
+        return {
+            'segment_id': segment_id,
+            'start_idx': start_idx,
+            'end_idx': end_idx,
+            'start_time': timestamps[start_idx],
+            'end_time': timestamps[end_idx - 1],
+            'duration_hours': (timestamps[end_idx - 1] - timestamps[start_idx]) / np.timedelta64(1, 'h'),
+            'glucose_data': series['glucose'][start_idx:end_idx],
+            'metrics': metrics,
+            'mean_glucose': metrics['mean_glucose'],
+            'glucose_std': metrics['glucose_std'],
+            'cv': metrics['cv'],
+            'min_glucose': metrics['min_glucose'],
+            'max_glucose': metrics['max_glucose'],
+            'glucose_range': metrics['glucose_range'],
+            'type': segment_type
+        }
+    
+    def _segment_from_info(self, series: Dict, segment_info: Dict) -> Dict:
+        """由已有分析结果中的 segment_info 重建片段描述"""
+        return self._make_segment(series, segment_info['segment_id'], segment_info['type'],
+                                  segment_info['start_idx'], segment_info['end_idx'])
+    
+    def _compare_adjacent_segments(self, pre_segment: Dict, post_segment: Dict) -> Dict:
+        """
+        相邻片段比较 (字段与 TreatmentCutpointDetector.compare_segments 一致)
+        t检验由两段的均值、标准差和有效读数数计算 (等价于 stats.ttest_ind)，无需原始数据
+        """
+        n_pre = pre_segment['metrics']['valid_points']
+        n_post = post_segment['metrics']['valid_points']
+        try:
+            # 前缀统计表给出总体标准差，t检验使用样本标准差
+            t_stat, p_value = stats.ttest_ind_from_stats(
+                pre_segment['mean_glucose'], pre_segment['glucose_std'] * np.sqrt(n_pre / (n_pre - 1)), n_pre,
+                post_segment['mean_glucose'], post_segment['glucose_std'] * np.sqrt(n_post / (n_post - 1)), n_post
+            )
+            
+            # 效应大小
+            cohens_d = abs(pre_segment['mean_glucose'] - post_segment['mean_glucose']) / \
+                      np.sqrt((pre_segment['glucose_std']**2 + post_segment['glucose_std']**2) / 2)
+        except (ZeroDivisionError, ValueError, FloatingPointError):
+            t_stat, p_value, cohens_d = 0, 1, 0
+        
+        return {
+            'pre_segment_id': pre_segment['segment_id'],
+            'post_segment_id': post_segment['segment_id'],
+            'mean_change': post_segment['mean_glucose'] - pre_segment['mean_glucose'],
+            'cv_change': post_segment['cv'] - pre_segment['cv'],
+            'range_change': post_segment['glucose_range'] - pre_segment['glucose_range'],
+            'statistical_significance': p_value,
+            'effect_size': cohens_d,
+            'significant': p_value < 0.05 and cohens_d > 0.3,
+            'improvement': {
+                'mean_closer_to_target': abs(post_segment['mean_glucose'] - 7.0) < abs(pre_segment['mean_glucose'] - 7.0),
+                'variability_decreased': post_segment['cv'] < pre_segment['cv'],
+                'range_decreased': post_segment['glucose_range'] < pre_segment['glucose_range']
+            }
+        }
+    
+    def _compare_segments(self, segments: List[Dict]) -> Dict:
+        """比较不同片段的差异"""
+        comparison = {
+            'segment_count': len(segments),
+            'total_duration': sum(s['duration_hours'] for s in segments),
+            'comparisons': [self._compare_adjacent_segments(segments[i], segments[i + 1])
+                            for i in range(len(segments) - 1)]
+        }
+        self._update_overall_comparison(comparison)
+        return comparison
+    
+    @staticmethod
+    def _update_overall_comparison(comparison: Dict):
+        """整体评估 (由逐对比较结果汇总)"""
+        comparisons = comparison['comparisons']
+        comparison['overall_assessment'] = {
+            'mean_improvement': sum(1 for c in comparisons if c['improvement']['mean_closer_to_target']),
+            'variability_improvement': sum(1 for c in comparisons if c['improvement']['variability_decreased']),
+            'range_improvement': sum(1 for c in comparisons if c['improvement']['range_decreased']),
+            'significant_changes': sum(1 for c in comparisons if c['significant'])
+        }
+    
+    def _update_brittleness_comparison(self, analysis_result: Dict):
+        """脆性比较和治疗效果评估 (只读取各段已有的分析结果)"""
+        segment_analyses = analysis_result['segments']
+        analysis_result['brittleness_comparison'] = self._compare_segment_brittleness(segment_analyses)
+        analysis_result['treatment_effectiveness'] = self._assess_treatment_effectiveness(
+            segment_analyses, analysis_result['segment_comparison']
+        )
+    
+    def _get_prefix_statistics(self, glucose_data, timestamps: np.ndarray = None,
+                               series_key: Optional[str] = None) -> Tuple[str, Dict]:
+        """
+        获取（必要时构建）序列的前缀统计表
+        缓存按序列对象识别，series_key 为构建时分配的版本号 (不对整条序列求哈希)：
+        - 传入 analyze_with_cutpoints 使用的同一数组对象时 O(1) 命中
+        - 传入内容相同的另一数组时逐点比对一次；内容不同则拒绝
+        分析后原地修改血糖数组需重新调用 analyze_with_cutpoints
+        """
+        if series_key is not None:
+            series = self._prefix_statistics.get(series_key)
+            if series is None:
+                raise ValueError("分析结果对应的前缀统计表已被淘汰，请重新调用 analyze_with_cutpoints")
+            if series['source'] is not glucose_data and not np.array_equal(
+                    series['glucose'], np.asarray(glucose_data, dtype=float), equal_nan=True):
+                raise ValueError("血糖数据与分析结果不一致，请传入 analyze_with_cutpoints 使用的同一序列")
+        else:
+            series_key = next((key for key, cached in self._prefix_statistics.items()
+                               if cached['source'] is glucose_data), None)
+            if series_key is None:
+                series_key = f"series_{next(self._series_versions)}"
+                glucose_array = np.asarray(glucose_data, dtype=float)
+                self._prefix_statistics[series_key] = {
+                    'source': glucose_data,
+                    'glucose': glucose_array,
+                    'stats': SegmentPrefixStatistics(glucose_array),
+                    'brittleness': OrderedDict()
+                }
+            series = self._prefix_statistics[series_key]
+        
+        self._prefix_statistics.move_to_end(series_key)
+        while len(self._prefix_statistics) > self._max_cached_series:
+            self._prefix_statistics.popitem(last=False)
+        if timestamps is not None:
+            series['timestamps'] = timestamps
+        return series_key, series
+    
+    def _segment_basic_metrics(self, metrics: Dict) -> Dict:
+        """从前缀统计结果提取基础指标"""
+        return {
+            'mean_glucose': metrics['mean_glucose'],
+            'glucose_std': metrics['glucose_std'],
+            'cv': metrics['cv'],
+            'glucose_range': metrics['glucose_range']
+        }
+    
+    def move_cutpoint(self, analysis_result: Dict, glucose_data: np.ndarray, timestamps: np.ndarray,
+                      boundary_position: int, new_index: int, defer_brittleness: bool = False) -> Dict:
+        """
+        交互式移动切点
+        
+        切点移到新索引 (同时更新切点时间) 后只更新边界改变的两个相邻片段：基础指标、临床评估
+        由前缀统计表 O(1) 查询，段间比较只重算与这两段相关的 (至多3对) 相邻比较，其余片段原样保留。
+        两段的脆性分型需对片段原始数据计算混沌指标，按片段区间缓存 (切点拖回已分析过的位置时
+        直接复用)；defer_brittleness=True 时未缓存的分型暂缓 (标记 brittleness_pending)，
+        拖动结束后调用 refresh_brittleness 补算。
+        
+        Args:
+            analysis_result: analyze_with_cutpoints 的返回结果
+            glucose_data: 与 analysis_result 相同的血糖数据
+            timestamps: 与 analysis_result 相同的时间戳
+            boundary_position: 片段边界序号 (0 表示第1、2段之间的边界)
+            new_index: 切点新的数据点索引
+            defer_brittleness: 是否暂缓两段的脆性分型
+            
+        Returns:
+            更新后的分析结果（原地修改）
+        """
+        _, series = self._get_prefix_statistics(glucose_data, timestamps, analysis_result.get('series_key'))
+        if len(timestamps) != series['stats'].n:
+            raise ValueError(f"时间戳长度 ({len(timestamps)}) 与血糖数据长度 ({series['stats'].n}) 不一致")
+        
+        segment_analyses = analysis_result.get('segments', [])
+        if not 0 <= boundary_position < len(segment_analyses) - 1:
+            raise ValueError(f"无效的切点边界序号: {boundary_position}")
+        
+        left = segment_analyses[boundary_position]['segment_info']
+        right = segment_analyses[boundary_position + 1]['segment_info']
+        if left['end_idx'] != right['start_idx']:
+            raise ValueError("相邻片段之间存在被跳过的短片段，无法直接移动该切点")
+        min_points = self.analysis_params['min_segment_points']
+        
+        if not left['start_idx'] + min_points <= new_index <= right['end_idx'] - min_points:
+            raise ValueError(
+                f"切点索引 {new_index} 超出允许范围 "
+                f"[{left['start_idx'] + min_points}, {right['end_idx'] - min_points}]"
+            )
+        
+        old_index = left['end_idx']
+        for cutpoint in analysis_result.get('cutpoints', []):
+            if cutpoint.get('index') == old_index:
+                cutpoint['index'] = new_index
+                cutpoint['timestamp'] = timestamps[new_index]
+        
+        # 片段序号和类型不变 (新索引严格位于两侧切点之间)，只有两段的边界改变
+        moved = {
+            boundary_position: self._make_segment(series, left['segment_id'], left['type'],
+                                                  left['start_idx'], new_index),
+            boundary_position + 1: self._make_segment(series, right['segment_id'], right['type'],
+                                                      new_index, right['end_idx'])
+        }
+        for position, segment in moved.items():
+            previous = segment_analyses[position]
+            if 'cutpoint_info' in previous:
+                segment['cutpoint_info'] = previous['cutpoint_info']
+            segment_analyses[position] = self._analyze_segment_brittleness(
+                segment, analysis_result['patient_info'], series, defer_brittleness)
+        
+        # 只重算涉及这两段的相邻比较
+        comparison = analysis_result['segment_comparison']
+        for pair in range(max(boundary_position - 1, 0), min(boundary_position + 2, len(segment_analyses) - 1)):
+            pre, post = (moved.get(position) or self._segment_from_info(series, segment_analyses[position]['segment_info'])
+                         for position in (pair, pair + 1))
+            comparison['comparisons'][pair] = self._compare_adjacent_segments(pre, post)
+        comparison['total_duration'] = sum(a['segment_info']['duration_hours'] for a in segment_analyses)
+        self._update_overall_comparison(comparison)
+        self._update_brittleness_comparison(analysis_result)
+        return analysis_result
+    
+    def refresh_brittleness(self, analysis_result: Dict, glucose_data: np.ndarray) -> Dict:
+        """补算 move_cutpoint(defer_brittleness=True) 暂缓的片段脆性分型，并更新脆性比较和治疗效果评估"""
+        _, series = self._get_prefix_statistics(glucose_data, series_key=analysis_result.get('series_key'))
+        segment_analyses = analysis_result.get('segments', [])
+        pending = [position for position, analysis in enumerate(segment_analyses)
+                   if analysis.get('brittleness_pending')]
+        for position in pending:
+            previous = segment_analyses[position]
+            segment = self._segment_from_info(series, previous['segment_info'])
+            segment_analyses[position] = self._analyze_segment_brittleness(
+                segment, analysis_result['patient_info'], series)
+        if pending and len(segment_analyses) > 1:
+            self._update_brittleness_comparison(analysis_result)
+        return analysis_result
+    
+    def _segment_brittleness(self, segment: Dict, patient_info: Dict, series: Dict,
+                             defer: bool = False) -> Optional[Dict]:
+        """
+        片段脆性报告 (按片段区间缓存，LRU)
+        defer=True 且未缓存时返回 None
+        """
+        cache = series['brittleness']
+        patient_id = f"{patient_info.get('name', 'Patient')}_Segment_{segment['segment_id']}"
+        key = (segment['start_idx'], segment['end_idx'], patient_id, repr(patient_info))
+        report = cache.get(key)
+        if report is not None:
+            cache.move_to_end(key)
+            return report
+        if defer:
+            return None
+        
+        report = self.brittleness_advisor.generate_brittleness_report(
+            segment['glucose_data'], patient_id, patient_info
+        )
+        cache[key] = report
+        while len(cache) > self._max_cached_reports:
+            cache.popitem(last=False)
+        return report
+    
+    def _analyze_segment_brittleness(self, segment: Dict, patient_info: Dict, series: Dict,
+                                     defer_brittleness: bool = False) -> Dict:
         """分析单个片段的脆性特征"""
-        glucose_data = segment['glucose_data']
+        metrics = segment['metrics']
         segment_info = {
             'segment_id': segment['segment_id'],
             'type': segment['type'],
+            'start_idx': segment['start_idx'],
+            'end_idx': segment['end_idx'],
             'duration_hours': segment['duration_hours'],
-            'data_points': len(glucose_data)
+            'data_points': metrics['data_points']
         }
         
         try:
-            # 脆性分析
-            brittleness_result = self.brittleness_advisor.generate_brittleness_report(
-                glucose_data, 
-                f"{patient_info.get('name', 'Patient')}_Segment_{segment['segment_id']}", 
-                patient_info
-            )
+            # 脆性分析 (报告中的混沌指标即片段混沌指标，不再单独重复计算)
+            brittleness_result = self._segment_brittleness(segment, patient_info, series, defer_brittleness)
             
             # 提取关键指标
             segment_analysis = {
                 'segment_info': segment_info,
-                'basic_metrics': {
-                    'mean_glucose': segment.get('mean_glucose', np.mean(glucose_data)),
-                    'glucose_std': segment.get('glucose_std', np.std(glucose_data)),
-                    'cv': segment.get('cv', np.std(glucose_data)/np.mean(glucose_data)*100),
-                    'glucose_range': segment.get('glucose_range', np.max(glucose_data) - np.min(glucose_data))
-                },
-                'brittleness_analysis': brittleness_result,
-                'chaos_indicators': self.brittleness_advisor._calculate_chaos_indicators(glucose_data),
-                'clinical_assessment': self._assess_segment_clinical_status(segment, glucose_data)
+                'basic_metrics': self._segment_basic_metrics(metrics),
+                'clinical_assessment': self._assess_segment_clinical_status(segment, metrics)
             }
+            if brittleness_result is None:
+                segment_analysis['brittleness_pending'] = True
+            else:
+                segment_analysis['brittleness_analysis'] = brittleness_result
+                segment_analysis['chaos_indicators'] = brittleness_result['chaos_analysis']
             
         except Exception as e:
             print(f"⚠️ 片段 {segment['segment_id']} 分析失败: {e}")
             segment_analysis = {
                 'segment_info': segment_info,
                 'error': str(e),
-                'basic_metrics': {
-                    'mean_glucose': np.mean(glucose_data),
-                    'glucose_std': np.std(glucose_data),
-                    'cv': np.std(glucose_data)/np.mean(glucose_data)*100
-                }
+                'basic_metrics': self._segment_basic_metrics(metrics)
             }
         
         return segment_analysis
     
-    def _assess_segment_clinical_status(self, segment: Dict, glucose_data: np.ndarray) -> Dict:
-        """评估片段的临床状态"""
-        mean_glucose = np.mean(glucose_data)
-        cv = np.std(glucose_data) / mean_glucose * 100
+    def _assess_segment_clinical_status(self, segment: Dict, metrics: Dict) -> Dict:
+        """评估片段的临床状态（指标来自前缀统计表，不再重复扫描原始数据）"""
+        mean_glucose = metrics['mean_glucose']
+        cv = metrics['cv']
         
         # TIR计算
-        tir = np.sum((glucose_data >= 3.9) & (glucose_data <= 10.0)) / len(glucose_data) * 100
-        tbr = np.sum(glucose_data < 3.9) / len(glucose_data) * 100
-        tar = np.sum(glucose_data > 10.0) / len(glucose_data) * 100
+        tir = metrics['tir']
+        tbr = metrics['tbr']
+        tar = metrics['tar']
         
         # 临床评估
         clinical_status = {
@@ -214,15 +495,13 @@ class SegmentedBrittlenessAnalyzer:
             'tbr': tbr,
             'tar': tar,
             'glycemic_control': self._classify_glycemic_control(tir, cv),
-            'safety_profile': self._assess_safety_profile(tbr, np.min(glucose_data)),
-            'stability_profile': self._assess_stability(cv, np.std(glucose_data))
+            'safety_profile': self._assess_safety_profile(tbr, metrics['min_glucose']),
+            'stability_profile': self._assess_stability(cv, metrics['glucose_std'])
         }
         
         # 胰腺外科专项评估
         if 'type' in segment and 'post_treatment' in segment['type']:
-            clinical_status['post_surgical_status'] = self._assess_post_surgical_status(
-                glucose_data, mean_glucose, cv
-            )
+            clinical_status['post_surgical_status'] = self._assess_post_surgical_status(metrics)
         
         return clinical_status
     
@@ -259,14 +538,13 @@ class SegmentedBrittlenessAnalyzer:
         else:
             return "high_variability"
     
-    def _assess_post_surgical_status(self, glucose_data: np.ndarray, 
-                                   mean_glucose: float, cv: float) -> Dict:
+    def _assess_post_surgical_status(self, metrics: Dict) -> Dict:
         """评估术后血糖状态"""
         return {
-            'pancreatic_function': self._estimate_pancreatic_function(mean_glucose, cv),
-            'insulin_sensitivity': self._estimate_insulin_sensitivity(glucose_data),
-            'metabolic_adaptation': self._assess_metabolic_adaptation(glucose_data),
-            'recovery_indicator': self._calculate_recovery_score(glucose_data, mean_glucose, cv)
+            'pancreatic_function': self._estimate_pancreatic_function(metrics['mean_glucose'], metrics['cv']),
+            'insulin_sensitivity': self._estimate_insulin_sensitivity(metrics),
+            'metabolic_adaptation': self._assess_metabolic_adaptation(metrics),
+            'recovery_indicator': self._calculate_recovery_score(metrics)
         }
     
     def _estimate_pancreatic_function(self, mean_glucose: float, cv: float) -> str:
@@ -278,11 +556,11 @@ class SegmentedBrittlenessAnalyzer:
         else:
             return "severely_impaired"
     
-    def _estimate_insulin_sensitivity(self, glucose_data: np.ndarray) -> str:
+    def _estimate_insulin_sensitivity(self, metrics: Dict) -> str:
         """估计胰岛素敏感性"""
         # 简化的估计方法，基于血糖模式
-        dawn_phenomenon = self._detect_dawn_phenomenon(glucose_data)
-        postprandial_excursion = np.std(glucose_data)  # 简化指标
+        dawn_phenomenon = self._detect_dawn_phenomenon(metrics)
+        postprandial_excursion = metrics['glucose_std']  # 简化指标
         
         if not dawn_phenomenon and postprandial_excursion < 2:
             return "high"
@@ -291,15 +569,15 @@ class SegmentedBrittlenessAnalyzer:
         else:
             return "low"
     
-    def _detect_dawn_phenomenon(self, glucose_data: np.ndarray) -> bool:
+    def _detect_dawn_phenomenon(self, metrics: Dict) -> bool:
         """检测黎明现象（简化版）"""
         # 这里需要时间信息，简化处理
         return False
     
-    def _assess_metabolic_adaptation(self, glucose_data: np.ndarray) -> str:
+    def _assess_metabolic_adaptation(self, metrics: Dict) -> str:
         """评估代谢适应性"""
         # 基于血糖变化模式评估
-        autocorr = np.corrcoef(glucose_data[:-1], glucose_data[1:])[0, 1] if len(glucose_data) > 1 else 0
+        autocorr = metrics['lag1_autocorrelation']
         
         if autocorr > 0.7:
             return "good_adaptation"
@@ -308,25 +586,23 @@ class SegmentedBrittlenessAnalyzer:
         else:
             return "poor_adaptation"
     
-    def _calculate_recovery_score(self, glucose_data: np.ndarray, 
-                                mean_glucose: float, cv: float) -> float:
+    def _calculate_recovery_score(self, metrics: Dict) -> float:
         """计算恢复评分 (0-100)"""
         # 目标：均值接近7-8 mmol/L，低变异性
-        mean_score = max(0, 100 - abs(mean_glucose - 7.5) * 10)
-        cv_score = max(0, 100 - cv * 2)
-        stability_score = self._calculate_stability_score(glucose_data)
+        mean_score = max(0, 100 - abs(metrics['mean_glucose'] - 7.5) * 10)
+        cv_score = max(0, 100 - metrics['cv'] * 2)
+        stability_score = self._calculate_stability_score(metrics)
         
         return (mean_score * 0.4 + cv_score * 0.4 + stability_score * 0.2)
     
-    def _calculate_stability_score(self, glucose_data: np.ndarray) -> float:
+    def _calculate_stability_score(self, metrics: Dict) -> float:
         """计算稳定性评分"""
-        if len(glucose_data) < 10:
+        if metrics['data_points'] < 10:
             return 0
         
         # 基于自相关和趋势强度
-        from scipy import stats
-        autocorr = np.corrcoef(glucose_data[:-1], glucose_data[1:])[0, 1] if len(glucose_data) > 1 else 0
-        trend_strength = abs(stats.linregress(range(len(glucose_data)), glucose_data)[2])
+        autocorr = metrics['lag1_autocorrelation']
+        trend_strength = abs(metrics['trend_correlation'])
         
         stability = (abs(autocorr) * 50 + (1 - trend_strength) * 50)
         return max(0, min(100, stability))
@@ -6,12 +6,68 @@
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+import hashlib
 import json
+from collections import OrderedDict
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import warnings
 warnings.filterwarnings('ignore')
 
+# ApEn 分块计算时临时数组的内存上限 (字节)
+APEN_BLOCK_BYTES = 32 * 1024 * 1024
+# 每个 (模板, 模板) 元素的临时内存: float64 距离 + float64 单维差值 + bool 比较结果
+_APEN_BYTES_PER_PAIR = 17
+
+def _approximate_entropy(data: np.ndarray, m: int = 2, r: float = 0.2,
+                         max_block_bytes: int = APEN_BLOCK_BYTES) -> float:
+    """
+    向量化近似熵 (ApEn)
+    模板间切比雪夫距离按行分块计算，块行数由序列长度决定，使临时数组不超过 max_block_bytes
+    """
+    N = len(data)
+    if N < 10:
+        return 0
+    
+    tolerance = r * np.std(data)
+    
+    def _phi(m):
+        n_patterns = N - m + 1
+        patterns = np.lib.stride_tricks.sliding_window_view(data, m)
+        matches = np.empty(n_patterns)
+        block_size = max(1, max_block_bytes // (_APEN_BYTES_PER_PAIR * n_patterns))
+        
+        dist_buffer = np.empty((min(block_size, n_patterns), n_patterns))
+        diff_buffer = np.empty_like(dist_buffer)
+        
+        for start in range(0, n_patterns, block_size):
+            block = patterns[start:start + block_size]
+            dist, diff = dist_buffer[:len(block)], diff_buffer[:len(block)]
+            np.subtract(block[:, None, 0], patterns[None, :, 0], out=dist)
+            np.abs(dist, out=dist)
+            for k in range(1, m):
+                np.subtract(block[:, None, k], patterns[None, :, k], out=diff)
+                np.abs(diff, out=diff)
+                np.maximum(dist, diff, out=dist)
+            matches[start:start + len(block)] = np.count_nonzero(dist <= tolerance, axis=1)
+        
+        C = matches / n_patterns
+        return np.mean(np.log(C[C > 0]))
+    
+    return _phi(m) - _phi(m + 1)
+
+def _hurst_exponent(data: np.ndarray) -> float:
+    """基于滞后差分标准差的Hurst指数估计"""
+    try:
+        lags = np.arange(2, min(50, len(data) // 4))
+        if len(lags) < 3:
+            return 0.5
+        tau = np.array([np.std(data[lag:] - data[:-lag]) for lag in lags])
+        poly = np.polyfit(np.log(lags), np.log(tau), 1)
+        return poly[0]
+    except Exception:
+        return 0.5
+
 @dataclass
 class TreatmentIntervention:
     """
@@ -36,28 +92,53 @@ class MetricsPeriod:
     chaos_metrics: Dict
     brittleness_type: str
     clinical_score: float
+    period_id: str = ""
     
 class TreatmentEffectTracker:
     """
     治疗效果追踪分析系统
     """
     
-    def __init__(self, patient_id: str):
+    def __init__(self, patient_id: str, max_cached_periods: int = 32):
+        if max_cached_periods < 1:
+            raise ValueError(f"max_cached_periods 必须为正整数: {max_cached_periods}")
         self.patient_id = patient_id
         self.interventions: List[TreatmentIntervention] = []
         self.metric_periods: List[MetricsPeriod] = []
         self.baseline_established = False
         self.baseline_period: Optional[MetricsPeriod] = None
+        # 周期指标 LRU 缓存: (period_id, 数据哈希) -> (传统指标, 混沌指标)
+        self._period_metrics_cache: "OrderedDict[Tuple[str, str], Tuple[Dict, Dict]]" = OrderedDict()
+        self._max_cached_periods = max_cached_periods
+        
+    def _get_period_metrics(self, period_id: str, glucose_data: List[float]) -> Tuple[Dict, Dict]:
+        """
+        获取周期指标，同一周期同一数据只计算一次 (最多缓存 max_cached_periods 个周期，淘汰最久未用的)
+        """
+        data_hash = hashlib.sha1(np.asarray(glucose_data, dtype=float).tobytes()).hexdigest()
+        key = (period_id, data_hash)
         
-    def establish_baseline(self, glucose_data: List[float], start_date: datetime, end_date: datetime):
+        if key in self._period_metrics_cache:
+            self._period_metrics_cache.move_to_end(key)
+        else:
+            self._period_metrics_cache[key] = (
+                self.calculate_traditional_metrics(glucose_data),
+                self.calculate_chaos_metrics(glucose_data)
+            )
+            if len(self._period_metrics_cache) > self._max_cached_periods:
+                self._period_metrics_cache.popitem(last=False)
+        
+        return self._period_metrics_cache[key]
+        
+    def establish_baseline(self, glucose_data: List[float], start_date: datetime, end_date: datetime,
+                           period_id: str = "baseline"):
         """
         建立基线指标
         """
         print(f"建立患者 {self.patient_id} 的基线指标...")
         
         # 计算基线指标
-        traditional_metrics = self.calculate_traditional_metrics(glucose_data)
-        chaos_metrics = self.calculate_chaos_metrics(glucose_data)
+        traditional_metrics, chaos_metrics = self._get_period_metrics(period_id, glucose_data)
         brittleness_type = self.classify_brittleness(traditional_metrics, chaos_metrics)
         clinical_score = self.calculate_clinical_score(traditional_metrics, chaos_metrics)
         
@@ -68,7 +149,8 @@ class TreatmentEffectTracker:
             traditional_metrics=traditional_metrics,
             chaos_metrics=chaos_metrics,
             brittleness_type=brittleness_type,
-            clinical_score=clinical_score
+            clinical_score=clinical_score,
+            period_id=period_id
         )
         
         self.baseline_established = True
@@ -87,17 +169,20 @@ class TreatmentEffectTracker:
         self.interventions.append(intervention)
         print(f"记录治疗干预: {intervention.intervention_type} - {intervention.description}")
         
-    def add_follow_up_period(self, glucose_data: List[float], start_date: datetime, end_date: datetime):
+    def add_follow_up_period(self, glucose_data: List[float], start_date: datetime, end_date: datetime,
+                             period_id: Optional[str] = None):
         """
         添加随访期数据
         """
         if not self.baseline_established:
             print("警告: 尚未建立基线，请先建立基线指标")
             return
+        
+        if period_id is None:
+            period_id = f"follow_up_{start_date.strftime('%Y%m%d%H%M')}_{end_date.strftime('%Y%m%d%H%M')}"
             
         # 计算当前期指标
-        traditional_metrics = self.calculate_traditional_metrics(glucose_data)
-        chaos_metrics = self.calculate_chaos_metrics(glucose_data)
+        traditional_metrics, chaos_metrics = self._get_period_metrics(period_id, glucose_data)
         brittleness_type = self.classify_brittleness(traditional_metrics, chaos_metrics)
         clinical_score = self.calculate_clinical_score(traditional_metrics, chaos_metrics)
         
@@ -108,7 +193,8 @@ class TreatmentEffectTracker:
             traditional_metrics=traditional_metrics,
             chaos_metrics=chaos_metrics,
             brittleness_type=brittleness_type,
-            clinical_score=clinical_score
+            clinical_score=clinical_score,
+            period_id=period_id
         )
         
         self.metric_periods.append(period)
@@ -157,20 +243,16 @@ class TreatmentEffectTracker:
         """
         计算混沌分析指标
         """
-        glucose_array = np.array(glucose_data)
+        glucose_array = np.asarray(glucose_data, dtype=float)
         
         try:
             # Lyapunov指数估计
-            rate_changes = np.diff(glucose_array)
-            divergence = []
-            
-            for i in range(len(rate_changes)-1):
-                if abs(rate_changes[i]) > 0.01:
-                    ratio = abs(rate_changes[i+1]) / abs(rate_changes[i])
-                    if ratio > 0:
-                        divergence.append(np.log(ratio))
+            rate_changes = np.abs(np.diff(glucose_array))
+            prev_changes, next_changes = rate_changes[:-1], rate_changes[1:]
+            valid = (prev_changes > 0.01) & (next_changes > 0)
+            divergence = np.log(next_changes[valid] / prev_changes[valid])
             
-            lyapunov = np.mean(divergence) if divergence else 0
+            lyapunov = np.mean(divergence) if len(divergence) else 0
             
             # Shannon熵
             hist, _ = np.histogram(glucose_array, bins=20, density=True)
@@ -178,48 +260,10 @@ class TreatmentEffectTracker:
             shannon_entropy = -np.sum(hist * np.log2(hist)) if len(hist) > 0 else 0
             
             # 近似熵
-            def approximate_entropy(data, m=2, r=0.2):
-                N = len(data)
-                if N < 10:
-                    return 0
-                    
-                def _maxdist(xi, xj):
-                    return max([abs(ua - va) for ua, va in zip(xi, xj)])
-                
-                def _phi(m):
-                    patterns = [data[i:i+m] for i in range(N-m+1)]
-                    C = []
-                    
-                    for i in range(N-m+1):
-                        template_i = patterns[i]
-                        matches = 0
-                        
-                        for j in range(N-m+1):
-                            if _maxdist(template_i, patterns[j]) <= r * np.std(data):
-                                matches += 1
-                        
-                        C.append(matches / (N-m+1))
-                    
-                    phi = np.mean([np.log(c) for c in C if c > 0])
-                    return phi
-                
-                return _phi(m) - _phi(m+1)
-            
-            approx_entropy = approximate_entropy(glucose_array)
+            approx_entropy = _approximate_entropy(glucose_array)
             
             # Hurst指数
-            def hurst_exponent(data):
-                try:
-                    lags = range(2, min(50, len(data)//4))
-                    if len(lags) < 3:
-                        return 0.5
-                    tau = [np.std(np.subtract(data[lag:], data[:-lag])) for lag in lags]
-                    poly = np.polyfit(np.log(lags), np.log(tau), 1)
-                    return poly[0]
-                except:
-                    return 0.5
-            
-            hurst = hurst_exponent(glucose_array)
+            hurst = _hurst_exponent(glucose_array)
             
             # 复杂度指标
             changes = np.abs(np.diff(glucose_array))
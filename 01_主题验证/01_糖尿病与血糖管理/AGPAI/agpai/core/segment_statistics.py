@@ -0,0 +1,183 @@
+"""
+血糖分段统计前缀表
+对整条血糖序列一次性构建前缀和/前缀计数表，任意区间 [start, end) 的
+均值、标准差、TIR/TBR/TAR、极值、一阶自相关和线性趋势均可 O(1) 查询。
+手动拖动切点时只需对相邻两段重新查询，无需重新扫描原始数据。
+缺失值 (NaN) 不计入任何统计：各前缀和由屏蔽缺失值后的数据累加，并另建有效读数的
+前缀计数，区间指标除以区间内有效读数数 (与 np.nanmean/np.nanstd 一致)。
+"""
+
+import numpy as np
+from typing import Dict
+
+
+class SegmentPrefixStatistics:
+    """血糖序列的前缀统计表"""
+
+    def __init__(self, glucose_data, low_threshold: float = 3.9,
+                 high_threshold: float = 10.0):
+        """
+        初始化并构建前缀表
+        glucose_data: 血糖数据数组
+        low_threshold: TBR阈值 (mmol/L)
+        high_threshold: TAR阈值 (mmol/L)
+        """
+        glucose = np.asarray(glucose_data, dtype=float)
+        self.n = len(glucose)
+        self.low_threshold = low_threshold
+        self.high_threshold = high_threshold
+
+        valid = ~np.isnan(glucose)
+        # 以全序列有效读数均值为中心累加，降低大样本下方差计算的舍入误差
+        self.offset = float(glucose[valid].mean()) if valid.any() else 0.0
+        y = np.where(valid, glucose - self.offset, 0.0)
+        idx = np.arange(self.n, dtype=float)
+        valid_idx = idx * valid
+
+        self._count = self._prefix(valid)
+        self._sum = self._prefix(y)
+        self._sumsq = self._prefix(y * y)
+        self._sum_i = self._prefix(valid_idx)
+        self._sum_ii = self._prefix(valid_idx * idx)
+        self._sum_iy = self._prefix(idx * y)
+
+        # 相邻两点均有效的读数对 (i, i+1)，按 i 累加
+        pair_valid = valid[:-1] & valid[1:]
+        lag_a = y[:-1] * pair_valid
+        lag_b = y[1:] * pair_valid
+        self._pair_count = self._prefix(pair_valid)
+        self._lag_a = self._prefix(lag_a)
+        self._lag_b = self._prefix(lag_b)
+        self._lag_aa = self._prefix(lag_a * lag_a)
+        self._lag_bb = self._prefix(lag_b * lag_b)
+        self._lag_prod = self._prefix(lag_a * lag_b)
+
+        self._below = self._prefix(glucose < low_threshold)
+        self._above = self._prefix(glucose > high_threshold)
+        self._in_range = self._prefix((glucose >= low_threshold) & (glucose <= high_threshold))
+
+        self._min_table, self._max_table = self._build_sparse_tables(glucose)
+
+    @staticmethod
+    def _prefix(values) -> np.ndarray:
+        """带前导0的前缀和，区间和 = p[end] - p[start]"""
+        out = np.zeros(len(values) + 1, dtype=float)
+        np.cumsum(values, out=out[1:])
+        return out
+
+    def _build_sparse_tables(self, glucose: np.ndarray):
+        """构建区间最小/最大值的稀疏表 (O(n log n) 构建, O(1) 查询；fmin/fmax 忽略缺失值)"""
+        min_table = [glucose]
+        max_table = [glucose]
+        span = 1
+        while span * 2 <= self.n:
+            prev_min, prev_max = min_table[-1], max_table[-1]
+            min_table.append(np.fmin(prev_min[:-span], prev_min[span:]))
+            max_table.append(np.fmax(prev_max[:-span], prev_max[span:]))
+            span *= 2
+        return min_table, max_table
+
+    def _range_sum(self, prefix: np.ndarray, start: int, end: int) -> float:
+        return float(prefix[end] - prefix[start])
+
+    def _range_extrema(self, start: int, end: int):
+        level = int(end - start).bit_length() - 1
+        width = 1 << level
+        low = np.fmin(self._min_table[level][start], self._min_table[level][end - width])
+        high = np.fmax(self._max_table[level][start], self._max_table[level][end - width])
+        return float(low), float(high)
+
+    def _check_range(self, start: int, end: int):
+        if not 0 <= start < end <= self.n:
+            raise ValueError(f"无效的分段区间: [{start}, {end}), 序列长度 {self.n}")
+
+    def valid_count(self, start: int, end: int) -> int:
+        """区间内有效 (非缺失) 读数数"""
+        self._check_range(start, end)
+        return int(self._range_sum(self._count, start, end))
+
+    def mean_std(self, start: int, end: int):
+        """区间有效读数的均值与总体标准差 (与 np.nanmean/np.nanstd 一致，无有效读数时为 NaN)"""
+        n = self.valid_count(start, end)
+        if n == 0:
+            return float('nan'), float('nan')
+        s = self._range_sum(self._sum, start, end)
+        ss = self._range_sum(self._sumsq, start, end)
+        mean_y = s / n
+        var = max(ss / n - mean_y * mean_y, 0.0)
+        return mean_y + self.offset, float(np.sqrt(var))
+
+    def lag1_autocorrelation(self, start: int, end: int) -> float:
+        """
+        一阶自相关，等价于 np.corrcoef(x[:-1], x[1:])[0, 1]
+        只使用相邻两点均有效的读数对
+        """
+        self._check_range(start, end)
+        m = int(self._range_sum(self._pair_count, start, end - 1))
+        if m < 2:
+            return 0.0
+        sa = self._range_sum(self._lag_a, start, end - 1)
+        sb = self._range_sum(self._lag_b, start, end - 1)
+        saa = self._range_sum(self._lag_aa, start, end - 1)
+        sbb = self._range_sum(self._lag_bb, start, end - 1)
+        sab = self._range_sum(self._lag_prod, start, end - 1)
+
+        cov = m * sab - sa * sb
+        var_a = m * saa - sa * sa
+        var_b = m * sbb - sb * sb
+        if var_a <= 0 or var_b <= 0:
+            return 0.0
+        return float(cov / np.sqrt(var_a * var_b))
+
+    def trend_correlation(self, start: int, end: int) -> float:
+        """
+        血糖与样本序号的相关系数，等价于 stats.linregress(range(n), x).rvalue
+        缺失读数连同其序号一并剔除
+        """
+        n = self.valid_count(start, end)
+        if n < 2:
+            return 0.0
+        sy = self._range_sum(self._sum, start, end)
+        syy = self._range_sum(self._sumsq, start, end)
+        # 全局序号 i = start + t，换算为段内序号 t 的各项和
+        si = self._range_sum(self._sum_i, start, end)
+        sii = self._range_sum(self._sum_ii, start, end)
+        sty = self._range_sum(self._sum_iy, start, end) - start * sy
+        st = si - start * n
+        stt = sii - 2 * start * si + start * start * n
+
+        cov = n * sty - st * sy
+        var_t = n * stt - st * st
+        var_y = n * syy - sy * sy
+        if var_t <= 0 or var_y <= 0:
+            return 0.0
+        return float(cov / np.sqrt(var_t * var_y))
+
+    def segment_metrics(self, start: int, end: int) -> Dict:
+        """
+        查询区间 [start, end) 的全部分段指标
+        返回字段与分段分析中 basic_metrics / clinical_assessment 所需一致
+        """
+        valid = self.valid_count(start, end)
+        mean_glucose, glucose_std = self.mean_std(start, end)
+        min_glucose, max_glucose = self._range_extrema(start, end)
+        # TIR/TBR/TAR 以有效读数为分母
+        denominator = valid if valid else 1
+
+        return {
+            'start_idx': start,
+            'end_idx': end,
+            'data_points': end - start,
+            'valid_points': valid,
+            'mean_glucose': mean_glucose,
+            'glucose_std': glucose_std,
+            'cv': glucose_std / (mean_glucose + 1e-6) * 100,
+            'min_glucose': min_glucose,
+            'max_glucose': max_glucose,
+            'glucose_range': max_glucose - min_glucose,
+            'tir': self._range_sum(self._in_range, start, end) / denominator * 100,
+            'tbr': self._range_sum(self._below, start, end) / denominator * 100,
+            'tar': self._range_sum(self._above, start, end) / denominator * 100,
+            'lag1_autocorrelation': self.lag1_autocorrelation(start, end),
+            'trend_correlation': self.trend_correlation(start, end)
+        }
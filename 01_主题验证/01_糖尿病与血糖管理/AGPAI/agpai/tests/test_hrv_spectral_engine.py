@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HRV频域引擎单元测试
+Lomb-Scargle功率谱与 scipy.signal.lombscargle 逐窗口计算一致；批量 (含NaN补齐与分块) 与逐窗口一致；
+滑动窗口前缀和计算与逐窗口直接计算一致
+"""
+
+import unittest
+import numpy as np
+from scipy import signal
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'HRV_Analysis'))
+
+from HRV_Spectral_Engine import HRVSpectralEngine, sliding_rr_windows
+
+
+def synthetic_rr(n, seed=0, lf_hz=0.1, hf_hz=0.25):
+    """LF/HF正弦调制 + 噪声的RR间期序列 (ms)"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) * 0.8
+    return (800 + 50 * np.sin(2 * np.pi * lf_hz * t) + 30 * np.sin(2 * np.pi * hf_hz * t)
+            + rng.normal(0, 10, n))
+
+
+def reference_psd(engine, rr, detrend=True):
+    """逐窗口计算：scipy Lomb-Scargle，去线性趋势 (或去均值) 后按平均心拍频率换算为单边PSD"""
+    rr = rr[~np.isnan(rr)]
+    if len(rr) < 3:
+        return np.zeros(len(engine.freqs))
+    t = np.cumsum(rr) / 1000.0
+    t -= t[0]
+    x = rr - np.polyval(np.polyfit(t, rr, 1), t) if detrend else rr - rr.mean()
+    return 2 * signal.lombscargle(t, x, 2 * np.pi * engine.freqs) * rr.mean() / 1000.0
+
+
+def reference_band_powers(engine, psd):
+    """频段功率：PSD 按频率间隔求和"""
+    powers = {name: psd[mask].sum() * engine.df for name, mask in engine.band_masks.items()}
+    powers['total_power'] = psd.sum() * engine.df
+    powers['LF_HF_ratio'] = powers['LF'] / powers['HF'] if powers['HF'] > 0 else 0.0
+    return powers
+
+
+class TestHRVSpectralEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = HRVSpectralEngine()
+
+    def test_periodogram_matches_scipy(self):
+        for seed, n in [(0, 300), (1, 64), (2, 1000)]:
+            rr = synthetic_rr(n, seed)
+            for detrend in (True, False):
+                freqs, psd = self.engine.periodogram(rr, detrend)
+                expected = reference_psd(self.engine, rr, detrend)
+                np.testing.assert_allclose(psd, expected, rtol=1e-8, atol=1e-10 * expected.max())
+
+    def test_band_powers_match_reference(self):
+        rr = synthetic_rr(400, 3)
+        powers = self.engine.band_powers(rr)
+        expected = reference_band_powers(self.engine, reference_psd(self.engine, rr))
+        for key, value in expected.items():
+            self.assertAlmostEqual(powers[key], value, delta=1e-8 * abs(value))
+        # 调制频率落在对应频段峰值，频谱积分≈去趋势后的方差
+        self.assertAlmostEqual(powers['LF_peak'], 0.1, delta=2 * self.engine.df)
+        self.assertAlmostEqual(powers['HF_peak'], 0.25, delta=2 * self.engine.df)
+        self.assertAlmostEqual(powers['total_power'] / np.var(rr), 1.0, delta=0.1)
+
+    def test_ragged_batch_matches_windows(self):
+        windows = [synthetic_rr(n, seed) for seed, n in enumerate([120, 80, 200, 2, 150])]
+        batch = np.full((len(windows), 200), np.nan)
+        for i, rr in enumerate(windows):
+            batch[i, :len(rr)] = rr
+        for chunk in (10 ** 8, 256 * 200):
+            engine = HRVSpectralEngine(max_chunk_elements=chunk)
+            _, psd = engine.periodogram(batch)
+            for i, rr in enumerate(windows):
+                expected = reference_psd(engine, rr)
+                np.testing.assert_allclose(psd[i], expected, rtol=1e-8, atol=1e-10 * max(expected.max(), 1))
+        self.assertTrue(np.all(psd[3] == 0))
+
+    def test_sliding_matches_direct_windows(self):
+        rr = synthetic_rr(700, 4)
+        for window, step, detrend in [(128, 1, True), (300, 37, True), (64, 5, False)]:
+            engine = HRVSpectralEngine(max_chunk_elements=50_000)
+            starts, powers = engine.sliding_band_powers(rr, window, step, detrend)
+            expected = engine.band_powers(sliding_rr_windows(rr, window, step), detrend)
+            np.testing.assert_array_equal(starts, np.arange(0, len(rr) - window + 1, step))
+            self.assertEqual(set(powers), set(expected))
+            for key in ('VLF', 'LF', 'HF', 'total_power', 'LF_HF_ratio'):
+                np.testing.assert_allclose(powers[key], expected[key], rtol=1e-6)
+
+        # 含缺失值时回退为逐窗口直接计算
+        rr[100] = np.nan
+        _, powers = self.engine.sliding_band_powers(rr, 128, 16)
+        expected = self.engine.band_powers(sliding_rr_windows(rr, 128, 16))
+        np.testing.assert_allclose(powers['LF'], expected['LF'])
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            HRVSpectralEngine(f_min=0.5, f_max=0.4)
+        with self.assertRaises(ValueError):
+            sliding_rr_windows(synthetic_rr(10), 0)
+        starts, powers = self.engine.sliding_band_powers(synthetic_rr(10), 20)
+        self.assertEqual((len(starts), powers), (0, {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
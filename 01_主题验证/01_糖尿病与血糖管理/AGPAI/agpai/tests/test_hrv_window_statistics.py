@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RR间期前缀和统计单元测试
+时域指标 (整段与心拍区间) 与直接对切片的numpy计算一致；分段分析器共用一份前缀和时各分段结果与逐段切片计算一致
+"""
+
+import unittest
+import numpy as np
+
+import sys
+import os
+AGPAI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(AGPAI_DIR, 'HRV_Analysis'))
+sys.path.append(os.path.join(AGPAI_DIR, 'ECG_Analysis'))
+
+from HRV_Window_Statistics import RRPrefixStatistics
+from Agent2_HRV_Brittleness_Analyzer import HRVBrittenessAnalyzer
+from HRV_Segmentation_Analyzer import HRVSegmentationAnalyzer
+from Agent2_ECG_Brittleness_Analyzer import ECGBrittenessAnalyzer
+from ECG_Segmentation_Analyzer import ECGSegmentationAnalyzer
+
+
+def reference_time_domain(rr):
+    """原实现：直接对切片计算时域指标"""
+    diff = np.diff(rr)
+    sdann = 0
+    if len(rr) > 100:
+        segment_size = len(rr) // 20
+        means = [np.mean(rr[i:i + segment_size]) for i in range(0, len(rr) - segment_size, segment_size)]
+        sdann = np.std(means) if len(means) > 1 else 0
+    return {
+        'RMSSD': np.sqrt(np.mean(diff ** 2)),
+        'pNN50': np.sum(np.abs(diff) > 50) / (len(rr) - 1) * 100,
+        'SDNN': np.std(rr),
+        'SDANN': sdann,
+        'mean_RR': np.mean(rr),
+        'mean_HR': 60000 / np.mean(rr)
+    }
+
+
+def synthetic_rr(n, seed=0):
+    rng = np.random.default_rng(seed)
+    trend = 800 + 150 * np.sin(np.arange(n) / 300)
+    return trend + rng.normal(0, 40, n)
+
+
+def synthetic_ecg(duration_sec, sampling_rate, seed=0):
+    """由随机RR间期生成的R波脉冲序列 (含幅值漂移)"""
+    rng = np.random.default_rng(seed)
+    beats = np.cumsum(rng.uniform(0.5, 1.1, int(duration_sec / 0.5)))
+    beats = beats[beats < duration_sec - 1]
+    ecg = 0.05 * rng.standard_normal(int(duration_sec * sampling_rate))
+    amplitude = 1 + 0.3 * np.sin(beats / 40)
+    ecg[(beats * sampling_rate).astype(int)] += amplitude
+    return ecg
+
+
+class TestBrittlenessTimeDomain(unittest.TestCase):
+    """脆性分析器时域指标：rr_intervals 与 (rr_stats, start, stop) 两种调用"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.rr = synthetic_rr(3000)
+        cls.rr_stats = RRPrefixStatistics(cls.rr)
+        cls.hrv = HRVBrittenessAnalyzer()
+        cls.ecg = ECGBrittenessAnalyzer()
+
+    def assertMetricsEqual(self, result, expected):
+        for key, value in expected.items():
+            self.assertAlmostEqual(result[key], value, places=6, msg=key)
+
+    def test_whole_series_matches_reference(self):
+        self.assertMetricsEqual(self.hrv.calculate_time_domain_hrv(self.rr), reference_time_domain(self.rr))
+
+    def test_windows_use_shared_statistics(self):
+        for start, stop in [(0, 3000), (0, 1200), (500, 2600), (1000, 1090), (2990, 3000), (10, 13)]:
+            result = self.hrv.calculate_time_domain_hrv(rr_stats=self.rr_stats, start=start, stop=stop)
+            if stop - start < 5:
+                self.assertEqual(result['RMSSD'], 0)
+            else:
+                self.assertMetricsEqual(result, reference_time_domain(self.rr[start:stop]))
+
+            ecg_result = self.ecg.calculate_hrv_time_domain(rr_stats=self.rr_stats, start=start, stop=stop)
+            segment = self.rr[start:stop]
+            self.assertAlmostEqual(ecg_result['SDNN'], np.std(segment), places=6)
+            self.assertAlmostEqual(ecg_result['RMSSD'], np.sqrt(np.mean(np.diff(segment) ** 2)), places=6)
+            self.assertAlmostEqual(ecg_result['pNN50'], np.sum(np.abs(np.diff(segment)) > 50) / len(segment) * 100)
+
+    def test_segment_means_window(self):
+        means = self.rr_stats.segment_means(50, 500, 1000)
+        expected = [np.mean(self.rr[i:i + 50]) for i in range(500, 950, 50)]
+        np.testing.assert_allclose(means, expected)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self.hrv.calculate_time_domain_hrv(self.rr, self.rr_stats)
+        with self.assertRaises(ValueError):
+            self.hrv.calculate_time_domain_hrv()
+        with self.assertRaises(ValueError):
+            self.ecg.calculate_hrv_time_domain(rr_stats=self.rr_stats, start=100, stop=3001)
+        with self.assertRaises(ValueError):
+            self.ecg.calculate_hrv_time_domain(rr_stats=self.rr_stats, start=200, stop=100)
+
+
+class TestHRVSegmentation(unittest.TestCase):
+    """HRV分段分析：共用前缀和的分段结果与逐段切片计算一致"""
+
+    def setUp(self):
+        self.analyzer = HRVSegmentationAnalyzer()
+        self.rr = synthetic_rr(4000, seed=1)
+        self.rr_stats = RRPrefixStatistics(self.rr)
+
+    def test_recovery_segments_match_slices(self):
+        segments = self.analyzer.create_recovery_segments(self.rr, [], self.rr_stats)
+        boundaries = [0, 1000, 2000, 3000, 4000]
+        for segment, start, stop in zip(segments, boundaries[:-1], boundaries[1:]):
+            segment_rr = self.rr[start:stop]
+            features = segment["恢复特征"]
+            self.assertEqual(features["平均心率"], f"{60000 / np.mean(segment_rr):.1f} bpm")
+            self.assertEqual(features["HRV(RMSSD)"], f"{np.sqrt(np.mean(np.diff(segment_rr) ** 2)):.1f} ms")
+            self.assertEqual(segment["持续时间"], f"{len(segment_rr) * np.mean(segment_rr) / 1000 / 60:.1f}分钟")
+
+            mid = len(segment_rr) // 2
+            change = (np.sqrt(np.mean(np.diff(segment_rr[mid:]) ** 2))
+                      - np.sqrt(np.mean(np.diff(segment_rr[:mid]) ** 2)))
+            expected = "HRV上升" if change > 5 else "HRV下降" if change < -5 else "HRV稳定"
+            self.assertEqual(features["HRV趋势"], expected)
+
+    def test_training_segments_match_slices(self):
+        result = self.analyzer.analyze_training_phases(self.rr, [], self.rr_stats)
+        self.assertEqual(result, self.analyzer.analyze_training_phases(self.rr, []))
+        first = result["分段详情"][0]
+        segment_rr = self.rr[:int(0.15 * len(self.rr))]
+        self.assertEqual(first["训练特征"]["平均心率"], f"{60000 / np.mean(segment_rr):.1f} bpm")
+
+    def test_mismatched_statistics_rejected(self):
+        with self.assertRaises(ValueError):
+            self.analyzer.create_recovery_segments(self.rr[:100], [], self.rr_stats)
+
+
+class TestECGSegmentation(unittest.TestCase):
+    """ECG分段特征：共用一次R波检测与前缀和，与按同一组R波逐段切片计算一致"""
+
+    def test_segment_features_match_slices(self):
+        sampling_rate = 250
+        analyzer = ECGSegmentationAnalyzer(sampling_rate=sampling_rate)
+        ecg = synthetic_ecg(600, sampling_rate)
+        r_peaks, rr_stats = analyzer.segment_rr_statistics(ecg)
+        self.assertGreater(len(r_peaks), 500)
+
+        segments = analyzer.create_fixed_time_segments(ecg, num_segments=3, rhythm=(r_peaks, rr_stats))
+        self.assertEqual(segments, analyzer.create_fixed_time_segments(ecg, num_segments=3))
+        bounds = [0, len(ecg) // 3, 2 * (len(ecg) // 3), len(ecg)]
+        for segment, start, stop in zip(segments, bounds[:-1], bounds[1:]):
+            peaks = r_peaks[(r_peaks >= start) & (r_peaks < stop)]
+            rr = np.diff(peaks) / sampling_rate * 1000
+            features = segment["段落特征"]
+            self.assertEqual(features["平均心率"], f"{60000 / np.mean(rr):.1f} bpm")
+            self.assertEqual(features["心率变异性(RMSSD)"], f"{np.sqrt(np.mean(np.diff(rr) ** 2)):.1f} ms")
+            self.assertEqual(features["节律规整性"], analyzer.assess_rhythm_regularity(rr))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+患者历史存储单元测试
+SQLite 追加写入与旧版整文件重写 JSON 历史的读取结果一致；旧版JSON迁移可重复执行；懒加载视图与历史库同步
+"""
+
+import unittest
+import json
+import tempfile
+
+import sys
+import os
+AGPAI_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(AGPAI_ROOT)
+
+from Patient_History_Store import PatientHistoryStore, LazyPatientDatabase
+
+
+def legacy_save(directory, patient_id, metrics, analysis_date):
+    """旧版写入方式：读出整个 {patient_id}_history.json，追加后整体重写"""
+    path = os.path.join(directory, f"{patient_id}_history.json")
+    history = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+    history.append({'analysis_date': analysis_date, 'metrics': metrics})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+
+
+def sample_records():
+    records = []
+    for day in range(1, 6):
+        for patient_id in ("张三", "P002"):
+            metrics = {'tir': 60.0 + day, 'glucose_cv': 30.5 - day, 'mage': 4.2, '表型': f"第{day}次"}
+            records.append((patient_id, metrics, f"2025-01-{day:02d}T08:00:00"))
+    return records
+
+
+class TestPatientHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = PatientHistoryStore(os.path.join(self.tmp.name, "history.db"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_append_matches_legacy_json(self):
+        legacy_dir = os.path.join(self.tmp.name, "legacy")
+        os.makedirs(legacy_dir)
+        for patient_id, metrics, analysis_date in sample_records():
+            record = self.store.append(patient_id, metrics, analysis_date)
+            self.assertEqual(record, {'analysis_date': analysis_date, 'metrics': metrics})
+            legacy_save(legacy_dir, patient_id, metrics, analysis_date)
+
+        for patient_id in ("张三", "P002"):
+            with open(os.path.join(legacy_dir, f"{patient_id}_history.json"), encoding='utf-8') as f:
+                self.assertEqual(self.store.load_history(patient_id), json.load(f))
+        self.assertEqual(self.store.load_history("不存在"), [])
+        self.assertEqual(self.store.patient_ids(), sorted(["张三", "P002"]))
+
+    def test_migration_is_idempotent(self):
+        for patient_id, metrics, analysis_date in sample_records():
+            legacy_save(self.tmp.name, patient_id, metrics, analysis_date)
+
+        self.assertEqual(self.store.migrate_json_histories(self.tmp.name), {"P002": 5, "张三": 5})
+        self.assertEqual(self.store.migrate_json_histories(self.tmp.name), {})
+        with open(os.path.join(self.tmp.name, "张三_history.json"), encoding='utf-8') as f:
+            self.assertEqual(self.store.load_history("张三"), json.load(f))
+
+        record_ids = [record_id for record_id, _, _, _ in self.store.iter_records()]
+        self.assertEqual(len(record_ids), 10)
+        self.assertEqual([r[0] for r in self.store.iter_records(after_id=record_ids[6])], record_ids[7:])
+
+    def test_lazy_database_view(self):
+        database = LazyPatientDatabase(self.store)
+        self.store.append("P001", {'tir': 70.0}, "2025-01-01T08:00:00")
+        self.assertIn("P001", database)
+        self.assertNotIn("P999", database)
+        with self.assertRaises(KeyError):
+            database["P999"]
+
+        history = database["P001"]
+        record = self.store.append("P001", {'tir': 72.0}, "2025-01-02T08:00:00")
+        database.record_appended("P001", record)
+        self.assertIs(database["P001"], history)
+        self.assertEqual(history, self.store.load_history("P001"))
+        self.assertEqual((list(database), len(database)), (["P001"], 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
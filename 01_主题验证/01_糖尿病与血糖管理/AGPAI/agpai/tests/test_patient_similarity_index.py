@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+患者表型相似度索引单元测试
+矩阵检索与逐条计算欧氏距离的暴力检索一致；BallTree 与 exact 模式一致；索引落盘后按记录ID增量追平；
+索引文件原子写入，损坏时由历史库重建
+"""
+
+import unittest
+import tempfile
+import numpy as np
+
+import sys
+import os
+AGPAI_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(AGPAI_ROOT)
+
+from Patient_History_Store import PatientHistoryStore
+from Patient_Similarity_Index import PatientSimilarityIndex, SIMILARITY_FEATURES, BALLTREE_AVAILABLE
+
+
+def random_metrics(rng, missing=0.1):
+    """随机指标，部分指标缺失 (模拟旧记录)"""
+    metrics = {feature: float(rng.normal(50, 15)) for feature in SIMILARITY_FEATURES if rng.random() > missing}
+    metrics['备注'] = "非数值字段不参与计算"
+    return metrics
+
+
+def reference_search(records, query, k, exclude_patient_id=None):
+    """逐条计算：按总体均值/标准差标准化，缺失值视为均值，欧氏距离排序"""
+    vectors = np.array([[m.get(f, np.nan) for f in SIMILARITY_FEATURES] for _, m in records], dtype=float)
+    center = np.nanmean(vectors, axis=0)
+    scale = np.nanstd(vectors, axis=0)
+    scale[scale == 0] = 1.0
+    normalized = np.nan_to_num((vectors - center) / scale)
+    q = np.nan_to_num((np.array([query.get(f, np.nan) for f in SIMILARITY_FEATURES], dtype=float) - center) / scale)
+    distances = [(float(np.sqrt(np.sum((row - q) ** 2))), i) for i, row in enumerate(normalized)
+                 if records[i][0] != exclude_patient_id]
+    return sorted(distances)[:k]
+
+
+class TestPatientSimilarityIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.tmp.name, "index.npz")
+        rng = np.random.default_rng(0)
+        self.records = [(f"P{i % 40:03d}", random_metrics(rng)) for i in range(300)]
+        self.queries = [random_metrics(rng, missing=0.3) for _ in range(5)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, mode='exact'):
+        index = PatientSimilarityIndex(self.index_path, mode=mode, persist_every=10 ** 6)
+        for record_id, (patient_id, metrics) in enumerate(self.records, 1):
+            index.add(record_id, patient_id, f"2025-01-01T{record_id}", metrics)
+        return index
+
+    def test_exact_matches_brute_force(self):
+        index = self.build()
+        for query in self.queries:
+            for exclude in (None, "P007"):
+                results = index.search(query, k=7, exclude_patient_id=exclude)
+                expected = reference_search(self.records, query, 7, exclude)
+                self.assertEqual(len(results), 7)
+                for result, (distance, i) in zip(results, expected):
+                    self.assertAlmostEqual(result['distance'], distance, places=8)
+                    self.assertEqual(result['patient_id'], self.records[i][0])
+                    self.assertNotEqual(result['patient_id'], exclude)
+
+    @unittest.skipUnless(BALLTREE_AVAILABLE, "sklearn不可用")
+    def test_balltree_matches_exact(self):
+        exact, tree = self.build(), self.build('balltree')
+        for query in self.queries:
+            for exclude in (None, "P011"):
+                expected = [r['distance'] for r in exact.search(query, k=5, exclude_patient_id=exclude)]
+                result = [r['distance'] for r in tree.search(query, k=5, exclude_patient_id=exclude)]
+                np.testing.assert_allclose(result, expected)
+
+    def test_sync_after_reload(self):
+        store = PatientHistoryStore(os.path.join(self.tmp.name, "history.db"))
+        try:
+            for patient_id, metrics in self.records[:200]:
+                store.append(patient_id, metrics)
+            index = PatientSimilarityIndex(self.index_path)
+            self.assertEqual(index.sync_with_store(store), 200)
+            index.save()
+
+            for patient_id, metrics in self.records[200:]:
+                store.append(patient_id, metrics)
+            reloaded = PatientSimilarityIndex(self.index_path)
+            self.assertEqual(len(reloaded), 200)
+            self.assertEqual(reloaded.sync_with_store(store), 100)
+            self.assertEqual(reloaded.sync_with_store(store), 0)
+
+            query = self.queries[0]
+            expected = reference_search(self.records, query, 5)
+            np.testing.assert_allclose([r['distance'] for r in reloaded.search(query, k=5)],
+                                       [distance for distance, _ in expected])
+        finally:
+            store.close()
+
+    def test_empty_and_invalid(self):
+        index = PatientSimilarityIndex(self.index_path)
+        self.assertEqual(index.search(self.queries[0]), [])
+        with self.assertRaises(ValueError):
+            PatientSimilarityIndex(self.index_path, mode='kdtree')
+
+    def test_corrupt_index_rebuilds_from_history(self):
+        store = PatientHistoryStore(os.path.join(self.tmp.name, "history.db"))
+        try:
+            for patient_id, metrics in self.records[:50]:
+                store.append(patient_id, metrics)
+            index = PatientSimilarityIndex(self.index_path)
+            index.sync_with_store(store)
+            index.save()
+            self.assertEqual([name for name in os.listdir(self.tmp.name) if name.startswith(".tmp_")], [])
+            with open(self.index_path, 'rb') as f:
+                valid = f.read()
+
+            np.savez(self.index_path, features=np.array(SIMILARITY_FEATURES, dtype=str))
+            with open(self.index_path, 'rb') as f:
+                missing_key = f.read()
+            for content in [b"", b"not an npz file", valid[:len(valid) // 2], missing_key]:
+                with open(self.index_path, 'wb') as f:
+                    f.write(content)
+                rebuilt = PatientSimilarityIndex(self.index_path)
+                self.assertEqual((len(rebuilt), rebuilt.last_record_id), (0, 0))
+                self.assertEqual(rebuilt.sync_with_store(store), 50)
+                rebuilt.save()
+                self.assertEqual(len(PatientSimilarityIndex(self.index_path)), 50)
+        finally:
+            store.close()
+
+    def test_numpy_scalars_are_kept(self):
+        index = PatientSimilarityIndex(self.index_path)
+        metrics = {'tir': np.float64(70.5), 'glucose_cv': np.float32(31.0), 'mage': np.int64(4),
+                   'lbgi': True, 'hbgi': np.bool_(False), 'gmi': "7.1"}
+        vector = dict(zip(index.features, index._to_vector(metrics)))
+        self.assertEqual((vector['tir'], vector['glucose_cv'], vector['mage']), (70.5, 31.0, 4.0))
+        for feature in ('lbgi', 'hbgi', 'gmi', 'j_index'):
+            self.assertTrue(np.isnan(vector[feature]), feature)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分段前缀统计表及分段脆性分析单元测试
+前缀表查询与直接对切片计算 (np.nanmean 等) 一致，含缺失值；分段及段间比较与检测器逐段计算一致；
+拖动切点只更新相邻两段，结果与按新切点重新分析一致
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core'))
+
+from segment_statistics import SegmentPrefixStatistics
+from Segmented_Brittleness_Analyzer import SegmentedBrittlenessAnalyzer
+
+
+def reference_metrics(segment: np.ndarray) -> dict:
+    """直接对切片计算的参考结果 (缺失值剔除)"""
+    valid = segment[~np.isnan(segment)]
+    pairs = ~np.isnan(segment[:-1]) & ~np.isnan(segment[1:])
+    positions = np.flatnonzero(~np.isnan(segment))
+    mean = np.nanmean(segment)
+    return {
+        'valid_points': len(valid),
+        'mean_glucose': mean,
+        'glucose_std': np.nanstd(segment),
+        'cv': np.nanstd(segment) / (mean + 1e-6) * 100,
+        'min_glucose': np.nanmin(segment),
+        'max_glucose': np.nanmax(segment),
+        'tir': np.mean((valid >= 3.9) & (valid <= 10.0)) * 100,
+        'tbr': np.mean(valid < 3.9) * 100,
+        'tar': np.mean(valid > 10.0) * 100,
+        'lag1_autocorrelation': np.corrcoef(segment[:-1][pairs], segment[1:][pairs])[0, 1],
+        'trend_correlation': stats.linregress(positions, valid).rvalue
+    }
+
+
+class TestSegmentPrefixStatistics(unittest.TestCase):
+    """测试前缀统计表"""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.glucose = 8 + 2.5 * np.sin(np.arange(2000) / 40) + rng.normal(0, 1.2, 2000)
+        self.glucose[rng.random(2000) < 0.08] = np.nan
+        self.glucose[300:360] = np.nan      # 连续缺失 (传感器脱落)
+        self.ranges = [(0, 2000), (0, 50), (250, 400), (1000, 1371), (1990, 2000)]
+
+    def assertMetricsMatch(self, stats_table, glucose):
+        for start, end in self.ranges:
+            metrics = stats_table.segment_metrics(start, end)
+            for key, expected in reference_metrics(glucose[start:end]).items():
+                self.assertAlmostEqual(metrics[key], expected, places=8, msg=f"{key} [{start}, {end})")
+
+    def test_metrics_match_reference(self):
+        self.assertMetricsMatch(SegmentPrefixStatistics(self.glucose), self.glucose)
+
+    def test_without_missing_values(self):
+        glucose = np.nan_to_num(self.glucose, nan=7.0)
+        self.assertMetricsMatch(SegmentPrefixStatistics(glucose), glucose)
+
+    def test_all_missing_segment(self):
+        metrics = SegmentPrefixStatistics(self.glucose).segment_metrics(300, 360)
+        self.assertEqual(metrics['valid_points'], 0)
+        self.assertTrue(np.isnan(metrics['mean_glucose']))
+        self.assertEqual(metrics['tir'], 0)
+
+    def test_invalid_range(self):
+        with self.assertRaises(ValueError):
+            SegmentPrefixStatistics(self.glucose).segment_metrics(10, 10)
+
+
+class TestMoveCutpoint(unittest.TestCase):
+    """测试拖动切点"""
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        n = 180
+        self.timestamps = pd.date_range('2025-01-01', periods=n, freq='15min').values
+        self.glucose = np.concatenate([
+            11 + rng.normal(0, 3.0, n // 3),
+            8 + rng.normal(0, 1.5, n // 3),
+            7 + rng.normal(0, 0.8, n - 2 * (n // 3))
+        ])
+        self.cutpoints = [
+            {'index': n // 3, 'timestamp': self.timestamps[n // 3], 'type': 'manual', 'confidence': 1.0},
+            {'index': 2 * (n // 3), 'timestamp': self.timestamps[2 * (n // 3)], 'type': 'manual',
+             'confidence': 1.0}
+        ]
+        self.patient_info = {'name': 'Test'}
+        self.analyzer = SegmentedBrittlenessAnalyzer()
+        self.analyzer.manual_cutpoint_manager.validate_cutpoint_timing = \
+            lambda cutpoint, glucose, timestamps: {'warnings': []}
+
+    def analyze(self, cutpoints):
+        return self.analyzer.analyze_with_cutpoints(
+            self.glucose, self.timestamps, self.patient_info, detect_cutpoints=False,
+            manual_cutpoints=[dict(cp) for cp in cutpoints])
+
+    def test_move_matches_fresh_analysis(self):
+        moved = self.analyze(self.cutpoints)
+        new_index = self.cutpoints[0]['index'] + 15
+        self.analyzer.move_cutpoint(moved, self.glucose, self.timestamps, 0, new_index)
+
+        expected_cutpoints = [dict(self.cutpoints[0], index=new_index, timestamp=self.timestamps[new_index]),
+                              self.cutpoints[1]]
+        fresh = self.analyze(expected_cutpoints)
+
+        self.assertEqual([cp['index'] for cp in moved['cutpoints']], [new_index, self.cutpoints[1]['index']])
+        self.assertEqual(moved['cutpoints'][0]['timestamp'], self.timestamps[new_index])
+        for moved_segment, fresh_segment in zip(moved['segments'], fresh['segments']):
+            for key in ('segment_info', 'basic_metrics', 'clinical_assessment', 'chaos_indicators'):
+                self.assertEqual(moved_segment[key], fresh_segment[key], key)
+            self.assertEqual(moved_segment['brittleness_analysis'].get('分型结果'),
+                             fresh_segment['brittleness_analysis'].get('分型结果'))
+        for key in ('segment_comparison', 'treatment_effectiveness'):
+            self.assertEqual(str(moved[key]), str(fresh[key]), key)
+        self.assertEqual(str(moved['brittleness_comparison']), str(fresh['brittleness_comparison']))
+
+    def test_unchanged_segments_are_reused(self):
+        result = self.analyze(self.cutpoints)
+        last = result['segments'][2]
+        self.analyzer.move_cutpoint(result, self.glucose, self.timestamps, 0, self.cutpoints[0]['index'] - 15)
+        self.assertIs(result['segments'][2], last)
+
+    def test_segments_match_detector(self):
+        """前缀表分段及段间比较与检测器逐段切片计算一致"""
+        result = self.analyze(self.cutpoints)
+        detector = self.analyzer.cutpoint_detector
+        segments = detector.analyze_segments(self.glucose, self.timestamps, result['cutpoints'])
+        self.assertEqual([(a['segment_info']['start_idx'], a['segment_info']['end_idx'], a['segment_info']['type'])
+                          for a in result['segments']],
+                         [(s['start_idx'], s['end_idx'], s['type']) for s in segments])
+        expected = detector.compare_segments(segments)
+        comparison = result['segment_comparison']
+        self.assertEqual(comparison['overall_assessment'], expected['overall_assessment'])
+        self.assertAlmostEqual(comparison['total_duration'], expected['total_duration'])
+        for pair, expected_pair in zip(comparison['comparisons'], expected['comparisons']):
+            for key in ('mean_change', 'cv_change', 'range_change', 'statistical_significance', 'effect_size'):
+                self.assertAlmostEqual(pair[key], expected_pair[key], places=8, msg=key)
+            self.assertEqual(pair['improvement'], expected_pair['improvement'])
+
+    def test_move_recomputes_only_adjacent_segments(self):
+        """拖动切点不重新扫描全部片段，只对两段生成脆性报告；拖回原位置时命中缓存"""
+        result = self.analyze(self.cutpoints)
+        reports = []
+        advisor = self.analyzer.brittleness_advisor
+        generate = advisor.generate_brittleness_report
+        advisor.generate_brittleness_report = lambda glucose, *args: reports.append(len(glucose)) or generate(glucose, *args)
+        self.analyzer.cutpoint_detector.analyze_segments = None
+        self.analyzer.cutpoint_detector.compare_segments = None
+
+        original = self.cutpoints[1]['index']
+        self.analyzer.move_cutpoint(result, self.glucose, self.timestamps, 1, original + 10)
+        self.assertEqual(reports, [original + 10 - self.cutpoints[0]['index'], len(self.glucose) - original - 10])
+        self.analyzer.move_cutpoint(result, self.glucose, self.timestamps, 1, original)
+        self.assertEqual(len(reports), 2)
+
+    def test_deferred_brittleness(self):
+        moved = self.analyze(self.cutpoints)
+        new_index = self.cutpoints[0]['index'] + 12
+        self.analyzer.move_cutpoint(moved, self.glucose, self.timestamps, 0, new_index, defer_brittleness=True)
+        self.assertEqual([a.get('brittleness_pending', False) for a in moved['segments']], [True, True, False])
+        self.assertNotIn('brittleness_analysis', moved['segments'][0])
+
+        self.analyzer.refresh_brittleness(moved, self.glucose)
+        fresh = self.analyze([dict(self.cutpoints[0], index=new_index, timestamp=self.timestamps[new_index]),
+                              self.cutpoints[1]])
+        self.assertFalse(any(a.get('brittleness_pending') for a in moved['segments']))
+        for key in ('segment_comparison', 'brittleness_comparison', 'treatment_effectiveness'):
+            self.assertEqual(str(moved[key]), str(fresh[key]), key)
+
+    def test_copy_of_series_is_accepted(self):
+        result = self.analyze(self.cutpoints)
+        self.analyzer.move_cutpoint(result, self.glucose.copy(), self.timestamps, 0, self.cutpoints[0]['index'] + 5)
+        self.assertEqual(result['segments'][0]['segment_info']['end_idx'], self.cutpoints[0]['index'] + 5)
+
+    def test_rejects_other_series_and_bad_index(self):
+        result = self.analyze(self.cutpoints)
+        with self.assertRaises(ValueError):
+            self.analyzer.move_cutpoint(result, self.glucose + 1, self.timestamps, 0, 70)
+        with self.assertRaises(ValueError):
+            self.analyzer.move_cutpoint(result, self.glucose, self.timestamps, 0, 5)
+        with self.assertRaises(ValueError):
+            self.analyzer.move_cutpoint(result, self.glucose, self.timestamps, 2, 70)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+治疗效果追踪单元测试
+向量化近似熵与逐对比较的参考实现一致、分块临时数组受内存上限约束、周期指标缓存按 LRU 淘汰
+"""
+
+import unittest
+import tracemalloc
+import numpy as np
+from datetime import datetime
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'core'))
+
+from Treatment_Tracker import TreatmentEffectTracker, _approximate_entropy
+
+
+def reference_approximate_entropy(data, m=2, r=0.2):
+    """逐对比较模板的近似熵 (原实现)"""
+    N = len(data)
+    if N < 10:
+        return 0
+    tolerance = r * np.std(data)
+
+    def _phi(m):
+        patterns = [data[i:i + m] for i in range(N - m + 1)]
+        C = [sum(max(abs(a - b) for a, b in zip(template, other)) <= tolerance for other in patterns)
+             / (N - m + 1) for template in patterns]
+        return np.mean([np.log(c) for c in C if c > 0])
+
+    return _phi(m) - _phi(m + 1)
+
+
+class TestApproximateEntropy(unittest.TestCase):
+    """测试近似熵"""
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.data = 8 + 2 * np.sin(np.arange(400) / 15) + rng.normal(0, 0.8, 400)
+
+    def test_matches_reference(self):
+        expected = reference_approximate_entropy(self.data)
+        self.assertAlmostEqual(_approximate_entropy(self.data), expected, places=10)
+        # 预算极小时每块一行，结果不变
+        self.assertAlmostEqual(_approximate_entropy(self.data, max_block_bytes=1), expected, places=10)
+        self.assertAlmostEqual(_approximate_entropy(self.data, m=3), reference_approximate_entropy(self.data, m=3),
+                               places=10)
+
+    def test_short_series(self):
+        self.assertEqual(_approximate_entropy(self.data[:9]), 0)
+
+    def test_block_memory_budget(self):
+        data = np.random.default_rng(0).normal(8, 2, 6000)
+        budget = 4 * 1024 * 1024
+        tracemalloc.start()
+        try:
+            _approximate_entropy(data, max_block_bytes=budget)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # 分块临时数组之外只有 O(N) 的数组
+        self.assertLess(peak, budget + 64 * len(data))
+
+
+class TestPeriodMetricsCache(unittest.TestCase):
+    """测试周期指标缓存"""
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.periods = [list(8 + rng.normal(0, 1.5, 60)) for _ in range(4)]
+
+    def test_lru_eviction(self):
+        tracker = TreatmentEffectTracker("P001", max_cached_periods=2)
+        first = tracker._get_period_metrics("p0", self.periods[0])
+        tracker._get_period_metrics("p1", self.periods[1])
+        self.assertIs(tracker._get_period_metrics("p0", self.periods[0]), first)  # p0 变为最近使用
+        tracker._get_period_metrics("p2", self.periods[2])                        # 淘汰 p1
+
+        self.assertEqual(len(tracker._period_metrics_cache), 2)
+        self.assertEqual([key[0] for key in tracker._period_metrics_cache], ["p0", "p2"])
+        self.assertIs(tracker._get_period_metrics("p0", self.periods[0]), first)
+
+    def test_cached_metrics_match_direct(self):
+        tracker = TreatmentEffectTracker("P001")
+        traditional, chaos = tracker._get_period_metrics("p0", self.periods[0])
+        self.assertEqual(traditional, tracker.calculate_traditional_metrics(self.periods[0]))
+        self.assertEqual(chaos, tracker.calculate_chaos_metrics(self.periods[0]))
+
+    def test_invalid_cache_size(self):
+        with self.assertRaises(ValueError):
+            TreatmentEffectTracker("P001", max_cached_periods=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+ECG形态学特征提取性能对比
+- 旧实现: 逐心拍 Python 循环，每拍多次切片 + find_peaks + polyfit，最后组装 DataFrame
+- 新实现: 按批次将全部心拍收集为二维窗口矩阵，一次性计算各波段特征
+用合成的长时程ECG (默认1小时) 计时，并校验两种实现的汇总特征一致
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import signal
+
+from enhanced_ecg_analyzer_v4 import detect_r_peaks_multilead, extract_ecg_morphology_features
+
+
+def legacy_extract_ecg_morphology_features(ecg_signal, r_peaks, sampling_rate):
+    """旧版逐心拍循环实现，仅用于对比 (np.trapz 已在 NumPy 2 中移除，面积改用 np.trapezoid)"""
+    if len(r_peaks) < 2:
+        return {}
+
+    features = {}
+    morphology_data = []
+
+    # 分析每个心拍的形态学特征
+    for i in range(1, len(r_peaks) - 1):  # 避免边界问题
+        r_peak = r_peaks[i]
+        prev_r = r_peaks[i-1]
+        next_r = r_peaks[i+1]
+
+        # 定义心拍边界
+        beat_start = prev_r + int(0.2 * sampling_rate)  # 上一个R峰后200ms
+        beat_end = next_r - int(0.1 * sampling_rate)    # 下一个R峰前100ms
+
+        if beat_end <= beat_start or beat_start < 0 or beat_end >= len(ecg_signal):
+            continue
+
+        beat_signal = ecg_signal[beat_start:beat_end]
+        r_peak_in_beat = r_peak - beat_start
+
+        if r_peak_in_beat <= 0 or r_peak_in_beat >= len(beat_signal):
+            continue
+
+        beat_features = {}
+
+        # === P波分析 ===
+        try:
+            # P波搜索窗口：R峰前200-80ms
+            p_search_start = max(0, r_peak_in_beat - int(0.2 * sampling_rate))
+            p_search_end = max(0, r_peak_in_beat - int(0.08 * sampling_rate))
+
+            if p_search_end > p_search_start:
+                p_segment = beat_signal[p_search_start:p_search_end]
+
+                # P波检测：寻找最大正向偏转
+                baseline = np.median(beat_signal[:min(20, len(beat_signal))])
+                p_peaks_pos = signal.find_peaks(p_segment - baseline, height=0.01)[0]
+                p_peaks_neg = signal.find_peaks(-(p_segment - baseline), height=0.01)[0]
+
+                if len(p_peaks_pos) > 0:
+                    p_peak_idx = p_peaks_pos[np.argmax(p_segment[p_peaks_pos])]
+                    beat_features['p_wave_amplitude'] = p_segment[p_peak_idx] - baseline
+                    beat_features['p_wave_duration'] = len(p_segment) / sampling_rate * 1000  # ms
+                else:
+                    beat_features['p_wave_amplitude'] = np.max(p_segment) - baseline
+                    beat_features['p_wave_duration'] = len(p_segment) / sampling_rate * 1000
+
+                # P波形态分析
+                beat_features['p_wave_area'] = np.trapezoid(np.abs(p_segment - baseline))
+                beat_features['p_wave_biphasic'] = len(p_peaks_pos) > 0 and len(p_peaks_neg) > 0
+            else:
+                beat_features['p_wave_amplitude'] = np.nan
+                beat_features['p_wave_duration'] = np.nan
+                beat_features['p_wave_area'] = np.nan
+                beat_features['p_wave_biphasic'] = False
+
+        except Exception as e:
+            beat_features.update({
+                'p_wave_amplitude': np.nan, 'p_wave_duration': np.nan,
+                'p_wave_area': np.nan, 'p_wave_biphasic': False
+            })
+
+        # === QRS复合波分析 ===
+        try:
+            # QRS搜索窗口：R峰前后80ms
+            qrs_start = max(0, r_peak_in_beat - int(0.08 * sampling_rate))
+            qrs_end = min(len(beat_signal), r_peak_in_beat + int(0.08 * sampling_rate))
+
+            qrs_segment = beat_signal[qrs_start:qrs_end]
+            qrs_duration = len(qrs_segment) / sampling_rate * 1000  # ms
+
+            # QRS振幅和形态
+            qrs_max = np.max(qrs_segment)
+            qrs_min = np.min(qrs_segment)
+            qrs_amplitude = qrs_max - qrs_min
+
+            # 检测QRS形态特征
+            baseline = np.median(beat_signal[:min(20, len(beat_signal))])
+
+            # Q波检测
+            q_segment = qrs_segment[:len(qrs_segment)//3]
+            q_wave_depth = baseline - np.min(q_segment) if len(q_segment) > 0 else 0
+
+            # S波检测
+            s_segment = qrs_segment[2*len(qrs_segment)//3:]
+            s_wave_depth = baseline - np.min(s_segment) if len(s_segment) > 0 else 0
+
+            beat_features.update({
+                'qrs_duration': qrs_duration,
+                'qrs_amplitude': qrs_amplitude,
+                'r_wave_amplitude': qrs_max - baseline,
+                'q_wave_depth': q_wave_depth,
+                's_wave_depth': s_wave_depth,
+                'qrs_area': np.trapezoid(np.abs(qrs_segment - baseline))
+            })
+
+        except Exception as e:
+            beat_features.update({
+                'qrs_duration': np.nan, 'qrs_amplitude': np.nan,
+                'r_wave_amplitude': np.nan, 'q_wave_depth': np.nan,
+                's_wave_depth': np.nan, 'qrs_area': np.nan
+            })
+
+        # === ST段分析 ===
+        try:
+            # ST段搜索窗口：R峰后80-200ms
+            st_start = min(len(beat_signal), r_peak_in_beat + int(0.08 * sampling_rate))
+            st_end = min(len(beat_signal), r_peak_in_beat + int(0.2 * sampling_rate))
+
+            if st_end > st_start:
+                st_segment = beat_signal[st_start:st_end]
+                baseline = np.median(beat_signal[:min(20, len(beat_signal))])
+
+                # ST段偏移
+                st_level = np.mean(st_segment[:len(st_segment)//3])  # ST起始部分
+                st_deviation = st_level - baseline
+
+                # ST段斜率
+                if len(st_segment) > 1:
+                    st_slope = np.polyfit(range(len(st_segment)), st_segment, 1)[0]
+                else:
+                    st_slope = 0
+
+                beat_features.update({
+                    'st_deviation': st_deviation,
+                    'st_slope': st_slope,
+                    'st_area': np.trapezoid(st_segment - baseline)
+                })
+            else:
+                beat_features.update({
+                    'st_deviation': np.nan, 'st_slope': np.nan, 'st_area': np.nan
+                })
+
+        except Exception as e:
+            beat_features.update({
+                'st_deviation': np.nan, 'st_slope': np.nan, 'st_area': np.nan
+            })
+
+        # === T波分析 ===
+        try:
+            # T波搜索窗口：R峰后200-400ms
+            t_start = min(len(beat_signal), r_peak_in_beat + int(0.2 * sampling_rate))
+            t_end = min(len(beat_signal), r_peak_in_beat + int(0.4 * sampling_rate))
+
+            if t_end > t_start:
+                t_segment = beat_signal[t_start:t_end]
+                baseline = np.median(beat_signal[:min(20, len(beat_signal))])
+
+                # T波振幅和方向
+                t_max = np.max(t_segment)
+                t_min = np.min(t_segment)
+
+                if abs(t_max - baseline) > abs(t_min - baseline):
+                    t_amplitude = t_max - baseline
+                    t_polarity = 'positive'
+                else:
+                    t_amplitude = baseline - t_min
+                    t_polarity = 'negative'
+
+                # T波对称性
+                t_peak_idx = np.argmax(np.abs(t_segment - baseline))
+                left_half = t_segment[:t_peak_idx] if t_peak_idx > 0 else []
+                right_half = t_segment[t_peak_idx:] if t_peak_idx < len(t_segment) else []
+
+                if len(left_half) > 0 and len(right_half) > 0:
+                    # 简化对称性评估
+                    symmetry = 1 - abs(len(left_half) - len(right_half)) / len(t_segment)
+                else:
+                    symmetry = 0
+
+                beat_features.update({
+                    't_wave_amplitude': abs(t_amplitude),
+                    't_wave_polarity': t_polarity,
+                    't_wave_symmetry': symmetry,
+                    't_wave_area': np.trapezoid(np.abs(t_segment - baseline))
+                })
+            else:
+                beat_features.update({
+                    't_wave_amplitude': np.nan, 't_wave_polarity': 'unknown',
+                    't_wave_symmetry': np.nan, 't_wave_area': np.nan
+                })
+
+        except Exception as e:
+            beat_features.update({
+                't_wave_amplitude': np.nan, 't_wave_polarity': 'unknown',
+                't_wave_symmetry': np.nan, 't_wave_area': np.nan
+            })
+
+        # === 间期分析 ===
+        try:
+            # PR间期：P波起始到QRS起始
+            if not np.isnan(beat_features.get('p_wave_duration', np.nan)):
+                # 简化PR间期计算
+                pr_interval = (r_peak_in_beat - p_search_start) / sampling_rate * 1000
+                beat_features['pr_interval'] = pr_interval
+            else:
+                beat_features['pr_interval'] = np.nan
+
+            # QT间期：QRS起始到T波结束
+            qt_interval = (t_end - qrs_start) / sampling_rate * 1000
+
+            # QT校正 (Bazett公式)
+            rr_interval = (next_r - prev_r) / sampling_rate * 1000
+            qtc_interval = qt_interval / np.sqrt(rr_interval / 1000) if rr_interval > 0 else np.nan
+
+            beat_features.update({
+                'qt_interval': qt_interval,
+                'qtc_interval': qtc_interval
+            })
+
+        except Exception as e:
+            beat_features.update({
+                'pr_interval': np.nan, 'qt_interval': np.nan, 'qtc_interval': np.nan
+            })
+
+        morphology_data.append(beat_features)
+
+    # 计算所有心拍的统计特征
+    if morphology_data:
+        df_morph = pd.DataFrame(morphology_data)
+
+        # 数值特征的统计
+        numeric_features = ['p_wave_amplitude', 'p_wave_duration', 'qrs_duration',
+                          'qrs_amplitude', 'r_wave_amplitude', 'st_deviation',
+                          't_wave_amplitude', 'pr_interval', 'qt_interval', 'qtc_interval']
+
+        for feature in numeric_features:
+            if feature in df_morph.columns:
+                values = pd.to_numeric(df_morph[feature], errors='coerce').dropna()
+                if len(values) > 0:
+                    features[f'{feature}_mean'] = values.mean()
+                    features[f'{feature}_std'] = values.std()
+                    features[f'{feature}_median'] = values.median()
+                    features[f'{feature}_max'] = values.max()
+                    features[f'{feature}_min'] = values.min()
+
+        # 形态学特征统计
+        features['beats_analyzed'] = len(morphology_data)
+        features['p_wave_detected_ratio'] = (~pd.isna(df_morph['p_wave_amplitude'])).sum() / len(morphology_data)
+        features['t_wave_positive_ratio'] = (df_morph['t_wave_polarity'] == 'positive').sum() / len(morphology_data)
+
+        # 异常检测
+        if 'qrs_duration_mean' in features:
+            features['wide_qrs_ratio'] = (pd.to_numeric(df_morph['qrs_duration'], errors='coerce') > 140).sum() / len(morphology_data)  # 临床优化：120→140ms
+
+        if 'st_deviation_mean' in features:
+            st_values = pd.to_numeric(df_morph['st_deviation'], errors='coerce').dropna()
+            if len(st_values) > 0:
+                features['st_elevation_ratio'] = (st_values > 0.2).sum() / len(st_values)  # 临床优化：0.1→0.2mV
+                features['st_depression_ratio'] = (st_values < -0.2).sum() / len(st_values)  # 临床优化：-0.1→-0.2mV
+
+    return features
+
+
+def synthetic_ecg(duration_sec, sampling_rate, mean_rr=0.8, seed=0):
+    """高斯P波/QRS波/T波 + 基线漂移 + 噪声，RR间期随机变化"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration_sec * sampling_rate)) / sampling_rate
+    beats = np.cumsum(rng.normal(mean_rr, 0.08 * mean_rr, int(duration_sec / mean_rr) + 5))
+    beats = beats[(beats > 0.5) & (beats < duration_sec - 0.5)]
+    ecg = 0.15 * np.sin(2 * np.pi * 0.2 * t) + 0.03 * rng.standard_normal(len(t))
+    for beat in beats:
+        window = slice(max(0, int((beat - 0.4) * sampling_rate)), int((beat + 0.6) * sampling_rate))
+        tw = t[window]
+        ecg[window] += 0.12 * np.exp(-((tw - beat + 0.16) / 0.025) ** 2)
+        ecg[window] += rng.uniform(0.8, 1.4) * np.exp(-((tw - beat) / 0.012) ** 2)
+        ecg[window] += rng.choice([-0.25, 0.25], p=[0.2, 0.8]) * np.exp(-((tw - beat - 0.28) / 0.05) ** 2)
+    return ecg
+
+
+def max_feature_difference(expected, actual):
+    """两组汇总特征的最大相对差异；键不一致时返回 inf"""
+    if set(expected) != set(actual):
+        return float('inf')
+    return max((abs(expected[k] - actual[k]) / max(abs(expected[k]), 1e-12) for k in expected), default=0.0)
+
+
+def run_benchmark(duration_sec=3600, sampling_rate=500, beat_chunk_size=10000):
+    """在合成记录上分别计时旧实现与新实现"""
+    ecg = synthetic_ecg(duration_sec, sampling_rate)
+    r_peaks = detect_r_peaks_multilead(ecg, sampling_rate)
+
+    start = time.perf_counter()
+    legacy = legacy_extract_ecg_morphology_features(ecg, r_peaks, sampling_rate)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vectorized = extract_ecg_morphology_features(ecg, r_peaks, sampling_rate, beat_chunk_size)
+    vector_time = time.perf_counter() - start
+
+    print(f"📊 合成记录: {duration_sec / 3600:g}小时, {sampling_rate}Hz, {len(r_peaks)}个R峰")
+    print(f"   逐心拍循环   {legacy_time:8.3f}s")
+    print(f"   批量窗口矩阵 {vector_time:8.3f}s  加速 {legacy_time / vector_time:6.1f}x")
+    print(f"   汇总特征最大相对差异: {max_feature_difference(legacy, vectorized):.3e}")
+    return legacy_time, vector_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ECG形态学特征提取性能对比')
+    parser.add_argument('--duration', type=float, default=3600, help='合成记录时长(秒)')
+    parser.add_argument('--sampling_rate', type=int, default=500, help='采样率(Hz)')
+    parser.add_argument('--beat_chunk_size', type=int, default=10000, help='新实现每批处理的心拍数')
+    args = parser.parse_args()
+
+    run_benchmark(args.duration, args.sampling_rate, args.beat_chunk_size)
+
+
+if __name__ == "__main__":
+    main()
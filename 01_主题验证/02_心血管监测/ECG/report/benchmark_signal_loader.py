@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+ECG信号读取性能对比
+- 旧实现: 整个文件读入内存后 struct.unpack 为Python元组，再逐导联转换单位
+- 新实现: np.memmap 零拷贝映射 + 全导联一次广播转换，支持只读取时间窗口
+对 ECG_demodata 各子目录 RECORDS 中的记录逐一计时，并校验两种实现结果一致
+"""
+
+import os
+import struct
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from enhanced_ecg_analyzer_v4 import parse_header_file, load_ecg_signal
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parent.parent / 'ECG_demodata'
+
+
+def legacy_load_signal(mat_path, header_info):
+    """旧版读取流程 (struct.unpack + 逐导联循环)，仅用于对比"""
+    with open(mat_path, 'rb') as f:
+        data = f.read()
+
+    num_values = len(data) // 2
+    values = struct.unpack(f'<{num_values}h', data)
+    expected_values = header_info['num_leads'] * header_info['num_samples']
+    signal_data = np.array(values[num_values - expected_values:]).reshape(
+        header_info['num_samples'], header_info['num_leads'])
+
+    physical_data = np.zeros_like(signal_data, dtype=float)
+    for i in range(len(header_info['gains'])):
+        physical_data[:, i] = (signal_data[:, i] - header_info['baselines'][i]) / header_info['gains'][i]
+    return physical_data
+
+
+def find_records(data_dir):
+    """收集 RECORDS 文件中列出且 .hea/.mat 齐全的记录"""
+    records = []
+    for records_file in sorted(Path(data_dir).rglob('RECORDS')):
+        for name in records_file.read_text().split():
+            base = records_file.parent / name
+            if base.with_suffix('.hea').exists() and base.with_suffix('.mat').exists():
+                records.append(base)
+    return records
+
+
+def run_benchmark(data_dir, window_sec=2.0, max_records=None):
+    """对全部记录分别计时旧实现、新实现(整条)与新实现(时间窗口)"""
+    records = find_records(data_dir)
+    if max_records:
+        records = records[:max_records]
+    if not records:
+        print(f"❌ 未在 {data_dir} 找到含 .hea/.mat 数据的记录")
+        return None
+
+    headers = [parse_header_file(str(base.with_suffix('.hea'))) for base in records]
+    pairs = [(str(base.with_suffix('.mat')), info) for base, info in zip(records, headers) if info]
+
+    timings = {}
+
+    start = time.perf_counter()
+    legacy_results = [legacy_load_signal(mat_path, info) for mat_path, info in pairs]
+    timings['struct + 逐导联循环'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    memmap_results = [load_ecg_signal(mat_path, info) for mat_path, info in pairs]
+    timings['memmap 整条记录'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for mat_path, info in pairs:
+        load_ecg_signal(mat_path, info, start_sec=0, end_sec=window_sec)
+    timings[f'memmap {window_sec:g}s 窗口'] = time.perf_counter() - start
+
+    max_diff = max(float(np.max(np.abs(a - b))) for a, b in zip(legacy_results, memmap_results))
+
+    print(f"📊 记录数: {len(pairs)}  (数据目录: {data_dir})")
+    baseline = timings['struct + 逐导联循环']
+    for name, elapsed in timings.items():
+        print(f"   {name:<22s} {elapsed:8.3f}s  {len(pairs) / elapsed:10.1f} 记录/秒  加速 {baseline / elapsed:6.1f}x")
+    print(f"   结果最大差异: {max_diff:.3e} mV")
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ECG信号读取性能对比')
+    parser.add_argument('--data_dir', default=str(DEFAULT_DATA_DIR), help='含RECORDS及.hea/.mat文件的目录')
+    parser.add_argument('--window', type=float, default=2.0, help='时间窗口读取的窗口长度(秒)')
+    parser.add_argument('--max_records', type=int, default=None, help='最多测试的记录数')
+    args = parser.parse_args()
+
+    run_benchmark(args.data_dir, args.window, args.max_records)
+
+
+if __name__ == "__main__":
+    main()
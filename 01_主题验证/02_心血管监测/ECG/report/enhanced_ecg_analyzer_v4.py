@@ -7,20 +7,31 @@
 - 大幅提升诊断准确率，从6%目标提升至60-80%
 """
 
-import struct
 import os
+import io
+import json
+import time
+import hashlib
+import contextlib
+import multiprocessing
+from datetime import datetime
 import pandas as pd
 import numpy as np
 import argparse
 from pathlib import Path
 import warnings
 import math
+from functools import lru_cache
 from scipy import signal
+from scipy.ndimage import convolve1d, maximum_filter1d
 from scipy.stats import entropy, skew, kurtosis
 import matplotlib.pyplot as plt
 
 warnings.filterwarnings('ignore')
 
+# 分析器版本: 写入结果分片的配置戳，续跑时只复用版本与配置一致的分片
+ANALYZER_VERSION = '4.0'
+
 def parse_header_file(header_path):
     """解析.hea头文件获取记录信息"""
     info = {}
@@ -40,8 +51,12 @@ def parse_header_file(header_path):
         # 解析导联信息和增益
         gains = []
         baselines = []
+        info['byte_offset'] = None
         for i in range(1, info['num_leads'] + 1):
             lead_line = lines[i].strip().split()
+            # 存储格式 "16+24" 表示16位整数、数据起始字节偏移24
+            if i == 1 and '+' in lead_line[1]:
+                info['byte_offset'] = int(lead_line[1].split('+')[1])
             lead_name = lead_line[-1]  # 导联名称在最后
             gain_str = lead_line[2]  # 增益信息 "1000/mV"
             gain = float(gain_str.split('/')[0])
@@ -71,28 +86,24 @@ def parse_header_file(header_path):
         print(f"解析头文件错误: {e}")
         return None
 
-def read_mat_file(mat_path, num_leads, num_samples):
-    """读取.mat二进制数据文件"""
+def read_mat_file(mat_path, num_leads, num_samples, byte_offset=None):
+    """
+    读取.mat二进制数据文件（内存映射，零拷贝）
+    
+    返回 (num_samples, num_leads) 的int16只读映射，按需从磁盘分页读取；
+    未给出字节偏移时，按文件大小推算数据前的文件头长度
+    """
     try:
-        with open(mat_path, 'rb') as f:
-            data = f.read()
-        
-        num_values = len(data) // 2
-        values = struct.unpack(f'<{num_values}h', data)
-        
-        expected_values = num_leads * num_samples
+        file_size = os.path.getsize(mat_path)
+        expected_bytes = num_leads * num_samples * 2
         
-        if num_values > expected_values:
-            extra = num_values - expected_values
-            signal_values = values[extra:]
-            if len(signal_values) == expected_values:
-                signal_data = np.array(signal_values).reshape(num_samples, num_leads)
-            else:
-                return None
-        else:
-            signal_data = np.array(values).reshape(num_samples, num_leads)
+        if byte_offset is None:
+            byte_offset = max(0, file_size - expected_bytes)
+        if byte_offset + expected_bytes > file_size:
+            return None
         
-        return signal_data
+        return np.memmap(mat_path, dtype='<i2', mode='r', offset=byte_offset,
+                         shape=(num_samples, num_leads))
         
     except Exception as e:
         print(f"读取数据文件错误: {e}")
@@ -101,283 +112,255 @@ def read_mat_file(mat_path, num_leads, num_samples):
 def convert_to_physical_units(signal_data, gains, baselines):
     """将数字信号转换为物理单位(mV)"""
     try:
-        physical_data = np.zeros_like(signal_data, dtype=float)
-        for i in range(len(gains)):
-            # 转换公式: physical = (digital - baseline) / gain
-            physical_data[:, i] = (signal_data[:, i] - baselines[i]) / gains[i]
-        return physical_data
+        # 转换公式: physical = (digital - baseline) / gain，所有导联一次广播完成
+        return (signal_data - np.asarray(baselines, dtype=float)) / np.asarray(gains, dtype=float)
     except Exception as e:
         print(f"单位转换错误: {e}")
-        return signal_data.astype(float)
+        return np.asarray(signal_data, dtype=float)
+
+def load_ecg_signal(mat_path, header_info, start_sec=None, end_sec=None):
+    """
+    读取记录的物理信号(mV)，可只读取 [start_sec, end_sec) 时间窗口
+    
+    只有窗口内的采样会从磁盘读入并转换，不加载整条记录
+    """
+    signal_data = read_mat_file(mat_path, header_info['num_leads'], header_info['num_samples'],
+                                header_info.get('byte_offset'))
+    if signal_data is None:
+        return None
+    
+    sampling_rate = header_info['sampling_rate']
+    start = 0 if start_sec is None else max(0, int(round(start_sec * sampling_rate)))
+    end = header_info['num_samples'] if end_sec is None else min(
+        header_info['num_samples'], int(round(end_sec * sampling_rate)))
+    
+    return convert_to_physical_units(signal_data[start:end], header_info['gains'], header_info['baselines'])
+
+@lru_cache(maxsize=None)
+def _qrs_bandpass_coefficients(sampling_rate):
+    """QRS带通滤波器系数 (5-15Hz, 4阶Butterworth)，按采样率缓存"""
+    nyquist = sampling_rate / 2
+    return signal.butter(4, [5 / nyquist, 15 / nyquist], btype='band')
+
+def detect_r_peaks_multilead(ecg_signals, sampling_rate):
+    """
+    向量化R峰检测，可一次处理全部导联
+    
+    ecg_signals: 单导联一维信号，或 (num_samples, num_leads) 多导联矩阵
+    返回R峰位置列表；多导联输入时返回每个导联一个列表
+    """
+    signals_2d = np.asarray(ecg_signals, dtype=float)
+    single_lead = signals_2d.ndim == 1
+    if single_lead:
+        signals_2d = signals_2d[:, np.newaxis]
+    
+    # 1. 带通滤波 (5-15Hz，突出QRS复合波)
+    b, a = _qrs_bandpass_coefficients(float(sampling_rate))
+    filtered_signal = signal.filtfilt(b, a, signals_2d, axis=0)
+    
+    # 2-3. 微分（突出QRS斜率）+ 平方（放大大的变化）
+    squared_signal = np.diff(filtered_signal, axis=0) ** 2
+    
+    # 4. 移动窗口积分 (80ms窗口，与 np.convolve(mode='same') 对齐)
+    window_size = int(sampling_rate * 0.08)
+    integrated_signal = convolve1d(squared_signal, np.ones(window_size), axis=0,
+                                   mode='constant', origin=-((window_size + 1) % 2))
+    
+    # 5. 自适应阈值（每个导联单独计算）
+    threshold = integrated_signal.mean(axis=0) + 2 * integrated_signal.std(axis=0)
+    
+    # 6. 峰值检测: 超过阈值且为 [i-半窗, i+半窗) 内的局部最大值
+    min_distance = int(sampling_rate * 0.4)  # 最小RR间期400ms
+    half_window = min_distance // 2
+    local_max = maximum_filter1d(integrated_signal, size=2 * half_window, axis=0)
+    candidate_mask = (integrated_signal > threshold) & (integrated_signal == local_max)
+    candidate_mask[:min_distance] = False
+    candidate_mask[max(min_distance, len(integrated_signal) - min_distance):] = False
+    
+    # 7. 在原始信号 ±20 个采样点内精确定位R峰（所有候选点一次完成）
+    search = 20
+    abs_windows = np.lib.stride_tricks.sliding_window_view(np.abs(signals_2d), 2 * search, axis=0)
+    
+    all_peaks = []
+    for lead in range(signals_2d.shape[1]):
+        candidates = np.flatnonzero(candidate_mask[:, lead])
+        refined = candidates - search + np.argmax(abs_windows[candidates - search, lead], axis=1)
+        
+        # 候选点数量与心搏数相当，按最小RR间期顺序去重
+        peaks = []
+        for peak in refined.tolist():
+            if not peaks or (peak - peaks[-1]) >= min_distance:
+                peaks.append(peak)
+        all_peaks.append(peaks)
+    
+    return all_peaks[0] if single_lead else all_peaks
 
 def advanced_r_peak_detection(ecg_signal, sampling_rate):
     """改进的R峰检测算法"""
     try:
-        # 1. 带通滤波 (5-15Hz，突出QRS复合波)
-        nyquist = sampling_rate / 2
-        low_cutoff = 5 / nyquist
-        high_cutoff = 15 / nyquist
-        
-        # 使用Butterworth滤波器
-        b, a = signal.butter(4, [low_cutoff, high_cutoff], btype='band')
-        filtered_signal = signal.filtfilt(b, a, ecg_signal)
-        
-        # 2. 微分操作（突出QRS斜率）
-        diff_signal = np.diff(filtered_signal)
-        
-        # 3. 平方操作（放大大的变化）
-        squared_signal = diff_signal ** 2
-        
-        # 4. 移动窗口积分
-        window_size = int(sampling_rate * 0.08)  # 80ms窗口
-        integrated_signal = np.convolve(squared_signal, np.ones(window_size), mode='same')
-        
-        # 5. 自适应阈值检测
-        threshold = np.mean(integrated_signal) + 2 * np.std(integrated_signal)
-        
-        # 6. 峰值检测
-        peaks = []
-        min_distance = int(sampling_rate * 0.4)  # 最小RR间期400ms
-        
-        for i in range(min_distance, len(integrated_signal) - min_distance):
-            if (integrated_signal[i] > threshold and
-                integrated_signal[i] == np.max(integrated_signal[i-min_distance//2:i+min_distance//2])):
-                # 在原始信号中精确定位R峰
-                search_window = slice(max(0, i-20), min(len(ecg_signal), i+20))
-                local_peak = i - 20 + np.argmax(np.abs(ecg_signal[search_window]))
-                
-                if not peaks or (local_peak - peaks[-1]) >= min_distance:
-                    peaks.append(local_peak)
-        
-        return peaks
-        
+        return detect_r_peaks_multilead(ecg_signal, sampling_rate)
     except Exception as e:
         print(f"高级R峰检测错误: {e}")
         return []
 
-def extract_ecg_morphology_features(ecg_signal, r_peaks, sampling_rate):
-    """🆕 提取ECG形态学特征 - 新增核心功能"""
+def detect_r_peaks_all_leads(ecg_signals, sampling_rate):
+    """
+    多导联R峰检测：先一次处理全部导联；批量检测出错时改为逐导联检测，
+    单个导联出错只影响该导联 (返回空列表)，与逐导联调用 advanced_r_peak_detection 一致
+    """
+    try:
+        return detect_r_peaks_multilead(ecg_signals, sampling_rate)
+    except Exception as e:
+        print(f"⚠️ 多导联R峰检测失败 ({e})，改为逐导联检测")
+        return [advanced_r_peak_detection(ecg_signals[:, lead], sampling_rate)
+                for lead in range(ecg_signals.shape[1])]
+
+def _gather_beat_segments(ecg_signal, starts, lengths, width):
+    """
+    按起点和长度把各心拍的片段收集为 (心拍数 × width) 矩阵
+    超出片段长度的位置为 NaN，返回 (矩阵, 有效位置掩码)
+    """
+    offsets = np.arange(width)
+    mask = offsets[np.newaxis, :] < lengths[:, np.newaxis]
+    index = np.clip(starts[:, np.newaxis] + offsets[np.newaxis, :], 0, len(ecg_signal) - 1)
+    return np.where(mask, ecg_signal[index], np.nan), mask
+
+def _segment_has_local_peak(values, mask, min_height):
+    """
+    逐行判断是否存在高度不低于 min_height 的局部峰，并给出这些峰的最大值
+    局部峰定义与 scipy.signal.find_peaks 一致：左侧最近的不等点更低、右侧最近的不等点更低（平台按整体计）
+    """
+    num_rows, width = values.shape
+    if width < 3:
+        return np.zeros(num_rows, dtype=bool), np.full(num_rows, -np.inf)
+    
+    step = np.sign(np.diff(np.where(mask, values, 0), axis=1))
+    step[~mask[:, 1:]] = 0
+    columns = np.broadcast_to(np.arange(width - 1), step.shape)
+    
+    # 左侧最近的非零差分（上升为正）
+    last_nonzero = np.maximum.accumulate(np.where(step != 0, columns, -1), axis=1)
+    left = np.where(last_nonzero >= 0, np.take_along_axis(step, np.maximum(last_nonzero, 0), axis=1), 0)
+    # 右侧最近的非零差分（下降为负）
+    next_nonzero = np.minimum.accumulate(np.where(step != 0, columns, width)[:, ::-1], axis=1)[:, ::-1]
+    right = np.where(next_nonzero < width, np.take_along_axis(step, np.minimum(next_nonzero, width - 2), axis=1), 0)
+    
+    is_peak = np.zeros_like(mask)
+    is_peak[:, 1:-1] = (left[:, :-1] > 0) & (right[:, 1:] < 0) & mask[:, 1:-1] & (values[:, 1:-1] >= min_height)
+    peak_max = np.max(np.where(is_peak, values, -np.inf), axis=1)
+    return is_peak.any(axis=1), peak_max
+
+def _batch_beat_morphology(ecg_signal, prev_r, r_peak, next_r, sampling_rate):
+    """
+    一批心拍的形态学指标（心拍 × 采样点矩阵上按轴运算）
+    各窗口定义与逐拍分析一致，返回 {指标名: 每拍数值数组}
+    """
+    n = len(ecg_signal)
+    d80, d100, d200, d400 = (int(sec * sampling_rate) for sec in (0.08, 0.1, 0.2, 0.4))
+    
+    # 心拍边界：上一个R峰后200ms至下一个R峰前100ms
+    beat_start = prev_r + d200
+    beat_len = (next_r - d100) - beat_start
+    r_in_beat = r_peak - beat_start
+    
+    def local_window(lo, hi):
+        lo = np.clip(lo, 0, beat_len)
+        hi = np.clip(hi, 0, beat_len)
+        return lo, np.maximum(hi - lo, 0)
+    
+    # 基线：心拍前20个采样点的中位数
+    baseline_values, _ = _gather_beat_segments(ecg_signal, beat_start, np.minimum(20, beat_len), 20)
+    baseline = np.nanmedian(baseline_values, axis=1)
+    
+    # === P波：R峰前200-80ms ===
+    p_lo = np.maximum(0, r_in_beat - d200)
+    p_hi = np.maximum(0, r_in_beat - d80)
+    p_lo, p_len = local_window(p_lo, p_hi)
+    p_width = max(int(p_len.max()), 1)
+    p_values, p_mask = _gather_beat_segments(ecg_signal, beat_start + p_lo, p_len, p_width)
+    has_p_peak, p_peak_max = _segment_has_local_peak(p_values - baseline[:, np.newaxis], p_mask, 0.01)
+    p_max = np.max(np.where(p_mask, p_values, -np.inf), axis=1)
+    p_present = p_len > 0
+    p_amplitude = np.where(has_p_peak, p_peak_max, p_max - baseline)
+    p_wave_amplitude = np.where(p_present, p_amplitude, np.nan)
+    p_wave_duration = np.where(p_present, p_len / sampling_rate * 1000, np.nan)
+    pr_interval = np.where(p_present, (r_in_beat - p_lo) / sampling_rate * 1000, np.nan)
+    
+    # === QRS复合波：R峰前后80ms ===
+    qrs_lo, qrs_len = local_window(np.maximum(0, r_in_beat - d80), r_in_beat + d80)
+    qrs_values, qrs_mask = _gather_beat_segments(ecg_signal, beat_start + qrs_lo, qrs_len, max(int(qrs_len.max()), 1))
+    qrs_max = np.max(np.where(qrs_mask, qrs_values, -np.inf), axis=1)
+    qrs_min = np.min(np.where(qrs_mask, qrs_values, np.inf), axis=1)
+    
+    # === ST段：R峰后80-200ms，取起始1/3段均值 ===
+    st_lo, st_len = local_window(r_in_beat + d80, r_in_beat + d200)
+    st_head = st_len // 3
+    st_values, st_mask = _gather_beat_segments(ecg_signal, beat_start + st_lo, st_head, max(int(st_head.max()), 1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        st_level = np.where(st_mask, st_values, 0).sum(axis=1) / st_head
+    st_deviation = np.where(st_len > 0, st_level - baseline, np.nan)
+    
+    # === T波：R峰后200-400ms ===
+    t_lo, t_len = local_window(r_in_beat + d200, r_in_beat + d400)
+    t_values, t_mask = _gather_beat_segments(ecg_signal, beat_start + t_lo, t_len, max(int(t_len.max()), 1))
+    t_max = np.max(np.where(t_mask, t_values, -np.inf), axis=1)
+    t_min = np.min(np.where(t_mask, t_values, np.inf), axis=1)
+    t_positive = np.abs(t_max - baseline) > np.abs(t_min - baseline)
+    t_present = t_len > 0
+    t_wave_amplitude = np.where(t_present, np.abs(np.where(t_positive, t_max - baseline, baseline - t_min)), np.nan)
+    t_wave_polarity = np.where(t_present, np.where(t_positive, 'positive', 'negative'), 'unknown')
+    
+    # === 间期：QT为QRS起始到T波窗口结束，Bazett公式校正 ===
+    qt_interval = ((t_lo + t_len) - qrs_lo) / sampling_rate * 1000
+    rr_interval = (next_r - prev_r) / sampling_rate * 1000
+    with np.errstate(invalid='ignore', divide='ignore'):
+        qtc_interval = np.where(rr_interval > 0, qt_interval / np.sqrt(rr_interval / 1000), np.nan)
+    
+    return {
+        'p_wave_amplitude': p_wave_amplitude,
+        'p_wave_duration': p_wave_duration,
+        'qrs_duration': qrs_len / sampling_rate * 1000,
+        'qrs_amplitude': qrs_max - qrs_min,
+        'r_wave_amplitude': qrs_max - baseline,
+        'st_deviation': st_deviation,
+        't_wave_amplitude': t_wave_amplitude,
+        't_wave_polarity': t_wave_polarity,
+        'pr_interval': pr_interval,
+        'qt_interval': qt_interval,
+        'qtc_interval': qtc_interval
+    }
+
+def extract_ecg_morphology_features(ecg_signal, r_peaks, sampling_rate, beat_chunk_size=10000):
+    """
+    🆕 提取ECG形态学特征 - 新增核心功能
+    
+    所有心拍按R峰对齐收集为矩阵后逐段（P/QRS/ST/T）按轴计算，
+    beat_chunk_size 控制每批心拍数，24小时Holter记录内存占用可控
+    """
     if len(r_peaks) < 2:
         return {}
     
+    ecg_signal = np.asarray(ecg_signal, dtype=float)
+    r_peaks = np.asarray(r_peaks, dtype=int)
     features = {}
-    morphology_data = []
     
-    # 分析每个心拍的形态学特征
-    for i in range(1, len(r_peaks) - 1):  # 避免边界问题
-        r_peak = r_peaks[i]
-        prev_r = r_peaks[i-1]
-        next_r = r_peaks[i+1]
-        
-        # 定义心拍边界
-        beat_start = prev_r + int(0.2 * sampling_rate)  # 上一个R峰后200ms
-        beat_end = next_r - int(0.1 * sampling_rate)    # 下一个R峰前100ms
-        
-        if beat_end <= beat_start or beat_start < 0 or beat_end >= len(ecg_signal):
-            continue
-            
-        beat_signal = ecg_signal[beat_start:beat_end]
-        r_peak_in_beat = r_peak - beat_start
-        
-        if r_peak_in_beat <= 0 or r_peak_in_beat >= len(beat_signal):
-            continue
-            
-        beat_features = {}
-        
-        # === P波分析 ===
-        try:
-            # P波搜索窗口：R峰前200-80ms
-            p_search_start = max(0, r_peak_in_beat - int(0.2 * sampling_rate))
-            p_search_end = max(0, r_peak_in_beat - int(0.08 * sampling_rate))
-            
-            if p_search_end > p_search_start:
-                p_segment = beat_signal[p_search_start:p_search_end]
-                
-                # P波检测：寻找最大正向偏转
-                baseline = np.median(beat_signal[:min(20, len(beat_signal))])
-                p_peaks_pos = signal.find_peaks(p_segment - baseline, height=0.01)[0]
-                p_peaks_neg = signal.find_peaks(-(p_segment - baseline), height=0.01)[0]
-                
-                if len(p_peaks_pos) > 0:
-                    p_peak_idx = p_peaks_pos[np.argmax(p_segment[p_peaks_pos])]
-                    beat_features['p_wave_amplitude'] = p_segment[p_peak_idx] - baseline
-                    beat_features['p_wave_duration'] = len(p_segment) / sampling_rate * 1000  # ms
-                else:
-                    beat_features['p_wave_amplitude'] = np.max(p_segment) - baseline
-                    beat_features['p_wave_duration'] = len(p_segment) / sampling_rate * 1000
-                
-                # P波形态分析
-                beat_features['p_wave_area'] = np.trapz(np.abs(p_segment - baseline))
-                beat_features['p_wave_biphasic'] = len(p_peaks_pos) > 0 and len(p_peaks_neg) > 0
-            else:
-                beat_features['p_wave_amplitude'] = np.nan
-                beat_features['p_wave_duration'] = np.nan
-                beat_features['p_wave_area'] = np.nan
-                beat_features['p_wave_biphasic'] = False
-                
-        except Exception as e:
-            beat_features.update({
-                'p_wave_amplitude': np.nan, 'p_wave_duration': np.nan,
-                'p_wave_area': np.nan, 'p_wave_biphasic': False
-            })
-        
-        # === QRS复合波分析 ===
-        try:
-            # QRS搜索窗口：R峰前后80ms
-            qrs_start = max(0, r_peak_in_beat - int(0.08 * sampling_rate))
-            qrs_end = min(len(beat_signal), r_peak_in_beat + int(0.08 * sampling_rate))
-            
-            qrs_segment = beat_signal[qrs_start:qrs_end]
-            qrs_duration = len(qrs_segment) / sampling_rate * 1000  # ms
-            
-            # QRS振幅和形态
-            qrs_max = np.max(qrs_segment)
-            qrs_min = np.min(qrs_segment)
-            qrs_amplitude = qrs_max - qrs_min
-            
-            # 检测QRS形态特征
-            baseline = np.median(beat_signal[:min(20, len(beat_signal))])
-            
-            # Q波检测
-            q_segment = qrs_segment[:len(qrs_segment)//3]
-            q_wave_depth = baseline - np.min(q_segment) if len(q_segment) > 0 else 0
-            
-            # S波检测  
-            s_segment = qrs_segment[2*len(qrs_segment)//3:]
-            s_wave_depth = baseline - np.min(s_segment) if len(s_segment) > 0 else 0
-            
-            beat_features.update({
-                'qrs_duration': qrs_duration,
-                'qrs_amplitude': qrs_amplitude,
-                'r_wave_amplitude': qrs_max - baseline,
-                'q_wave_depth': q_wave_depth,
-                's_wave_depth': s_wave_depth,
-                'qrs_area': np.trapz(np.abs(qrs_segment - baseline))
-            })
-            
-        except Exception as e:
-            beat_features.update({
-                'qrs_duration': np.nan, 'qrs_amplitude': np.nan,
-                'r_wave_amplitude': np.nan, 'q_wave_depth': np.nan,
-                's_wave_depth': np.nan, 'qrs_area': np.nan
-            })
-        
-        # === ST段分析 ===
-        try:
-            # ST段搜索窗口：R峰后80-200ms
-            st_start = min(len(beat_signal), r_peak_in_beat + int(0.08 * sampling_rate))
-            st_end = min(len(beat_signal), r_peak_in_beat + int(0.2 * sampling_rate))
-            
-            if st_end > st_start:
-                st_segment = beat_signal[st_start:st_end]
-                baseline = np.median(beat_signal[:min(20, len(beat_signal))])
-                
-                # ST段偏移
-                st_level = np.mean(st_segment[:len(st_segment)//3])  # ST起始部分
-                st_deviation = st_level - baseline
-                
-                # ST段斜率
-                if len(st_segment) > 1:
-                    st_slope = np.polyfit(range(len(st_segment)), st_segment, 1)[0]
-                else:
-                    st_slope = 0
-                
-                beat_features.update({
-                    'st_deviation': st_deviation,
-                    'st_slope': st_slope,
-                    'st_area': np.trapz(st_segment - baseline)
-                })
-            else:
-                beat_features.update({
-                    'st_deviation': np.nan, 'st_slope': np.nan, 'st_area': np.nan
-                })
-                
-        except Exception as e:
-            beat_features.update({
-                'st_deviation': np.nan, 'st_slope': np.nan, 'st_area': np.nan
-            })
-        
-        # === T波分析 ===
-        try:
-            # T波搜索窗口：R峰后200-400ms
-            t_start = min(len(beat_signal), r_peak_in_beat + int(0.2 * sampling_rate))
-            t_end = min(len(beat_signal), r_peak_in_beat + int(0.4 * sampling_rate))
-            
-            if t_end > t_start:
-                t_segment = beat_signal[t_start:t_end]
-                baseline = np.median(beat_signal[:min(20, len(beat_signal))])
-                
-                # T波振幅和方向
-                t_max = np.max(t_segment)
-                t_min = np.min(t_segment)
-                
-                if abs(t_max - baseline) > abs(t_min - baseline):
-                    t_amplitude = t_max - baseline
-                    t_polarity = 'positive'
-                else:
-                    t_amplitude = baseline - t_min
-                    t_polarity = 'negative'
-                
-                # T波对称性
-                t_peak_idx = np.argmax(np.abs(t_segment - baseline))
-                left_half = t_segment[:t_peak_idx] if t_peak_idx > 0 else []
-                right_half = t_segment[t_peak_idx:] if t_peak_idx < len(t_segment) else []
-                
-                if len(left_half) > 0 and len(right_half) > 0:
-                    # 简化对称性评估
-                    symmetry = 1 - abs(len(left_half) - len(right_half)) / len(t_segment)
-                else:
-                    symmetry = 0
-                
-                beat_features.update({
-                    't_wave_amplitude': abs(t_amplitude),
-                    't_wave_polarity': t_polarity,
-                    't_wave_symmetry': symmetry,
-                    't_wave_area': np.trapz(np.abs(t_segment - baseline))
-                })
-            else:
-                beat_features.update({
-                    't_wave_amplitude': np.nan, 't_wave_polarity': 'unknown',
-                    't_wave_symmetry': np.nan, 't_wave_area': np.nan
-                })
-                
-        except Exception as e:
-            beat_features.update({
-                't_wave_amplitude': np.nan, 't_wave_polarity': 'unknown',
-                't_wave_symmetry': np.nan, 't_wave_area': np.nan
-            })
-        
-        # === 间期分析 ===
-        try:
-            # PR间期：P波起始到QRS起始
-            if not np.isnan(beat_features.get('p_wave_duration', np.nan)):
-                # 简化PR间期计算
-                pr_interval = (r_peak_in_beat - p_search_start) / sampling_rate * 1000
-                beat_features['pr_interval'] = pr_interval
-            else:
-                beat_features['pr_interval'] = np.nan
-            
-            # QT间期：QRS起始到T波结束
-            qt_interval = (t_end - qrs_start) / sampling_rate * 1000
-            
-            # QT校正 (Bazett公式)
-            rr_interval = (next_r - prev_r) / sampling_rate * 1000
-            qtc_interval = qt_interval / np.sqrt(rr_interval / 1000) if rr_interval > 0 else np.nan
-            
-            beat_features.update({
-                'qt_interval': qt_interval,
-                'qtc_interval': qtc_interval
-            })
-            
-        except Exception as e:
-            beat_features.update({
-                'pr_interval': np.nan, 'qt_interval': np.nan, 'qtc_interval': np.nan
-            })
-        
-        morphology_data.append(beat_features)
+    # 每个心拍使用前后R峰定义边界（避免边界问题，跳过首末R峰）
+    prev_r, r_peak, next_r = r_peaks[:-2], r_peaks[1:-1], r_peaks[2:]
+    beat_start = prev_r + int(0.2 * sampling_rate)  # 上一个R峰后200ms
+    beat_end = next_r - int(0.1 * sampling_rate)    # 下一个R峰前100ms
+    valid = ((beat_end > beat_start) & (beat_start >= 0) & (beat_end < len(ecg_signal)) &
+             (r_peak > beat_start) & (r_peak < beat_end))
+    prev_r, r_peak, next_r = prev_r[valid], r_peak[valid], next_r[valid]
+    
+    chunks = [
+        _batch_beat_morphology(ecg_signal, prev_r[i:i + beat_chunk_size], r_peak[i:i + beat_chunk_size],
+                               next_r[i:i + beat_chunk_size], sampling_rate)
+        for i in range(0, len(r_peak), beat_chunk_size)
+    ]
+    morphology_data = {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]} if chunks else {}
     
     # 计算所有心拍的统计特征
-    if morphology_data:
+    if len(r_peak) > 0:
         df_morph = pd.DataFrame(morphology_data)
         
         # 数值特征的统计
@@ -396,13 +379,13 @@ def extract_ecg_morphology_features(ecg_signal, r_peaks, sampling_rate):
                     features[f'{feature}_min'] = values.min()
         
         # 形态学特征统计
-        features['beats_analyzed'] = len(morphology_data)
-        features['p_wave_detected_ratio'] = (~pd.isna(df_morph['p_wave_amplitude'])).sum() / len(morphology_data)
-        features['t_wave_positive_ratio'] = (df_morph['t_wave_polarity'] == 'positive').sum() / len(morphology_data)
+        features['beats_analyzed'] = len(df_morph)
+        features['p_wave_detected_ratio'] = (~pd.isna(df_morph['p_wave_amplitude'])).sum() / len(df_morph)
+        features['t_wave_positive_ratio'] = (df_morph['t_wave_polarity'] == 'positive').sum() / len(df_morph)
         
         # 异常检测
         if 'qrs_duration_mean' in features:
-            features['wide_qrs_ratio'] = (pd.to_numeric(df_morph['qrs_duration'], errors='coerce') > 140).sum() / len(morphology_data)  # 临床优化：120→140ms
+            features['wide_qrs_ratio'] = (pd.to_numeric(df_morph['qrs_duration'], errors='coerce') > 140).sum() / len(df_morph)  # 临床优化：120→140ms
         
         if 'st_deviation_mean' in features:
             st_values = pd.to_numeric(df_morph['st_deviation'], errors='coerce').dropna()
@@ -412,6 +395,31 @@ def extract_ecg_morphology_features(ecg_signal, r_peaks, sampling_rate):
     
     return features
 
+@lru_cache(maxsize=None)
+def _hrv_frequency_grid(f_min=0.0033, f_max=0.4, n_freqs=256):
+    """HRV频域分析的固定频率网格 (Hz) 及 VLF/LF/HF 频段掩码，全部记录共用"""
+    freqs = np.linspace(f_min, f_max, n_freqs)
+    bands = {
+        'vlf': (freqs >= 0.0033) & (freqs < 0.04),
+        'lf': (freqs >= 0.04) & (freqs < 0.15),
+        'hf': (freqs >= 0.15) & (freqs < 0.4)
+    }
+    for values in (freqs, *bands.values()):
+        values.flags.writeable = False
+    return freqs, 2 * np.pi * freqs, freqs[1] - freqs[0], bands
+
+def lomb_scargle_psd(rr_intervals):
+    """
+    RR间期序列的Lomb-Scargle功率谱 (ms²/Hz)
+    直接使用非等间隔的心拍时刻，无需插值重采样；返回 (频率, PSD, 频率间隔, 频段掩码)
+    """
+    freqs, omega, df, bands = _hrv_frequency_grid()
+    beat_times = np.cumsum(rr_intervals) / 1000
+    rr_detrended = rr_intervals - np.polyval(np.polyfit(beat_times, rr_intervals, 1), beat_times)
+    # 以平均心拍频率归一化为单边PSD，使频谱积分≈RR方差
+    psd = 2 * signal.lombscargle(beat_times - beat_times[0], rr_detrended, omega) * np.mean(rr_intervals) / 1000
+    return freqs, psd, df, bands
+
 def calculate_comprehensive_hrv_metrics(r_peaks, sampling_rate):
     """计算全面的HRV指标（保持原有功能）"""
     if len(r_peaks) < 5:
@@ -464,23 +472,16 @@ def calculate_comprehensive_hrv_metrics(r_peaks, sampling_rate):
         
         # === 频域指标 ===
         try:
-            # 重采样到均匀时间间隔（4Hz）
+            # Lomb-Scargle谱估计 (非等间隔心拍时刻，固定频率网格)
             time_rr = np.cumsum(rr_intervals) / 1000
-            time_uniform = np.arange(0, time_rr[-1], 0.25)
             
-            if len(time_uniform) > 10:
-                rr_interpolated = np.interp(time_uniform, time_rr, rr_intervals)
-                rr_detrended = rr_interpolated - np.mean(rr_interpolated)
+            if time_rr[-1] - time_rr[0] > 2.5:
+                freqs, psd, df, bands = lomb_scargle_psd(rr_intervals)
+                vlf_band, lf_band, hf_band = bands['vlf'], bands['lf'], bands['hf']
                 
-                freqs, psd = signal.welch(rr_detrended, fs=4.0, nperseg=min(256, len(rr_detrended)))
-                
-                vlf_band = (freqs >= 0.0033) & (freqs < 0.04)
-                lf_band = (freqs >= 0.04) & (freqs < 0.15)
-                hf_band = (freqs >= 0.15) & (freqs < 0.4)
-                
-                metrics['vlf_power'] = np.trapz(psd[vlf_band], freqs[vlf_band]) if np.any(vlf_band) else 0
-                metrics['lf_power'] = np.trapz(psd[lf_band], freqs[lf_band]) if np.any(lf_band) else 0
-                metrics['hf_power'] = np.trapz(psd[hf_band], freqs[hf_band]) if np.any(hf_band) else 0
+                metrics['vlf_power'] = np.sum(psd[vlf_band]) * df
+                metrics['lf_power'] = np.sum(psd[lf_band]) * df
+                metrics['hf_power'] = np.sum(psd[hf_band]) * df
                 
                 metrics['total_power'] = metrics['vlf_power'] + metrics['lf_power'] + metrics['hf_power']
                 
@@ -491,13 +492,8 @@ def calculate_comprehensive_hrv_metrics(r_peaks, sampling_rate):
                 
                 metrics['lf_hf_ratio'] = metrics['lf_power'] / metrics['hf_power'] if metrics['hf_power'] > 0 else np.nan
                 
-                if np.any(lf_band):
-                    lf_peak_idx = np.argmax(psd[lf_band])
-                    metrics['lf_peak'] = freqs[lf_band][lf_peak_idx]
-                
-                if np.any(hf_band):
-                    hf_peak_idx = np.argmax(psd[hf_band])
-                    metrics['hf_peak'] = freqs[hf_band][hf_peak_idx]
+                metrics['lf_peak'] = freqs[lf_band][np.argmax(psd[lf_band])]
+                metrics['hf_peak'] = freqs[hf_band][np.argmax(psd[hf_band])]
             
         except Exception:
             for key in ['vlf_power', 'lf_power', 'hf_power', 'total_power', 
@@ -568,14 +564,11 @@ def analyze_single_record_enhanced_v4(record_name, data_dir):
     print(f"采样率: {header_info['sampling_rate']} Hz")
     print(f"时长: {header_info['num_samples'] / header_info['sampling_rate']:.1f}秒")
     
-    # 读取数据
-    signal_data = read_mat_file(mat_path, header_info['num_leads'], header_info['num_samples'])
-    if signal_data is None:
+    # 读取数据并转换为物理单位
+    physical_data = load_ecg_signal(mat_path, header_info)
+    if physical_data is None:
         return None
     
-    # 转换为物理单位
-    physical_data = convert_to_physical_units(signal_data, header_info['gains'], header_info['baselines'])
-    
     print(f"🆕 完整ECG数据维度: {physical_data.shape}")
     print(f"🆕 数据信息保留: 100% (vs 旧版本0.03%)")
     
@@ -583,14 +576,16 @@ def analyze_single_record_enhanced_v4(record_name, data_dir):
     lead_analyses = {}
     all_morphology_features = {}
     
+    # R峰检测（全部导联一次完成，出错时逐导联检测）
+    all_r_peaks = detect_r_peaks_all_leads(physical_data, header_info['sampling_rate'])
+    
     for i, lead_name in enumerate(header_info['leads']):
         ecg_signal = physical_data[:, i]
         
         # 信号质量分析
         quality = analyze_signal_quality(ecg_signal, header_info['sampling_rate'])
         
-        # R峰检测
-        r_peaks = advanced_r_peak_detection(ecg_signal, header_info['sampling_rate'])
+        r_peaks = all_r_peaks[i]
         
         # 🆕 形态学特征提取 (新功能)
         morphology_features = extract_ecg_morphology_features(ecg_signal, r_peaks, header_info['sampling_rate'])
@@ -665,8 +660,167 @@ def analyze_single_record_enhanced_v4(record_name, data_dir):
     print("✅ v4.0增强版分析完成 - 包含完整形态学特征")
     return result
 
-def analyze_directory_enhanced_v4(data_dir, output_file=None):
-    """🆕 v4.0批量增强版分析"""
+def _analyze_record_task(task):
+    """进程池任务：分析单个记录，返回 (记录名, 结果, 耗时)；并行模式下屏蔽逐导联输出"""
+    record_name, data_dir, quiet = task
+    start = time.perf_counter()
+    try:
+        if quiet:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = analyze_single_record_enhanced_v4(record_name, data_dir)
+        else:
+            result = analyze_single_record_enhanced_v4(record_name, data_dir)
+    except Exception as e:
+        print(f"❌ 记录 {record_name} 分析失败: {e}")
+        result = None
+    return record_name, result, time.perf_counter() - start
+
+def _json_default(value):
+    """numpy标量转换为JSON原生类型"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+def _read_jsonl(path):
+    """读取JSON Lines文件，忽略中断写入导致的不完整行"""
+    rows = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return rows
+
+def analysis_config(data_dir):
+    """影响分析结果的运行配置: 分析器版本、本模块源码摘要、数据目录"""
+    with open(os.path.abspath(__file__), 'rb') as f:
+        source_digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    return {
+        'analyzer_version': ANALYZER_VERSION,
+        'source_digest': source_digest,
+        'data_dir': os.path.abspath(data_dir)
+    }
+
+def config_key(config):
+    """配置戳: 运行配置的摘要"""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def _manifest_entries(shard_dir):
+    manifest_path = os.path.join(shard_dir, 'manifest.jsonl')
+    return _read_jsonl(manifest_path) if os.path.exists(manifest_path) else []
+
+def _manifest_shard_paths(entries, shard_dir, key=None):
+    """清单登记的分片文件路径 (按清单顺序去重)；指定 key 时只取该配置戳的条目"""
+    names = [entry.get('shard') for entry in entries if key is None or entry.get('config_key') == key]
+    return [os.path.join(shard_dir, os.path.basename(name)) for name in dict.fromkeys(names)
+            if name and os.path.basename(name).startswith('shard_')]
+
+def read_shard_key(shard_path):
+    """分片首行记录的配置戳；旧版无戳分片返回 None"""
+    with open(shard_path, 'r', encoding='utf-8') as f:
+        try:
+            header = json.loads(f.readline())
+        except json.JSONDecodeError:
+            return None
+    if isinstance(header, dict) and header.get('shard_header'):
+        return header.get('config_key')
+    return None
+
+def prepare_shard_dir(shard_dir, key, resume=False):
+    """
+    准备分片目录，返回删除的分片数；只删除本目录清单中登记的分片，目录中的其他文件不动
+    resume=False: 删除清单登记的全部分片并清空清单，重新分析
+    resume=True: 只删除配置戳与本次不一致的清单条目及其分片，其余分片续用
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    entries = _manifest_entries(shard_dir)
+    kept = [entry for entry in entries if entry.get('config_key') == key] if resume else []
+    kept_paths = set(_manifest_shard_paths(kept, shard_dir))
+    stale = [path for path in _manifest_shard_paths(entries, shard_dir)
+             if path not in kept_paths and os.path.exists(path)]
+    for path in stale:
+        os.remove(path)
+    
+    manifest_path = os.path.join(shard_dir, 'manifest.jsonl')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'w', encoding='utf-8') as manifest:
+            for entry in kept:
+                manifest.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return len(stale)
+
+def load_completed_records(shard_dir, key):
+    """从清单读取本配置下已成功分析、且结果分片仍在的记录名"""
+    manifest_path = os.path.join(shard_dir, 'manifest.jsonl')
+    if not os.path.exists(manifest_path):
+        return set()
+    return {entry['record_name'] for entry in _read_jsonl(manifest_path)
+            if entry.get('status') == 'ok' and entry.get('config_key') == key
+            and os.path.exists(os.path.join(shard_dir, entry.get('shard', '')))}
+
+def merge_result_shards(shard_dir, record_names, key):
+    """合并清单中登记且配置戳一致的分片结果（同一记录保留最后一次结果），按RECORDS顺序排列"""
+    latest = {}
+    for path in _manifest_shard_paths(_manifest_entries(shard_dir), shard_dir, key):
+        if not os.path.exists(path) or read_shard_key(path) != key:
+            continue
+        for row in _read_jsonl(path):
+            if not row.get('shard_header'):
+                latest[row['record_name']] = row
+    return [latest[name] for name in record_names if name in latest]
+
+def print_analysis_summary_v4(df):
+    """打印v4.0批量分析的统计摘要"""
+    print(f"\n📈 v4.0增强版分析摘要:")
+    
+    # 传统HRV指标
+    hrv_cols = ['mean_hr', 'std_rr', 'rmssd', 'lf_power', 'hf_power', 'lf_hf_ratio', 'sd1', 'sd2']
+    print("\n🫀 HRV指标:")
+    for col in hrv_cols:
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce').dropna()
+            if len(values) > 0:
+                print(f"  {col}: {values.mean():.2f} ± {values.std():.2f}")
+    
+    # 🆕 形态学指标
+    morph_cols = ['qrs_duration_mean', 'st_deviation_mean', 't_wave_amplitude_mean', 
+                 'pr_interval_mean', 'qtc_interval_mean']
+    print("\n🆕 形态学指标:")
+    for col in morph_cols:
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce').dropna()
+            if len(values) > 0:
+                print(f"  {col}: {values.mean():.2f} ± {values.std():.2f}")
+    
+    # 🆕 异常检测统计
+    abnormal_cols = ['wide_qrs_ratio', 'st_elevation_ratio', 'st_depression_ratio']
+    print("\n🆕 异常检测统计:")
+    for col in abnormal_cols:
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors='coerce').dropna()
+            if len(values) > 0:
+                print(f"  {col}: {values.mean()*100:.1f}% ± {values.std()*100:.1f}%")
+    
+    # 信息利用率统计
+    if 'morphology_analysis_enabled' in df.columns:
+        enabled_count = df['morphology_analysis_enabled'].sum()
+        print(f"\n🆕 信息利用率: {enabled_count}/{len(df)} ({enabled_count/len(df)*100:.1f}%) 记录启用完整分析")
+
+def analyze_directory_enhanced_v4(data_dir, output_file=None, workers=1, chunk_size=8, shard_dir=None,
+                                  resume=False):
+    """
+    🆕 v4.0批量增强版分析
+    
+    并行 (workers>1) 或续跑 (resume=True) 时，每条记录完成后立即追加到本次运行的结果分片 (JSON Lines)
+    并记入清单，分片首行与清单条目带有配置戳 (分析器版本、源码摘要、数据目录)，最后合并分片输出CSV；
+    串行且不续跑时结果只保存在内存中，不写分片
+    
+    workers: 并行进程数 (1为串行)
+    chunk_size: 每次派发给工作进程的记录数
+    shard_dir: 分片与清单目录，默认为输出文件旁的 <输出文件名>_shards
+    resume: 续跑中断的分析，跳过清单中已成功的记录；配置戳不一致的旧分片会被丢弃。
+            默认 False，删除清单登记的旧分片全部重新分析
+    """
     print(f"🔍 增强版v4.0分析目录: {data_dir}")
     print("🆕 新特性: 完整ECG形态学分析, 99%+信息利用率")
     
@@ -681,64 +835,97 @@ def analyze_directory_enhanced_v4(data_dir, output_file=None):
     
     print(f"找到 {len(record_names)} 个记录")
     
-    # 分析所有记录
-    results = []
+    if output_file is None:
+        output_file = os.path.join(data_dir, 'enhanced_ecg_analysis_results_v4.csv')
+    
+    use_shards = workers > 1 or resume
+    completed = set()
+    if use_shards:
+        if shard_dir is None:
+            shard_dir = os.path.splitext(output_file)[0] + '_shards'
+        config = analysis_config(data_dir)
+        key = config_key(config)
+        discarded = prepare_shard_dir(shard_dir, key, resume)
+        if resume and discarded:
+            print(f"🗑️ 丢弃 {discarded} 个版本或配置不一致的旧分片")
+        
+        # 续跑时跳过已完成的记录
+        completed = load_completed_records(shard_dir, key) if resume else set()
+        shard_path = os.path.join(shard_dir, f"shard_{datetime.now():%Y%m%d_%H%M%S_%f}_{os.getpid()}.jsonl")
+        manifest_path = os.path.join(shard_dir, 'manifest.jsonl')
+    
+    pending = [name for name in record_names if name not in completed]
+    if completed:
+        print(f"♻️ 清单中已完成 {len(record_names) - len(pending)} 个记录，本次分析 {len(pending)} 个")
+    
+    # 分析记录（写分片时结果按完成顺序逐条落盘）
     successful = 0
-    
-    for i, record_name in enumerate(record_names, 1):
-        print(f"\n进度: {i}/{len(record_names)}")
-        result = analyze_single_record_enhanced_v4(record_name, data_dir)
+    in_memory = {}
+    start_time = time.perf_counter()
+    tasks = [(name, data_dir, workers > 1) for name in pending]
+    
+    with contextlib.ExitStack() as stack:
+        shard = manifest = None
+        if use_shards:
+            shard = stack.enter_context(open(shard_path, 'a', encoding='utf-8'))
+            manifest = stack.enter_context(open(manifest_path, 'a', encoding='utf-8'))
+            shard.write(json.dumps({'shard_header': True, 'config_key': key, **config}, ensure_ascii=False) + '\n')
+            shard.flush()
+        if workers > 1:
+            pool = multiprocessing.Pool(workers)
+            task_results = pool.imap_unordered(_analyze_record_task, tasks, chunksize=chunk_size)
+        else:
+            pool = None
+            task_results = map(_analyze_record_task, tasks)
         
-        if result:
-            results.append(result)
-            successful += 1
+        try:
+            for i, (record_name, result, elapsed) in enumerate(task_results, 1):
+                if result:
+                    successful += 1
+                    if shard is None:
+                        in_memory[record_name] = result
+                    else:
+                        shard.write(json.dumps(result, ensure_ascii=False, default=_json_default) + '\n')
+                        shard.flush()
+                if manifest is not None:
+                    manifest.write(json.dumps({
+                        'record_name': record_name,
+                        'status': 'ok' if result else 'failed',
+                        'shard': os.path.basename(shard_path),
+                        'config_key': key,
+                        'elapsed_sec': round(elapsed, 3)
+                    }, ensure_ascii=False) + '\n')
+                    manifest.flush()
+                
+                rate = i / (time.perf_counter() - start_time)
+                print(f"\n进度: {i}/{len(pending)} ({record_name}) - {rate:.2f} 记录/秒")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    
+    if use_shards and not successful:
+        os.remove(shard_path)
+    
+    total_elapsed = time.perf_counter() - start_time
+    if pending:
+        print(f"\n⏱️ 本次分析 {len(pending)} 个记录, 用时 {total_elapsed:.1f}秒, "
+              f"{len(pending) / max(total_elapsed, 1e-9):.2f} 记录/秒 (进程数: {workers})")
+    
+    # 合并本配置的全部分片
+    if use_shards:
+        results = merge_result_shards(shard_dir, record_names, key)
+    else:
+        results = [in_memory[name] for name in record_names if name in in_memory]
     
     if results:
         df = pd.DataFrame(results)
         
-        if output_file is None:
-            output_file = os.path.join(data_dir, 'enhanced_ecg_analysis_results_v4.csv')
-        
         df.to_csv(output_file, index=False, encoding='utf-8-sig')
         print(f"\n📊 v4.0增强版分析结果已保存到: {output_file}")
-        print(f"✅ 成功分析: {successful}/{len(record_names)} 个记录")
-        
-        # 显示统计摘要
-        print(f"\n📈 v4.0增强版分析摘要:")
-        
-        # 传统HRV指标
-        hrv_cols = ['mean_hr', 'std_rr', 'rmssd', 'lf_power', 'hf_power', 'lf_hf_ratio', 'sd1', 'sd2']
-        print("\n🫀 HRV指标:")
-        for col in hrv_cols:
-            if col in df.columns:
-                values = pd.to_numeric(df[col], errors='coerce').dropna()
-                if len(values) > 0:
-                    print(f"  {col}: {values.mean():.2f} ± {values.std():.2f}")
-        
-        # 🆕 形态学指标
-        morph_cols = ['qrs_duration_mean', 'st_deviation_mean', 't_wave_amplitude_mean', 
-                     'pr_interval_mean', 'qtc_interval_mean']
-        print("\n🆕 形态学指标:")
-        for col in morph_cols:
-            if col in df.columns:
-                values = pd.to_numeric(df[col], errors='coerce').dropna()
-                if len(values) > 0:
-                    print(f"  {col}: {values.mean():.2f} ± {values.std():.2f}")
-        
-        # 🆕 异常检测统计
-        abnormal_cols = ['wide_qrs_ratio', 'st_elevation_ratio', 'st_depression_ratio']
-        print("\n🆕 异常检测统计:")
-        for col in abnormal_cols:
-            if col in df.columns:
-                values = pd.to_numeric(df[col], errors='coerce').dropna()
-                if len(values) > 0:
-                    print(f"  {col}: {values.mean()*100:.1f}% ± {values.std()*100:.1f}%")
-        
-        # 信息利用率统计
-        if 'morphology_analysis_enabled' in df.columns:
-            enabled_count = df['morphology_analysis_enabled'].sum()
-            print(f"\n🆕 信息利用率: {enabled_count}/{len(df)} ({enabled_count/len(df)*100:.1f}%) 记录启用完整分析")
+        print(f"✅ 成功分析: {len(results)}/{len(record_names)} 个记录 (本次新增 {successful})")
         
+        print_analysis_summary_v4(df)
         return df
     else:
         print("❌ 没有成功分析的记录")
@@ -748,6 +935,14 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="增强版ECG数据分析器 v4.0 - 完整形态学分析版本")
     parser.add_argument("data_dir", help="ECG数据目录路径")
     parser.add_argument("--output", "-o", help="输出CSV文件路径")
+    parser.add_argument("--workers", "-j", type=int, default=1, help="并行进程数 (默认1，串行)")
+    parser.add_argument("--chunk-size", type=int, default=8, help="每次派发给工作进程的记录数")
+    parser.add_argument("--shard-dir", help="结果分片与清单目录 (默认: <输出文件名>_shards)")
+    resume_group = parser.add_mutually_exclusive_group()
+    resume_group.add_argument("--resume", dest="resume", action="store_true",
+                              help="续跑中断的分析，复用版本与配置一致的已完成分片")
+    resume_group.add_argument("--fresh", dest="resume", action="store_false",
+                              help="删除清单登记的旧分片全部重新分析 (默认)；串行且不续跑时不写分片")
     
     args = parser.parse_args()
     
@@ -771,4 +966,5 @@ if __name__ == '__main__':
     print("🆕 目标: 诊断准确率从6%提升至60-80%")
     print("="*60)
     
-    analyze_directory_enhanced_v4(args.data_dir, args.output)
\ No newline at end of file
+    analyze_directory_enhanced_v4(args.data_dir, args.output, workers=args.workers,
+                                  chunk_size=args.chunk_size, shard_dir=args.shard_dir, resume=args.resume)
\ No newline at end of file
@@ -2,12 +2,36 @@
 """
 层级诊断系统 - 解决V4.0诊断层级缺失问题
 建立完整的ECG诊断层级关系，提高与专家诊断的匹配率
+层级树在初始化时编译为位集表（每个诊断一个比特位），
+层级扩展为查表，集合相似度为按位与/或后计数
 """
 
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def _popcount(bits):
+    """位集中的诊断数量"""
+    return bin(bits).count('1')
+
+
+def _iter_bits(bits):
+    """依次给出位集中置位的比特序号"""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
 class HierarchicalDiagnosisSystem:
     """ECG诊断层级系统"""
     
-    def __init__(self):
+    def __init__(self, max_cached_similarities=4096):
+        if max_cached_similarities < 1:
+            raise ValueError(f"max_cached_similarities 必须为正整数: {max_cached_similarities}")
+        self._max_cached_similarities = max_cached_similarities
+        
         # 完整的ECG诊断层级树
         self.diagnosis_hierarchy = {
             # 传导系统异常层级
@@ -91,56 +115,155 @@ class HierarchicalDiagnosisSystem:
                 'clinical_significance': 'high'
             }
         }
+        
+        self._compile_hierarchy()
     
-    def expand_diagnosis_with_hierarchy(self, specific_diagnoses):
-        """将具体诊断扩展为包含层级关系的完整诊断"""
-        expanded_diagnoses = set(specific_diagnoses)
+    def _compile_hierarchy(self):
+        """
+        编译层级树：
+        - _closure[诊断]: 诊断自身及全部祖先（沿 parent 向上）的位集
+        - _related[诊断]: 与之存在直接父子关系的已登记诊断位集
+        比特位只分配给层级树中的诊断，编译后固定；树外诊断在每次调用中临时编码
+        """
+        self._bit_index = {}
+        self._names = []
+        self._closure = {}
+        # 相似度 LRU 缓存: (专家位集, 算法位集, 临时编码的诊断) -> 结果，超出容量淘汰最久未用的
+        self._similarity_cache = OrderedDict()
+        for name, info in self.diagnosis_hierarchy.items():
+            for related_name in [name, info.get('parent'), *info.get('children', [])]:
+                if related_name:
+                    self._register(related_name)
         
-        # 向上扩展：添加父级诊断
-        for diagnosis in specific_diagnoses:
-            if diagnosis in self.diagnosis_hierarchy:
-                parent = self.diagnosis_hierarchy[diagnosis].get('parent')
-                if parent:
-                    expanded_diagnoses.add(parent)
-                    # 继续向上级扩展
-                    grandparent = self.diagnosis_hierarchy[parent].get('parent')
-                    if grandparent:
-                        expanded_diagnoses.add(grandparent)
+        for name in self._names:
+            bits = 0
+            seen = set()
+            current = name
+            while current and current not in seen:
+                seen.add(current)
+                bits |= 1 << self._register(current)
+                current = self.diagnosis_hierarchy.get(current, {}).get('parent')
+            self._closure[name] = bits
         
-        return list(expanded_diagnoses)
+        known_bits = self.encode_diagnoses(self.diagnosis_hierarchy)
+        self._related = {}
+        for name, info in self.diagnosis_hierarchy.items():
+            related = self.encode_diagnoses([info['parent']] if info.get('parent') else [])
+            related |= self.encode_diagnoses(info.get('children', []))
+            for other, other_info in self.diagnosis_hierarchy.items():
+                if other_info.get('parent') == name or name in other_info.get('children', []):
+                    related |= 1 << self._bit_index[other]
+            self._related[name] = related & known_bits
     
-    def calculate_hierarchical_similarity(self, expert_diagnoses, algorithm_diagnoses):
-        """计算考虑层级关系的相似度"""
+    def _register(self, diagnosis):
+        """编译层级树时为诊断分配比特位"""
+        index = self._bit_index.get(diagnosis)
+        if index is None:
+            index = len(self._names)
+            self._bit_index[diagnosis] = index
+            self._names.append(diagnosis)
+            self._closure[diagnosis] = 1 << index
+        return index
+    
+    def encode_diagnoses(self, diagnoses, transient=None):
+        """
+        诊断集合编码为位集
+        层级树外的诊断不进入共享的比特位表，而是在 transient 字典（诊断 -> 比特位）中
+        接着已登记诊断临时编号；同一次比较的两组诊断应共用同一个 transient
+        """
+        if transient is None:
+            transient = {}
+        bits = 0
+        bit_index = self._bit_index
+        for diagnosis in diagnoses:
+            index = bit_index.get(diagnosis)
+            if index is None:
+                index = transient.setdefault(diagnosis, len(self._names) + len(transient))
+            bits |= 1 << index
+        return bits
+    
+    def decode_diagnoses(self, bits, transient=None):
+        """位集解码为诊断列表（按比特位顺序，临时编码的诊断取自 transient）"""
+        names = self._names + list(transient or {})
+        return [names[index] for index in _iter_bits(bits)]
+    
+    def expand_bits(self, bits):
+        """位集的层级扩展（每个诊断并入其祖先闭包，临时编码的诊断闭包即自身）"""
+        n_known = len(self._names)
+        expanded = 0
+        for index in _iter_bits(bits):
+            expanded |= self._closure[self._names[index]] if index < n_known else 1 << index
+        return expanded
+    
+    def expand_diagnosis_with_hierarchy(self, specific_diagnoses):
+        """将具体诊断扩展为包含层级关系的完整诊断（向上添加全部父级诊断）"""
+        transient = {}
+        expanded = self.expand_bits(self.encode_diagnoses(specific_diagnoses, transient))
+        return self.decode_diagnoses(expanded, transient)
+    
+    def _similarity(self, expert_diagnoses, algorithm_diagnoses):
+        """层级相似度（结果按位集组合 LRU 缓存）"""
+        transient = {}
+        expert_bits = self.encode_diagnoses(expert_diagnoses, transient)
+        algorithm_bits = self.encode_diagnoses(algorithm_diagnoses, transient)
+        key = (expert_bits, algorithm_bits, tuple(transient))
+        cache = self._similarity_cache
+        if key in cache:
+            cache.move_to_end(key)
+        else:
+            cache[key] = self._compute_similarity(expert_bits, algorithm_bits, transient)
+            if len(cache) > self._max_cached_similarities:
+                cache.popitem(last=False)
+        return cache[key]
+    
+    def _compute_similarity(self, expert_bits, algorithm_bits, transient=None):
         # 扩展两个诊断集合
-        expanded_expert = set(self.expand_diagnosis_with_hierarchy(expert_diagnoses))
-        expanded_algorithm = set(self.expand_diagnosis_with_hierarchy(algorithm_diagnoses))
+        expanded_expert = self.expand_bits(expert_bits)
+        expanded_algorithm = self.expand_bits(algorithm_bits)
         
         # 计算加权相似度
         intersection = expanded_expert & expanded_algorithm
-        union = expanded_expert | expanded_algorithm
-        
-        # 基础Jaccard相似度
-        basic_jaccard = len(intersection) / len(union) if union else 0
+        union_size = _popcount(expanded_expert | expanded_algorithm)
         
         # 加权计算：精确匹配权重更高
-        exact_matches = set(expert_diagnoses) & set(algorithm_diagnoses)
-        hierarchical_matches = intersection - exact_matches
+        exact_matches = expert_bits & algorithm_bits
+        hierarchical_matches = intersection & ~exact_matches
         
         exact_weight = 1.0
         hierarchical_weight = 0.5
         
-        weighted_score = (
-            len(exact_matches) * exact_weight + 
-            len(hierarchical_matches) * hierarchical_weight
-        ) / len(union) if union else 0
-        
         return {
-            'basic_jaccard': basic_jaccard,
-            'weighted_similarity': weighted_score,
-            'exact_matches': list(exact_matches),
-            'hierarchical_matches': list(hierarchical_matches)
+            # 基础Jaccard相似度
+            'basic_jaccard': _popcount(intersection) / union_size if union_size else 0,
+            'weighted_similarity': (
+                _popcount(exact_matches) * exact_weight +
+                _popcount(hierarchical_matches) * hierarchical_weight
+            ) / union_size if union_size else 0,
+            'exact_matches': self.decode_diagnoses(exact_matches, transient),
+            'hierarchical_matches': self.decode_diagnoses(hierarchical_matches, transient)
         }
     
+    def calculate_hierarchical_similarity(self, expert_diagnoses, algorithm_diagnoses):
+        """计算考虑层级关系的相似度"""
+        result = self._similarity(expert_diagnoses, algorithm_diagnoses)
+        return {**result, 'exact_matches': list(result['exact_matches']),
+                'hierarchical_matches': list(result['hierarchical_matches'])}
+    
+    def batch_hierarchical_similarity(self, expert_diagnoses_list, algorithm_diagnoses_list):
+        """
+        批量计算层级相似度（如数万条专家诊断 vs 算法诊断）
+        相同的诊断组合经 LRU 缓存只计算一次 (缓存容量内)，各行共享同一结果
+        
+        Returns:
+            DataFrame，列与 calculate_hierarchical_similarity 的返回字段一致
+        """
+        rows = [
+            self._similarity(expert_diagnoses, algorithm_diagnoses)
+            for expert_diagnoses, algorithm_diagnoses in zip(expert_diagnoses_list, algorithm_diagnoses_list)
+        ]
+        return pd.DataFrame(rows, columns=['basic_jaccard', 'weighted_similarity',
+                                           'exact_matches', 'hierarchical_matches'])
+    
     def prioritize_diagnoses_by_clinical_significance(self, diagnoses):
         """根据临床重要性排序诊断"""
         significance_order = {'high': 3, 'moderate': 2, 'low': 1}
@@ -177,14 +300,12 @@ class HierarchicalDiagnosisSystem:
         
         # 需要移除的诊断
         extra = current_set - target_set
+        target_bits = self.encode_diagnoses(target_set)
         for diagnosis in extra:
             if diagnosis in self.diagnosis_hierarchy:
                 level = self.diagnosis_hierarchy[diagnosis].get('level', 'unknown')
                 # 检查是否有层级关系可以保留
-                has_hierarchical_match = any(
-                    self._is_hierarchically_related(diagnosis, target) 
-                    for target in target_set
-                )
+                has_hierarchical_match = bool(self._related[diagnosis] & target_bits)
                 if not has_hierarchical_match:
                     suggestions.append({
                         'action': 'remove',
@@ -196,18 +317,9 @@ class HierarchicalDiagnosisSystem:
         return suggestions
     
     def _is_hierarchically_related(self, diag1, diag2):
-        """检查两个诊断是否有层级关系"""
+        """检查两个诊断是否有层级关系（直接父子关系，两者都需在层级树中）"""
         if diag1 in self.diagnosis_hierarchy and diag2 in self.diagnosis_hierarchy:
-            # 检查父子关系
-            parent1 = self.diagnosis_hierarchy[diag1].get('parent')
-            parent2 = self.diagnosis_hierarchy[diag2].get('parent')
-            children1 = self.diagnosis_hierarchy[diag1].get('children', [])
-            children2 = self.diagnosis_hierarchy[diag2].get('children', [])
-            
-            return (
-                parent1 == diag2 or parent2 == diag1 or
-                diag1 in children2 or diag2 in children1
-            )
+            return bool(self._related[diag1] >> self._bit_index[diag2] & 1)
         return False
 
 def demonstrate_hierarchical_system():
@@ -15,6 +15,28 @@ from sklearn.metrics import jaccard_score
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+def _diagnosis_indicator_matrices(*diagnosis_columns):
+    """
+    将若干列逗号分隔的诊断字符串编码为共享词表的布尔指示矩阵 (记录数 × 诊断数)
+    空字符串视为无诊断，与 set(s.split(',') if s else []) 语义一致
+    """
+    exploded = []
+    for column in diagnosis_columns:
+        column = column.reset_index(drop=True)
+        exploded.append(column.where(column != '').str.split(',').explode())
+    codes, vocabulary = pd.factorize(pd.concat(exploded))
+    
+    matrices = []
+    start = 0
+    for column, values in zip(diagnosis_columns, exploded):
+        column_codes = codes[start:start + len(values)]
+        start += len(values)
+        valid = column_codes >= 0
+        matrix = np.zeros((len(column), len(vocabulary)), dtype=bool)
+        matrix[values.index.to_numpy()[valid], column_codes[valid]] = True
+        matrices.append(matrix)
+    return matrices
+
 class IntegratedECGDiagnosisSystem:
     """整合的ECG诊断系统"""
     
@@ -240,6 +262,102 @@ class IntegratedECGDiagnosisSystem:
             'total_features_used': self._count_available_features(row)
         }
     
+    def _feature_column(self, df, name, default=np.nan):
+        """取特征列为浮点数组，缺失列按默认值填充（与 row.get(name, default) 一致）"""
+        if name in df.columns:
+            return df[name].to_numpy(dtype=float)
+        return np.full(len(df), default, dtype=float)
+    
+    def vectorized_rule_diagnosis(self, df):
+        """
+        🆕 列式规则引擎 - 与 enhanced_rule_based_diagnosis 逐条等价
+        
+        每条阈值规则表示为整张特征表上的布尔掩码，置信度按列累加，
+        返回 (诊断标记表, 置信度表)，列为按规则顺序排列的诊断代码
+        """
+        t = self.thresholds
+        col = lambda name, default=np.nan: self._feature_column(df, name, default)
+        
+        mean_hr, lf_hf_ratio = col('mean_hr'), col('lf_hf_ratio')
+        rmssd, pnn50 = col('rmssd'), col('pnn50')
+        qrs_duration, st_deviation = col('qrs_duration_mean'), col('st_deviation_mean')
+        pr_interval, qtc_interval = col('pr_interval_mean'), col('qtc_interval_mean')
+        r_wave_amplitude = col('r_wave_amplitude_mean')
+        
+        labels = {}
+        confidences = {}
+        
+        def add_rule(code, mask, confidence):
+            labels[code] = mask
+            confidences[code] = np.where(mask, confidence, 0.0)
+        
+        # === 1. 心率相关诊断（HRV主导）===
+        brady = mean_hr < t['bradycardia_hr']
+        tachy = ~brady & (mean_hr > t['tachycardia_hr'])
+        sinus_regular = ~np.isnan(mean_hr) & ~brady & ~tachy & (rmssd < 20)
+        add_rule('427393009', brady, 0.9)
+        add_rule('426627000', tachy, 0.8)
+        add_rule('426783006', sinus_regular, 0.7)
+        
+        # === 2. 束支阻滞诊断（形态学主导）===
+        bundle_branch_confidence = (np.zeros(len(df))
+                                    + np.where(qrs_duration > t['qrs_wide_threshold'], 0.4, 0.0)
+                                    + np.where(col('wide_qrs_ratio', 0) > 0.5, 0.4, 0.0)
+                                    + np.where(col('multi_lead_qrs_consistency', 0) > 0.8, 0.2, 0.0))
+        bundle_branch = bundle_branch_confidence >= t['confidence_threshold']
+        has_r_wave = ~np.isnan(r_wave_amplitude)
+        add_rule('251146004', bundle_branch & has_r_wave & (r_wave_amplitude > 1.0), bundle_branch_confidence)
+        add_rule('59118001', bundle_branch & has_r_wave & ~(r_wave_amplitude > 1.0), bundle_branch_confidence)
+        add_rule('426177001', bundle_branch & ~has_r_wave, bundle_branch_confidence)
+        
+        # === 3. 心肌缺血诊断（HRV + 形态学综合）===
+        lf_hf_abnormal = (lf_hf_ratio < t['lf_hf_ischemia_low']) | (lf_hf_ratio > t['lf_hf_ischemia_high'])
+        st_ratio_abnormal = (col('st_elevation_ratio', 0) > 0.2) | (col('st_depression_ratio', 0) > 0.2)
+        ischemia_confidence = (np.zeros(len(df))
+                               + np.where(lf_hf_abnormal, 0.3 * t['hrv_weight'], 0.0)
+                               + np.where(np.abs(st_deviation) > abs(t['st_elevation_threshold']),
+                                          0.5 * t['morphology_weight'], 0.0)
+                               + np.where(st_ratio_abnormal, 0.3 * t['morphology_weight'], 0.0)
+                               + np.where(col('t_wave_positive_ratio', 1) < 0.7, 0.2 * t['morphology_weight'], 0.0))
+        add_rule('413444003', ischemia_confidence >= t['confidence_threshold'], ischemia_confidence)
+        
+        # === 4. 房室阻滞诊断 ===
+        add_rule('164931005', pr_interval > t['pr_long_threshold'], 0.85)
+        
+        # === 5. 左心室肥厚诊断 ===
+        lvh_confidence = (np.zeros(len(df))
+                          + np.where(r_wave_amplitude > t['r_wave_lvh_threshold'], 0.6, 0.0)
+                          + np.where((qrs_duration >= 100) & (qrs_duration <= 140), 0.3, 0.0))
+        add_rule('39732003', lvh_confidence >= t['confidence_threshold'], lvh_confidence)
+        
+        # === 6. 心律不齐诊断 ===
+        arrhythmia_confidence = (np.zeros(len(df))
+                                 + np.where(pnn50 > t['pnn50_afib'], 0.4, 0.0)
+                                 + np.where(rmssd > t['rmssd_arrhythmia'], 0.3, 0.0)
+                                 + np.where(col('r_peaks_consistency', 1) < 0.8, 0.2, 0.0))
+        arrhythmia = arrhythmia_confidence >= 0.6
+        add_rule('164934002', arrhythmia & (pnn50 > 80), arrhythmia_confidence)
+        add_rule('164917005', arrhythmia & ~(pnn50 > 80), arrhythmia_confidence)
+        
+        # === 7. QT间期异常 ===
+        qt_long = qtc_interval > t['qtc_long_threshold']
+        
+        # === 8. 兜底诊断（仅对前7步无任何诊断的记录）===
+        no_diagnosis = ~np.any(list(labels.values()), axis=0) & ~qt_long
+        abnormal_count = (((mean_hr < 50) | (mean_hr > 110)).astype(int)
+                          + ((qrs_duration > 110) | (qrs_duration < 70)).astype(int)
+                          + (np.abs(st_deviation) > 0.05).astype(int))
+        fallback_abnormal = no_diagnosis & (abnormal_count >= 2)
+        fallback_sinus = no_diagnosis & (abnormal_count == 0)
+        
+        # 164884008 与 426783006 在同一记录中只会由其中一条规则产生
+        labels['164884008'] = qt_long | fallback_abnormal
+        confidences['164884008'] = np.where(qt_long, 0.8, np.where(fallback_abnormal, 0.5, 0.0))
+        labels['426783006'] = labels['426783006'] | fallback_sinus
+        confidences['426783006'] = np.where(fallback_sinus, 0.6, confidences['426783006'])
+        
+        return pd.DataFrame(labels, index=df.index), pd.DataFrame(confidences, index=df.index)
+    
     def _count_available_features(self, row):
         """统计可用特征数量"""
         hrv_features = ['mean_hr', 'lf_hf_ratio', 'rmssd', 'pnn50', 'std_rr']
@@ -253,62 +371,79 @@ class IntegratedECGDiagnosisSystem:
                 'total': hrv_count + morph_count}
     
     def batch_diagnosis(self, df):
-        """批量诊断处理"""
-        results = []
+        """批量诊断处理（列式规则引擎）"""
+        labels, confidences = self.vectorized_rule_diagnosis(df)
         
-        for idx, row in df.iterrows():
-            diagnosis_result = self.enhanced_rule_based_diagnosis(row)
-            
-            result = {
-                'record_name': row.get('record_name', f'record_{idx}'),
-                'algorithm_diagnosis': ','.join(diagnosis_result['diagnoses']),
-                'diagnosis_confidence': np.mean(list(diagnosis_result['confidence_scores'].values())) if diagnosis_result['confidence_scores'] else 0,
-                'features_used_total': diagnosis_result['total_features_used']['total'],
-                'features_used_morphology': diagnosis_result['total_features_used']['morphology_features'],
-                'features_used_hrv': diagnosis_result['total_features_used']['hrv_features']
-            }
-            results.append(result)
-        
-        return pd.DataFrame(results)
+        # 诊断代码按规则顺序拼接（兜底诊断只在无其他诊断时出现，顺序与逐条诊断一致）
+        joined = pd.Series('', index=df.index, dtype=object)
+        for code in labels.columns:
+            joined = joined + np.where(labels[code].to_numpy(), code + ',', '')
+        
+        diagnosis_count = labels.sum(axis=1).to_numpy()
+        confidence_sum = np.zeros(len(df))
+        for code in confidences.columns:
+            confidence_sum = confidence_sum + confidences[code].to_numpy()
+        
+        hrv_features = ['mean_hr', 'lf_hf_ratio', 'rmssd', 'pnn50', 'std_rr']
+        morph_features = ['qrs_duration_mean', 'st_deviation_mean', 'pr_interval_mean', 
+                         'qtc_interval_mean', 'r_wave_amplitude_mean']
+        available = lambda names: df[[f for f in names if f in df.columns]].notna().sum(axis=1).to_numpy()
+        hrv_count, morph_count = available(hrv_features), available(morph_features)
+        
+        if 'record_name' in df.columns:
+            record_names = df['record_name'].to_numpy()
+        else:
+            record_names = np.array([f'record_{idx}' for idx in df.index], dtype=object)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            diagnosis_confidence = np.where(diagnosis_count > 0, confidence_sum / diagnosis_count, 0)
+        
+        return pd.DataFrame({
+            'record_name': record_names,
+            'algorithm_diagnosis': joined.str.rstrip(',').to_numpy(),
+            'diagnosis_confidence': diagnosis_confidence,
+            'features_used_total': hrv_count + morph_count,
+            'features_used_morphology': morph_count,
+            'features_used_hrv': hrv_count
+        })
     
     def compare_with_expert_diagnosis(self, algorithm_df, expert_df):
-        """与专家诊断对比"""
+        """与专家诊断对比（诊断集合编码为指示矩阵后按列计算匹配指标）"""
         # 合并数据
         merged = pd.merge(algorithm_df, expert_df[['record_name', 'original_chinese']], 
                          on='record_name', how='inner')
         
-        comparison_results = []
-        
-        for idx, row in merged.iterrows():
-            algo_diagnoses = set(row['algorithm_diagnosis'].split(',') if row['algorithm_diagnosis'] else [])
-            expert_diagnoses = set(row['original_chinese'].split(',') if row['original_chinese'] else [])
-            
-            # 计算各种匹配指标
-            intersection = algo_diagnoses.intersection(expert_diagnoses)
-            union = algo_diagnoses.union(expert_diagnoses)
-            
-            exact_match = algo_diagnoses == expert_diagnoses
-            jaccard_similarity = len(intersection) / len(union) if union else 0
-            precision = len(intersection) / len(algo_diagnoses) if algo_diagnoses else 0
-            recall = len(intersection) / len(expert_diagnoses) if expert_diagnoses else 0
-            f1_score = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-            
-            comparison_results.append({
-                'record_name': row['record_name'],
-                'algorithm_diagnosis': row['algorithm_diagnosis'],
-                'expert_diagnosis': row['original_chinese'],
-                'exact_match': exact_match,
-                'jaccard_similarity': jaccard_similarity,
-                'precision': precision,
-                'recall': recall,
-                'f1_score': f1_score,
-                'features_used_total': row.get('features_used_total', 0),
-                'features_used_morphology': row.get('features_used_morphology', 0),
-                'diagnosis_confidence': row.get('diagnosis_confidence', 0),
-                'algorithm_version': 'v4.0_integrated'
-            })
-        
-        return pd.DataFrame(comparison_results)
+        algo_matrix, expert_matrix = _diagnosis_indicator_matrices(merged['algorithm_diagnosis'],
+                                                                   merged['original_chinese'])
+        
+        # 计算各种匹配指标
+        algo_count = algo_matrix.sum(axis=1)
+        expert_count = expert_matrix.sum(axis=1)
+        intersection = (algo_matrix & expert_matrix).sum(axis=1)
+        union = (algo_matrix | expert_matrix).sum(axis=1)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            jaccard_similarity = np.where(union > 0, intersection / union, 0)
+            precision = np.where(algo_count > 0, intersection / algo_count, 0)
+            recall = np.where(expert_count > 0, intersection / expert_count, 0)
+            f1_score = np.where(precision + recall > 0, 2 * (precision * recall) / (precision + recall), 0)
+        
+        column_or_zero = lambda name: merged[name].to_numpy() if name in merged.columns else np.zeros(len(merged))
+        
+        return pd.DataFrame({
+            'record_name': merged['record_name'].to_numpy(),
+            'algorithm_diagnosis': merged['algorithm_diagnosis'].to_numpy(),
+            'expert_diagnosis': merged['original_chinese'].to_numpy(),
+            'exact_match': (algo_matrix == expert_matrix).all(axis=1),
+            'jaccard_similarity': jaccard_similarity,
+            'precision': precision,
+            'recall': recall,
+            'f1_score': f1_score,
+            'features_used_total': column_or_zero('features_used_total'),
+            'features_used_morphology': column_or_zero('features_used_morphology'),
+            'diagnosis_confidence': column_or_zero('diagnosis_confidence'),
+            'algorithm_version': 'v4.0_integrated'
+        })
     
     def generate_performance_report(self, comparison_df):
         """生成性能评估报告"""
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+v4.0批量分析的结果分片测试
+- 默认重新分析全部记录，串行且不续跑时不写分片；--resume 才写入并续用已完成的分片
+- 续跑结果与一次完整分析一致
+- 分析器版本/配置不一致的旧分片被丢弃；只删除、合并清单中登记的分片
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import enhanced_ecg_analyzer_v4 as analyzer
+
+RECORDS = ['A0001', 'A0002', 'A0003', 'A0004']
+
+
+def fake_record_analysis(record_name, data_dir, version='v1', failing=()):
+    """替代逐记录的信号分析：结果由记录名和版本决定"""
+    if record_name in failing:
+        return None
+    return {'record_name': record_name, 'mean_hr': 60 + RECORDS.index(record_name), 'version': version}
+
+
+class TestResultShards(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp.name
+        with open(os.path.join(self.data_dir, 'RECORDS'), 'w') as f:
+            f.write('\n'.join(RECORDS) + '\n')
+        self.output = os.path.join(self.data_dir, 'results.csv')
+        self.shard_dir = os.path.join(self.data_dir, 'results_shards')
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_analysis(self, resume=False, **kwargs):
+        def analyze(record_name, data_dir):
+            self.calls.append(record_name)
+            return fake_record_analysis(record_name, data_dir, **kwargs)
+        with mock.patch.object(analyzer, 'analyze_single_record_enhanced_v4', side_effect=analyze), \
+                mock.patch('builtins.print'):
+            return analyzer.analyze_directory_enhanced_v4(self.data_dir, self.output, resume=resume)
+
+    def shard_files(self):
+        return sorted(f for f in os.listdir(self.shard_dir) if f.startswith('shard_'))
+
+    def test_default_run_reanalyzes_everything(self):
+        self.run_analysis()
+        self.calls.clear()
+        df = self.run_analysis(version='v2')
+        self.assertEqual(self.calls, RECORDS)
+        self.assertEqual(df['version'].tolist(), ['v2'] * len(RECORDS))
+        self.assertFalse(os.path.exists(self.shard_dir))
+
+    def test_resume_matches_full_run(self):
+        full = self.run_analysis()
+        self.calls.clear()
+        self.run_analysis(resume=True, failing={'A0003'})
+        self.assertEqual(len(self.shard_files()), 1)
+        self.calls.clear()
+        resumed = self.run_analysis(resume=True)
+        self.assertEqual(self.calls, ['A0003'])
+        self.assertEqual(resumed.to_dict('records'), full.to_dict('records'))
+
+    def test_resume_discards_mismatched_shards(self):
+        self.run_analysis(resume=True, failing={'A0004'})
+        old_shards = self.shard_files()
+        # 清单未登记的文件 (如其他工具写入的) 既不删除也不合并
+        with open(os.path.join(self.shard_dir, 'shard_legacy.jsonl'), 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'record_name': 'A0004', 'mean_hr': 0, 'version': 'legacy'}) + '\n')
+
+        self.calls.clear()
+        with mock.patch.object(analyzer, 'ANALYZER_VERSION', 'next'):
+            df = self.run_analysis(resume=True, version='v2')
+            key = analyzer.config_key(analyzer.analysis_config(self.data_dir))
+        self.assertEqual(self.calls, RECORDS)
+        self.assertEqual(df['version'].tolist(), ['v2'] * len(RECORDS))
+        shards = [name for name in self.shard_files() if name != 'shard_legacy.jsonl']
+        self.assertEqual(len(shards), 1)
+        self.assertNotIn(shards[0], old_shards)
+        self.assertIn('shard_legacy.jsonl', self.shard_files())
+        self.assertEqual(analyzer.read_shard_key(os.path.join(self.shard_dir, shards[0])), key)
+        with open(os.path.join(self.shard_dir, 'manifest.jsonl'), encoding='utf-8') as f:
+            self.assertEqual({json.loads(line)['config_key'] for line in f}, {key})
+
+    def test_fresh_start_removes_only_manifest_shards(self):
+        self.run_analysis(resume=True)
+        key = analyzer.config_key(analyzer.analysis_config(self.data_dir))
+        listed = os.path.join(self.shard_dir, self.shard_files()[0])
+        unlisted = os.path.join(self.shard_dir, 'shard_copy.jsonl')
+        other = os.path.join(self.shard_dir, 'notes.txt')
+        with open(listed, encoding='utf-8') as src, open(unlisted, 'w', encoding='utf-8') as dst:
+            dst.write(src.read())
+        with open(other, 'w', encoding='utf-8') as f:
+            f.write('keep')
+
+        self.assertEqual(analyzer.prepare_shard_dir(self.shard_dir, key, resume=False), 1)
+        self.assertFalse(os.path.exists(listed))
+        self.assertTrue(os.path.exists(unlisted) and os.path.exists(other))
+        self.assertEqual(analyzer.load_completed_records(self.shard_dir, key), set())
+        self.assertEqual(analyzer.merge_result_shards(self.shard_dir, RECORDS, key), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
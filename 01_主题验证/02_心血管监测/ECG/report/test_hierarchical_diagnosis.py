@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+层级诊断系统测试
+- 位集闭包扩展与逐级向上遍历父级诊断的集合一致
+- 层级相似度 (单条与批量) 与集合运算实现一致
+- 层级相关判断与改进建议与逐对比较的旧实现一致
+- 层级树外的诊断临时编码，不扩充共享的比特位表；相似度缓存有容量上限
+"""
+
+import unittest
+
+import numpy as np
+
+from hierarchical_diagnosis_system import HierarchicalDiagnosisSystem
+
+
+def reference_expand(system, diagnoses):
+    """逐级向上遍历 parent，收集诊断及其全部祖先"""
+    expanded = set(diagnoses)
+    for diagnosis in diagnoses:
+        parent = system.diagnosis_hierarchy.get(diagnosis, {}).get('parent')
+        while parent and parent not in expanded:
+            expanded.add(parent)
+            parent = system.diagnosis_hierarchy.get(parent, {}).get('parent')
+    return expanded
+
+
+def reference_similarity(system, expert, algorithm):
+    """集合运算计算层级相似度"""
+    expanded_expert, expanded_algorithm = reference_expand(system, expert), reference_expand(system, algorithm)
+    intersection = expanded_expert & expanded_algorithm
+    union = expanded_expert | expanded_algorithm
+    exact = set(expert) & set(algorithm)
+    hierarchical = intersection - exact
+    return {
+        'basic_jaccard': len(intersection) / len(union) if union else 0,
+        'weighted_similarity': (len(exact) + 0.5 * len(hierarchical)) / len(union) if union else 0,
+        'exact_matches': exact,
+        'hierarchical_matches': hierarchical,
+    }
+
+
+def reference_related(system, diag1, diag2):
+    """旧实现：比较两个诊断的 parent/children 字段"""
+    hierarchy = system.diagnosis_hierarchy
+    if diag1 in hierarchy and diag2 in hierarchy:
+        return (hierarchy[diag1].get('parent') == diag2 or hierarchy[diag2].get('parent') == diag1 or
+                diag1 in hierarchy[diag2].get('children', []) or diag2 in hierarchy[diag1].get('children', []))
+    return False
+
+
+def reference_suggestions(system, current, target):
+    """旧实现：多余诊断逐个与全部目标诊断比较层级关系"""
+    hierarchy = system.diagnosis_hierarchy
+    current_set, target_set = set(current), set(target)
+    added = {d for d in target_set - current_set if d in hierarchy}
+    removed = {d for d in current_set - target_set
+               if d in hierarchy and not any(reference_related(system, d, t) for t in target_set)}
+    return added, removed
+
+
+class TestHierarchicalDiagnosis(unittest.TestCase):
+
+    def setUp(self):
+        self.system = HierarchicalDiagnosisSystem()
+        names = set(self.system.diagnosis_hierarchy)
+        for info in self.system.diagnosis_hierarchy.values():
+            names.update(filter(None, [info.get('parent'), *info.get('children', [])]))
+        self.names = sorted(names) + ['未登记诊断A', '未登记诊断B']
+        rng = np.random.default_rng(0)
+        self.pairs = [([str(d) for d in rng.choice(self.names, rng.integers(0, 5), replace=False)],
+                       [str(d) for d in rng.choice(self.names, rng.integers(0, 5), replace=False)])
+                      for _ in range(2000)]
+
+    def test_expand_matches_parent_walk(self):
+        for name in self.names:
+            self.assertEqual(set(self.system.expand_diagnosis_with_hierarchy([name])),
+                             reference_expand(self.system, [name]), name)
+        for expert, _ in self.pairs:
+            expanded = self.system.expand_diagnosis_with_hierarchy(expert)
+            self.assertEqual(len(expanded), len(set(expanded)))
+            self.assertEqual(set(expanded), reference_expand(self.system, expert))
+
+    def assertSimilarityEqual(self, result, expected):
+        self.assertAlmostEqual(result['basic_jaccard'], expected['basic_jaccard'])
+        self.assertAlmostEqual(result['weighted_similarity'], expected['weighted_similarity'])
+        self.assertEqual(set(result['exact_matches']), expected['exact_matches'])
+        self.assertEqual(set(result['hierarchical_matches']), expected['hierarchical_matches'])
+
+    def test_similarity_matches_sets(self):
+        for expert, algorithm in self.pairs:
+            self.assertSimilarityEqual(self.system.calculate_hierarchical_similarity(expert, algorithm),
+                                       reference_similarity(self.system, expert, algorithm))
+
+    def test_batch_similarity_matches_single(self):
+        experts, algorithms = zip(*self.pairs)
+        batch = self.system.batch_hierarchical_similarity(experts, algorithms)
+        self.assertEqual(len(batch), len(self.pairs))
+        for (expert, algorithm), (_, row) in zip(self.pairs, batch.iterrows()):
+            self.assertSimilarityEqual(row, reference_similarity(self.system, expert, algorithm))
+
+    def test_related_and_suggestions_match_pairwise(self):
+        for diag1 in self.names:
+            for diag2 in self.names:
+                self.assertEqual(self.system._is_hierarchically_related(diag1, diag2),
+                                 reference_related(self.system, diag1, diag2), (diag1, diag2))
+        for current, target in self.pairs:
+            suggestions = self.system.suggest_diagnosis_improvements(current, target)
+            added = {s['diagnosis'] for s in suggestions if s['action'] == 'add'}
+            removed = {s['diagnosis'] for s in suggestions if s['action'] == 'remove'}
+            self.assertEqual((added, removed), reference_suggestions(self.system, current, target))
+
+    def test_unknown_labels_do_not_grow_vocabulary(self):
+        names = list(self.system._names)
+        for i in range(500):
+            unknown = [f'自由文本诊断{i}', f'自由文本诊断{i + 1}']
+            self.assertSimilarityEqual(
+                self.system.calculate_hierarchical_similarity(unknown + ['右束支阻滞'], unknown[1:] + ['束支阻滞']),
+                reference_similarity(self.system, unknown + ['右束支阻滞'], unknown[1:] + ['束支阻滞']))
+            self.assertEqual(set(self.system.expand_diagnosis_with_hierarchy(unknown)), set(unknown))
+            self.system.suggest_diagnosis_improvements(unknown, ['心肌缺血'])
+        self.assertEqual(self.system._names, names)
+        self.assertEqual(set(self.system._closure), set(names))
+
+    def test_similarity_cache_is_bounded(self):
+        system = HierarchicalDiagnosisSystem(max_cached_similarities=8)
+        for expert, algorithm in self.pairs:
+            self.assertSimilarityEqual(system.calculate_hierarchical_similarity(expert, algorithm),
+                                       reference_similarity(system, expert, algorithm))
+            self.assertLessEqual(len(system._similarity_cache), 8)
+        with self.assertRaises(ValueError):
+            HierarchicalDiagnosisSystem(max_cached_similarities=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+整合诊断系统列式规则测试
+- batch_diagnosis 列式规则引擎与逐行 enhanced_rule_based_diagnosis 结果一致 (含缺失值与缺失列)
+- compare_with_expert_diagnosis 指示矩阵计算与逐行集合运算一致
+- V4.2 batch_analyze_and_compare 按输入组合去重后与逐行分析结果一致
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from integrated_ecg_diagnosis_system import IntegratedECGDiagnosisSystem
+from v4_2_clinical_intelligent_system import V42ClinicalIntelligentSystem
+
+# 各特征的取值范围覆盖规则阈值两侧
+FEATURE_RANGES = {
+    'mean_hr': (40, 120), 'lf_hf_ratio': (0.3, 5), 'rmssd': (5, 80), 'pnn50': (0, 100), 'std_rr': (10, 150),
+    'qrs_duration_mean': (60, 170), 'st_deviation_mean': (-0.4, 0.4), 'pr_interval_mean': (120, 260),
+    'qtc_interval_mean': (380, 500), 'r_wave_amplitude_mean': (0.3, 3.5), 'wide_qrs_ratio': (0, 1),
+    'multi_lead_qrs_consistency': (0.5, 1), 'st_elevation_ratio': (0, 0.5), 'st_depression_ratio': (0, 0.5),
+    't_wave_positive_ratio': (0.3, 1), 'r_peaks_consistency': (0.5, 1),
+}
+
+
+def random_features(n, seed=0, missing=0.15, drop_columns=()):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({name: rng.uniform(low, high, n) for name, (low, high) in FEATURE_RANGES.items()})
+    df = df.mask(rng.random(df.shape) < missing)
+    df.insert(0, 'record_name', [f'A{i:04d}' for i in range(n)])
+    return df.drop(columns=list(drop_columns))
+
+
+def reference_batch_diagnosis(system, df):
+    """原实现：逐行调用 enhanced_rule_based_diagnosis"""
+    results = []
+    for idx, row in df.iterrows():
+        diagnosis_result = system.enhanced_rule_based_diagnosis(row)
+        confidences = diagnosis_result['confidence_scores']
+        results.append({
+            'record_name': row.get('record_name', f'record_{idx}'),
+            'algorithm_diagnosis': ','.join(diagnosis_result['diagnoses']),
+            'diagnosis_confidence': np.mean(list(confidences.values())) if confidences else 0,
+            'features_used_total': diagnosis_result['total_features_used']['total'],
+            'features_used_morphology': diagnosis_result['total_features_used']['morphology_features'],
+            'features_used_hrv': diagnosis_result['total_features_used']['hrv_features']
+        })
+    return pd.DataFrame(results)
+
+
+def reference_expert_comparison(merged):
+    """原实现：逐行集合运算"""
+    rows = []
+    for _, row in merged.iterrows():
+        algo = set(row['algorithm_diagnosis'].split(',') if row['algorithm_diagnosis'] else [])
+        expert = set(row['original_chinese'].split(',') if row['original_chinese'] else [])
+        intersection, union = algo & expert, algo | expert
+        precision = len(intersection) / len(algo) if algo else 0
+        recall = len(intersection) / len(expert) if expert else 0
+        rows.append({
+            'record_name': row['record_name'],
+            'exact_match': algo == expert,
+            'jaccard_similarity': len(intersection) / len(union) if union else 0,
+            'precision': precision,
+            'recall': recall,
+            'f1_score': 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0,
+        })
+    return pd.DataFrame(rows)
+
+
+def reference_v42_rows(system, merged_df):
+    """原实现：逐行运行V4.2完整流程并与专家诊断对比"""
+    rows = []
+    for _, row in merged_df.iterrows():
+        result = system.analyze_ecg_with_clinical_intelligence(
+            {'features_used_total': row.get('features_used_total', 8),
+             'features_used_morphology': row.get('features_used_morphology', 4),
+             'diagnosis_confidence': row.get('diagnosis_confidence', 0.8)},
+            {'age': row.get('age'), 'sex': row.get('sex'), 'record_name': row['record_name']})
+        expert_dx = row['expert_diagnoses'].split(', ') if pd.notna(row['expert_diagnoses']) else []
+        comparison = system.compare_with_expert_diagnoses(expert_dx, result)
+        metrics = comparison['similarity_metrics']
+        rows.append({
+            'record_name': row['record_name'],
+            'v42_diagnoses': ', '.join(result['diagnoses']),
+            'v42_confidence': result['overall_confidence'],
+            'weighted_similarity': metrics['weighted_similarity'],
+            'basic_jaccard': metrics['basic_jaccard'],
+            'exact_matches': ', '.join(metrics['exact_matches']),
+            'hierarchical_matches': ', '.join(metrics['hierarchical_matches']),
+            'match_quality': comparison['match_quality'],
+            'adjustments_applied': '; '.join(result['adjustments_applied']),
+        })
+    return pd.DataFrame(rows)
+
+
+class TestIntegratedDiagnosis(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.system = IntegratedECGDiagnosisSystem()
+
+    def test_batch_diagnosis_matches_row_rules(self):
+        for seed, drop in [(0, ()), (1, ('wide_qrs_ratio', 'r_peaks_consistency', 'lf_hf_ratio')),
+                           (2, ('record_name', 'qtc_interval_mean'))]:
+            df = random_features(600, seed, drop_columns=drop)
+            df.index = df.index * 3 + 7
+            result = self.system.batch_diagnosis(df)
+            expected = reference_batch_diagnosis(self.system, df)
+            self.assertGreater(expected['algorithm_diagnosis'].str.contains(',').sum(), 50)
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    def test_expert_comparison_matches_sets(self):
+        algorithm_df = self.system.batch_diagnosis(random_features(300, 3))
+        rng = np.random.default_rng(3)
+        codes = list(self.system.diagnosis_codes)
+        expert_df = pd.DataFrame({
+            'record_name': algorithm_df['record_name'],
+            'original_chinese': [','.join(rng.choice(codes, rng.integers(0, 4), replace=False)) for _ in range(300)],
+        })
+        # 部分记录专家诊断与算法诊断完全相同
+        expert_df.loc[::10, 'original_chinese'] = algorithm_df['algorithm_diagnosis'][::10]
+
+        result = self.system.compare_with_expert_diagnosis(algorithm_df, expert_df)
+        merged = pd.merge(algorithm_df, expert_df, on='record_name', how='inner')
+        expected = reference_expert_comparison(merged)
+        self.assertGreaterEqual(expected['exact_match'].sum(), 30)
+        pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False)
+
+
+class TestV42BatchAnalysis(unittest.TestCase):
+
+    def test_grouped_analysis_matches_rows(self):
+        rng = np.random.default_rng(4)
+        n = 120
+        v4_df = pd.DataFrame({
+            'record_name': [f'A{i:04d}' for i in range(n)],
+            'features_used_total': rng.integers(3, 11, n),
+            'features_used_morphology': rng.integers(0, 5, n),
+            'diagnosis_confidence': rng.uniform(0.5, 1, n),
+            'algorithm_diagnosis': rng.choice(['426783006', '427393009,164884008', ''], n),
+            'age': rng.choice([25.0, 45.0, 70.0, np.nan], n),
+            'sex': rng.choice(['Male', 'Female'], n),
+        })
+        expert_df = pd.DataFrame({
+            'record_name': v4_df['record_name'],
+            'expert_diagnoses': rng.choice(['窦性心律', '窦性心动过缓, 心电图异常', '心房颤动, 心律不齐', None], n),
+        })
+
+        system = V42ClinicalIntelligentSystem()
+        with tempfile.TemporaryDirectory() as tmp:
+            v4_path = os.path.join(tmp, 'v4_results.csv')
+            v4_df.to_csv(v4_path, index=False)
+            with mock.patch.object(system, '_load_expert_diagnoses', return_value=expert_df), \
+                 mock.patch.object(system, '_generate_performance_statistics'), \
+                 mock.patch('builtins.print'):
+                result = system.batch_analyze_and_compare(tmp, v4_path)
+            merged_df = pd.merge(pd.read_csv(v4_path), expert_df, on='record_name', how='inner')
+
+        with mock.patch('builtins.print'):
+            expected = reference_v42_rows(system, merged_df)
+        self.assertEqual(len(result), n)
+        pd.testing.assert_frame_equal(result[expected.columns], expected, check_dtype=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
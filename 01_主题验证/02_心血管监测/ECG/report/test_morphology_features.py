@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+ECG形态学特征测试
+- 批量窗口矩阵实现与旧版逐心拍循环实现的汇总特征一致
+- 分批大小 (beat_chunk_size) 不影响结果
+- 边界心拍、过近R峰与R峰不足时的处理与旧版一致
+"""
+
+import unittest
+
+import numpy as np
+
+from benchmark_morphology_features import legacy_extract_ecg_morphology_features, synthetic_ecg
+from enhanced_ecg_analyzer_v4 import detect_r_peaks_multilead, extract_ecg_morphology_features
+
+
+class TestMorphologyFeatures(unittest.TestCase):
+
+    def assertFeaturesEqual(self, actual, expected):
+        self.assertEqual(sorted(actual), sorted(expected))
+        for key in expected:
+            np.testing.assert_allclose(actual[key], expected[key], rtol=1e-9, atol=1e-12, err_msg=key)
+
+    def test_matches_legacy(self):
+        for sampling_rate, mean_rr, seed in [(500, 0.8, 0), (500, 0.5, 1), (250, 1.0, 2), (360, 0.65, 3)]:
+            ecg = synthetic_ecg(60, sampling_rate, mean_rr, seed)
+            r_peaks = detect_r_peaks_multilead(ecg, sampling_rate)
+            expected = legacy_extract_ecg_morphology_features(ecg, r_peaks, sampling_rate)
+            self.assertGreater(expected['beats_analyzed'], 40)
+            self.assertFeaturesEqual(extract_ecg_morphology_features(ecg, r_peaks, sampling_rate), expected)
+
+    def test_chunk_size_does_not_change_result(self):
+        ecg = synthetic_ecg(60, 500, 0.7, 4)
+        r_peaks = detect_r_peaks_multilead(ecg, 500)
+        expected = legacy_extract_ecg_morphology_features(ecg, r_peaks, 500)
+        for chunk in (1, 7, 32, len(r_peaks)):
+            self.assertFeaturesEqual(extract_ecg_morphology_features(ecg, r_peaks, 500, beat_chunk_size=chunk),
+                                     expected)
+
+    def test_irregular_peaks_match_legacy(self):
+        """人为加入过近R峰与贴近信号末端的R峰，需跳过的心拍与旧版一致"""
+        sampling_rate = 500
+        ecg = synthetic_ecg(30, sampling_rate, 0.8, 5)
+        r_peaks = detect_r_peaks_multilead(ecg, sampling_rate)
+        irregular = sorted(set(r_peaks) | {r_peaks[5] + 40, r_peaks[10] + 120, len(ecg) - 3, len(ecg) - 1})
+        self.assertFeaturesEqual(extract_ecg_morphology_features(ecg, irregular, sampling_rate),
+                                 legacy_extract_ecg_morphology_features(ecg, irregular, sampling_rate))
+
+    def test_too_few_peaks(self):
+        ecg = synthetic_ecg(5, 500)
+        for r_peaks in ([], [1000], [1000, 1400]):
+            self.assertEqual(extract_ecg_morphology_features(ecg, r_peaks, 500),
+                             legacy_extract_ecg_morphology_features(ecg, r_peaks, 500))
+
+
+if __name__ == '__main__':
+    unittest.main()
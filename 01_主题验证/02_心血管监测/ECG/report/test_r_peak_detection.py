@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+R峰检测测试
+- 向量化实现与旧版逐采样点循环实现检测结果一致
+- 多导联一次检测与逐导联检测一致
+- 批量检测出错时逐导联检测，单个导联出错只影响该导联
+"""
+
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import enhanced_ecg_analyzer_v4
+from enhanced_ecg_analyzer_v4 import advanced_r_peak_detection, detect_r_peaks_all_leads, detect_r_peaks_multilead
+from validate_qrs_detector import legacy_r_peak_detection
+
+
+def synthetic_ecg(duration_sec, sampling_rate, mean_rr=0.8, seed=0):
+    """高斯QRS波 + T波 + 基线漂移 + 噪声，RR间期随机变化"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration_sec * sampling_rate)) / sampling_rate
+    beats = np.cumsum(rng.normal(mean_rr, 0.08 * mean_rr, int(duration_sec / mean_rr) + 5))
+    beats = beats[(beats > 0.5) & (beats < duration_sec - 0.5)]
+    ecg = 0.15 * np.sin(2 * np.pi * 0.2 * t) + 0.03 * rng.standard_normal(len(t))
+    for beat in beats:
+        amplitude = rng.uniform(0.8, 1.4)
+        ecg += amplitude * np.exp(-((t - beat) / 0.012) ** 2)
+        ecg += 0.25 * np.exp(-((t - beat - 0.25) / 0.05) ** 2)
+    return ecg
+
+
+class TestRPeakDetection(unittest.TestCase):
+
+    def test_single_lead_matches_legacy(self):
+        for sampling_rate, mean_rr, seed in [(500, 0.8, 0), (500, 0.5, 1), (250, 1.0, 2), (360, 0.65, 3)]:
+            ecg = synthetic_ecg(30, sampling_rate, mean_rr, seed)
+            expected = [int(p) for p in legacy_r_peak_detection(ecg, sampling_rate)]
+            self.assertGreater(len(expected), 20)
+            self.assertEqual(detect_r_peaks_multilead(ecg, sampling_rate), expected)
+            self.assertEqual(advanced_r_peak_detection(ecg, sampling_rate), expected)
+
+    def test_multilead_matches_per_lead(self):
+        sampling_rate = 500
+        leads = np.column_stack([synthetic_ecg(20, sampling_rate, 0.75, seed) * sign
+                                 for seed, sign in [(4, 1), (5, -1), (6, 0.5)]])
+        all_peaks = detect_r_peaks_multilead(leads, sampling_rate)
+        self.assertEqual(len(all_peaks), 3)
+        for lead, peaks in enumerate(all_peaks):
+            self.assertEqual(peaks, detect_r_peaks_multilead(leads[:, lead], sampling_rate))
+            self.assertEqual(peaks, [int(p) for p in legacy_r_peak_detection(leads[:, lead], sampling_rate)])
+
+    def test_batch_failure_isolated_per_lead(self):
+        sampling_rate = 500
+        leads = np.column_stack([synthetic_ecg(20, sampling_rate, 0.75, seed) for seed in (7, 8, 9)])
+        expected = detect_r_peaks_multilead(leads, sampling_rate)
+        self.assertEqual(detect_r_peaks_all_leads(leads, sampling_rate), expected)
+
+        def failing_detector(ecg_signals, fs):
+            """批量调用及第2导联出错"""
+            ecg_signals = np.asarray(ecg_signals)
+            if ecg_signals.ndim == 2 or np.array_equal(ecg_signals, leads[:, 1]):
+                raise ValueError("模拟检测失败")
+            return detect_r_peaks_multilead(ecg_signals, fs)
+
+        with mock.patch.object(enhanced_ecg_analyzer_v4, 'detect_r_peaks_multilead', failing_detector):
+            all_peaks = detect_r_peaks_all_leads(leads, sampling_rate)
+        self.assertEqual(all_peaks, [expected[0], [], expected[2]])
+
+
+if __name__ == '__main__':
+    unittest.main()
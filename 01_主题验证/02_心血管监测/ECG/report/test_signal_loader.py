@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+ECG信号读取测试
+- np.memmap 读取与旧版 struct.unpack + 逐导联转换结果一致
+- 时间窗口读取等于整条记录的对应切片
+- 头文件未给出字节偏移时按文件大小推算；数据不完整时返回 None
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from benchmark_signal_loader import legacy_load_signal
+from enhanced_ecg_analyzer_v4 import load_ecg_signal, parse_header_file
+
+SAMPLING_RATE = 500
+NUM_SAMPLES = 5000
+LEADS = ['I', 'II', 'III', 'aVR', 'aVL', 'aVF']
+
+
+def write_record(directory, name='A0001', header_bytes=24, with_offset=True, seed=0):
+    """写入WFDB格式的合成记录: .mat 为文件头 + 按采样点交错的 int16 数据"""
+    rng = np.random.default_rng(seed)
+    digital = rng.integers(-3000, 3000, size=(NUM_SAMPLES, len(LEADS)), dtype='<i2')
+    with open(os.path.join(directory, f'{name}.mat'), 'wb') as f:
+        f.write(b'\0' * header_bytes)
+        f.write(digital.tobytes())
+
+    storage = f'16+{header_bytes}' if with_offset else '16'
+    lines = [f'{name} {len(LEADS)} {SAMPLING_RATE} {NUM_SAMPLES}']
+    for i, lead in enumerate(LEADS):
+        gain = 1000 if i % 2 == 0 else 500
+        lines.append(f'{name}.mat {storage} {gain}/mV 16 {i * 10 - 20} 0 0 0 {lead}')
+    lines += ['#Age: 56', '#Sex: Female', '#Dx: 426783006']
+    with open(os.path.join(directory, f'{name}.hea'), 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return os.path.join(directory, f'{name}.hea'), os.path.join(directory, f'{name}.mat')
+
+
+class TestSignalLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_full_record_matches_legacy(self):
+        for with_offset in (True, False):
+            header_path, mat_path = write_record(self.tmp.name, with_offset=with_offset)
+            info = parse_header_file(header_path)
+            self.assertEqual(info['byte_offset'], 24 if with_offset else None)
+            np.testing.assert_allclose(load_ecg_signal(mat_path, info), legacy_load_signal(mat_path, info))
+
+    def test_windows_match_full_record(self):
+        header_path, mat_path = write_record(self.tmp.name)
+        info = parse_header_file(header_path)
+        full = legacy_load_signal(mat_path, info)
+        for start_sec, end_sec in [(0, 2), (1.5, 4.25), (9, 20), (None, 3), (7, None)]:
+            start = 0 if start_sec is None else int(round(start_sec * SAMPLING_RATE))
+            end = NUM_SAMPLES if end_sec is None else min(NUM_SAMPLES, int(round(end_sec * SAMPLING_RATE)))
+            window = load_ecg_signal(mat_path, info, start_sec, end_sec)
+            np.testing.assert_allclose(window, full[start:end])
+
+    def test_truncated_file_returns_none(self):
+        header_path, mat_path = write_record(self.tmp.name)
+        with open(mat_path, 'r+b') as f:
+            f.truncate(os.path.getsize(mat_path) - 2)
+        self.assertIsNone(load_ecg_signal(mat_path, parse_header_file(header_path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -201,55 +201,62 @@ class V42ClinicalIntelligentSystem:
         merged_df = pd.merge(v4_df, expert_diagnoses_df, on='record_name', how='inner')
         print(f"📊 匹配数据: {len(merged_df)}条记录")
         
-        # 批量V4.2分析
-        v42_results = []
+        # 批量V4.2分析：结果只取决于特征计数和年龄性别，
+        # 按这些列的不同取值分组，每组只运行一次完整流程
+        input_columns = {'features_used_total': 8, 'features_used_morphology': 4,
+                         'diagnosis_confidence': 0.8, 'age': None, 'sex': None}
+        group_columns = ['features_used_total', 'features_used_morphology', 'age', 'sex']
+        inputs = pd.DataFrame({
+            name: merged_df[name] if name in merged_df.columns else default
+            for name, default in input_columns.items()
+        }, index=merged_df.index)
+        input_groups = inputs.groupby(group_columns, dropna=False, sort=False).ngroup().to_numpy()
         
-        for idx, row in merged_df.iterrows():
-            # 准备ECG特征数据
+        group_results = {}
+        for group_id, position in zip(*np.unique(input_groups, return_index=True)):
+            row = inputs.iloc[position]
             ecg_features = {
-                'features_used_total': row.get('features_used_total', 8),
-                'features_used_morphology': row.get('features_used_morphology', 4),
-                'diagnosis_confidence': row.get('diagnosis_confidence', 0.8)
+                'features_used_total': row['features_used_total'],
+                'features_used_morphology': row['features_used_morphology'],
+                'diagnosis_confidence': row['diagnosis_confidence']
             }
-            
-            # 患者信息
-            patient_info = {
-                'age': row.get('age'),
-                'sex': row.get('sex'),
-                'record_name': row['record_name']
-            }
-            
-            # V4.2分析
-            v42_result = self.analyze_ecg_with_clinical_intelligence(
-                ecg_features, patient_info
-            )
-            
-            # 与专家诊断对比
-            expert_dx = row['expert_diagnoses'].split(', ') if pd.notna(row['expert_diagnoses']) else []
-            comparison = self.compare_with_expert_diagnoses(expert_dx, v42_result)
-            
-            # 记录结果
-            result_record = {
-                'record_name': row['record_name'],
-                'age': row.get('age'),
-                'sex': row.get('sex'),
-                'expert_diagnoses': row['expert_diagnoses'],
-                'v40_diagnoses': row.get('algorithm_diagnosis', ''),
-                'v42_diagnoses': ', '.join(v42_result['diagnoses']),
-                'v42_confidence': v42_result['overall_confidence'],
-                'weighted_similarity': comparison['similarity_metrics']['weighted_similarity'],
-                'basic_jaccard': comparison['similarity_metrics']['basic_jaccard'],
-                'exact_matches': ', '.join(comparison['similarity_metrics']['exact_matches']),
-                'hierarchical_matches': ', '.join(comparison['similarity_metrics']['hierarchical_matches']),
-                'match_quality': comparison['match_quality'],
-                'adjustments_applied': '; '.join(v42_result['adjustments_applied']),
-                'version': 'V4.2_Clinical_Intelligent'
-            }
-            
-            v42_results.append(result_record)
-            
-            if (idx + 1) % 25 == 0:
-                print(f"📊 处理进度: {idx + 1}/{len(merged_df)}")
+            patient_info = {'age': row['age'], 'sex': row['sex'], 'record_name': merged_df['record_name'].iloc[position]}
+            group_results[group_id] = self.analyze_ecg_with_clinical_intelligence(ecg_features, patient_info)
+        
+        v42 = [group_results[group_id] for group_id in input_groups]
+        
+        # 与专家诊断对比：对比只取决于V4.2诊断列表和专家诊断，按二者组合去重
+        comparison_groups = pd.DataFrame({
+            'v42_diagnoses': ['\t'.join(result['diagnoses']) for result in v42],
+            'expert_diagnoses': merged_df['expert_diagnoses'].to_numpy()
+        }).groupby(['v42_diagnoses', 'expert_diagnoses'], dropna=False, sort=False).ngroup().to_numpy()
+        
+        group_comparisons = {}
+        for group_id, position in zip(*np.unique(comparison_groups, return_index=True)):
+            expert_value = merged_df['expert_diagnoses'].iloc[position]
+            expert_dx = expert_value.split(', ') if pd.notna(expert_value) else []
+            group_comparisons[group_id] = self.compare_with_expert_diagnoses(expert_dx, v42[position])
+        print(f"📊 不同输入组合: {len(group_results)}个, 不同对比组合: {len(group_comparisons)}个")
+        
+        comparisons = [group_comparisons[group_id] for group_id in comparison_groups]
+        similarity = [comparison['similarity_metrics'] for comparison in comparisons]
+        
+        v42_results = {
+            'record_name': merged_df['record_name'].to_numpy(),
+            'age': inputs['age'].to_numpy(),
+            'sex': inputs['sex'].to_numpy(),
+            'expert_diagnoses': merged_df['expert_diagnoses'].to_numpy(),
+            'v40_diagnoses': merged_df['algorithm_diagnosis'].to_numpy() if 'algorithm_diagnosis' in merged_df.columns else '',
+            'v42_diagnoses': [', '.join(result['diagnoses']) for result in v42],
+            'v42_confidence': [result['overall_confidence'] for result in v42],
+            'weighted_similarity': [metrics['weighted_similarity'] for metrics in similarity],
+            'basic_jaccard': [metrics['basic_jaccard'] for metrics in similarity],
+            'exact_matches': [', '.join(metrics['exact_matches']) for metrics in similarity],
+            'hierarchical_matches': [', '.join(metrics['hierarchical_matches']) for metrics in similarity],
+            'match_quality': [comparison['match_quality'] for comparison in comparisons],
+            'adjustments_applied': ['; '.join(result['adjustments_applied']) for result in v42],
+            'version': 'V4.2_Clinical_Intelligent'
+        }
         
         results_df = pd.DataFrame(v42_results)
         
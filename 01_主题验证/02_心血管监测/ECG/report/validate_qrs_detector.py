@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+R峰检测器准确性验证
+使用 abdominal-and-direct-fetal-ecg-database 中人工校验的 .qrs 标注:
+- 对每条记录的直接胎儿导联(Direct)检测R峰，按容差窗口计算灵敏度/阳性预测值
+- 与旧版逐采样点循环实现对比检测结果是否一致及耗时
+- 全部通道一次性检测(二维模式)的耗时
+"""
+
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+from scipy import signal
+
+from enhanced_ecg_analyzer_v4 import detect_r_peaks_multilead
+
+DEFAULT_DB_DIR = Path(__file__).resolve().parent.parent / 'abdominal-and-direct-fetal-ecg-database-1.0.0'
+
+
+def read_edf_signals(edf_path):
+    """读取EDF文件，返回 (通道名列表, 采样率列表, 物理信号列表)"""
+    with open(edf_path, 'rb') as f:
+        header = f.read(256)
+        num_signals = int(header[252:256])
+        num_records = int(header[236:244])
+        record_duration = float(header[244:252])
+        signal_header = f.read(256 * num_signals)
+
+    def field(offset, width):
+        return [signal_header[offset + i * width: offset + (i + 1) * width].decode('ascii').strip()
+                for i in range(num_signals)]
+
+    labels = field(0, 16)
+    offset = 16 * num_signals + 80 * num_signals + 8 * num_signals
+    phys_min = np.array(field(offset, 8), dtype=float)
+    phys_max = np.array(field(offset + 8 * num_signals, 8), dtype=float)
+    dig_min = np.array(field(offset + 16 * num_signals, 8), dtype=float)
+    dig_max = np.array(field(offset + 24 * num_signals, 8), dtype=float)
+    samples_per_record = np.array(field(offset + 32 * num_signals + 80 * num_signals, 8), dtype=int)
+
+    data = np.memmap(edf_path, dtype='<i2', mode='r', offset=256 * (num_signals + 1),
+                     shape=(num_records, int(samples_per_record.sum())))
+    bounds = np.concatenate([[0], np.cumsum(samples_per_record)])
+    scale = (phys_max - phys_min) / (dig_max - dig_min)
+
+    signals = [(data[:, bounds[i]:bounds[i + 1]].reshape(-1) - dig_min[i]) * scale[i] + phys_min[i]
+               for i in range(num_signals)]
+    sampling_rates = (samples_per_record / record_duration).tolist()
+    return labels, sampling_rates, signals
+
+
+def read_wfdb_annotations(annotation_path):
+    """解码WFDB标准格式(MIT)注释文件，返回心搏标注的采样点位置"""
+    words = np.fromfile(annotation_path, dtype='<u2')
+    positions = []
+    time_index = 0
+    i = 0
+    while i < len(words):
+        code, interval = int(words[i]) >> 10, int(words[i]) & 0x3FF
+        i += 1
+        if code == 0 and interval == 0:
+            break
+        if code == 59:  # SKIP: 后续两个字为32位间隔 (高16位在前)
+            time_index += (int(words[i]) << 16) | int(words[i + 1])
+            if time_index >= 1 << 31:
+                time_index -= 1 << 32
+            i += 2
+        elif code == 63:  # AUX: 跳过附加字节 (按字对齐)
+            i += (interval + 1) // 2
+        elif code in (60, 61, 62):  # NUM / SUB / CHN
+            continue
+        else:
+            time_index += interval
+            positions.append(time_index)
+    return np.array(positions, dtype=int)
+
+
+def legacy_r_peak_detection(ecg_signal, sampling_rate):
+    """旧版逐采样点循环实现，仅用于对比"""
+    nyquist = sampling_rate / 2
+    b, a = signal.butter(4, [5 / nyquist, 15 / nyquist], btype='band')
+    filtered_signal = signal.filtfilt(b, a, ecg_signal)
+    squared_signal = np.diff(filtered_signal) ** 2
+    window_size = int(sampling_rate * 0.08)
+    integrated_signal = np.convolve(squared_signal, np.ones(window_size), mode='same')
+    threshold = np.mean(integrated_signal) + 2 * np.std(integrated_signal)
+
+    peaks = []
+    min_distance = int(sampling_rate * 0.4)
+    for i in range(min_distance, len(integrated_signal) - min_distance):
+        if (integrated_signal[i] > threshold and
+                integrated_signal[i] == np.max(integrated_signal[i - min_distance // 2:i + min_distance // 2])):
+            search_window = slice(max(0, i - 20), min(len(ecg_signal), i + 20))
+            local_peak = i - 20 + np.argmax(np.abs(ecg_signal[search_window]))
+            if not peaks or (local_peak - peaks[-1]) >= min_distance:
+                peaks.append(local_peak)
+    return peaks
+
+
+def match_peaks(detected, reference, tolerance):
+    """容差窗口内一对一匹配，返回 (TP, FP, FN)"""
+    detected = np.asarray(detected, dtype=int)
+    if len(detected) == 0 or len(reference) == 0:
+        return 0, len(detected), len(reference)
+    idx = np.clip(np.searchsorted(detected, reference), 1, len(detected) - 1)
+    nearest = np.where(np.abs(detected[idx - 1] - reference) <= np.abs(detected[idx] - reference),
+                       idx - 1, idx)
+    hits = np.abs(detected[nearest] - reference) <= tolerance
+    true_positive = len(np.unique(nearest[hits]))
+    return true_positive, len(detected) - true_positive, len(reference) - true_positive
+
+
+def validate(db_dir, tolerance_ms=50.0, compare_legacy=True):
+    """逐条记录验证并打印汇总"""
+    db_dir = Path(db_dir)
+    records = (db_dir / 'RECORDS').read_text().split()
+    totals = np.zeros(3, dtype=int)
+    legacy_time = vector_time = multilead_time = 0.0
+    all_identical = True
+
+    print(f"📊 R峰检测验证 (容差 ±{tolerance_ms:g}ms, 数据: {db_dir.name})")
+    for record in records:
+        labels, sampling_rates, signals = read_edf_signals(db_dir / record)
+        direct = next(i for i, label in enumerate(labels) if label.lower().startswith('direct'))
+        fs = sampling_rates[direct]
+        reference = read_wfdb_annotations(db_dir / f"{record}.qrs")
+
+        start = time.perf_counter()
+        peaks = detect_r_peaks_multilead(signals[direct], fs)
+        vector_time += time.perf_counter() - start
+
+        ecg_channels = [i for i, rate in enumerate(sampling_rates) if rate == fs]
+        start = time.perf_counter()
+        detect_r_peaks_multilead(np.column_stack([signals[i] for i in ecg_channels]), fs)
+        multilead_time += time.perf_counter() - start
+
+        if compare_legacy:
+            start = time.perf_counter()
+            legacy_peaks = legacy_r_peak_detection(signals[direct], fs)
+            legacy_time += time.perf_counter() - start
+            identical = [int(p) for p in legacy_peaks] == peaks
+            all_identical &= identical
+
+        tp, fp, fn = match_peaks(peaks, reference, int(round(tolerance_ms / 1000 * fs)))
+        totals += (tp, fp, fn)
+        sensitivity = tp / (tp + fn) * 100 if tp + fn else 0
+        ppv = tp / (tp + fp) * 100 if tp + fp else 0
+        status = '' if not compare_legacy else ('  与旧版一致' if identical else '  ⚠️ 与旧版不一致')
+        print(f"   {record}: 标注 {len(reference)}, 检出 {len(peaks)}, Se {sensitivity:5.1f}%, +P {ppv:5.1f}%{status}")
+
+    tp, fp, fn = totals
+    print(f"   总计: Se {tp / max(tp + fn, 1) * 100:.1f}%, +P {tp / max(tp + fp, 1) * 100:.1f}%")
+    print(f"   向量化(单导联) 耗时 {vector_time:.3f}s, 全通道二维模式 {multilead_time:.3f}s")
+    if compare_legacy:
+        print(f"   旧版循环实现 耗时 {legacy_time:.3f}s, 加速 {legacy_time / vector_time:.1f}x, "
+              f"结果{'完全一致' if all_identical else '存在差异'}")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='R峰检测器准确性验证')
+    parser.add_argument('--db_dir', default=str(DEFAULT_DB_DIR), help='胎儿ECG数据库目录')
+    parser.add_argument('--tolerance', type=float, default=50.0, help='匹配容差(毫秒)')
+    parser.add_argument('--skip_legacy', action='store_true', help='不运行旧版实现对比')
+    args = parser.parse_args()
+
+    validate(args.db_dir, args.tolerance, not args.skip_legacy)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vectorized CGM analytics for a whole patient cohort.
+
+All readings of a cohort are concatenated into flat NumPy arrays (sorted by
+patient, then timestamp) so summary metrics and abnormal-pattern detection
+run as grouped reductions (``np.bincount`` / ``ufunc.reduceat``) instead of
+one pandas pass per patient and per day. Metric definitions and thresholds
+follow the ZSHMC v3 report generator so the results can be dropped into its
+analysis payload unchanged.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping
+
+import numpy as np
+import pandas as pd
+from scipy import signal
+
+MMOL_TO_MGDL = 18.018
+
+# Hour windows used by the pattern detectors (inclusive, as ``Series.between``)
+DAWN_EARLY_HOURS = (4, 6)
+DAWN_NIGHT_HOURS = (2, 4)
+NOCTURNAL_HOURS = (0, 6)
+POSTPRANDIAL_HOURS = tuple(range(10, 14)) + tuple(range(18, 22))
+
+# Six daily periods as [start, end) hours
+DAY_PERIODS = {
+    "夜间时段 (00:00-06:00)": (0, 6),
+    "晨起时段 (06:00-09:00)": (6, 9),
+    "上午时段 (09:00-12:00)": (9, 12),
+    "下午时段 (12:00-18:00)": (12, 18),
+    "晚间时段 (18:00-22:00)": (18, 22),
+    "睡前时段 (22:00-00:00)": (22, 24),
+}
+
+
+@dataclass
+class CohortReadings:
+    """Flat, patient-grouped CGM readings for a cohort."""
+
+    patient_ids: List[str]
+    codes: np.ndarray          # patient index of every reading
+    glucose: np.ndarray        # mmol/L
+    timestamps: np.ndarray     # datetime64[ns]
+    hours: np.ndarray
+    days: np.ndarray           # datetime64[D]
+    starts: np.ndarray         # first reading of each patient
+    counts: np.ndarray         # readings per patient
+    empty_patients: List[str]  # patients without any valid reading
+
+    @classmethod
+    def from_frames(cls, frames: Mapping[str, pd.DataFrame]) -> "CohortReadings":
+        """
+        Build from ``{patient_id: DataFrame(timestamp, glucose_value)}``.
+        Rows without a glucose value are dropped; patients left with no
+        readings are listed in ``empty_patients`` instead of being analysed.
+        """
+        patient_ids: List[str] = []
+        empty_patients: List[str] = []
+        glucose_parts, time_parts = [], []
+        for patient_id, df in frames.items():
+            glucose = df["glucose_value"].to_numpy(dtype=float)
+            valid = ~np.isnan(glucose)
+            if not valid.any():
+                empty_patients.append(patient_id)
+                continue
+            timestamps = df["timestamp"]
+            if not pd.api.types.is_datetime64_any_dtype(timestamps):
+                timestamps = pd.to_datetime(timestamps)
+            patient_ids.append(patient_id)
+            glucose_parts.append(glucose[valid])
+            time_parts.append(timestamps.to_numpy(dtype="datetime64[ns]")[valid])
+
+        counts = np.array([len(part) for part in glucose_parts], dtype=np.int64)
+        codes = np.repeat(np.arange(len(patient_ids)), counts)
+        glucose = np.concatenate(glucose_parts) if glucose_parts else np.empty(0)
+        timestamps = (
+            np.concatenate(time_parts) if time_parts else np.empty(0, dtype="datetime64[ns]")
+        )
+
+        order = np.lexsort((timestamps, codes))
+        glucose, timestamps = glucose[order], timestamps[order]
+        days = timestamps.astype("datetime64[D]")
+        hours = ((timestamps - days) // np.timedelta64(1, "h")).astype(np.int64)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else counts
+
+        return cls(patient_ids, codes, glucose, timestamps, hours, days, starts, counts, empty_patients)
+
+    def __len__(self) -> int:
+        return len(self.patient_ids)
+
+    def patient_values(self, index: int) -> np.ndarray:
+        start = self.starts[index]
+        return self.glucose[start:start + self.counts[index]]
+
+
+def _group_sum(readings: CohortReadings, weights: np.ndarray) -> np.ndarray:
+    return np.bincount(readings.codes, weights=weights, minlength=len(readings))
+
+
+def _percent(readings: CohortReadings, mask: np.ndarray) -> np.ndarray:
+    return _group_sum(readings, mask) / readings.counts * 100
+
+
+def _segment_auc(readings: CohortReadings, mask: np.ndarray) -> np.ndarray:
+    """Unit-spaced trapezoid area divided by the point count, per patient subset."""
+    index = np.flatnonzero(mask)
+    codes = readings.codes[index]
+    patients = np.arange(len(readings))
+    counts = np.bincount(codes, minlength=len(readings))
+    totals = np.bincount(codes, weights=readings.glucose[index], minlength=len(readings))
+
+    auc = np.zeros(len(readings))
+    present = counts >= 2
+    if present.any():
+        first = index[np.searchsorted(codes, patients[present], side="left")]
+        last = index[np.searchsorted(codes, patients[present], side="right") - 1]
+        ends = (readings.glucose[first] + readings.glucose[last]) / 2
+        auc[present] = (totals[present] - ends) / counts[present]
+    return auc
+
+
+def _group_percentile(readings: CohortReadings, sorted_glucose: np.ndarray, q: float) -> np.ndarray:
+    """Linear-interpolated percentile per patient on readings pre-sorted within each patient."""
+    position = (readings.counts - 1) * q / 100.0
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, readings.counts - 1)
+    low_values = sorted_glucose[readings.starts + lower]
+    high_values = sorted_glucose[readings.starts + upper]
+    return low_values + (position - lower) * (high_values - low_values)
+
+
+def _mage(glucose_values: np.ndarray) -> float:
+    """Mean amplitude of excursions larger than one SD between adjacent extrema."""
+    if len(glucose_values) < 10:
+        return 0.0
+    sd = np.std(glucose_values)
+    peaks, _ = signal.find_peaks(glucose_values, distance=4)
+    troughs, _ = signal.find_peaks(-glucose_values, distance=4)
+    extrema = np.sort(np.concatenate((peaks, troughs)))
+    if len(extrema) < 2:
+        return 0.0
+    excursions = np.abs(np.diff(glucose_values[extrema]))
+    excursions = excursions[excursions > sd]
+    return float(round(excursions.mean(), 2)) if len(excursions) else 0.0
+
+
+def cohort_summary_metrics(readings: CohortReadings) -> Dict[str, Dict]:
+    """Summary metrics per patient (same keys as the v3 generator's ``summary_metrics``)."""
+    glucose, codes, n = readings.glucose, readings.codes, readings.counts
+    mean = _group_sum(readings, glucose) / n
+    std = np.sqrt(_group_sum(readings, (glucose - mean[codes]) ** 2) / n)
+    gmi = 3.31 + 0.02392 * mean * MMOL_TO_MGDL
+    cv = std / mean * 100
+
+    tir = _percent(readings, (glucose >= 3.9) & (glucose <= 10.0))
+    tar_level1 = _percent(readings, (glucose > 10.0) & (glucose <= 13.9))
+    tar_level2 = _percent(readings, glucose > 13.9)
+    tbr_level1 = _percent(readings, (glucose >= 3.0) & (glucose < 3.9))
+    tbr_level2 = _percent(readings, glucose < 3.0)
+
+    daytime = (readings.hours >= 6) & (readings.hours < 22)
+    auc_day = _segment_auc(readings, daytime)
+    auc_night = _segment_auc(readings, ~daytime)
+    auc_all = _segment_auc(readings, np.ones(len(glucose), dtype=bool))
+
+    sorted_glucose = glucose[np.lexsort((glucose, codes))]
+    iqr = _group_percentile(readings, sorted_glucose, 75) - _group_percentile(readings, sorted_glucose, 25)
+
+    symmetric = 1.509 * (np.log(glucose * MMOL_TO_MGDL) ** 1.084 - 5.381)
+    risk = 10 * symmetric ** 2
+    lbgi = _group_sum(readings, risk * (symmetric < 0)) / n
+    hbgi = _group_sum(readings, risk * (symmetric > 0)) / n
+
+    patient_days = np.unique(codes * np.int64(1 << 32) + readings.days.astype(np.int64)) >> 32
+    monitoring_days = np.bincount(patient_days, minlength=len(readings))
+
+    metrics = {}
+    for i, patient_id in enumerate(readings.patient_ids):
+        metrics[patient_id] = {
+            "mean_glucose": float(mean[i]),
+            "gmi": float(gmi[i]),
+            "cv": float(cv[i]),
+            "std": float(std[i]),
+            "tir": float(tir[i]),
+            "tar": float(tar_level1[i] + tar_level2[i]),
+            "tar_level1": float(tar_level1[i]),
+            "tar_level2": float(tar_level2[i]),
+            "tbr": float(tbr_level1[i] + tbr_level2[i]),
+            "tbr_level1": float(tbr_level1[i]),
+            "tbr_level2": float(tbr_level2[i]),
+            "monitoring_days": int(monitoring_days[i]),
+            "total_points": int(n[i]),
+            "mage": _mage(readings.patient_values(i)),
+            "auc_day": float(round(auc_day[i], 1)),
+            "auc_night": float(round(auc_night[i], 1)),
+            "auc_all": float(round(auc_all[i], 1)),
+            "iqr": float(round(iqr[i], 1)),
+            "lbgi": float(round(lbgi[i], 2)),
+            "hbgi": float(round(hbgi[i], 2)),
+        }
+    return metrics
+
+
+def _grouped_glucose_stats(readings: CohortReadings, groups: np.ndarray, group_count: int) -> Dict[str, np.ndarray]:
+    """Per (patient, group) count, mean, population std and TIR/TAR/TBR shares."""
+    glucose = readings.glucose
+    key = readings.codes * group_count + groups
+    size = len(readings) * group_count
+
+    def reduce(weights):
+        return np.bincount(key, weights=weights, minlength=size).reshape(len(readings), group_count)
+
+    count = reduce(None)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = reduce(glucose) / count
+        std = np.sqrt(reduce((glucose - mean.ravel()[key]) ** 2) / count)
+        return {
+            "count": count,
+            "mean": mean,
+            "std": std,
+            "tir": reduce((glucose >= 3.9) & (glucose <= 10.0)) / count * 100,
+            "tar": reduce(glucose > 10.0) / count * 100,
+            "tbr": reduce(glucose < 3.9) / count * 100,
+        }
+
+
+def _period_result(mean_glucose: float, tir: float, tar: float, tbr: float) -> Dict:
+    problems, suggestions = [], []
+    if mean_glucose > 11.0:
+        problems.append("平均血糖偏高")
+        suggestions.append("需要优化该时段的血糖控制")
+    if tir < 50:
+        problems.append("目标范围内时间不足")
+        suggestions.append("调整饮食或用药时间")
+    if tar > 40:
+        problems.append("高血糖时间过长")
+        suggestions.append("考虑增加运动或调整用药")
+    if tbr > 5:
+        problems.append("低血糖风险偏高")
+        suggestions.append("避免过度降糖，监测血糖变化")
+    if not problems:
+        problems.append("控制良好")
+        suggestions.append("继续保持")
+    return {
+        "mean_glucose": float(round(mean_glucose, 1)),
+        "tir": float(round(tir, 1)),
+        "tar": float(round(tar, 1)),
+        "tbr": float(round(tbr, 1)),
+        "main_problems": problems,
+        "suggestions": suggestions
+    }
+
+
+def cohort_period_analysis(readings: CohortReadings) -> Dict[str, Dict]:
+    """Six-period analysis per patient (``period_details`` plus TIR ``ranking``)."""
+    names = list(DAY_PERIODS)
+    bounds = np.array([start for start, _ in DAY_PERIODS.values()])
+    periods = np.searchsorted(bounds, readings.hours, side="right") - 1
+    stats = _grouped_glucose_stats(readings, periods, len(names))
+
+    analysis = {}
+    for i, patient_id in enumerate(readings.patient_ids):
+        details = {
+            name: _period_result(stats["mean"][i, j], stats["tir"][i, j], stats["tar"][i, j], stats["tbr"][i, j])
+            for j, name in enumerate(names)
+            if stats["count"][i, j] > 0
+        }
+        ranking = sorted(details.items(), key=lambda item: item[1]["tir"], reverse=True)
+        analysis[patient_id] = {"period_details": details, "ranking": [name for name, _ in ranking]}
+    return analysis
+
+
+def _weekday_weekend_suggestions(tir_diff: float) -> List[str]:
+    if tir_diff < -5:
+        return [
+            "保持周末作息规律，避免晚睡晚起",
+            "控制周末聚餐和零食摄入",
+            "增加周末户外活动和运动",
+            "监测周末血糖变化，及时调整"
+        ]
+    if tir_diff > 5:
+        return [
+            "注意工作日压力管理",
+            "规律进餐，避免工作忙碌而延迟用餐",
+            "工作间隙适当活动",
+            "保证充足睡眠"
+        ]
+    return ["继续保持良好的血糖管理习惯"]
+
+
+def cohort_weekday_weekend(readings: CohortReadings) -> Dict[str, Dict]:
+    """Weekday (Mon-Fri) versus weekend comparison per patient."""
+    weekday = (readings.days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    stats = _grouped_glucose_stats(readings, (weekday >= 5).astype(np.int64), 2)
+
+    comparison = {}
+    for i, patient_id in enumerate(readings.patient_ids):
+        if not stats["count"][i].all():
+            comparison[patient_id] = {"available": False}
+            continue
+        weekday_metrics, weekend_metrics = (
+            {
+                "mean_glucose": float(round(stats["mean"][i, j], 1)),
+                "tir": float(round(stats["tir"][i, j], 1)),
+                "cv": float(round(stats["std"][i, j] / stats["mean"][i, j] * 100, 1)),
+                "std": float(round(stats["std"][i, j], 1)),
+            }
+            for j in (0, 1)
+        )
+        tir_diff = weekend_metrics["tir"] - weekday_metrics["tir"]
+        mean_diff = weekend_metrics["mean_glucose"] - weekday_metrics["mean_glucose"]
+
+        if abs(tir_diff) < 5:
+            analysis = ["工作日与周末血糖控制相似"]
+        elif tir_diff < -5:
+            analysis = [f"周末血糖控制比工作日差{abs(tir_diff):.1f}个百分点",
+                        "可能原因：饮食时间不规律、运动减少、作息改变"]
+        else:
+            analysis = [f"周末血糖控制比工作日好{tir_diff:.1f}个百分点",
+                        "可能原因：工作日压力影响血糖"]
+
+        comparison[patient_id] = {
+            "available": True,
+            "weekday": weekday_metrics,
+            "weekend": weekend_metrics,
+            "difference": {
+                "tir_diff": float(round(np.float64(tir_diff), 1)),
+                "mean_diff": float(round(np.float64(mean_diff), 1)),
+            },
+            "analysis": analysis,
+            "suggestions": _weekday_weekend_suggestions(tir_diff),
+        }
+    return comparison
+
+
+def _hour_between(hours: np.ndarray, window) -> np.ndarray:
+    return (hours >= window[0]) & (hours <= window[1])
+
+
+def _day_groups(readings: CohortReadings):
+    """(patient, day) group id of every reading and the patient of every group."""
+    keys = readings.codes * np.int64(1 << 32) + readings.days.astype(np.int64)
+    group_keys, group_ids = np.unique(keys, return_inverse=True)
+    return group_ids, (group_keys >> 32).astype(np.int64), readings.days[np.searchsorted(keys, group_keys)]
+
+
+def _dawn_phenomenon(occurrence_days: int, total_days: int, avg_magnitude: float) -> Dict:
+    detection_rate = (occurrence_days / total_days * 100) if total_days > 0 else 0
+    return {
+        "detected": occurrence_days > 0,
+        "detection_rate": round(detection_rate, 1),
+        "occurrence_days": occurrence_days,
+        "avg_magnitude": float(round(avg_magnitude, 1)),
+        "severity": "明显" if detection_rate > 50 else ("轻度" if detection_rate > 20 else "偶发"),
+        "suggestions": [
+            "调整晚餐时间和内容，减少碳水化合物",
+            "考虑调整晚间用药时间",
+            "监测凌晨血糖变化"
+        ] if occurrence_days > 0 else []
+    }
+
+
+def _nocturnal_hypoglycemia(events: List[Dict]) -> Dict:
+    return {
+        "detected": len(events) > 0,
+        "frequency": len(events),
+        "events": events[:3],
+        "min_value": round(min(e["min_value"] for e in events), 1) if events else None,
+        "risk_level": "高" if len(events) > 3 else ("中" if len(events) > 0 else "低"),
+        "suggestions": [
+            "监测睡前血糖，<6.0 mmol/L时适当补充",
+            "调整晚间用药剂量",
+            "避免睡前剧烈运动",
+            "设置CGM低血糖报警"
+        ] if events else []
+    }
+
+
+def _postprandial_hyperglycemia(hyper_events: int, total_points: int,
+                                peak_min: float, peak_max: float) -> Dict:
+    if total_points == 0:
+        return {"detected": False}
+    hyper_rate = np.float64(hyper_events) / total_points * 100
+    return {
+        "detected": hyper_events > 0,
+        "frequency": hyper_events,
+        "rate": float(round(hyper_rate, 1)),
+        "peak_range": f"{peak_min:.1f}-{peak_max:.1f}" if hyper_events > 0 else "N/A",
+        "severity": "严重" if hyper_rate > 20 else ("中等" if hyper_rate > 10 else "轻度"),
+        "suggestions": [
+            "餐前30分钟用药",
+            "控制碳水化合物摄入量",
+            "餐后30-60分钟适度活动",
+            "考虑使用速效胰岛素"
+        ] if hyper_events > 0 else []
+    }
+
+
+def cohort_patterns(readings: CohortReadings) -> Dict[str, Dict]:
+    """
+    Abnormal glucose patterns per patient (dawn phenomenon, nocturnal
+    hypoglycaemia, postprandial hyperglycaemia), shaped like the ``patterns``
+    entry of the v3 generator's ``_detect_abnormal_patterns``.
+    """
+    k = len(readings)
+    glucose, hours, codes = readings.glucose, readings.hours, readings.codes
+    group_ids, group_patients, group_days = _day_groups(readings)
+    group_count = len(group_patients)
+
+    def day_mean(mask):
+        counts = np.bincount(group_ids[mask], minlength=group_count)
+        totals = np.bincount(group_ids[mask], weights=glucose[mask], minlength=group_count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return totals / counts, counts > 0
+
+    # Dawn phenomenon: days whose 4-6h mean exceeds the 2-4h mean by >1.1 mmol/L
+    early, has_early = day_mean(_hour_between(hours, DAWN_EARLY_HOURS))
+    night, has_night = day_mean(_hour_between(hours, DAWN_NIGHT_HOURS))
+    rise = np.where(has_early & has_night, early - night, 0.0)
+    dawn_day = rise > 1.1
+    dawn_days = np.bincount(group_patients, weights=dawn_day, minlength=k).astype(np.int64)
+    dawn_rise = np.bincount(group_patients, weights=rise * dawn_day, minlength=k)
+    total_days = np.bincount(group_patients, minlength=k)
+
+    # Nocturnal hypoglycaemia: nightly (0-6h) minimum <3.9 mmol/L, timed at its first occurrence
+    night_index = np.flatnonzero(_hour_between(hours, NOCTURNAL_HOURS))
+    night_groups = group_ids[night_index]
+    segment_starts = np.flatnonzero(np.r_[True, np.diff(night_groups) != 0])
+    events_by_patient: List[List[Dict]] = [[] for _ in range(k)]
+    if len(night_index):
+        segment_min = np.minimum.reduceat(glucose[night_index], segment_starts)
+        segment_of_row = np.cumsum(np.r_[True, np.diff(night_groups) != 0]) - 1
+        at_min = np.flatnonzero(glucose[night_index] == segment_min[segment_of_row])
+        _, first_hit = np.unique(segment_of_row[at_min], return_index=True)
+        first_min_rows = night_index[at_min[first_hit]]
+        hypo = np.flatnonzero(segment_min < 3.9)
+        if len(hypo):
+            times = pd.DatetimeIndex(readings.timestamps[first_min_rows[hypo]]).strftime("%H:%M")
+            for segment, time_text in zip(hypo, times):
+                group = night_groups[segment_starts[segment]]
+                events_by_patient[group_patients[group]].append({
+                    "date": str(group_days[group]),
+                    "min_value": float(round(segment_min[segment], 1)),
+                    "time": time_text
+                })
+
+    # Postprandial hyperglycaemia: readings >13.9 mmol/L within the meal windows
+    postprandial = np.isin(hours, POSTPRANDIAL_HOURS)
+    hyper = postprandial & (glucose > 13.9)
+    postprandial_points = np.bincount(codes[postprandial], minlength=k)
+    hyper_events = np.bincount(codes[hyper], minlength=k)
+    peak_min = np.full(k, np.inf)
+    peak_max = np.full(k, -np.inf)
+    np.minimum.at(peak_min, codes[hyper], glucose[hyper])
+    np.maximum.at(peak_max, codes[hyper], glucose[hyper])
+
+    patterns = {}
+    for i, patient_id in enumerate(readings.patient_ids):
+        dawn_magnitude = dawn_rise[i] / dawn_days[i] if dawn_days[i] else 0
+        patterns[patient_id] = {
+            "dawn_phenomenon": _dawn_phenomenon(int(dawn_days[i]), int(total_days[i]), dawn_magnitude),
+            "nocturnal_hypoglycemia": _nocturnal_hypoglycemia(events_by_patient[i]),
+            "postprandial_hyperglycemia": _postprandial_hyperglycemia(
+                int(hyper_events[i]), int(postprandial_points[i]), float(peak_min[i]), float(peak_max[i])
+            ),
+        }
+    return patterns
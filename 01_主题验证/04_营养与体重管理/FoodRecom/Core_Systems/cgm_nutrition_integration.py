@@ -11,11 +11,21 @@ from typing import Dict, List, Tuple, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from .glucose_sensitivity_model import GlucoseSensitivityModel, GlucoseSensitivityStore
+except ImportError:
+    from glucose_sensitivity_model import GlucoseSensitivityModel, GlucoseSensitivityStore
+
 class CGMNutritionIntegration:
     """CGM数据与营养推荐系统集成"""
 
-    def __init__(self):
-        """初始化CGM-营养集成系统"""
+    def __init__(self, sensitivity_store_dir: Optional[str] = None):
+        """
+        初始化CGM-营养集成系统
+        sensitivity_store_dir: 可选的血糖敏感性模型存储目录；指定后每位患者的增量模型持久化到本地
+        """
+        self.sensitivity_store = GlucoseSensitivityStore(sensitivity_store_dir) if sensitivity_store_dir else None
+
         # CGM血糖目标范围
         self.glucose_targets = {
             'fasting': {'target': 5.1, 'max': 6.1},      # 空腹血糖
@@ -54,49 +64,46 @@ class CGMNutritionIntegration:
             餐后血糖反应分析结果
         """
         try:
-            # 提取餐前餐后数据
-            pre_meal_window = meal_time - timedelta(minutes=30)
-            post_meal_2h = meal_time + timedelta(hours=2)
-            post_meal_4h = meal_time + timedelta(hours=4)
-
-            # 获取相关时间段数据
-            pre_meal_data = cgm_data[
-                (cgm_data['timestamp'] >= pre_meal_window) &
-                (cgm_data['timestamp'] <= meal_time)
-            ]
-
-            post_meal_data = cgm_data[
-                (cgm_data['timestamp'] > meal_time) &
-                (cgm_data['timestamp'] <= post_meal_4h)
-            ]
+            return self.analyze_meal_glucose_responses(cgm_data, [meal_time], [meal_composition])[0]
+        except Exception as e:
+            return {'error': f'分析失败: {str(e)}'}
 
-            if pre_meal_data.empty or post_meal_data.empty:
-                return {'error': '数据不足，无法分析'}
+    def analyze_meal_glucose_responses(self, cgm_data: pd.DataFrame,
+                                       meal_times: List[datetime],
+                                       meal_compositions: List[Dict]) -> List[Dict]:
+        """
+        批量分析多餐的血糖反应 (指标一次向量化计算，结果格式同 analyze_meal_glucose_response)
 
-            # 计算关键指标
-            baseline_glucose = pre_meal_data['glucose'].mean()
-            peak_glucose = post_meal_data['glucose'].max()
-            peak_time = post_meal_data.loc[post_meal_data['glucose'].idxmax(), 'timestamp']
+        Args:
+            cgm_data: CGM数据 (包含时间戳和血糖值)
+            meal_times: 各餐用餐时间
+            meal_compositions: 各餐餐食组成，与 meal_times 等长
 
-            # 餐后2小时血糖
-            post_2h_data = post_meal_data[
-                post_meal_data['timestamp'] <= post_meal_2h
-            ]
-            glucose_2h = post_2h_data['glucose'].iloc[-1] if not post_2h_data.empty else None
+        Returns:
+            每餐的分析结果列表；数据不足的餐次为 {'error': ...}
+        """
+        if len(meal_times) != len(meal_compositions):
+            raise ValueError(f"用餐时间与餐食组成数量不一致: {len(meal_times)} != {len(meal_compositions)}")
+
+        if not cgm_data['timestamp'].is_monotonic_increasing:
+            cgm_data = cgm_data.sort_values('timestamp', kind='stable')
+        metrics = self.meal_response_metrics(cgm_data['timestamp'].to_numpy(),
+                                             cgm_data['glucose'].to_numpy(), meal_times)
+
+        results = []
+        for i, meal_composition in enumerate(meal_compositions):
+            if not metrics['valid'][i]:
+                results.append({'error': '数据不足，无法分析'})
+                continue
+
+            baseline_glucose = metrics['baseline_glucose'][i]
+            peak_glucose = metrics['peak_glucose'][i]
+            glucose_2h = metrics['glucose_2h'][i] if metrics['has_2h'][i] else None
+            recovery_time = metrics['recovery_time'][i] if metrics['recovered'][i] else None
+            auc = metrics['auc'][i]
 
             # 血糖上升幅度
             glucose_excursion = peak_glucose - baseline_glucose
-            time_to_peak = (peak_time - meal_time).total_seconds() / 60  # 分钟
-
-            # 血糖回归时间
-            recovery_threshold = baseline_glucose + 1.0  # 回归到基线+1mmol/L
-            recovery_data = post_meal_data[post_meal_data['glucose'] <= recovery_threshold]
-            recovery_time = None
-            if not recovery_data.empty:
-                recovery_time = (recovery_data.iloc[0]['timestamp'] - meal_time).total_seconds() / 60
-
-            # 计算曲线下面积 (AUC)
-            auc = self._calculate_glucose_auc(post_meal_data, baseline_glucose)
 
             # 餐后血糖反应评级
             response_grade = self._grade_glucose_response(
@@ -109,36 +116,129 @@ class CGMNutritionIntegration:
                 glucose_excursion, expected_response
             )
 
-            return {
+            results.append({
                 'baseline_glucose': round(baseline_glucose, 1),
                 'peak_glucose': round(peak_glucose, 1),
                 'glucose_excursion': round(glucose_excursion, 1),
-                'time_to_peak': round(time_to_peak, 1),
+                'time_to_peak': round(float(metrics['time_to_peak'][i]), 1),
                 'glucose_2h': round(glucose_2h, 1) if glucose_2h else None,
-                'recovery_time': round(recovery_time, 1) if recovery_time else None,
+                'recovery_time': round(float(recovery_time), 1) if recovery_time else None,
                 'auc': round(auc, 1),
                 'response_grade': response_grade,
                 'expected_response': expected_response,
                 'response_match': response_match,
                 'meal_composition': meal_composition
-            }
+            })
 
-        except Exception as e:
-            return {'error': f'分析失败: {str(e)}'}
+        return results
 
-    def _calculate_glucose_auc(self, glucose_data: pd.DataFrame, baseline: float) -> float:
-        """计算血糖曲线下面积"""
-        if len(glucose_data) < 2:
-            return 0.0
+    @staticmethod
+    def meal_response_metrics(timestamps, glucose, meal_times) -> Dict[str, np.ndarray]:
+        """
+        多餐餐后血糖指标的向量化计算
+        在升序时间戳上用 np.searchsorted 定位各餐窗口，再按窗口分段归约:
+        - 餐前窗口 [用餐-30分钟, 用餐]：基线 = 均值 (忽略缺失值)
+        - 餐后窗口 (用餐, 用餐+4小时]：峰值、达峰时间、回归基线+1mmol/L 的时间、基线以上梯形AUC
+        - 餐后2小时值：(用餐, 用餐+2小时] 内最后一个读数
 
-        # 使用梯形积分计算AUC
-        times = [(t - glucose_data.iloc[0]['timestamp']).total_seconds() / 60
-                for t in glucose_data['timestamp']]
-        glucose_values = glucose_data['glucose'].values - baseline
-        glucose_values[glucose_values < 0] = 0  # 只考虑超过基线的部分
+        Args:
+            timestamps: 升序时间戳
+            glucose: 对应血糖值 (mmol/L)
+            meal_times: 各餐用餐时间
+
+        Returns:
+            与餐次等长的数组字典: valid, baseline_glucose, peak_glucose, time_to_peak (分钟),
+            has_2h, glucose_2h, recovered, recovery_time (分钟), auc (mmol/L·分钟)
+        """
+        minute = np.int64(60 * 10**9)
+        t = np.asarray(timestamps, dtype='datetime64[ns]').astype(np.int64)
+        g = np.asarray(glucose, dtype=float)
+        meals = np.asarray(meal_times, dtype='datetime64[ns]').astype(np.int64).reshape(-1)
+        if len(t) != len(g):
+            raise ValueError(f"时间戳与血糖值长度不一致: {len(t)} != {len(g)}")
+
+        pre_start = np.searchsorted(t, meals - 30 * minute, side='left')
+        post_start = np.searchsorted(t, meals, side='right')
+        post_2h = np.searchsorted(t, meals + 120 * minute, side='right')
+        post_end = np.searchsorted(t, meals + 240 * minute, side='right')
+        valid = (post_start > pre_start) & (post_end > post_start)
+
+        n_meals = len(meals)
+        metrics = {
+            'valid': valid,
+            'baseline_glucose': np.full(n_meals, np.nan),
+            'peak_glucose': np.full(n_meals, np.nan),
+            'time_to_peak': np.full(n_meals, np.nan),
+            'has_2h': valid & (post_2h > post_start),
+            'glucose_2h': np.full(n_meals, np.nan),
+            'recovered': np.zeros(n_meals, dtype=bool),
+            'recovery_time': np.full(n_meals, np.nan),
+            'auc': np.full(n_meals, np.nan)
+        }
 
-        auc = np.trapz(glucose_values, times)
-        return auc
+        # 餐前基线: 忽略缺失值的区间均值
+        # 按窗口长度分组逐行求和，求和顺序与逐餐 pandas .mean() 相同，舍入到0.1时结果一致
+        baseline = np.full(n_meals, np.nan)
+        pre_lengths = post_start - pre_start
+        for length in np.unique(pre_lengths[valid]):
+            rows = np.flatnonzero(valid & (pre_lengths == length))
+            window = g[pre_start[rows, None] + np.arange(length)]
+            observed = ~np.isnan(window)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                baseline[rows] = np.where(observed, window, 0.0).sum(axis=1) / observed.sum(axis=1)
+        metrics['baseline_glucose'][valid] = baseline[valid]
+
+        has_2h = metrics['has_2h']
+        metrics['glucose_2h'][has_2h] = g[post_2h[has_2h] - 1]
+
+        if not valid.any():
+            return metrics
+
+        # 各餐餐后窗口首尾相接展开为一维 (窗口可重叠)，分段起点为 offsets
+        starts, lengths = post_start[valid], (post_end - post_start)[valid]
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        total = int(lengths.sum())
+        positions = np.arange(total)
+        flat = np.repeat(starts - offsets, lengths) + positions
+        segment_t, segment_g = t[flat], g[flat]
+        meal_t = np.repeat(meals[valid], lengths)
+        meal_baseline = baseline[valid]
+        segment_baseline = np.repeat(meal_baseline, lengths)
+
+        def first_position(mask):
+            """各分段内首个满足条件的位置，无则为 total"""
+            return np.minimum.reduceat(np.where(mask, positions, total), offsets)
+
+        # 峰值 (忽略缺失值) 及首次达峰时间
+        peak = np.fmax.reduceat(segment_g, offsets)
+        peak_at = first_position(segment_g == np.repeat(peak, lengths))
+        found = peak_at < total
+        time_to_peak = np.full(len(starts), np.nan)
+        time_to_peak[found] = (segment_t[peak_at[found]] - meal_t[peak_at[found]]) / minute
+
+        # 首次回到基线+1mmol/L 以内
+        recovery_at = first_position(segment_g <= segment_baseline + 1.0)
+        recovered = recovery_at < total
+        recovery_time = np.full(len(starts), np.nan)
+        recovery_time[recovered] = (segment_t[recovery_at[recovered]] - meal_t[recovery_at[recovered]]) / minute
+
+        # 基线以上部分的梯形AUC (时间单位: 分钟，自窗口首个读数起算)
+        # 同样按窗口长度分组逐行积分，运算顺序与逐餐 np.trapz 一致
+        auc = np.zeros(len(starts))
+        for length in np.unique(lengths[lengths >= 2]):
+            rows = np.flatnonzero(lengths == length)
+            window = starts[rows, None] + np.arange(length)
+            times = (t[window] - t[window[:, :1]]) / minute
+            excess = g[window] - meal_baseline[rows, None]
+            excess[excess < 0] = 0
+            auc[rows] = (np.diff(times, axis=1) * (excess[:, 1:] + excess[:, :-1]) / 2.0).sum(axis=1)
+
+        metrics['peak_glucose'][valid] = peak
+        metrics['time_to_peak'][valid] = time_to_peak
+        metrics['recovered'][valid] = recovered
+        metrics['recovery_time'][valid] = recovery_time
+        metrics['auc'][valid] = auc
+        return metrics
 
     def _grade_glucose_response(self, excursion: float, glucose_2h: float,
                               baseline: float, auc: float) -> Dict:
@@ -254,11 +354,33 @@ class CGMNutritionIntegration:
             'suggestion': suggestion
         }
 
+    def load_sensitivity_model(self, patient_id: str) -> GlucoseSensitivityModel:
+        """
+        读取患者的血糖敏感性增量模型
+        未配置存储目录或 patient_id 为空 (未标识的患者) 时返回空模型，后者不会写入本地存储
+        """
+        if self.sensitivity_store is None or not patient_id:
+            return GlucoseSensitivityModel(patient_id)
+        return self.sensitivity_store.load(patient_id)
+
+    def record_meal_response(self, sensitivity_model: GlucoseSensitivityModel,
+                             analysis_result: Dict) -> bool:
+        """将一次餐后分析结果计入患者模型并保存 (未标识患者的模型只更新不保存)，返回是否已计入"""
+        if not sensitivity_model.update(analysis_result):
+            return False
+        if self.sensitivity_store is not None and sensitivity_model.patient_id:
+            try:
+                self.sensitivity_store.save(sensitivity_model)
+            except OSError as e:
+                print(f"⚠️ 血糖敏感性模型保存失败: {e}")
+        return True
+
     def generate_personalized_recommendations(self,
                                            cgm_history: List[Dict],
                                            current_glucose: float,
                                            next_meal_type: str,
-                                           patient_profile: Dict) -> Dict:
+                                           patient_profile: Dict,
+                                           sensitivity_model: Optional[GlucoseSensitivityModel] = None) -> Dict:
         """
         基于CGM历史数据生成个性化营养推荐
 
@@ -267,13 +389,17 @@ class CGMNutritionIntegration:
             current_glucose: 当前血糖值
             next_meal_type: 下一餐类型 (early_breakfast, lunch, dinner, snack)
             patient_profile: 患者档案
+            sensitivity_model: 患者的血糖敏感性增量模型；提供时直接使用其统计量，不再遍历 cgm_history
 
         Returns:
             个性化营养推荐方案
         """
         try:
             # 分析个体血糖反应模式
-            glucose_sensitivity = self._analyze_glucose_sensitivity(cgm_history)
+            if sensitivity_model is not None:
+                glucose_sensitivity = sensitivity_model.summary()
+            else:
+                glucose_sensitivity = self._analyze_glucose_sensitivity(cgm_history)
 
             # 当前血糖状态评估
             current_status = self._assess_current_glucose_status(
@@ -305,53 +431,7 @@ class CGMNutritionIntegration:
         """分析个体血糖敏感性"""
         if not cgm_history:
             return {'sensitivity_level': 'unknown', 'confidence': 0}
-
-        # 收集血糖反应数据
-        excursions = []
-        gi_values = []
-        gl_values = []
-
-        for record in cgm_history:
-            if 'glucose_excursion' in record and 'meal_composition' in record:
-                excursions.append(record['glucose_excursion'])
-                meal_comp = record['meal_composition']
-                gi_values.append(meal_comp.get('gi_total', 50))
-                gl_values.append(meal_comp.get('gl_total', 15))
-
-        if len(excursions) < 3:
-            return {'sensitivity_level': 'insufficient_data', 'confidence': 0}
-
-        # 计算敏感性指标
-        avg_excursion = np.mean(excursions)
-        excursion_variability = np.std(excursions)
-
-        # 计算GI/GL相关性
-        gi_correlation = np.corrcoef(gi_values, excursions)[0, 1] if len(gi_values) > 2 else 0
-        gl_correlation = np.corrcoef(gl_values, excursions)[0, 1] if len(gl_values) > 2 else 0
-
-        # 敏感性分级
-        if avg_excursion <= 2.0:
-            sensitivity_level = 'low'
-            sensitivity_desc = "血糖反应较平缓"
-        elif avg_excursion <= 3.5:
-            sensitivity_level = 'moderate'
-            sensitivity_desc = "血糖反应适中"
-        else:
-            sensitivity_level = 'high'
-            sensitivity_desc = "血糖反应较敏感"
-
-        confidence = min(len(excursions) / 10.0, 1.0)  # 最多10次记录达到100%置信度
-
-        return {
-            'sensitivity_level': sensitivity_level,
-            'sensitivity_desc': sensitivity_desc,
-            'avg_excursion': round(avg_excursion, 1),
-            'variability': round(excursion_variability, 1),
-            'gi_correlation': round(gi_correlation, 2),
-            'gl_correlation': round(gl_correlation, 2),
-            'confidence': round(confidence, 2),
-            'sample_size': len(excursions)
-        }
+        return GlucoseSensitivityModel.from_history(cgm_history).summary()
 
     def _assess_current_glucose_status(self, glucose: float, meal_type: str) -> Dict:
         """评估当前血糖状态"""
@@ -7,13 +7,26 @@ recommendations (FoodRecom).
 
 from __future__ import annotations
 
+import json
 import sys
+import time
+from collections import Counter
 from copy import deepcopy
+from dataclasses import dataclass, field
+from datetime import date
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
+from cgm_cohort_analysis import (
+    CohortReadings,
+    cohort_patterns,
+    cohort_period_analysis,
+    cohort_summary_metrics,
+    cohort_weekday_weekend,
+)
 from integration_models import (
     CGMInsights,
     CGMMetricSnapshot,
@@ -35,6 +48,59 @@ from zshmc_report.generator_v3 import ZSHMCReportGeneratorV3  # noqa: E402
 from integrated_nutrition_system_v2 import IntegratedNutritionSystemV2  # noqa: E402
 
 
+@dataclass
+class CohortRunMetrics:
+    """Throughput counters for a cohort run (stage timings in seconds)."""
+
+    patients: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    readings: int = 0
+    load_seconds: float = 0.0
+    cgm_seconds: float = 0.0
+    html_seconds: float = 0.0
+    nutrition_seconds: float = 0.0
+    write_seconds: float = 0.0
+    wall_seconds: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def patients_per_second(self) -> float:
+        return self.patients / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    @property
+    def readings_per_second(self) -> float:
+        return self.readings / self.cgm_seconds if self.cgm_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "patients": self.patients,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "readings": self.readings,
+            "load_seconds": round(self.load_seconds, 3),
+            "cgm_seconds": round(self.cgm_seconds, 3),
+            "html_seconds": round(self.html_seconds, 3),
+            "nutrition_seconds": round(self.nutrition_seconds, 3),
+            "write_seconds": round(self.write_seconds, 3),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "patients_per_second": round(self.patients_per_second, 2),
+            "readings_per_second": round(self.readings_per_second, 1),
+            "errors": dict(self.errors),
+        }
+
+
+def _json_default(value):
+    """JSON fallback for dates and NumPy scalars/arrays inside recommendations."""
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
 class IntegratedCGMNutritionPipeline:
     """High level orchestrator for CGM + nutrition workflows."""
 
@@ -57,7 +123,89 @@ class IntegratedCGMNutritionPipeline:
     # ------------------------------------------------------------------ #
     def run(self, context: IntegratedPatientContext) -> IntegratedRecommendation:
         """Execute the integrated pipeline and return combined outputs."""
-        cgm_insights = self._analyze_cgm(context)
+        return self._recommend(context, self._analyze_cgm(context))
+
+    def iter_cohort(
+        self,
+        contexts: Iterable[IntegratedPatientContext],
+        batch_size: int = 100,
+        write_html: bool = True,
+        metrics: Optional[CohortRunMetrics] = None,
+    ) -> Iterator[Tuple[IntegratedPatientContext, Optional[IntegratedRecommendation], Optional[str]]]:
+        """
+        Run the pipeline for many patients, yielding
+        ``(context, recommendation, error)`` as soon as each one is ready.
+
+        CGM metrics and abnormal patterns are computed for a whole batch in one
+        vectorized pass; the nutrition system and CGM generator are shared by
+        every patient. A failing patient yields an error message instead of
+        stopping the run. ``write_html=False`` skips the per-patient HTML CGM
+        report, which dominates CGM cost for large cohorts.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive: {batch_size}")
+        metrics = metrics if metrics is not None else CohortRunMetrics()
+
+        batch: List[IntegratedPatientContext] = []
+        for context in contexts:
+            batch.append(context)
+            if len(batch) == batch_size:
+                yield from self._run_batch(batch, write_html, metrics)
+                batch = []
+        if batch:
+            yield from self._run_batch(batch, write_html, metrics)
+
+    def run_cohort(
+        self,
+        contexts: Iterable[IntegratedPatientContext],
+        output_path: Path,
+        batch_size: int = 100,
+        write_html: bool = True,
+    ) -> CohortRunMetrics:
+        """
+        Run the pipeline for a cohort and stream one JSON line per patient to
+        ``output_path`` (``{"patient_id", "status", "recommendation"|"error"}``).
+        Each line is flushed once written, so partial results are readable
+        while the run is in progress. Returns throughput metrics.
+        """
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        metrics = CohortRunMetrics()
+        started = time.perf_counter()
+
+        with output_path.open("w", encoding="utf-8") as handle:
+            for context, recommendation, error in self.iter_cohort(
+                contexts, batch_size=batch_size, write_html=write_html, metrics=metrics
+            ):
+                write_started = time.perf_counter()
+                if error is None:
+                    record = {
+                        "patient_id": context.patient_id,
+                        "status": "ok",
+                        "recommendation": recommendation.to_dict(),
+                    }
+                else:
+                    record = {"patient_id": context.patient_id, "status": "error", "error": error}
+                handle.write(json.dumps(record, ensure_ascii=False, default=_json_default) + "\n")
+                handle.flush()
+                metrics.write_seconds += time.perf_counter() - write_started
+
+        metrics.wall_seconds = time.perf_counter() - started
+        print(
+            f"✅ Cohort finished: {metrics.succeeded}/{metrics.patients} patients, "
+            f"{metrics.patients_per_second:.2f} patients/s -> {output_path}"
+        )
+        if metrics.failed:
+            print(f"⚠️ {metrics.failed} patients failed, see error records in {output_path}")
+        return metrics
+
+    # ------------------------------------------------------------------ #
+    # Recommendation assembly
+    # ------------------------------------------------------------------ #
+    def _recommend(
+        self, context: IntegratedPatientContext, cgm_insights: CGMInsights
+    ) -> IntegratedRecommendation:
+        """Merge CGM insights with the nutrition assessment and build the report."""
         adjusted_assessment, guidance_notes = self._integrate_assessments(
             context, cgm_insights
         )
@@ -106,12 +254,134 @@ class IntegratedCGMNutritionPipeline:
             df, patient_info, medication_payload
         )
 
+        html_path = self._write_html_report(context, analysis, patient_info)
+        return self._build_insights(analysis, html_path)
+
+    def _run_batch(
+        self,
+        contexts: Sequence[IntegratedPatientContext],
+        write_html: bool,
+        metrics: CohortRunMetrics,
+    ) -> Iterator[Tuple[IntegratedPatientContext, Optional[IntegratedRecommendation], Optional[str]]]:
+        """
+        Vectorized CGM analysis for one batch, then per-patient nutrition.
+
+        Cohort results, frames and HTML reports are keyed by ``patient_id``, so
+        every record sharing an id with another record in the same batch is
+        rejected with an error record rather than analysed.
+        """
+        metrics.patients += len(contexts)
+        errors: Dict[str, str] = {}
+
+        id_counts = Counter(context.patient_id for context in contexts)
+        for patient_id, count in id_counts.items():
+            if count > 1:
+                errors[patient_id] = f"Duplicate patient_id in batch ({count} records)"
+
+        load_started = time.perf_counter()
+        frames: Dict[str, pd.DataFrame] = {}
+        for context in contexts:
+            if context.patient_id in errors:
+                continue
+            try:
+                frames[context.patient_id] = load_cgm_data(context.cgm_file)
+            except Exception as exc:  # noqa: BLE001 - one bad file must not stop the cohort
+                errors[context.patient_id] = f"CGM data load failed: {exc}"
+        metrics.load_seconds += time.perf_counter() - load_started
+
+        cgm_started = time.perf_counter()
+        readings = CohortReadings.from_frames(frames)
+        cohort = {
+            "summary_metrics": cohort_summary_metrics(readings),
+            "period_analysis": cohort_period_analysis(readings),
+            "weekday_weekend": cohort_weekday_weekend(readings),
+            "patterns": cohort_patterns(readings),
+        }
+        for patient_id in readings.empty_patients:
+            errors[patient_id] = "No valid CGM readings"
+        metrics.readings += len(readings.glucose)
+        metrics.cgm_seconds += time.perf_counter() - cgm_started
+
+        for context in contexts:
+            patient_id = context.patient_id
+            try:
+                if patient_id in errors:
+                    raise ValueError(errors[patient_id])
+
+                cgm_started = time.perf_counter()
+                analysis = self._assemble_analysis(
+                    frames[patient_id],
+                    {name: results[patient_id] for name, results in cohort.items()},
+                    context,
+                )
+                metrics.cgm_seconds += time.perf_counter() - cgm_started
+
+                html_path = None
+                if write_html:
+                    html_started = time.perf_counter()
+                    df = frames[patient_id]
+                    analysis["agp_profile"] = self.cgm_generator._calculate_agp_profile(df)
+                    analysis["daily_data"] = self.cgm_generator._calculate_daily_metrics(df)
+                    html_path = self._write_html_report(context, analysis, analysis["patient_info"])
+                    metrics.html_seconds += time.perf_counter() - html_started
+
+                nutrition_started = time.perf_counter()
+                recommendation = self._recommend(context, self._build_insights(analysis, html_path))
+                metrics.nutrition_seconds += time.perf_counter() - nutrition_started
+            except Exception as exc:  # noqa: BLE001 - reported per patient
+                metrics.failed += 1
+                metrics.errors[patient_id] = str(exc)
+                print(f"⚠️ Patient {patient_id} skipped: {exc}")
+                yield context, None, str(exc)
+                continue
+
+            metrics.succeeded += 1
+            yield context, recommendation, None
+
+    def _assemble_analysis(
+        self, df: pd.DataFrame, cohort_results: Dict, context: IntegratedPatientContext
+    ) -> Dict:
+        """
+        Complete cohort-computed CGM results into the generator's analysis
+        payload (risk level, medication overview and text assessment).
+        """
+        patient_info = self._compose_patient_info(context)
+        medication_payload = context.medications.to_dict()
+        summary_metrics = cohort_results["summary_metrics"]
+        period_analysis = cohort_results["period_analysis"]
+        pattern_payload = {
+            "patterns": cohort_results["patterns"],
+            "risk_assessment": self.cgm_generator._assess_risk_level(cohort_results["patterns"]),
+        }
+
+        return {
+            "summary_metrics": summary_metrics,
+            "period_analysis": period_analysis,
+            "weekday_weekend": cohort_results["weekday_weekend"],
+            "patterns": pattern_payload,
+            "medication_analysis": self.cgm_generator._analyze_medication_effect(
+                df, medication_payload
+            ),
+            "text_assessment": self.cgm_generator._generate_text_assessment(
+                summary_metrics, period_analysis, pattern_payload
+            ),
+            "patient_info": patient_info,
+            "medication_data": medication_payload,
+        }
+
+    def _write_html_report(
+        self, context: IntegratedPatientContext, analysis: Dict, patient_info: Dict
+    ) -> Path:
+        """Render and persist the HTML CGM report for one patient."""
         html_report = self.cgm_generator._generate_comprehensive_html(
             analysis, context.patient_id, patient_info
         )
         html_path = self.report_output_dir / f"CGM_Report_{context.patient_id}.html"
         html_path.write_text(html_report, encoding="utf-8")
+        return html_path
 
+    def _build_insights(self, analysis: Dict, html_path: Optional[Path]) -> CGMInsights:
+        """Map a CGM analysis payload onto the integration dataclasses."""
         summary = analysis["summary_metrics"]
         snapshot = CGMMetricSnapshot(
             mean_glucose=summary["mean_glucose"],
@@ -136,7 +406,7 @@ class IntegratedCGMNutritionPipeline:
             weekday_weekend=analysis["weekday_weekend"],
             medication_analysis=analysis["medication_analysis"],
             text_assessment=analysis["text_assessment"],
-            html_report_path=str(html_path),
+            html_report_path=str(html_path) if html_path is not None else None,
         )
 
     def _compose_patient_info(self, context: IntegratedPatientContext) -> Dict:
@@ -285,7 +555,9 @@ class IntegratedCGMNutritionPipeline:
             "### 🧭 系统建议",
             insights.text_assessment,
             "",
-            f"[🔗 点击查看完整CGM报告]({insights.html_report_path})",
+            f"[🔗 点击查看完整CGM报告]({insights.html_report_path})"
+            if insights.html_report_path
+            else "",
             "",
             "### 💊 当前用药概览",
         ]
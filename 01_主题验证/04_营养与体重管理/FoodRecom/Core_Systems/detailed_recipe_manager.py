@@ -7,6 +7,11 @@ from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional
 from enum import Enum
 
+try:
+    from .recipe_store import RecipeStore
+except ImportError:
+    from recipe_store import RecipeStore
+
 class WeightType(Enum):
     """重量类型"""
     RAW = "生重"        # 生重/购买重量
@@ -48,8 +53,12 @@ class DetailedRecipe:
 class DetailedRecipeManager:
     """详细菜谱管理器"""
 
-    def __init__(self):
-        self.detailed_recipes = self._initialize_detailed_recipes()
+    def __init__(self, snapshot_path: Optional[str] = None):
+        """
+        snapshot_path: 可选的菜谱库快照文件路径；菜谱库在进程内只编译一次，每个实例使用独立副本
+        """
+        self.store = RecipeStore.compile(self._initialize_detailed_recipes, snapshot_path)
+        self.detailed_recipes = self.store.nested
 
     def _initialize_detailed_recipes(self) -> Dict[str, Dict[str, List[DetailedRecipe]]]:
         """初始化详细菜谱数据库"""
@@ -1113,23 +1122,11 @@ class DetailedRecipeManager:
 
     def get_detailed_recipe(self, cuisine_type: str, meal_type: str, recipe_name: str) -> Optional[DetailedRecipe]:
         """获取详细菜谱信息"""
-        try:
-            recipes = self.detailed_recipes[cuisine_type][meal_type]
-            for recipe in recipes:
-                if recipe.name == recipe_name:
-                    return recipe
-            return None
-        except KeyError:
-            return None
+        return self.store.get(cuisine_type, meal_type, recipe_name)
 
     def get_recipe_by_name(self, recipe_name: str) -> Optional[DetailedRecipe]:
         """根据菜谱名称搜索菜谱（跨菜系和餐次）"""
-        for cuisine_type in self.detailed_recipes:
-            for meal_type in self.detailed_recipes[cuisine_type]:
-                for recipe in self.detailed_recipes[cuisine_type][meal_type]:
-                    if recipe.name == recipe_name:
-                        return recipe
-        return None
+        return self.store.get_by_name(recipe_name)
 
     def get_all_recipes_by_cuisine(self, cuisine_type: str) -> Dict[str, List[DetailedRecipe]]:
         """获取指定菜系的所有详细菜谱"""
@@ -1137,25 +1134,11 @@ class DetailedRecipeManager:
 
     def search_recipes_by_ingredient(self, ingredient_name: str) -> List[DetailedRecipe]:
         """根据食材搜索菜谱"""
-        found_recipes = []
-        for cuisine_recipes in self.detailed_recipes.values():
-            for meal_recipes in cuisine_recipes.values():
-                for recipe in meal_recipes:
-                    for ingredient in recipe.ingredients:
-                        if ingredient_name in ingredient.name:
-                            found_recipes.append(recipe)
-                            break
-        return found_recipes
+        return self.store.search_by_ingredient(ingredient_name)
 
     def get_recipes_for_disease(self, disease: str) -> List[DetailedRecipe]:
         """获取适合特定疾病的菜谱"""
-        suitable_recipes = []
-        for cuisine_recipes in self.detailed_recipes.values():
-            for meal_recipes in cuisine_recipes.values():
-                for recipe in meal_recipes:
-                    if disease in recipe.disease_suitability:
-                        suitable_recipes.append(recipe)
-        return suitable_recipes
+        return self.store.get_by_disease(disease)
 
     def format_recipe_display(self, recipe: DetailedRecipe) -> str:
         """格式化菜谱显示信息"""
@@ -7,9 +7,16 @@
 
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 import math
 
+import numpy as np
+
+try:
+    from .nutrition_registry import get_registry
+except ImportError:
+    from nutrition_registry import get_registry
+
 class GILevel(Enum):
     """血糖指数等级"""
     LOW = "低GI"           # ≤55
@@ -73,6 +80,9 @@ class PatientProfile:
     spice_tolerance: str = "中等"            # 辣度承受
     cooking_preferences: List[str] = None     # 烹饪偏好
 
+    # 稳定标识 (病历号等)，个人模型按此持久化；为空时只在当前会话内使用
+    patient_id: Optional[str] = None
+
     def __post_init__(self):
         if self.diagnosed_diseases is None:
             self.diagnosed_diseases = []
@@ -108,11 +118,104 @@ class PatientProfile:
         else:
             return "肥胖"
 
+# 素食限制排除的食物分类及名称关键词
+MEAT_CATEGORIES = ("肉类", "鱼类")
+MEAT_TOKENS = ("鱼", "肉", "鸡", "鸭", "猪", "牛", "羊")
+
+# 餐食计划的分组 {分组: 食物分类}
+MEAL_PLAN_GROUPS = {
+    "主食类": ("谷物", "薯类"),
+    "蛋白质类": ("肉类", "鱼类", "蛋类", "豆类"),
+    "蔬菜类": ("蔬菜",),
+    "水果类": ("水果",)
+}
+
+class GIFoodTable:
+    """
+    列式GI/GL食物表
+    每种食物一行，GI、每克碳水、GL、分类编码等存为NumPy数组:
+    - 多份餐食的GI/GL由 (餐食 × 食物) 重量矩阵一次矩阵乘法求得
+    - 过敏/不喜食物按名称子串匹配，子串 → 食物布尔掩码预先建好，计划过滤为布尔运算
+    """
+
+    def __init__(self, gi_database: Dict[str, FoodGIData]):
+        foods = list(gi_database.values())
+        self.foods = foods
+        self.names = [food.name for food in foods]
+        self.index = {name: i for i, name in enumerate(gi_database)}
+
+        self.gi = np.array([food.gi_value for food in foods], dtype=float)
+        self.gl = np.array([food.gl_value for food in foods], dtype=float)
+        self.carb_per_g = np.array([food.carb_per_portion / food.portion_size_g for food in foods], dtype=float)
+        self.gi_carb_per_g = self.gi * self.carb_per_g
+        self.gi_level = np.array([list(GILevel).index(food.gi_level) for food in foods], dtype=np.int8)
+        self.gl_level = np.array([list(GLLevel).index(food.gl_level) for food in foods], dtype=np.int8)
+
+        self.categories, category_codes = np.unique([food.category for food in foods], return_inverse=True)
+        self.category_code = category_codes.astype(np.int16)
+
+        # 名称子串 → 含该子串的食物掩码
+        self._token_masks: Dict[str, np.ndarray] = {}
+        for i, name in enumerate(self.names):
+            for token in {name[a:b] for a in range(len(name)) for b in range(a + 1, len(name) + 1)}:
+                self._token_masks.setdefault(token, np.zeros(len(foods), dtype=bool))[i] = True
+
+        self.meat_mask = self.category_mask(*MEAT_CATEGORIES) | self.name_mask(MEAT_TOKENS)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def category_mask(self, *categories: str) -> np.ndarray:
+        """属于指定分类的食物掩码"""
+        codes = [i for i, category in enumerate(self.categories) if category in categories]
+        return np.isin(self.category_code, codes)
+
+    def name_mask(self, terms: Sequence[str]) -> np.ndarray:
+        """名称包含任一关键词的食物掩码"""
+        mask = np.zeros(len(self.names), dtype=bool)
+        for term in terms:
+            if term == "":
+                mask[:] = True
+            elif term in self._token_masks:
+                mask |= self._token_masks[term]
+        return mask
+
+    def weight_matrix(self, meals: Sequence[Sequence[Tuple[str, float]]]) -> np.ndarray:
+        """餐食组成 [[(食物名称, 重量g), ...], ...] → (餐食 × 食物) 重量矩阵，未收录的食物忽略"""
+        index = self.index
+        entries = [(row, index[food_name], weight_g)
+                   for row, meal in enumerate(meals) for food_name, weight_g in meal if food_name in index]
+        weights = np.zeros((len(meals), len(self.names)))
+        if entries:
+            rows, columns, values = zip(*entries)
+            np.add.at(weights, (np.array(rows), np.array(columns)), np.array(values, dtype=float))
+        return weights
+
+    def meal_gi_gl(self, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """由重量矩阵计算各餐食的 (碳水加权平均GI, 总GL)"""
+        weights = np.atleast_2d(weights)
+        carbs = weights @ self.carb_per_g
+        gi_carbs = weights @ self.gi_carb_per_g
+        average_gi = np.divide(gi_carbs, carbs, out=np.zeros_like(carbs), where=carbs > 0)
+        return average_gi, gi_carbs / 100
+
+    def plan_mask(self, target_gl: float, avoid_terms: Sequence[str] = (), vegetarian: bool = False) -> np.ndarray:
+        """低GI、GL不超过目标、排除过敏/不喜食物 (及素食时排除肉鱼) 的食物掩码"""
+        mask = (self.gi_level == list(GILevel).index(GILevel.LOW)) & (self.gl <= target_gl)
+        if avoid_terms:
+            mask &= ~self.name_mask(avoid_terms)
+        if vegetarian:
+            mask &= ~self.meat_mask
+        return mask
+
 class GIDatabaseSystemV2:
     """血糖指数数据库系统 v2.0 - 扩充版"""
 
     def __init__(self):
-        self.gi_database = self._initialize_expanded_gi_database()
+        # GI数据库及列式表由进程内共享的注册表提供 (只读，只构建一次)
+        registry = get_registry()
+        self.gi_database = registry.gi_foods
+        self.food_table = registry.gi_table
         print(f"🩺 血糖指数数据库 v2.0 已加载")
         print(f"📊 收录食物: {len(self.gi_database)} 种")
 
@@ -125,7 +228,8 @@ class GIDatabaseSystemV2:
         print(f"🟡 中GI食物: {medium_gi_count}种 ({medium_gi_count/len(self.gi_database)*100:.1f}%)")
         print(f"🔴 高GI食物: {high_gi_count}种 ({high_gi_count/len(self.gi_database)*100:.1f}%)")
 
-    def _initialize_expanded_gi_database(self) -> Dict[str, FoodGIData]:
+    @staticmethod
+    def _initialize_expanded_gi_database() -> Dict[str, FoodGIData]:
         """初始化扩充版GI数据库 - 95种食物"""
         gi_foods = {}
 
@@ -278,85 +382,74 @@ class GIDatabaseSystemV2:
         if not meal_composition:
             return 0.0, 0.0
 
-        total_carbs = 0.0
-        weighted_gi_sum = 0.0
-        total_gl = 0.0
-
-        for food_name, weight_g in meal_composition:
-            food_data = self.get_food_gi_info(food_name)
-            if not food_data:
-                continue
-
-            # 计算该食物的碳水化合物量
-            carb_ratio = weight_g / food_data.portion_size_g
-            food_carbs = food_data.carb_per_portion * carb_ratio
-            food_gl = (food_data.gi_value * food_carbs) / 100
+        weights = self.food_table.weight_matrix([meal_composition])
+        average_gi, total_gl = self.food_table.meal_gi_gl(weights)
+        return round(float(average_gi[0]), 1), round(float(total_gl[0]), 1)
 
-            total_carbs += food_carbs
-            weighted_gi_sum += food_data.gi_value * food_carbs
-            total_gl += food_gl
-
-        # 计算加权平均GI
-        average_gi = weighted_gi_sum / total_carbs if total_carbs > 0 else 0
-
-        return round(average_gi, 1), round(total_gl, 1)
-
-    def generate_diabetes_meal_plan(self, target_gl: float = 15.0, patient: Optional[PatientProfile] = None) -> Dict[str, List[str]]:
-        """生成基于饮食偏好的糖尿病患者餐食计划"""
-        low_gi_foods = self.get_low_gi_foods()
-
-        meal_plan = {
-            "主食类": [],
-            "蛋白质类": [],
-            "蔬菜类": [],
-            "水果类": [],
-            "个性化说明": []
-        }
-
-        # 过滤掉过敏和不喜欢的食物
+    def calculate_meals_gi_gl(self, meals: List[List[Tuple[str, float]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        批量计算多份餐食的加权平均GI和总GL (一次矩阵乘法)
+        meals: [[(食物名称, 重量g), ...], ...]
+        返回: (加权平均GI数组, 总GL数组)，均保留1位小数
+        (逐个用 round 舍入，与 calculate_meal_gi_gl 一致；np.round 在 x.x5 边界可能相差 0.1)
+        """
+        weights = self.food_table.weight_matrix(meals)
+        average_gi, total_gl = self.food_table.meal_gi_gl(weights)
+        return (np.array([round(value, 1) for value in average_gi.tolist()]),
+                np.array([round(value, 1) for value in total_gl.tolist()]))
+
+    @staticmethod
+    def _avoid_terms(patient: Optional[PatientProfile]) -> List[str]:
+        """患者的过敏和不喜欢的食物"""
         avoid_foods = []
         if patient:
             if patient.allergies:
                 avoid_foods.extend(patient.allergies)
             if patient.disliked_foods:
                 avoid_foods.extend(patient.disliked_foods)
+        return avoid_foods
 
-        for food in low_gi_foods:
-            if food.gl_value <= target_gl:
-                # 检查是否为过敏或不喜欢的食物
-                if any(avoid_food in food.name for avoid_food in avoid_foods):
-                    continue
-
-                # 素食限制检查
-                if patient and patient.dietary_restrictions and "素食" in patient.dietary_restrictions:
-                    if food.category in ["肉类", "鱼类"] or any(meat in food.name for meat in ["鱼", "肉", "鸡", "鸭", "猪", "牛", "羊"]):
-                        continue
-
-                # 分类推荐
-                if food.category in ["谷物", "薯类"]:
-                    meal_plan["主食类"].append(f"{food.name} (GI:{food.gi_value}, GL:{food.gl_value:.1f})")
-                elif food.category in ["肉类", "鱼类", "蛋类", "豆类"]:
-                    meal_plan["蛋白质类"].append(f"{food.name} (GI:{food.gi_value}, GL:{food.gl_value:.1f})")
-                elif food.category == "蔬菜":
-                    meal_plan["蔬菜类"].append(f"{food.name} (GI:{food.gi_value}, GL:{food.gl_value:.1f})")
-                elif food.category == "水果":
-                    meal_plan["水果类"].append(f"{food.name} (GI:{food.gi_value}, GL:{food.gl_value:.1f})")
-
-        # 添加个性化说明
-        if patient:
-            notes = []
-            if patient.preferred_cuisines:
-                notes.append(f"考虑{'/'.join(patient.preferred_cuisines)}口味偏好")
-            if patient.dietary_restrictions:
-                notes.append(f"遵循{'/'.join(patient.dietary_restrictions)}饮食要求")
-            if avoid_foods:
-                notes.append(f"已排除过敏/不喜食物: {'/'.join(avoid_foods)}")
-            if patient.spice_tolerance != "中等":
-                notes.append(f"适配{patient.spice_tolerance}口味")
-
-            meal_plan["个性化说明"] = notes
+    def generate_diabetes_meal_plan(self, target_gl: float = 15.0, patient: Optional[PatientProfile] = None) -> Dict[str, List[str]]:
+        """生成基于饮食偏好的糖尿病患者餐食计划"""
+        return self.generate_diabetes_meal_plans([patient], target_gl)[0]
 
-        return meal_plan
+    def generate_diabetes_meal_plans(self, patients: List[Optional[PatientProfile]],
+                                     target_gl: float = 15.0) -> List[Dict[str, List[str]]]:
+        """
+        批量生成餐食计划 (如整个病区的患者)
+        每位患者的可选食物为一个布尔掩码行，分组由分类掩码一次求得
+        """
+        table = self.food_table
+        group_masks = {group: table.category_mask(*categories) for group, categories in MEAL_PLAN_GROUPS.items()}
+        labels = [f"{food.name} (GI:{food.gi_value}, GL:{food.gl_value:.1f})" for food in table.foods]
+
+        plans = []
+        for patient in patients:
+            avoid_foods = self._avoid_terms(patient)
+            vegetarian = bool(patient and patient.dietary_restrictions and "素食" in patient.dietary_restrictions)
+            selected = table.plan_mask(target_gl, avoid_foods, vegetarian)
+
+            meal_plan = {group: [labels[i] for i in np.flatnonzero(selected & mask)]
+                         for group, mask in group_masks.items()}
+            meal_plan["个性化说明"] = []
+
+            # 添加个性化说明
+            if patient:
+                notes = []
+                if patient.preferred_cuisines:
+                    notes.append(f"考虑{'/'.join(patient.preferred_cuisines)}口味偏好")
+                if patient.dietary_restrictions:
+                    notes.append(f"遵循{'/'.join(patient.dietary_restrictions)}饮食要求")
+                if avoid_foods:
+                    notes.append(f"已排除过敏/不喜食物: {'/'.join(avoid_foods)}")
+                if patient.spice_tolerance != "中等":
+                    notes.append(f"适配{patient.spice_tolerance}口味")
+
+                meal_plan["个性化说明"] = notes
+
+            plans.append(meal_plan)
+
+        return plans
 
     def generate_personalized_gi_recommendations(self, patient: PatientProfile) -> Dict[str, any]:
         """为患者生成个性化GI推荐"""
@@ -382,9 +475,10 @@ class GIDatabaseSystemV2:
         diabetes_friendly = self.get_diabetes_friendly_foods()
         avoid_foods = (patient.allergies or []) + (patient.disliked_foods or [])
 
+        avoid_mask = self.food_table.name_mask(avoid_foods)
         safe_foods = []
         for food in diabetes_friendly[:10]:  # 取前10个最佳选择
-            if not any(avoid_food in food.name for avoid_food in avoid_foods):
+            if not avoid_mask[self.food_table.index[food.name]]:
                 safe_foods.append(f"{food.name} (GI:{food.gi_value}, GL:{food.gl_value:.1f})")
 
         recommendations["最佳选择食物"] = safe_foods
@@ -0,0 +1,238 @@
+"""
+个体血糖敏感性增量模型
+每次餐后血糖分析结果到来时在线更新统计量 (Welford 均值/方差、协方差)，无需保留和重算全部历史:
+- 总体: 血糖上升幅度的均值、标准差，及与餐食 GI/GL 的相关系数
+- 分组: 按 餐次 × GL分级 的上升幅度均值、标准差
+- 每位患者按稳定标识 (病历号) 一个 JSON 文件保存在本地目录，推荐耗时不随餐次历史增长；
+  未标识的患者不落盘
+"""
+
+import hashlib
+import json
+import math
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+# 模型文件格式版本
+MODEL_FORMAT_VERSION = 1
+
+# GL分级 (与 GLLevel 一致: ≤10 低, 11-19 中, ≥20 高)
+GL_BUCKETS = (("低GL", 10), ("中GL", 19), ("高GL", math.inf))
+
+
+def gl_bucket(gl_value: float) -> str:
+    """GL值所属分级"""
+    for name, upper in GL_BUCKETS:
+        if gl_value <= upper:
+            return name
+    return GL_BUCKETS[-1][0]
+
+
+class RunningMoments:
+    """单变量在线均值/方差 (Welford)"""
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std(self) -> float:
+        """总体标准差 (与 np.std 一致)"""
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RunningMoments":
+        return cls(data['count'], data['mean'], data['m2'])
+
+
+class RunningCovariance:
+    """双变量在线协方差，用于相关系数"""
+
+    def __init__(self, count: int = 0, mean_x: float = 0.0, mean_y: float = 0.0,
+                 m2_x: float = 0.0, m2_y: float = 0.0, c_xy: float = 0.0):
+        self.count = count
+        self.mean_x, self.mean_y = mean_x, mean_y
+        self.m2_x, self.m2_y, self.c_xy = m2_x, m2_y, c_xy
+
+    def update(self, x: float, y: float):
+        self.count += 1
+        dx = x - self.mean_x
+        self.mean_x += dx / self.count
+        dy = y - self.mean_y
+        self.mean_y += dy / self.count
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+
+    @property
+    def correlation(self) -> float:
+        """Pearson 相关系数；任一变量无变化时为 NaN (与 np.corrcoef 一致)"""
+        denominator = math.sqrt(self.m2_x * self.m2_y)
+        return self.c_xy / denominator if denominator > 0 else math.nan
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'mean_x': self.mean_x, 'mean_y': self.mean_y,
+                'm2_x': self.m2_x, 'm2_y': self.m2_y, 'c_xy': self.c_xy}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RunningCovariance":
+        return cls(**data)
+
+
+class GlucoseSensitivityModel:
+    """单个患者的血糖敏感性增量模型"""
+
+    def __init__(self, patient_id: str = ""):
+        self.patient_id = patient_id
+        self.excursion = RunningMoments()
+        self.gi_excursion = RunningCovariance()
+        self.gl_excursion = RunningCovariance()
+        self.groups: Dict[Tuple[str, str], RunningMoments] = {}
+
+    @property
+    def sample_size(self) -> int:
+        return self.excursion.count
+
+    def update(self, analysis_result: Dict) -> bool:
+        """
+        加入一次餐后血糖分析结果 (analyze_meal_glucose_response 的返回值)
+        缺少上升幅度或餐食组成的记录不计入，返回是否已计入
+        """
+        if 'glucose_excursion' not in analysis_result or 'meal_composition' not in analysis_result:
+            return False
+
+        excursion = analysis_result['glucose_excursion']
+        meal_composition = analysis_result['meal_composition']
+        gi_value = meal_composition.get('gi_total', 50)
+        gl_value = meal_composition.get('gl_total', 15)
+
+        self.excursion.update(excursion)
+        self.gi_excursion.update(gi_value, excursion)
+        self.gl_excursion.update(gl_value, excursion)
+
+        group_key = (meal_composition.get('meal_type') or '未知', gl_bucket(gl_value))
+        self.groups.setdefault(group_key, RunningMoments()).update(excursion)
+        return True
+
+    def update_many(self, analysis_results: Iterable[Dict]) -> int:
+        """依次加入多次分析结果，返回计入的条数"""
+        return sum(self.update(result) for result in analysis_results)
+
+    @classmethod
+    def from_history(cls, cgm_history: Iterable[Dict], patient_id: str = "") -> "GlucoseSensitivityModel":
+        """由分析结果列表一次性构建"""
+        model = cls(patient_id)
+        model.update_many(cgm_history)
+        return model
+
+    def group_stats(self, meal_type: Optional[str] = None) -> Dict[str, Dict]:
+        """按 餐次 × GL分级 的上升幅度统计，可只取某一餐次"""
+        return {
+            f"{group_meal}/{bucket}": {
+                'avg_excursion': round(moments.mean, 1),
+                'variability': round(moments.std, 1),
+                'sample_size': moments.count
+            }
+            for (group_meal, bucket), moments in self.groups.items()
+            if meal_type is None or group_meal == meal_type
+        }
+
+    def summary(self) -> Dict:
+        """血糖敏感性评估 (字段与 CGMNutritionIntegration._analyze_glucose_sensitivity 一致)"""
+        if self.sample_size < 3:
+            return {'sensitivity_level': 'insufficient_data', 'confidence': 0}
+
+        avg_excursion = self.excursion.mean
+
+        # 敏感性分级
+        if avg_excursion <= 2.0:
+            sensitivity_level = 'low'
+            sensitivity_desc = "血糖反应较平缓"
+        elif avg_excursion <= 3.5:
+            sensitivity_level = 'moderate'
+            sensitivity_desc = "血糖反应适中"
+        else:
+            sensitivity_level = 'high'
+            sensitivity_desc = "血糖反应较敏感"
+
+        confidence = min(self.sample_size / 10.0, 1.0)  # 最多10次记录达到100%置信度
+
+        return {
+            'sensitivity_level': sensitivity_level,
+            'sensitivity_desc': sensitivity_desc,
+            'avg_excursion': round(avg_excursion, 1),
+            'variability': round(self.excursion.std, 1),
+            'gi_correlation': round(self.gi_excursion.correlation, 2),
+            'gl_correlation': round(self.gl_excursion.correlation, 2),
+            'confidence': round(confidence, 2),
+            'sample_size': self.sample_size,
+            'group_stats': self.group_stats()
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': MODEL_FORMAT_VERSION,
+            'patient_id': self.patient_id,
+            'excursion': self.excursion.to_dict(),
+            'gi_excursion': self.gi_excursion.to_dict(),
+            'gl_excursion': self.gl_excursion.to_dict(),
+            'groups': [{'meal_type': meal_type, 'gl_bucket': bucket, **moments.to_dict()}
+                       for (meal_type, bucket), moments in self.groups.items()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "GlucoseSensitivityModel":
+        if data.get('version') != MODEL_FORMAT_VERSION:
+            raise ValueError(f"不支持的血糖敏感性模型版本: {data.get('version')}")
+        model = cls(data.get('patient_id', ""))
+        model.excursion = RunningMoments.from_dict(data['excursion'])
+        model.gi_excursion = RunningCovariance.from_dict(data['gi_excursion'])
+        model.gl_excursion = RunningCovariance.from_dict(data['gl_excursion'])
+        for group in data.get('groups', []):
+            model.groups[(group['meal_type'], group['gl_bucket'])] = RunningMoments.from_dict(group)
+        return model
+
+
+class GlucoseSensitivityStore:
+    """血糖敏感性模型的本地存储 (每位患者一个 JSON 文件)"""
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+
+    def _path(self, patient_id: str) -> str:
+        file_key = hashlib.sha1(patient_id.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.store_dir, f"{file_key}.json")
+
+    def load(self, patient_id: str) -> GlucoseSensitivityModel:
+        """读取患者模型；不存在或损坏时返回空模型"""
+        path = self._path(patient_id)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('patient_id') == patient_id:
+                    return GlucoseSensitivityModel.from_dict(data)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ 血糖敏感性模型读取失败，将重新建立: {e}")
+        return GlucoseSensitivityModel(patient_id)
+
+    def save(self, model: GlucoseSensitivityModel):
+        """原子写入患者模型"""
+        if not model.patient_id:
+            raise ValueError("未标识患者的血糖敏感性模型不保存到本地")
+        os.makedirs(self.store_dir, exist_ok=True)
+        path = self._path(model.patient_id)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(model.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
@@ -8,10 +8,45 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Dict, List, Optional, Tuple
 import math
+import os
 from datetime import datetime
 import matplotlib.pyplot as plt
 import numpy as np
 
+try:
+    from .gi_database_integration_v2 import FoodGIData, GILevel, GLLevel
+    from .menu_optimizer import MenuTargets, WeeklyMenuOptimizer
+    from .nutrient_matrix import NUTRIENT_INDEX
+    from .nutrition_registry import get_registry
+    from .radar_chart_renderer import RadarChartSpec, RadarNote, RadarSeries, draw_radar_chart
+except ImportError:
+    from gi_database_integration_v2 import FoodGIData, GILevel, GLLevel
+    from menu_optimizer import MenuTargets, WeeklyMenuOptimizer
+    from nutrient_matrix import NUTRIENT_INDEX
+    from nutrition_registry import get_registry
+    from radar_chart_renderer import RadarChartSpec, RadarNote, RadarSeries, draw_radar_chart
+
+# 糖尿病/高血糖患者一周菜单的GL上限 (单餐≥20为高GL；每日<80为低GL饮食)
+MEAL_GL_CEILING = 20.0
+DAILY_GL_CEILING = 80.0
+
+# 营养雷达图的指标及每日推荐值
+RADAR_DRV_VALUES = {
+    '蛋白质': 60, '碳水化合物': 300, '脂肪': 60, '膳食纤维': 30,
+    '维生素C': 100, '钙': 800, '铁': 15, '钾': 2000
+}
+# 雷达图各指标在食材营养矩阵中的列
+RADAR_NUTRIENT_COLUMNS = [NUTRIENT_INDEX[field] for field in
+                          ("protein", "carbs", "fat", "fiber", "vitamin_c", "calcium", "iron", "potassium")]
+RADAR_COMPARISON_COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7']
+
+# 综合报告附带的雷达图 {文件名: (图表类型, 食物及份量)}
+REPORT_RADAR_CHARTS = {
+    "单食物营养雷达图": ("single", [("鸡胸肉", 100)]),
+    "食物对比雷达图": ("comparison", [("糙米", 100), ("大米", 100)]),
+    "整餐营养雷达图": ("meal", [("糙米", 100), ("鸡胸肉", 100), ("西兰花", 150), ("胡萝卜", 100)])
+}
+
 # 设置中文字体
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False
@@ -22,18 +57,6 @@ class SystemVersion(Enum):
     PROFESSIONAL = "专业版"
     CLINICAL = "临床版"
 
-class GILevel(Enum):
-    """血糖指数等级"""
-    LOW = "低GI"           # ≤55
-    MEDIUM = "中GI"        # 56-69
-    HIGH = "高GI"          # ≥70
-
-class GLLevel(Enum):
-    """血糖负荷等级"""
-    LOW = "低GL"           # ≤10
-    MEDIUM = "中GL"        # 11-19
-    HIGH = "高GL"          # ≥20
-
 @dataclass
 class PatientProfile:
     """完整患者档案"""
@@ -106,19 +129,6 @@ class PatientProfile:
         else:
             return "肥胖"
 
-@dataclass
-class FoodGIData:
-    """食物血糖指数数据"""
-    name: str
-    gi_value: int
-    gi_level: GILevel
-    portion_size_g: int
-    carb_per_portion: float
-    gl_value: float
-    gl_level: GLLevel
-    category: str
-    diabetes_recommendation: str = ""
-
 @dataclass
 class FoodNutrition:
     """食物营养数据"""
@@ -160,7 +170,8 @@ class IntegratedNutritionSystemV2:
 
     def _init_food_database(self):
         """初始化整合食物数据库"""
-        self.integrated_foods = self._load_integrated_food_data()
+        self.registry = get_registry()
+        self.integrated_foods = self.registry.integrated_foods
         self.food_count = len(self.integrated_foods)
         print(f"🥗 整合食物数据库已加载 ({self.food_count}种食物)")
 
@@ -181,16 +192,19 @@ class IntegratedNutritionSystemV2:
 
     def _init_gi_database(self):
         """初始化GI数据库"""
-        self.gi_foods_database = self._load_expanded_gi_database()
+        self.gi_foods_database = self.registry.gi_foods
         self.gi_foods_count = len(self.gi_foods_database)
         print(f"📈 血糖指数数据库已加载 ({self.gi_foods_count}种食物)")
 
     def _init_radar_chart_system(self):
         """初始化营养雷达图系统"""
         self.radar_chart_enabled = True
+        # 无界面渲染器及其缓存由注册表共享
+        self.chart_renderer = self.registry.chart_renderer
         print("📊 营养雷达图系统已加载")
 
-    def _load_integrated_food_data(self) -> Dict[str, IntegratedFoodData]:
+    @staticmethod
+    def _load_integrated_food_data() -> Dict[str, IntegratedFoodData]:
         """加载整合的食物数据"""
         foods = {}
 
@@ -391,129 +405,6 @@ class IntegratedNutritionSystemV2:
 
         return foods
 
-    def _load_expanded_gi_database(self) -> Dict[str, FoodGIData]:
-        """加载扩充版GI数据库 - 95种食物"""
-        gi_foods = {}
-
-        # 谷物类 (15种)
-        gi_foods["大米(白米)"] = FoodGIData("大米(白米)", 83, GILevel.HIGH, 150, 35.0, 29.1, GLLevel.HIGH, "谷物", "限制摄入，用糙米替代")
-        gi_foods["糙米"] = FoodGIData("糙米", 50, GILevel.LOW, 150, 33.0, 16.5, GLLevel.MEDIUM, "谷物", "推荐糖尿病患者主食")
-        gi_foods["燕麦(即食)"] = FoodGIData("燕麦(即食)", 55, GILevel.LOW, 40, 24.0, 13.2, GLLevel.MEDIUM, "谷物", "早餐首选，含β-葡聚糖")
-        gi_foods["燕麦片(生)"] = FoodGIData("燕麦片(生)", 40, GILevel.LOW, 40, 24.0, 9.6, GLLevel.LOW, "谷物", "需煮制，GI更低")
-        gi_foods["荞麦面"] = FoodGIData("荞麦面", 45, GILevel.LOW, 150, 30.0, 13.5, GLLevel.MEDIUM, "谷物", "优秀低GI主食，富含芦丁")
-        gi_foods["全麦面包"] = FoodGIData("全麦面包", 51, GILevel.LOW, 50, 13.0, 6.6, GLLevel.LOW, "谷物", "比白面包更适合")
-        gi_foods["白面包"] = FoodGIData("白面包", 75, GILevel.HIGH, 50, 15.0, 11.3, GLLevel.MEDIUM, "谷物", "应避免或限制摄入")
-        gi_foods["薏米"] = FoodGIData("薏米", 54, GILevel.LOW, 150, 23.0, 12.4, GLLevel.MEDIUM, "谷物", "健脾利湿，适合糖尿病患者")
-        gi_foods["黑米"] = FoodGIData("黑米", 42, GILevel.LOW, 150, 43.3, 18.2, GLLevel.MEDIUM, "谷物", "花青素丰富，抗氧化强")
-        gi_foods["藜麦"] = FoodGIData("藜麦", 35, GILevel.LOW, 150, 30.6, 10.7, GLLevel.MEDIUM, "谷物", "完全蛋白质，营养价值高")
-        gi_foods["小米"] = FoodGIData("小米", 52, GILevel.LOW, 150, 30.0, 15.6, GLLevel.MEDIUM, "谷物", "易消化，适合老年患者")
-        gi_foods["青稞"] = FoodGIData("青稞", 48, GILevel.LOW, 150, 30.2, 14.5, GLLevel.MEDIUM, "谷物", "高原谷物，β-葡聚糖含量高")
-        gi_foods["玉米"] = FoodGIData("玉米", 60, GILevel.MEDIUM, 150, 16.0, 9.6, GLLevel.LOW, "谷物", "膳食纤维丰富，控制分量")
-        gi_foods["意大利面"] = FoodGIData("意大利面", 58, GILevel.MEDIUM, 150, 40.0, 23.2, GLLevel.HIGH, "谷物", "比精制面条好，但仍需控制")
-        gi_foods["玉米片"] = FoodGIData("玉米片", 81, GILevel.HIGH, 30, 25.0, 20.3, GLLevel.HIGH, "谷物", "应避免，用燕麦片替代")
-
-        # 薯类 (6种)
-        gi_foods["甘薯(蒸)"] = FoodGIData("甘薯(蒸)", 54, GILevel.LOW, 150, 24.0, 12.8, GLLevel.MEDIUM, "薯类", "富含β-胡萝卜素")
-        gi_foods["紫薯"] = FoodGIData("紫薯", 47, GILevel.LOW, 150, 24.0, 11.2, GLLevel.MEDIUM, "薯类", "花青素丰富，抗氧化")
-        gi_foods["山药"] = FoodGIData("山药", 51, GILevel.LOW, 150, 26.0, 13.3, GLLevel.MEDIUM, "薯类", "药食同源，益气养阴")
-        gi_foods["芋头"] = FoodGIData("芋头", 53, GILevel.LOW, 150, 24.0, 12.7, GLLevel.MEDIUM, "薯类", "钾含量高，适合高血压合并糖尿病")
-        gi_foods["马铃薯(煮)"] = FoodGIData("马铃薯(煮)", 78, GILevel.HIGH, 150, 20.0, 15.6, GLLevel.MEDIUM, "薯类", "建议用甘薯、山药替代")
-        gi_foods["红薯(烤)"] = FoodGIData("红薯(烤)", 63, GILevel.MEDIUM, 150, 27.0, 17.1, GLLevel.MEDIUM, "薯类", "比蒸制GI稍高，注意分量")
-
-        # 豆类 (12种)
-        gi_foods["绿豆"] = FoodGIData("绿豆", 25, GILevel.LOW, 150, 25.0, 6.2, GLLevel.LOW, "豆类", "清热解毒，极低GI")
-        gi_foods["红豆"] = FoodGIData("红豆", 29, GILevel.LOW, 150, 22.0, 6.4, GLLevel.LOW, "豆类", "补血养心，膳食纤维丰富")
-        gi_foods["黄豆"] = FoodGIData("黄豆", 18, GILevel.LOW, 100, 11.0, 2.0, GLLevel.LOW, "豆类", "优质蛋白，异黄酮丰富")
-        gi_foods["黑豆"] = FoodGIData("黑豆", 30, GILevel.LOW, 150, 18.0, 5.4, GLLevel.LOW, "豆类", "补肾益阴，花青素丰富")
-        gi_foods["扁豆"] = FoodGIData("扁豆", 38, GILevel.LOW, 150, 23.5, 8.9, GLLevel.LOW, "豆类", "健脾化湿，B族维生素丰富")
-        gi_foods["鹰嘴豆"] = FoodGIData("鹰嘴豆", 33, GILevel.LOW, 150, 24.0, 8.0, GLLevel.LOW, "豆类", "地中海饮食，蛋白质含量高")
-        gi_foods["豌豆"] = FoodGIData("豌豆", 45, GILevel.LOW, 150, 21.0, 9.5, GLLevel.LOW, "豆类", "维生素K丰富，有助骨骼健康")
-        gi_foods["蚕豆"] = FoodGIData("蚕豆", 40, GILevel.LOW, 150, 18.0, 7.2, GLLevel.LOW, "豆类", "叶酸含量高，适合孕期糖尿病")
-        gi_foods["四季豆"] = FoodGIData("四季豆", 30, GILevel.LOW, 150, 7.0, 2.1, GLLevel.LOW, "豆类", "极低GL，可自由摄入")
-        gi_foods["豆腐"] = FoodGIData("豆腐", 15, GILevel.LOW, 100, 6.0, 0.9, GLLevel.LOW, "豆类", "优质植物蛋白，低碳水化合物")
-        gi_foods["豆浆"] = FoodGIData("豆浆", 30, GILevel.LOW, 250, 3.5, 1.1, GLLevel.LOW, "豆类", "植物蛋白饮品，无糖版本")
-        gi_foods["花生"] = FoodGIData("花生", 15, GILevel.LOW, 30, 5.0, 0.8, GLLevel.LOW, "豆类", "健康脂肪，适量摄入")
-
-        # 蔬菜类 (18种)
-        gi_foods["西兰花"] = FoodGIData("西兰花", 10, GILevel.LOW, 150, 5.2, 0.8, GLLevel.LOW, "蔬菜", "抗癌蔬菜之王，自由摄入")
-        gi_foods["菠菜"] = FoodGIData("菠菜", 15, GILevel.LOW, 150, 6.0, 0.9, GLLevel.LOW, "蔬菜", "叶酸、铁含量高")
-        gi_foods["白菜"] = FoodGIData("白菜", 25, GILevel.LOW, 150, 4.8, 1.2, GLLevel.LOW, "蔬菜", "水分含量高，维生素C丰富")
-        gi_foods["芹菜"] = FoodGIData("芹菜", 35, GILevel.LOW, 150, 4.0, 1.4, GLLevel.LOW, "蔬菜", "降血压，膳食纤维丰富")
-        gi_foods["生菜"] = FoodGIData("生菜", 20, GILevel.LOW, 150, 2.5, 0.5, GLLevel.LOW, "蔬菜", "生食佳品，热量极低")
-        gi_foods["黄瓜"] = FoodGIData("黄瓜", 15, GILevel.LOW, 150, 4.6, 0.7, GLLevel.LOW, "蔬菜", "利尿消肿，含硅元素美容")
-        gi_foods["番茄"] = FoodGIData("番茄", 30, GILevel.LOW, 150, 7.7, 2.3, GLLevel.LOW, "蔬菜", "番茄红素丰富，抗氧化")
-        gi_foods["茄子"] = FoodGIData("茄子", 25, GILevel.LOW, 150, 11.2, 2.8, GLLevel.LOW, "蔬菜", "膳食纤维丰富，有助控糖")
-        gi_foods["青椒"] = FoodGIData("青椒", 40, GILevel.LOW, 150, 6.0, 2.4, GLLevel.LOW, "蔬菜", "维生素C含量极高")
-        gi_foods["胡萝卜(生)"] = FoodGIData("胡萝卜(生)", 35, GILevel.LOW, 150, 8.0, 2.8, GLLevel.LOW, "蔬菜", "β-胡萝卜素丰富")
-        gi_foods["胡萝卜(煮)"] = FoodGIData("胡萝卜(煮)", 85, GILevel.HIGH, 150, 8.0, 6.8, GLLevel.LOW, "蔬菜", "建议生食或轻微加热")
-        gi_foods["洋葱"] = FoodGIData("洋葱", 25, GILevel.LOW, 150, 12.4, 3.1, GLLevel.LOW, "蔬菜", "含硫化合物，调节血糖")
-        gi_foods["大蒜"] = FoodGIData("大蒜", 30, GILevel.LOW, 10, 4.0, 1.0, GLLevel.LOW, "蔬菜", "抗菌消炎，调节血脂")
-        gi_foods["韭菜"] = FoodGIData("韭菜", 25, GILevel.LOW, 150, 6.0, 1.5, GLLevel.LOW, "蔬菜", "补肾壮阳，膳食纤维丰富")
-        gi_foods["苦瓜"] = FoodGIData("苦瓜", 24, GILevel.LOW, 150, 5.6, 1.4, GLLevel.LOW, "蔬菜", "苦瓜素有助降血糖")
-        gi_foods["冬瓜"] = FoodGIData("冬瓜", 15, GILevel.LOW, 150, 5.4, 0.8, GLLevel.LOW, "蔬菜", "利水消肿，钾含量高")
-        gi_foods["丝瓜"] = FoodGIData("丝瓜", 20, GILevel.LOW, 150, 7.4, 1.1, GLLevel.LOW, "蔬菜", "清热化痰，维生素C丰富")
-        gi_foods["萝卜"] = FoodGIData("萝卜", 35, GILevel.LOW, 150, 6.0, 2.1, GLLevel.LOW, "蔬菜", "消食化痰，维生素C丰富")
-
-        # 水果类 (15种)
-        gi_foods["草莓"] = FoodGIData("草莓", 40, GILevel.LOW, 150, 7.7, 3.1, GLLevel.LOW, "水果", "维生素C丰富，抗氧化")
-        gi_foods["蓝莓"] = FoodGIData("蓝莓", 53, GILevel.LOW, 150, 9.6, 5.1, GLLevel.LOW, "水果", "花青素之王，护眼明目")
-        gi_foods["樱桃"] = FoodGIData("樱桃", 22, GILevel.LOW, 150, 16.8, 3.7, GLLevel.LOW, "水果", "花青素丰富，抗炎作用")
-        gi_foods["柚子"] = FoodGIData("柚子", 25, GILevel.LOW, 150, 11.2, 2.8, GLLevel.LOW, "水果", "维生素C高，柚皮苷有助控糖")
-        gi_foods["橙子"] = FoodGIData("橙子", 45, GILevel.LOW, 150, 9.8, 4.4, GLLevel.LOW, "水果", "维生素C、叶酸丰富")
-        gi_foods["苹果"] = FoodGIData("苹果", 36, GILevel.LOW, 150, 14.4, 5.2, GLLevel.LOW, "水果", "果胶丰富，有助控制血糖")
-        gi_foods["梨"] = FoodGIData("梨", 38, GILevel.LOW, 150, 10.6, 4.0, GLLevel.LOW, "水果", "润燥清肺，膳食纤维丰富")
-        gi_foods["桃子"] = FoodGIData("桃子", 35, GILevel.LOW, 150, 10.5, 3.7, GLLevel.LOW, "水果", "维生素A丰富，低热量")
-        gi_foods["李子"] = FoodGIData("李子", 24, GILevel.LOW, 150, 11.2, 2.7, GLLevel.LOW, "水果", "有机酸丰富，助消化")
-        gi_foods["猕猴桃"] = FoodGIData("猕猴桃", 50, GILevel.LOW, 150, 12.4, 6.2, GLLevel.LOW, "水果", "维生素C极高，膳食纤维丰富")
-        gi_foods["柠檬"] = FoodGIData("柠檬", 25, GILevel.LOW, 100, 6.0, 1.5, GLLevel.LOW, "水果", "维生素C高，柠檬酸有助代谢")
-        gi_foods["牛油果"] = FoodGIData("牛油果", 15, GILevel.LOW, 100, 6.0, 0.9, GLLevel.LOW, "水果", "单不饱和脂肪酸丰富")
-        gi_foods["西瓜"] = FoodGIData("西瓜", 72, GILevel.HIGH, 150, 5.5, 4.0, GLLevel.LOW, "水果", "虽然GI高但GL低，可少量食用")
-        gi_foods["香蕉(成熟)"] = FoodGIData("香蕉(成熟)", 60, GILevel.MEDIUM, 120, 20.3, 12.2, GLLevel.MEDIUM, "水果", "富含钾元素，适量食用")
-        gi_foods["葡萄"] = FoodGIData("葡萄", 62, GILevel.MEDIUM, 120, 15.5, 9.6, GLLevel.LOW, "水果", "白藜芦醇丰富，但糖分较高")
-
-        # 奶制品 (6种)
-        gi_foods["牛奶(全脂)"] = FoodGIData("牛奶(全脂)", 30, GILevel.LOW, 250, 12.3, 3.7, GLLevel.LOW, "奶制品", "优质蛋白和钙质")
-        gi_foods["酸奶(无糖)"] = FoodGIData("酸奶(无糖)", 35, GILevel.LOW, 200, 8.8, 3.1, GLLevel.LOW, "奶制品", "益生菌丰富，改善肠道健康")
-        gi_foods["酸奶(希腊式)"] = FoodGIData("酸奶(希腊式)", 11, GILevel.LOW, 200, 10.5, 1.9, GLLevel.LOW, "奶制品", "蛋白质含量更高，饱腹感强")
-        gi_foods["奶酪(切达)"] = FoodGIData("奶酪(切达)", 25, GILevel.LOW, 30, 1.2, 0.4, GLLevel.LOW, "奶制品", "高蛋白低碳水")
-        gi_foods["茅屋奶酪"] = FoodGIData("茅屋奶酪", 45, GILevel.LOW, 100, 4.0, 1.8, GLLevel.LOW, "奶制品", "低脂高蛋白，减重期选择")
-        gi_foods["酸牛奶"] = FoodGIData("酸牛奶", 31, GILevel.LOW, 250, 11.0, 3.4, GLLevel.LOW, "奶制品", "传统发酵，营养易吸收")
-
-        # 坚果种子 (8种)
-        gi_foods["核桃"] = FoodGIData("核桃", 15, GILevel.LOW, 30, 1.2, 0.4, GLLevel.LOW, "坚果", "ω-3脂肪酸丰富，护心益脑")
-        gi_foods["杏仁"] = FoodGIData("杏仁", 15, GILevel.LOW, 30, 3.0, 0.9, GLLevel.LOW, "坚果", "维生素E高，抗氧化强")
-        gi_foods["腰果"] = FoodGIData("腰果", 25, GILevel.LOW, 30, 12.0, 3.0, GLLevel.LOW, "坚果", "镁含量高，有助血糖控制")
-        gi_foods["榛子"] = FoodGIData("榛子", 15, GILevel.LOW, 30, 2.8, 0.7, GLLevel.LOW, "坚果", "单不饱和脂肪酸丰富")
-        gi_foods["开心果"] = FoodGIData("开心果", 15, GILevel.LOW, 30, 1.0, 0.3, GLLevel.LOW, "坚果", "膳食纤维高，饱腹感强")
-        gi_foods["南瓜子"] = FoodGIData("南瓜子", 25, GILevel.LOW, 30, 5.6, 1.4, GLLevel.LOW, "种子", "锌含量高，增强免疫力")
-        gi_foods["芝麻"] = FoodGIData("芝麻", 35, GILevel.LOW, 20, 3.2, 1.1, GLLevel.LOW, "种子", "钙质丰富，芝麻素有益健康")
-        gi_foods["亚麻籽"] = FoodGIData("亚麻籽", 35, GILevel.LOW, 20, 0.6, 0.2, GLLevel.LOW, "种子", "ω-3含量极高，抗炎作用")
-
-        # 肉类 (5种) - GI=0
-        gi_foods["鸡胸肉"] = FoodGIData("鸡胸肉", 0, GILevel.LOW, 100, 0, 0, GLLevel.LOW, "肉类", "无碳水化合物，高蛋白低脂")
-        gi_foods["瘦猪肉"] = FoodGIData("瘦猪肉", 0, GILevel.LOW, 100, 0, 0, GLLevel.LOW, "肉类", "B族维生素丰富，适量摄入")
-        gi_foods["牛瘦肉"] = FoodGIData("牛瘦肉", 0, GILevel.LOW, 100, 0, 0, GLLevel.LOW, "肉类", "血红素铁高，预防贫血")
-        gi_foods["羊肉"] = FoodGIData("羊肉", 0, GILevel.LOW, 100, 0, 0, GLLevel.LOW, "肉类", "温补性质，冬季食用佳")
-        gi_foods["鸭胸肉"] = FoodGIData("鸭胸肉", 0, GILevel.LOW, 100, 0, 0, GLLevel.LOW, "肉类", "不饱和脂肪酸含量高")
-
-        # 鱼类 (6种) - GI=0
-        gi_foods["三文鱼"] = FoodGIData("三文鱼", 0, GILevel.LOW, 100, 0, 0, GLLevel.LOW, "鱼类", "ω-3脂肪酸极高，护心健脑")
-        gi_foods["鲫鱼"] = FoodGIData("鲫鱼", 0, GILevel.LOW, 100, 0, 0, GLLevel.LOW, "鱼类", "蛋白质优质，易消化吸收")
-        gi_foods["带鱼"] = FoodGIData("带鱼", 0, GILevel.LOW, 100, 0, 0, GLLevel.LOW, "鱼类", "DHA含量高，益智健脑")
-        gi_foods["鲈鱼"] = FoodGIData("鲈鱼", 0, GILevel.LOW, 100, 0, 0, GLLevel.LOW, "鱼类", "低脂高蛋白，肉质鲜嫩")
-        gi_foods["鳕鱼"] = FoodGIData("鳕鱼", 0, GILevel.LOW, 100, 0, 0, GLLevel.LOW, "鱼类", "维生素D丰富，助钙吸收")
-        gi_foods["沙丁鱼"] = FoodGIData("沙丁鱼", 0, GILevel.LOW, 100, 0, 0, GLLevel.LOW, "鱼类", "小型鱼类，汞含量低")
-
-        # 蛋类 (2种) - GI=0
-        gi_foods["鸡蛋"] = FoodGIData("鸡蛋", 0, GILevel.LOW, 50, 0, 0, GLLevel.LOW, "蛋类", "完全蛋白质，营养价值高")
-        gi_foods["鸭蛋"] = FoodGIData("鸭蛋", 0, GILevel.LOW, 50, 0, 0, GLLevel.LOW, "蛋类", "维生素B12含量高")
-
-        # 油脂类 (2种) - GI=0
-        gi_foods["橄榄油"] = FoodGIData("橄榄油", 0, GILevel.LOW, 10, 0, 0, GLLevel.LOW, "油脂", "单不饱和脂肪酸高，地中海饮食核心")
-        gi_foods["椰子油"] = FoodGIData("椰子油", 0, GILevel.LOW, 10, 0, 0, GLLevel.LOW, "油脂", "中链脂肪酸，易被人体利用")
-
-        return gi_foods
-
     def get_food_data(self, food_name: str) -> Optional[IntegratedFoodData]:
         """获取整合的食物数据"""
         return self.integrated_foods.get(food_name)
@@ -610,6 +501,21 @@ class IntegratedNutritionSystemV2:
 
     def _calculate_nutrition_targets(self, patient: PatientProfile) -> Dict:
         """计算营养目标"""
+        targets = self._nutrition_target_values(patient)
+
+        return {
+            "基础代谢率": f"{targets['bmr']:.0f}千卡/天",
+            "总日消耗": f"{targets['tdee']:.0f}千卡/天",
+            "目标热量": f"{targets['target_calories']:.0f}千卡/天",
+            "蛋白质": f"{targets['protein_grams']:.0f}g ({targets['protein_ratio']*100:.0f}%)",
+            "碳水化合物": f"{targets['carb_grams']:.0f}g ({targets['carb_ratio']*100:.0f}%)",
+            "脂肪": f"{targets['fat_grams']:.0f}g ({targets['fat_ratio']*100:.0f}%)",
+            "热量调整系数": f"{targets['calorie_adjustment']:.0%}"
+        }
+
+    @staticmethod
+    def _nutrition_target_values(patient: PatientProfile) -> Dict[str, float]:
+        """营养目标数值 (供报告格式化和菜单优化使用)"""
         # Harris-Benedict公式计算基础代谢率
         if patient.gender == "男":
             bmr = 88.362 + (13.397 * patient.weight) + (4.799 * patient.height) - (5.677 * patient.age)
@@ -641,27 +547,53 @@ class IntegratedNutritionSystemV2:
         carb_ratio = 0.50     # 50%碳水化合物
         fat_ratio = 0.25      # 25%脂肪
 
-        protein_grams = (target_calories * protein_ratio) / 4
-        carb_grams = (target_calories * carb_ratio) / 4
-        fat_grams = (target_calories * fat_ratio) / 9
-
         return {
-            "基础代谢率": f"{bmr:.0f}千卡/天",
-            "总日消耗": f"{tdee:.0f}千卡/天",
-            "目标热量": f"{target_calories:.0f}千卡/天",
-            "蛋白质": f"{protein_grams:.0f}g ({protein_ratio*100:.0f}%)",
-            "碳水化合物": f"{carb_grams:.0f}g ({carb_ratio*100:.0f}%)",
-            "脂肪": f"{fat_grams:.0f}g ({fat_ratio*100:.0f}%)",
-            "热量调整系数": f"{calorie_adjustment:.0%}"
+            "bmr": bmr,
+            "tdee": tdee,
+            "target_calories": target_calories,
+            "calorie_adjustment": calorie_adjustment,
+            "protein_ratio": protein_ratio,
+            "carb_ratio": carb_ratio,
+            "fat_ratio": fat_ratio,
+            "protein_grams": (target_calories * protein_ratio) / 4,
+            "carb_grams": (target_calories * carb_ratio) / 4,
+            "fat_grams": (target_calories * fat_ratio) / 9
         }
 
+    def menu_targets(self, patient: PatientProfile) -> MenuTargets:
+        """一周菜单优化的每日营养目标；糖尿病/高血糖患者附加单餐和每日GL上限"""
+        targets = self._nutrition_target_values(patient)
+        has_high_glucose = ("糖尿病" in patient.diagnosed_diseases or
+                            (patient.blood_glucose_fasting and patient.blood_glucose_fasting >= 7.0))
+        return MenuTargets(
+            calories=targets["target_calories"],
+            protein_g=targets["protein_grams"],
+            carbs_g=targets["carb_grams"],
+            fat_g=targets["fat_grams"],
+            meal_gl_ceiling=MEAL_GL_CEILING if has_high_glucose else None,
+            daily_gl_ceiling=DAILY_GL_CEILING if has_high_glucose else None
+        )
+
+    def optimize_weekly_menu(self, patient: PatientProfile) -> Dict:
+        """
+        按营养目标、GL上限、过敏/偏好约束优化一周菜单
+        与 _recommend_recipes 的固定轮换菜单不同，菜品和份量均按患者求解
+        """
+        return self.optimize_weekly_menus([patient])[0]
+
+    def optimize_weekly_menus(self, patients: List[PatientProfile], workers: Optional[int] = None) -> List[Dict]:
+        """
+        批量优化一周菜单 (如整个病区)，候选菜谱表由注册表共享
+        workers: 进程池大小，大于1时多位患者并行求解
+        """
+        optimizer = WeeklyMenuOptimizer(self.registry.menu_candidates)
+        return optimizer.optimize_batch(patients, [self.menu_targets(patient) for patient in patients], workers)
+
     def _recommend_recipes(self, patient: PatientProfile) -> Dict:
         """基于饮食偏好和健康状况的一周高质量菜谱推荐"""
 
-        # 导入一周菜谱管理器
-        from Core_Systems.weekly_menu_manager import WeeklyMenuManager
-
-        weekly_manager = WeeklyMenuManager()
+        # 一周菜谱管理器由注册表共享
+        weekly_manager = self.registry.weekly_menu_manager
 
         selected_cuisine = "清淡"  # 默认清淡，营养配比最均衡
         if patient.preferred_cuisines:
@@ -775,78 +707,113 @@ class IntegratedNutritionSystemV2:
         else:  # meal
             return self._create_meal_nutrition_radar(foods_portions, save_path)
 
+    def radar_chart_spec(self, foods_portions: List[Tuple[str, float]], chart_type: str = "meal") -> RadarChartSpec:
+        """营养雷达图的内容描述 (图表类型规则与 create_nutrition_radar_chart 一致)"""
+        if chart_type == "single" and len(foods_portions) == 1:
+            return self._single_food_radar_spec(foods_portions[0][0], foods_portions[0][1])
+        elif chart_type == "comparison":
+            return self._food_comparison_radar_spec(foods_portions)
+        else:  # meal
+            return self._meal_nutrition_radar_spec(foods_portions)
+
+    def render_nutrition_radar_chart(self, foods_portions: List[Tuple[str, float]],
+                                     chart_type: str = "meal", fmt: str = "png") -> bytes:
+        """无界面渲染营养雷达图，返回PNG/SVG字节 (相同内容直接返回缓存)"""
+        return self.chart_renderer.render(self.radar_chart_spec(foods_portions, chart_type), fmt)
+
+    def render_nutrition_radar_charts(self, chart_requests: List[Tuple[List[Tuple[str, float]], str]],
+                                      fmt: str = "png", workers: Optional[int] = None) -> List[bytes]:
+        """
+        批量渲染营养雷达图
+        chart_requests: [(食物及份量, 图表类型), ...]
+        workers: 进程池大小，未命中缓存的图表并行渲染
+        """
+        specs = [self.radar_chart_spec(foods_portions, chart_type) for foods_portions, chart_type in chart_requests]
+        return self.chart_renderer.render_many(specs, fmt, workers)
+
+    def save_report_radar_charts(self, chart_dir: str, workers: Optional[int] = None) -> Dict[str, str]:
+        """批量渲染综合报告附带的雷达图并保存为PNG，返回 {图表名称: 文件路径}"""
+        titles = list(REPORT_RADAR_CHARTS)
+        images = self.render_nutrition_radar_charts(
+            [(foods_portions, chart_type) for chart_type, foods_portions in REPORT_RADAR_CHARTS.values()],
+            workers=workers)
+
+        os.makedirs(chart_dir, exist_ok=True)
+        chart_files = {}
+        for title, image in zip(titles, images):
+            path = os.path.join(chart_dir, f"{title}.png")
+            with open(path, "wb") as f:
+                f.write(image)
+            chart_files[title] = path
+        return chart_files
+
+    def _figure_from_spec(self, spec: RadarChartSpec, save_path: Optional[str]) -> plt.Figure:
+        """按内容描述新建 pyplot 图形；保存文件经缓存渲染器完成"""
+        fig = plt.figure(figsize=spec.figsize)
+        draw_radar_chart(fig, spec)
+
+        if save_path:
+            self.chart_renderer.save(spec, save_path)
+
+        return fig
+
     def _create_single_food_radar(self, food_name: str, portion_g: float, save_path: str = None) -> plt.Figure:
         """创建单个食物的营养雷达图"""
+        return self._figure_from_spec(self._single_food_radar_spec(food_name, portion_g), save_path)
+
+    def _create_meal_nutrition_radar(self, meal_composition: List[Tuple[str, float]], save_path: str = None) -> plt.Figure:
+        """创建整餐营养雷达图"""
+        return self._figure_from_spec(self._meal_nutrition_radar_spec(meal_composition), save_path)
+
+    def _create_food_comparison_radar(self, foods_portions: List[Tuple[str, float]], save_path: str = None) -> plt.Figure:
+        """创建多个食物的营养对比雷达图"""
+        return self._figure_from_spec(self._food_comparison_radar_spec(foods_portions), save_path)
+
+    @staticmethod
+    def _nutrient_amounts(nutrition: FoodNutrition, ratio: float) -> List[float]:
+        """按 RADAR_DRV_VALUES 指标顺序的营养素含量"""
+        return [nutrition.protein * ratio, nutrition.carbs * ratio, nutrition.fat * ratio, nutrition.fiber * ratio,
+                nutrition.vitamin_c * ratio, nutrition.calcium * ratio, nutrition.iron * ratio,
+                nutrition.potassium * ratio]
+
+    @staticmethod
+    def _drv_percentages(amounts: List[float], cap: float) -> Tuple[float, ...]:
+        """相对于每日推荐值的百分比 (上限 cap)"""
+        return tuple(min(amount / drv * 100, cap) for amount, drv in zip(amounts, RADAR_DRV_VALUES.values()))
+
+    def _single_food_radar_spec(self, food_name: str, portion_g: float) -> RadarChartSpec:
+        """单个食物营养雷达图的内容"""
         food_data = self.get_food_data(food_name)
         if not food_data:
             raise ValueError(f"未找到食物 {food_name} 的营养数据")
 
         nutrition = food_data.nutrition
         ratio = portion_g / 100
-
-        # 定义营养指标和对应的每日推荐值
-        nutrients = {
-            '蛋白质': (nutrition.protein * ratio, 60),
-            '碳水化合物': (nutrition.carbs * ratio, 300),
-            '脂肪': (nutrition.fat * ratio, 60),
-            '膳食纤维': (nutrition.fiber * ratio, 30),
-            '维生素C': (nutrition.vitamin_c * ratio, 100),
-            '钙': (nutrition.calcium * ratio, 800),
-            '铁': (nutrition.iron * ratio, 15),
-            '钾': (nutrition.potassium * ratio, 2000),
-        }
-
-        # 计算相对于DRV的百分比
-        labels = list(nutrients.keys())
-        values = [min(nutrients[label][0] / nutrients[label][1] * 100, 150)
-                 for label in labels]
-
-        # 创建雷达图
-        fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(projection='polar'))
-
-        angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
-        angles += angles[:1]
-        values += values[:1]
-
-        ax.plot(angles, values, 'o-', linewidth=2, label=f'{nutrition.name} ({portion_g}g)')
-        ax.fill(angles, values, alpha=0.25)
-
-        ax.set_xticks(angles[:-1])
-        ax.set_xticklabels(labels, fontsize=12)
-        ax.set_ylim(0, 150)
-        ax.set_yticks([25, 50, 75, 100, 125, 150])
-        ax.set_yticklabels(['25%', '50%', '75%', '100%', '125%', '150%'], fontsize=10)
-        ax.grid(True)
-
-        plt.title(f'{nutrition.name} 营养成分雷达图\n(每{portion_g}g，相对于每日推荐值的百分比)',
-                 fontsize=16, fontweight='bold', pad=20)
+        values = self._drv_percentages(self._nutrient_amounts(nutrition, ratio), 150)
 
         calories_per_portion = nutrition.calories * ratio
-        plt.figtext(0.02, 0.02, f'热量: {calories_per_portion:.0f} 千卡/{portion_g}g',
-                   fontsize=12, bbox=dict(boxstyle="round,pad=0.3", facecolor="yellow", alpha=0.7))
+        notes = [RadarNote(0.02, 0.02, f'热量: {calories_per_portion:.0f} 千卡/{portion_g}g', "yellow")]
 
         # 添加GI信息（如果有）
         if food_data.gi_data:
             gi_info = f'GI: {food_data.gi_data.gi_value} ({food_data.gi_data.gi_level.value})'
-            plt.figtext(0.02, 0.08, gi_info, fontsize=12,
-                       bbox=dict(boxstyle="round,pad=0.3", facecolor="lightgreen", alpha=0.7))
-
-        plt.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1))
-        plt.tight_layout()
-
-        if save_path:
-            fig.savefig(save_path, dpi=300, bbox_inches='tight')
-
-        return fig
-
-    def _create_meal_nutrition_radar(self, meal_composition: List[Tuple[str, float]], save_path: str = None) -> plt.Figure:
-        """创建整餐营养雷达图"""
-        total_nutrition = {
-            'protein': 0, 'carbs': 0, 'fat': 0, 'fiber': 0,
-            'vitamin_c': 0, 'calcium': 0, 'iron': 0, 'potassium': 0,
-            'calories': 0
-        }
+            notes.append(RadarNote(0.02, 0.08, gi_info, "lightgreen"))
+
+        return RadarChartSpec(
+            labels=tuple(RADAR_DRV_VALUES),
+            series=(RadarSeries(values, color="C0", label=f'{nutrition.name} ({portion_g}g)', fill_alpha=0.25,
+                               fill_edge=False),),
+            title=f'{nutrition.name} 营养成分雷达图\n(每{portion_g}g，相对于每日推荐值的百分比)',
+            figsize=(10, 10),
+            notes=tuple(notes),
+            legend_anchor=(0.1, 0.1)
+        )
 
+    def _meal_nutrition_radar_spec(self, meal_composition: List[Tuple[str, float]]) -> RadarChartSpec:
+        """整餐营养雷达图的内容 (营养合计为食物重量向量与食材营养矩阵的乘积)"""
+        nutrients = self.registry.nutrient_table.totals(meal_composition)
+        totals = nutrients[RADAR_NUTRIENT_COLUMNS].tolist()
+        total_calories = nutrients[NUTRIENT_INDEX["calories"]]
         meal_details = []
         meal_gi_info = []
 
@@ -856,147 +823,71 @@ class IntegratedNutritionSystemV2:
                 continue
 
             nutrition = food_data.nutrition
-            ratio = portion / 100
-
-            total_nutrition['protein'] += nutrition.protein * ratio
-            total_nutrition['carbs'] += nutrition.carbs * ratio
-            total_nutrition['fat'] += nutrition.fat * ratio
-            total_nutrition['fiber'] += nutrition.fiber * ratio
-            total_nutrition['vitamin_c'] += nutrition.vitamin_c * ratio
-            total_nutrition['calcium'] += nutrition.calcium * ratio
-            total_nutrition['iron'] += nutrition.iron * ratio
-            total_nutrition['potassium'] += nutrition.potassium * ratio
-            total_nutrition['calories'] += nutrition.calories * ratio
-
             meal_details.append(f"{nutrition.name} {portion}g")
 
             if food_data.gi_data:
                 meal_gi_info.append(f"{food_name}(GI{food_data.gi_data.gi_value})")
 
-        # 营养指标标准值
-        drv_values = {
-            '蛋白质': 60, '碳水化合物': 300, '脂肪': 60, '膳食纤维': 30,
-            '维生素C': 100, '钙': 800, '铁': 15, '钾': 2000
-        }
-
-        labels = list(drv_values.keys())
-        values = [
-            min(total_nutrition['protein'] / drv_values['蛋白质'] * 100, 200),
-            min(total_nutrition['carbs'] / drv_values['碳水化合物'] * 100, 200),
-            min(total_nutrition['fat'] / drv_values['脂肪'] * 100, 200),
-            min(total_nutrition['fiber'] / drv_values['膳食纤维'] * 100, 200),
-            min(total_nutrition['vitamin_c'] / drv_values['维生素C'] * 100, 200),
-            min(total_nutrition['calcium'] / drv_values['钙'] * 100, 200),
-            min(total_nutrition['iron'] / drv_values['铁'] * 100, 200),
-            min(total_nutrition['potassium'] / drv_values['钾'] * 100, 200),
-        ]
-
-        fig, ax = plt.subplots(figsize=(12, 10), subplot_kw=dict(projection='polar'))
-
-        angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
-        angles += angles[:1]
-        values += values[:1]
-
-        ax.plot(angles, values, 'o-', linewidth=3, color='#FF6B6B')
-        ax.fill(angles, values, alpha=0.3, color='#FF6B6B')
-
-        # 添加100%参考线
-        ref_values = [100] * (len(labels) + 1)
-        ax.plot(angles, ref_values, '--', linewidth=1, color='green', alpha=0.7,
-               label='每日推荐值(100%)')
-
-        ax.set_xticks(angles[:-1])
-        ax.set_xticklabels(labels, fontsize=12)
-        ax.set_ylim(0, 200)
-        ax.set_yticks([50, 100, 150, 200])
-        ax.set_yticklabels(['50%', '100%', '150%', '200%'], fontsize=10)
-        ax.grid(True)
-
-        plt.title('膳食营养成分雷达图\n(相对于每日推荐值的百分比)',
-                 fontsize=16, fontweight='bold', pad=20)
-
         # 添加膳食组成信息
-        meal_info = f"膳食组成: {', '.join(meal_details)}\n总热量: {total_nutrition['calories']:.0f} 千卡"
+        meal_info = f"膳食组成: {', '.join(meal_details)}\n总热量: {total_calories:.0f} 千卡"
         if meal_gi_info:
             meal_info += f"\nGI信息: {', '.join(meal_gi_info)}"
 
-        plt.figtext(0.02, 0.02, meal_info, fontsize=10,
-                   bbox=dict(boxstyle="round,pad=0.5", facecolor="lightblue", alpha=0.7))
-
-        plt.legend(loc='upper right', bbox_to_anchor=(1.2, 1.0))
-        plt.tight_layout()
-
-        if save_path:
-            fig.savefig(save_path, dpi=300, bbox_inches='tight')
-
-        return fig
+        return RadarChartSpec(
+            labels=tuple(RADAR_DRV_VALUES),
+            series=(
+                RadarSeries(self._drv_percentages(totals, 200), color='#FF6B6B', linewidth=3, fill_alpha=0.3),
+                # 100%参考线
+                RadarSeries((100,) * len(RADAR_DRV_VALUES), color='green', label='每日推荐值(100%)',
+                            linestyle='--', linewidth=1, line_alpha=0.7)
+            ),
+            title='膳食营养成分雷达图\n(相对于每日推荐值的百分比)',
+            ylim=200,
+            yticks=(50, 100, 150, 200),
+            notes=(RadarNote(0.02, 0.02, meal_info, "lightblue", fontsize=10, pad=0.5),),
+            legend_anchor=(1.2, 1.0)
+        )
 
-    def _create_food_comparison_radar(self, foods_portions: List[Tuple[str, float]], save_path: str = None) -> plt.Figure:
-        """创建多个食物的营养对比雷达图"""
+    def _food_comparison_radar_spec(self, foods_portions: List[Tuple[str, float]]) -> RadarChartSpec:
+        """多个食物营养对比雷达图的内容"""
         if len(foods_portions) > 5:
             raise ValueError("最多支持5个食物的对比")
 
-        colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7']
-        drv_values = {
-            '蛋白质': 60, '碳水化合物': 300, '脂肪': 60, '膳食纤维': 30,
-            '维生素C': 100, '钙': 800, '铁': 15, '钾': 2000
-        }
-
-        labels = list(drv_values.keys())
-        fig, ax = plt.subplots(figsize=(12, 10), subplot_kw=dict(projection='polar'))
-
-        angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
-        angles += angles[:1]
-
+        series = []
         for i, (food_name, portion) in enumerate(foods_portions):
             food_data = self.get_food_data(food_name)
             if not food_data:
                 continue
 
             nutrition = food_data.nutrition
-            ratio = portion / 100
-
-            values = [
-                min(nutrition.protein * ratio / drv_values['蛋白质'] * 100, 150),
-                min(nutrition.carbs * ratio / drv_values['碳水化合物'] * 100, 150),
-                min(nutrition.fat * ratio / drv_values['脂肪'] * 100, 150),
-                min(nutrition.fiber * ratio / drv_values['膳食纤维'] * 100, 150),
-                min(nutrition.vitamin_c * ratio / drv_values['维生素C'] * 100, 150),
-                min(nutrition.calcium * ratio / drv_values['钙'] * 100, 150),
-                min(nutrition.iron * ratio / drv_values['铁'] * 100, 150),
-                min(nutrition.potassium * ratio / drv_values['钾'] * 100, 150),
-            ]
-            values += values[:1]
-
             label = f'{nutrition.name} ({portion}g)'
             if food_data.gi_data:
                 label += f' GI{food_data.gi_data.gi_value}'
 
-            ax.plot(angles, values, 'o-', linewidth=2,
-                   color=colors[i], label=label)
-            ax.fill(angles, values, alpha=0.1, color=colors[i])
-
-        ax.set_xticks(angles[:-1])
-        ax.set_xticklabels(labels, fontsize=12)
-        ax.set_ylim(0, 150)
-        ax.set_yticks([25, 50, 75, 100, 125, 150])
-        ax.set_yticklabels(['25%', '50%', '75%', '100%', '125%', '150%'], fontsize=10)
-        ax.grid(True)
-
-        plt.title('食物营养成分对比雷达图\n(相对于每日推荐值的百分比，含GI信息)',
-                 fontsize=16, fontweight='bold', pad=20)
-        plt.legend(loc='upper right', bbox_to_anchor=(1.3, 1.0))
-        plt.tight_layout()
+            values = self._drv_percentages(self._nutrient_amounts(nutrition, portion / 100), 150)
+            series.append(RadarSeries(values, color=RADAR_COMPARISON_COLORS[i], label=label, fill_alpha=0.1))
 
-        if save_path:
-            fig.savefig(save_path, dpi=300, bbox_inches='tight')
-
-        return fig
+        return RadarChartSpec(
+            labels=tuple(RADAR_DRV_VALUES),
+            series=tuple(series),
+            title='食物营养成分对比雷达图\n(相对于每日推荐值的百分比，含GI信息)',
+            legend_anchor=(1.3, 1.0)
+        )
 
     def generate_comprehensive_report_v2(self, patient: PatientProfile,
-                                        include_charts: bool = True) -> str:
-        """生成综合营养报告 v2.0（包含GI和雷达图）"""
-        assessment = self.comprehensive_assessment(patient)
+                                        include_charts: bool = True,
+                                        chart_dir: Optional[str] = None,
+                                        chart_workers: Optional[int] = None,
+                                        assessment_override: Optional[Dict] = None,
+                                        additional_sections: Optional[str] = None) -> str:
+        """
+        生成综合营养报告 v2.0（包含GI和雷达图）
+        chart_dir: 指定时将 REPORT_RADAR_CHARTS 渲染为PNG保存到该目录并在报告中列出
+        chart_workers: 雷达图批量渲染的进程池大小 (未命中缓存的图表并行渲染)
+        assessment_override: 已调整的综合评估 (如合并CGM结果后)，替代重新评估
+        additional_sections: 附加的Markdown章节，插入在监测计划之前
+        """
+        assessment = assessment_override if assessment_override is not None else self.comprehensive_assessment(patient)
 
         report = f"""
 # {patient.name} 综合营养管理报告 v2.0
@@ -1114,6 +1005,14 @@ class IntegratedNutritionSystemV2:
 
 *雷达图文件将保存为PNG格式，可用于报告展示*
 """
+            if chart_dir:
+                chart_files = self.save_report_radar_charts(chart_dir, chart_workers)
+                report += "\n### 雷达图文件:\n"
+                for title, path in chart_files.items():
+                    report += f"- {title}: `{path}`\n"
+
+        if additional_sections:
+            report += f"\n{additional_sections}\n"
 
         report += f"""
 ## 📊 监测计划
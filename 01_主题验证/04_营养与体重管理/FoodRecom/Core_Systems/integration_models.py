@@ -6,7 +6,7 @@ Shared data models for CGM + nutrition integration workflows.
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from datetime import date
 from typing import Dict, List, Optional
 
@@ -117,3 +117,7 @@ class IntegratedRecommendation:
     guidance_notes: List[str]
     medication_plan: MedicationPlan
     questionnaire: DietQuestionnaire
+
+    def to_dict(self) -> Dict:
+        """Plain-dict form for JSON export (dates/NumPy values left to the encoder)."""
+        return asdict(self)
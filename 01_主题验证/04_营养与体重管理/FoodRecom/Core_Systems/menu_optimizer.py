@@ -0,0 +1,607 @@
+"""
+一周菜单优化模块
+将一周菜单表述为带约束的组合优化问题，用确定性局部搜索求解 (单个患者毫秒级):
+- 决策: 每天每餐若干道菜 (菜谱 × 份量)，候选为简化菜谱库的全部菜谱
+- 目标: 每日热量和三大营养素接近营养目标 (_calculate_nutrition_targets)，各餐热量比例合理
+- 约束: 过敏/不喜食材、素食、单餐/每日GL上限为硬约束 (超出上限的移动不被接受)；
+  每日热量/营养素目标范围为高权重罚项，求解后仍超出范围的在说明中列出；
+  同一餐次一周内同名菜品不重复 (该餐次候选不足时按需放宽)
+- 偏好: 偏好菜系、适宜所患疾病的菜品优先
+候选菜谱的营养列 (热量、蛋白质、碳水、脂肪、GL) 预先编译为 NumPy 数组，进程内共享；
+批量求解时约束相同的患者共用候选可选项，约束和目标都相同的只求解一次，可用进程池并行
+"""
+
+import copy
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import astuple, dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .gi_database_integration_v2 import MEAT_TOKENS
+    from .nutrient_matrix import NUTRIENT_INDEX, match_food
+except ImportError:
+    from gi_database_integration_v2 import MEAT_TOKENS
+    from nutrient_matrix import NUTRIENT_INDEX, match_food
+
+WEEKDAY_NAMES = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+MEAL_SLOTS = ("早餐", "午餐", "晚餐", "加餐")
+
+# 每餐菜品数量及热量占比
+SLOT_DISHES = {"早餐": 2, "午餐": 3, "晚餐": 3, "加餐": 1}
+SLOT_CALORIE_SHARE = {"早餐": 0.25, "午餐": 0.35, "晚餐": 0.30, "加餐": 0.10}
+
+# 可选份量 (标准份量的倍数)
+PORTION_OPTIONS = (0.5, 0.75, 1.0, 1.25, 1.5, 2.0)
+
+# 素食排除的食材关键词 (蛋类不排除)
+VEGETARIAN_EXCLUDE_TOKENS = MEAT_TOKENS + ("虾", "蟹", "排骨")
+
+DEFAULT_CUISINE = "清淡"
+
+# 目标函数权重
+WEIGHT_CALORIES = 4.0       # 每日热量相对偏差²
+WEIGHT_PROTEIN = 1.0        # 每日蛋白质相对偏差²
+WEIGHT_CARBS_FAT = 1.0      # 每日碳水/脂肪相对偏差²
+WEIGHT_RANGE = 20.0         # 超出每日目标范围的相对量²
+WEIGHT_SLOT_SHARE = 1.0     # 各餐热量占比偏差²
+WEIGHT_CUISINE = 0.05       # 非偏好菜系
+WEIGHT_DISEASE = 0.02       # 不适宜所患疾病
+WEIGHT_PORTION = 0.01       # 偏离标准份量
+
+NUTRIENT_LABELS = ("热量", "蛋白质", "碳水化合物", "脂肪")
+
+# 能估算碳水的食材重量占比低于该值的菜谱不作为候选 (碳水/脂肪无法可靠估算)
+MIN_MACRO_COVERAGE = 0.8
+
+# GI数据库按熟重给出碳水的食物 (制备说明含这些词)，干重食材匹配到它们时碳水无法换算
+COOKED_BASIS_NOTES = ("煮熟", "粥", "米饭")
+
+# 每日热量/营养素允许的相对偏差 (目标范围)，顺序同 NUTRIENT_LABELS
+NUTRIENT_TOLERANCE = (0.10, 0.20, 0.20, 0.20)
+
+
+@dataclass
+class MenuTargets:
+    """每日营养目标及GL上限"""
+    calories: float                         # 热量(kcal)
+    protein_g: float                        # 蛋白质(g)
+    carbs_g: float                          # 碳水化合物(g)
+    fat_g: float                            # 脂肪(g)
+    meal_gl_ceiling: Optional[float] = None   # 单餐GL上限
+    daily_gl_ceiling: Optional[float] = None  # 每日GL上限
+
+    def __post_init__(self):
+        for name in ("calories", "protein_g", "carbs_g", "fat_g"):
+            if not getattr(self, name) > 0:
+                raise ValueError(f"营养目标 {name} 必须为正数: {getattr(self, name)}")
+        for name in ("meal_gl_ceiling", "daily_gl_ceiling"):
+            value = getattr(self, name)
+            if value is not None and not value > 0:
+                raise ValueError(f"GL上限 {name} 必须为正数: {value}")
+
+    @property
+    def vector(self) -> np.ndarray:
+        return np.array([self.calories, self.protein_g, self.carbs_g, self.fat_g])
+
+
+class RecipeCandidateTable:
+    """
+    列式候选菜谱表 (行顺序与 RecipeStore.recipes 一致)
+    简化菜谱只有热量和蛋白质，碳水由食材估算 (优先食物营养数据库的生重含量，否则GI数据库)，
+    GL为GI × 碳水，脂肪由剩余热量估算；能估算碳水的食材重量不足 MIN_MACRO_COVERAGE 的菜谱标记为数据不足
+    """
+
+    def __init__(self, store, gi_table, nutrient_table=None):
+        """
+        store: 简化菜谱库的 RecipeStore
+        gi_table: GI数据库的 GIFoodTable
+        nutrient_table: 可选的食物营养数据库 IngredientNutrientTable (每克营养素)
+        """
+        self.store = store
+        self.revision = store.revision
+        recipes = store.recipes
+        self.names = [recipe.name for recipe in recipes]
+        self.cuisines = [cuisine for cuisine, _ in store.locations]
+
+        slot_index = {slot: i for i, slot in enumerate(MEAL_SLOTS)}
+        self.slot_code = np.array([slot_index.get(meal_type, -1) for _, meal_type in store.locations], dtype=np.int8)
+        unique_names, name_code = np.unique(self.names, return_inverse=True)
+        self.unique_names = list(unique_names)
+        self.name_code = name_code.astype(np.int32)
+        self.cuisine_names, cuisine_code = np.unique(self.cuisines, return_inverse=True)
+        self.cuisine_code = cuisine_code.astype(np.int16)
+
+        # 食材 → 营养数据库/GI数据库食物，求每道菜的碳水、GL及能估算碳水的重量占比
+        gi_bases = {name: name.split("(")[0] for name in gi_table.index}
+        carbs, self.gl, self.macro_coverage = (np.zeros(len(recipes)) for _ in range(3))
+        for row, recipe in enumerate(recipes):
+            known_weight = total_weight = 0.0
+            for ingredient in recipe.ingredients:
+                carb_per_g, gi_value = self._ingredient_carbs(ingredient, gi_bases, gi_table, nutrient_table)
+                if carb_per_g is None and "水" in ingredient.name:
+                    continue  # 清水/温水不含能量，不计入重量
+                total_weight += ingredient.weight
+                if carb_per_g is not None:
+                    known_weight += ingredient.weight
+                    carbs[row] += ingredient.weight * carb_per_g
+                    self.gl[row] += gi_value * ingredient.weight * carb_per_g / 100
+            self.macro_coverage[row] = known_weight / total_weight if total_weight else 1.0
+        self.macro_estimated = self.macro_coverage >= MIN_MACRO_COVERAGE
+
+        calories = np.array([recipe.calories for recipe in recipes], dtype=float)
+        protein = np.array([recipe.protein for recipe in recipes], dtype=float)
+        fat = np.maximum(calories - 4 * (protein + carbs), 0) / 9
+        self.nutrients = np.column_stack([calories, protein, carbs, fat])
+
+        self.meat_mask = np.array([
+            any(token in ingredient.name for ingredient in recipe.ingredients if "蛋" not in ingredient.name
+                for token in VEGETARIAN_EXCLUDE_TOKENS)
+            for recipe in recipes], dtype=bool)
+        self._term_masks: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def _match_gi_food(ingredient_name: str, gi_bases: Dict[str, str]) -> Optional[str]:
+        """食材名对应的GI数据库食物 (匹配规则与食材营养矩阵一致)"""
+        return match_food(ingredient_name, gi_bases)
+
+    @classmethod
+    def _ingredient_carbs(cls, ingredient, gi_bases: Dict[str, str], gi_table,
+                          nutrient_table) -> Tuple[Optional[float], float]:
+        """
+        食材每克碳水及GI：营养数据库 (生重含量) 优先，否则GI数据库；
+        干重食材只匹配到按熟重给出碳水的GI食物时无法换算，碳水为 None
+        """
+        food = cls._match_gi_food(ingredient.name, gi_bases)
+        gi_food = gi_table.foods[gi_table.index[food]] if food else None
+        gi_value = gi_food.gi_value if gi_food else 0.0
+        nutrient_food = nutrient_table.match(ingredient.name) if nutrient_table is not None else None
+        if nutrient_food is not None:
+            return float(nutrient_table.per_gram[nutrient_food, NUTRIENT_INDEX["carbs"]]), gi_value
+        if gi_food is None or (getattr(ingredient, "weight_type", "") == "干重" and
+                               any(note in gi_food.preparation_notes for note in COOKED_BASIS_NOTES)):
+            return None, gi_value
+        return float(gi_table.carb_per_g[gi_table.index[food]]), gi_value
+
+    def term_mask(self, terms: Sequence[str]) -> np.ndarray:
+        """菜名或任一食材名包含任一关键词的菜谱掩码"""
+        mask = np.zeros(len(self.names), dtype=bool)
+        for term in terms:
+            if not term:
+                continue
+            if term not in self._term_masks:
+                term_mask = np.array([term in name for name in self.names], dtype=bool)
+                term_mask[self.store.ingredient_indices(term)] = True
+                self._term_masks[term] = term_mask
+            mask |= self._term_masks[term]
+        return mask
+
+    def disease_mask(self, diseases: Sequence[str]) -> np.ndarray:
+        """适宜任一疾病的菜谱掩码"""
+        mask = np.zeros(len(self.names), dtype=bool)
+        for disease in diseases:
+            mask[self.store.disease_indices(disease)] = True
+        return mask
+
+    def cuisine_mask(self, cuisines: Sequence[str]) -> np.ndarray:
+        """属于任一菜系的菜谱掩码"""
+        codes = [i for i, cuisine in enumerate(self.cuisine_names) if cuisine in cuisines]
+        return np.isin(self.cuisine_code, codes)
+
+
+class _SlotOptions:
+    """某餐次的全部可选项 (菜谱 × 份量) 列"""
+
+    def __init__(self, table: RecipeCandidateTable, rows: np.ndarray, row_penalty: np.ndarray, dishes: int):
+        portions = np.array(PORTION_OPTIONS)
+        self.dishes = dishes
+        self.rows = np.repeat(rows, len(portions))
+        self.portion = np.tile(portions, len(rows))
+        self.nutrients = table.nutrients[self.rows] * self.portion[:, None]
+        self.gl = table.gl[self.rows] * self.portion
+        self.name = table.name_code[self.rows]
+        self.static_cost = row_penalty[self.rows] + WEIGHT_PORTION * np.abs(self.portion - 1)
+        # 一周内每个菜名最多出现次数: 候选菜名足够时不重复
+        name_count = len(np.unique(table.name_code[rows]))
+        self.repeat_limit = math.ceil(len(WEEKDAY_NAMES) * dishes / name_count) if name_count else 0
+
+
+class WeeklyMenuOptimizer:
+    """一周菜单优化器 (候选表可在多位患者、多次求解间共享)"""
+
+    def __init__(self, candidates: RecipeCandidateTable, max_sweeps: int = 20):
+        if max_sweeps < 1:
+            raise ValueError(f"max_sweeps 必须为正整数: {max_sweeps}")
+        self.candidates = candidates
+        self.max_sweeps = max_sweeps
+
+    def _patient_rows(self, patient) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """患者可选菜谱掩码、每行偏好罚项及说明"""
+        table = self.candidates
+        notes = []
+        allowed = table.slot_code >= 0
+        lacking = int((allowed & ~table.macro_estimated).sum())
+        if lacking:
+            allowed &= table.macro_estimated
+            notes.append(f"已排除食材营养数据不足、碳水/脂肪无法估算的菜品{lacking}道")
+
+        avoid_terms = [term for term in list(patient.allergies or []) + list(patient.disliked_foods or []) if term]
+        if avoid_terms:
+            allowed &= ~table.term_mask(avoid_terms)
+            notes.append(f"已排除含过敏/不喜食材的菜品: {'/'.join(avoid_terms)}")
+        if patient.dietary_restrictions and "素食" in patient.dietary_restrictions:
+            allowed &= ~table.meat_mask
+            notes.append("遵循素食要求 (可含蛋奶)")
+
+        preferred = [c for c in (patient.preferred_cuisines or []) if c in table.cuisine_names] or [DEFAULT_CUISINE]
+        penalty = WEIGHT_CUISINE * ~table.cuisine_mask(preferred)
+        notes.append(f"优先选择{'/'.join(preferred)}菜系")
+        if patient.diagnosed_diseases:
+            penalty = penalty + WEIGHT_DISEASE * ~table.disease_mask(patient.diagnosed_diseases)
+        return allowed, penalty, notes
+
+    @staticmethod
+    def _constraint_key(patient) -> Tuple:
+        """决定候选可选项的患者约束 (过敏/不喜食材、饮食限制、偏好菜系、所患疾病)"""
+        return tuple(tuple(sorted(getattr(patient, field) or [])) for field in
+                     ("allergies", "disliked_foods", "dietary_restrictions", "preferred_cuisines", "diagnosed_diseases"))
+
+    def _slot_options(self, patient) -> Tuple[List[_SlotOptions], List[str]]:
+        """患者各餐次的可选项及说明"""
+        table = self.candidates
+        allowed, penalty, notes = self._patient_rows(patient)
+        slots = [_SlotOptions(table, np.flatnonzero(allowed & (table.slot_code == s)), penalty, SLOT_DISHES[slot])
+                 for s, slot in enumerate(MEAL_SLOTS)]
+        return slots, notes
+
+    def optimize(self, patient, targets: MenuTargets) -> Dict:
+        """为单个患者求解一周菜单"""
+        return self._solve(*self._slot_options(patient), targets)
+
+    def _solve(self, slots: List[_SlotOptions], patient_notes: List[str], targets: MenuTargets) -> Dict:
+        start = time.perf_counter()
+        table = self.candidates
+        notes = list(patient_notes)
+        solver = _LocalSearch(slots, targets, len(table.unique_names))
+        sweeps = solver.solve(self.max_sweeps)
+
+        for slot, options, choices in zip(MEAL_SLOTS, slots, solver.choices):
+            if options.repeat_limit == 0:
+                notes.append(f"{slot}无符合约束的候选菜品")
+                continue
+            if options.repeat_limit > 1:
+                notes.append(f"{slot}候选菜品不足，一周内同一菜品最多出现{options.repeat_limit}次")
+            empty = int((choices < 0).sum())
+            if empty:
+                notes.append(f"{slot}有{empty}个菜品位置没有不超过GL上限的可选菜品，已留空")
+        notes.extend(self._range_notes(solver))
+
+        result = self._format_result(solver, slots, targets, notes)
+        result["优化信息"] = {
+            "目标函数值": round(solver.total_cost(), 4),
+            "迭代轮数": sweeps,
+            "耗时毫秒": round((time.perf_counter() - start) * 1000, 1)
+        }
+        return result
+
+    @staticmethod
+    def _range_notes(solver: "_LocalSearch") -> List[str]:
+        """求解后仍超出每日目标范围的热量/营养素 (候选菜谱无法同时满足全部约束)"""
+        notes = []
+        lower = solver.day_nutrients < solver.target - solver.tolerance
+        upper = solver.day_nutrients > solver.target + solver.tolerance
+        for i, label in enumerate(NUTRIENT_LABELS):
+            for outside, word in ((lower[:, i], "低于"), (upper[:, i], "高于")):
+                if outside.any():
+                    notes.append(f"{label}有{int(outside.sum())}天{word}目标范围 "
+                                 f"(目标{solver.target[i]:.0f}±{NUTRIENT_TOLERANCE[i]:.0%}，"
+                                 f"这些天平均{solver.day_nutrients[outside, i].mean():.0f})")
+        if notes:
+            notes.append("碳水化合物由匹配到营养/GI数据库的食材估算，脂肪由剩余热量估算")
+        return notes
+
+    def optimize_batch(self, patients: Sequence, targets: Sequence[MenuTargets],
+                       workers: Optional[int] = None) -> List[Dict]:
+        """
+        批量求解 (如整个病区)，共享候选表和菜名/疾病掩码缓存:
+        约束相同的患者共用各餐次可选项，约束和营养目标都相同的患者只求解一次 (结果各自独立副本)
+        workers: 进程池大小；待求解的患者多于1位且 workers>1 时并行求解，否则在本进程求解
+        """
+        if len(patients) != len(targets):
+            raise ValueError(f"患者数量({len(patients)})与营养目标数量({len(targets)})不一致")
+
+        keys = [(self._constraint_key(patient), astuple(patient_targets))
+                for patient, patient_targets in zip(patients, targets)]
+        jobs: Dict[Tuple, Tuple] = {}
+        for key, patient, patient_targets in zip(keys, patients, targets):
+            jobs.setdefault(key, (patient, patient_targets))
+        # 约束相同的作业相邻，分块后同一进程内共用可选项
+        pending = sorted(jobs.items(), key=lambda item: repr(item[0][0]))
+
+        if workers and workers > 1 and len(pending) > 1:
+            workers = min(workers, len(pending))
+            size = math.ceil(len(pending) / workers)
+            chunks = [[job for _, job in pending[i:i + size]] for i in range(0, len(pending), size)]
+            with ProcessPoolExecutor(max_workers=len(chunks), initializer=_init_worker,
+                                     initargs=(self,)) as executor:
+                solved = [result for chunk in executor.map(_optimize_jobs, chunks) for result in chunk]
+        else:
+            solved = self._optimize_jobs([job for _, job in pending])
+
+        results = dict(zip((key for key, _ in pending), solved))
+        output, seen = [], set()
+        for key in keys:
+            output.append(results[key] if key not in seen else copy.deepcopy(results[key]))
+            seen.add(key)
+        return output
+
+    def _optimize_jobs(self, jobs: Sequence[Tuple]) -> List[Dict]:
+        """依次求解 (患者, 营养目标)，约束相同的患者共用可选项"""
+        slot_cache: Dict[Tuple, Tuple[List[_SlotOptions], List[str]]] = {}
+        results = []
+        for patient, patient_targets in jobs:
+            key = self._constraint_key(patient)
+            if key not in slot_cache:
+                slot_cache[key] = self._slot_options(patient)
+            results.append(self._solve(*slot_cache[key], patient_targets))
+        return results
+
+    def _format_result(self, solver: "_LocalSearch", slots: List[_SlotOptions],
+                       targets: MenuTargets, notes: List[str]) -> Dict:
+        table = self.candidates
+        weekly_plan, daily_nutrition = {}, {}
+        for d, day in enumerate(WEEKDAY_NAMES):
+            day_plan = {}
+            for slot, options, choices in zip(MEAL_SLOTS, slots, solver.choices):
+                dishes = []
+                for k in choices[d]:
+                    if k < 0:
+                        continue
+                    row = options.rows[k]
+                    calories, protein, carbs, fat = options.nutrients[k]
+                    dishes.append({
+                        "菜品名称": table.names[row],
+                        "菜系": table.cuisines[row],
+                        "份量": f"{options.portion[k]:g}份",
+                        "热量": round(float(calories)),
+                        "蛋白质": round(float(protein), 1),
+                        "碳水化合物": round(float(carbs), 1),
+                        "脂肪": round(float(fat), 1),
+                        "GL": round(float(options.gl[k]), 1)
+                    })
+                day_plan[slot] = dishes
+            weekly_plan[day] = day_plan
+            daily_nutrition[day] = {label: round(float(value), 1)
+                                    for label, value in zip(NUTRIENT_LABELS, solver.day_nutrients[d])}
+            daily_nutrition[day]["GL"] = round(float(solver.day_gl[d]), 1)
+
+        return {
+            "一周计划": weekly_plan,
+            "每日营养": daily_nutrition,
+            "营养目标": {
+                "热量": round(targets.calories),
+                "蛋白质": round(targets.protein_g),
+                "碳水化合物": round(targets.carbs_g),
+                "脂肪": round(targets.fat_g),
+                "单餐GL上限": targets.meal_gl_ceiling,
+                "每日GL上限": targets.daily_gl_ceiling
+            },
+            "说明": notes
+        }
+
+
+_worker_optimizer: Optional[WeeklyMenuOptimizer] = None
+
+
+def _init_worker(optimizer: WeeklyMenuOptimizer):
+    """进程池初始化：每个进程接收一份优化器 (含候选表)"""
+    global _worker_optimizer
+    _worker_optimizer = optimizer
+
+
+def _optimize_jobs(jobs: Sequence[Tuple]) -> List[Dict]:
+    return _worker_optimizer._optimize_jobs(jobs)
+
+
+class _LocalSearch:
+    """
+    局部搜索状态
+    目标函数 = Σ每日(热量/营养素偏差 + 超出目标范围) + Σ每餐热量占比偏差 + Σ菜品静态罚项
+    单餐/每日GL上限为可行性条件：初始为空菜单，只接受移动后仍不超过上限的移动，任何时刻都满足上限
+    (没有满足上限的可选项时该位置留空)
+    - 单点移动: 某天某餐某个位置换成全部可行选项中最优的一个 (向量化计算)
+    - 交换移动: 同一餐次两天的菜品互换 (不改变菜品使用次数)
+    """
+
+    def __init__(self, slots: List[_SlotOptions], targets: MenuTargets, name_count: int):
+        days = len(WEEKDAY_NAMES)
+        self.slots = slots
+        self.target = targets.vector
+        self.nutrient_weight = np.array([WEIGHT_CALORIES, WEIGHT_PROTEIN, WEIGHT_CARBS_FAT, WEIGHT_CARBS_FAT]) / self.target ** 2
+        self.tolerance = np.array(NUTRIENT_TOLERANCE) * self.target
+        self.slot_target = np.array([SLOT_CALORIE_SHARE[slot] * targets.calories for slot in MEAL_SLOTS])
+        self.meal_gl_ceiling = targets.meal_gl_ceiling
+        self.daily_gl_ceiling = targets.daily_gl_ceiling
+
+        self.choices = [np.full((days, options.dishes), -1, dtype=np.int64) for options in slots]
+        self.day_nutrients = np.zeros((days, 4))
+        self.day_gl = np.zeros(days)
+        self.slot_calories = np.zeros((days, len(slots)))
+        self.slot_gl = np.zeros((days, len(slots)))
+        # 各餐次分别计数 (同一菜品可出现在不同餐次)
+        self.name_used = np.zeros((len(slots), name_count), dtype=np.int64)
+        self.day_version = np.zeros(days, dtype=np.int64)
+        self._day_pairs = np.triu_indices(days, k=1)
+
+        # 单点移动的二次项展开: Σw(b+n-t)² = 常数 + 2n·w(b-t) + Σwn²，常数项不影响比较
+        self._option_square = [(options.nutrients ** 2 * self.nutrient_weight).sum(axis=1) +
+                               WEIGHT_SLOT_SHARE * (options.nutrients[:, 0] / self.target[0]) ** 2
+                               for options in slots]
+
+    @staticmethod
+    def _within_ceiling(gl, ceiling: Optional[float]):
+        """GL不超过上限 (无上限时恒为真)"""
+        if ceiling is None:
+            return True
+        return gl <= ceiling + 1e-9
+
+    def _range_penalty(self, nutrients):
+        """每日热量/营养素超出目标范围的罚项"""
+        excess = np.maximum(np.abs(nutrients - self.target) - self.tolerance, 0) / self.target
+        return WEIGHT_RANGE * (excess ** 2).sum(axis=-1)
+
+    def _day_cost(self, nutrients):
+        return ((nutrients - self.target) ** 2 * self.nutrient_weight).sum(axis=-1) + self._range_penalty(nutrients)
+
+    def _slot_cost(self, s: int, calories):
+        return WEIGHT_SLOT_SHARE * ((calories - self.slot_target[s]) / self.target[0]) ** 2
+
+    def total_cost(self) -> float:
+        cost = float(self._day_cost(self.day_nutrients).sum())
+        for s, (options, choices) in enumerate(zip(self.slots, self.choices)):
+            cost += float(self._slot_cost(s, self.slot_calories[:, s]).sum())
+            cost += float(options.static_cost[choices[choices >= 0]].sum())
+        return cost
+
+    def _assign(self, s: int, d: int, j: int, k: int):
+        """将 (天d, 餐次s, 位置j) 设为可选项k (-1 表示空)"""
+        options = self.slots[s]
+        current = self.choices[s][d, j]
+        for option, sign in ((current, -1), (k, 1)):
+            if option < 0:
+                continue
+            self.day_nutrients[d] += sign * options.nutrients[option]
+            self.day_gl[d] += sign * options.gl[option]
+            self.slot_calories[d, s] += sign * options.nutrients[option, 0]
+            self.slot_gl[d, s] += sign * options.gl[option]
+            self.name_used[s, options.name[option]] += sign
+        self.choices[s][d, j] = k
+        self.day_version[d] += 1
+
+    def _position_costs(self, s: int, d: int, j: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (天d, 餐次s, 位置j) 换成各可选项后的目标函数 (差一个与候选无关的常数) 及可行掩码
+        (菜品重复次数、同餐不重名、单餐/每日GL上限)
+        """
+        options = self.slots[s]
+        current = self.choices[s][d, j]
+        day_base, gl_base = self.day_nutrients[d].copy(), self.day_gl[d]
+        slot_calories, slot_gl = self.slot_calories[d, s], self.slot_gl[d, s]
+        if current >= 0:
+            day_base -= options.nutrients[current]
+            gl_base -= options.gl[current]
+            slot_calories -= options.nutrients[current, 0]
+            slot_gl -= options.gl[current]
+
+        # 与候选无关的常数项已略去，仅用于比较
+        linear = self.nutrient_weight * (day_base - self.target)
+        linear[0] += WEIGHT_SLOT_SHARE * (slot_calories - self.slot_target[s]) / self.target[0] ** 2
+        costs = 2 * (options.nutrients @ linear) + self._option_square[s] + options.static_cost
+        costs += self._range_penalty(day_base + options.nutrients)
+
+        used = self.name_used[s, options.name]
+        if current >= 0:
+            used = used - (options.name == options.name[current])
+        feasible = used < options.repeat_limit
+        feasible &= self._within_ceiling(gl_base + options.gl, self.daily_gl_ceiling)
+        feasible &= self._within_ceiling(slot_gl + options.gl, self.meal_gl_ceiling)
+        for i, other in enumerate(self.choices[s][d]):
+            if i != j and other >= 0:
+                feasible &= options.name != options.name[other]
+        return costs, feasible
+
+    def _improve_position(self, s: int, d: int, j: int) -> bool:
+        """单点移动：返回是否改进"""
+        if self.slots[s].repeat_limit == 0:
+            return False
+        current = self.choices[s][d, j]
+        costs, feasible = self._position_costs(s, d, j)
+        if not feasible.any():
+            return False
+
+        best = int(np.argmin(np.where(feasible, costs, np.inf)))
+        if current >= 0 and not costs[best] < costs[current] - 1e-12:
+            return False
+        self._assign(s, d, j, best)
+        return True
+
+    def _improve_by_swaps(self, s: int) -> bool:
+        """同一餐次两天互换某个位置的菜品 (全部天数组合向量化评估，每次执行收益最大的一次)：返回是否改进"""
+        options = self.slots[s]
+        choices = self.choices[s]
+        first, second = self._day_pairs
+        improved = False
+        for j in range(options.dishes):
+            while True:
+                current = choices[:, j]
+                valid = current >= 0
+                safe = np.where(valid, current, 0)
+                names = np.where(valid, options.name[safe], -1)
+                nutrients = options.nutrients[safe] * valid[:, None]
+                gl = options.gl[safe] * valid
+
+                # 互换后菜名不能与当天同餐其他位置重复
+                other_names = np.where(choices >= 0, options.name[np.maximum(choices, 0)], -1)
+                other_names[:, j] = -1
+                # 互换后两天的单餐/每日GL仍不超过上限
+                delta_gl = gl[second] - gl[first]
+                feasible = (valid[first] & valid[second] & (names[first] != names[second]) &
+                            ~(other_names[first] == names[second][:, None]).any(axis=1) &
+                            ~(other_names[second] == names[first][:, None]).any(axis=1) &
+                            self._within_ceiling(self.day_gl[first] + delta_gl, self.daily_gl_ceiling) &
+                            self._within_ceiling(self.day_gl[second] - delta_gl, self.daily_gl_ceiling) &
+                            self._within_ceiling(self.slot_gl[first, s] + delta_gl, self.meal_gl_ceiling) &
+                            self._within_ceiling(self.slot_gl[second, s] - delta_gl, self.meal_gl_ceiling))
+                if not feasible.any():
+                    break
+
+                delta_nutrients = nutrients[second] - nutrients[first]
+                day_cost = self._day_cost(self.day_nutrients)
+                slot_cost = self._slot_cost(s, self.slot_calories[:, s])
+                old = day_cost[first] + day_cost[second] + slot_cost[first] + slot_cost[second]
+                new = (self._day_cost(self.day_nutrients[first] + delta_nutrients) +
+                       self._day_cost(self.day_nutrients[second] - delta_nutrients) +
+                       self._slot_cost(s, self.slot_calories[first, s] + delta_nutrients[:, 0]) +
+                       self._slot_cost(s, self.slot_calories[second, s] - delta_nutrients[:, 0]))
+                gain = np.where(feasible, old - new, 0.0)
+                best = int(np.argmax(gain))
+                if not gain[best] > 1e-12:
+                    break
+
+                d1, d2 = first[best], second[best]
+                a, b = choices[d1, j], choices[d2, j]
+                self._assign(s, d1, j, -1)
+                self._assign(s, d2, j, a)
+                self._assign(s, d1, j, b)
+                improved = True
+        return improved
+
+    def solve(self, max_sweeps: int) -> int:
+        """
+        贪心构造初始解后交替单点移动和交换移动，直到无改进；返回迭代轮数
+        某位置上次评估后所在的天未发生变化时跳过该位置的单点移动
+        """
+        positions = [(s, d, j) for d in range(len(WEEKDAY_NAMES))
+                     for s, options in enumerate(self.slots) for j in range(options.dishes)]
+        for s, d, j in positions:
+            self._improve_position(s, d, j)
+        checked = [-1] * len(positions)
+
+        for sweep in range(1, max_sweeps + 1):
+            improved = False
+            for p, (s, d, j) in enumerate(positions):
+                if checked[p] == self.day_version[d]:
+                    continue
+                improved |= self._improve_position(s, d, j)
+                checked[p] = self.day_version[d]
+            for s in range(len(self.slots)):
+                improved |= self._improve_by_swaps(s)
+            if not improved:
+                return sweep
+        return max_sweeps
@@ -0,0 +1,243 @@
+"""
+食材营养矩阵模块
+菜谱、菜单、一周的营养合计由稀疏矩阵乘积得到，不再逐个食材查表累加:
+- 食材×营养素矩阵: 食物营养数据库每克含量 (注册表构建时编译一次)
+- 菜谱×食材重量矩阵 (scipy.sparse CSR): 每道菜各食材的可食重量(g)
+- 菜谱营养 = 重量矩阵 × 食材营养矩阵，编译时计算一次；菜谱库增删改后只计算新增或修改的菜谱
+- 菜单/一周营养 = 选菜矩阵 (菜单×菜谱，元素为份数) × 菜谱营养
+食材名按"精确匹配，否则取包含于食材名中最长的食物名"对应到营养数据库，未匹配的食材不计入，
+每道菜已匹配重量占比见 coverage
+"""
+
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# 营养素 (FoodNutrition 字段，每100g) 及显示名称
+NUTRIENT_FIELDS = ("calories", "protein", "carbs", "fat", "fiber",
+                   "vitamin_c", "calcium", "iron", "sodium", "potassium")
+NUTRIENT_LABELS = ("热量", "蛋白质", "碳水化合物", "脂肪", "膳食纤维",
+                   "维生素C", "钙", "铁", "钠", "钾")
+NUTRIENT_INDEX = {field: i for i, field in enumerate(NUTRIENT_FIELDS)}
+
+
+def match_food(ingredient_name: str, bases: Mapping[str, str]) -> Optional[str]:
+    """
+    食材名对应的数据库食物：精确匹配，否则取名称 (去掉括号说明) 包含于食材名中最长的一种
+    bases: {食物名: 去掉括号说明的名称}
+    """
+    if ingredient_name in bases:
+        return ingredient_name
+    best = None
+    for food, base in bases.items():
+        if base in ingredient_name and (best is None or len(base) > len(bases[best])):
+            best = food
+    return best
+
+
+def edible_weight(ingredient) -> float:
+    """食材的可食重量(g)：简化菜谱的 weight；详细菜谱优先净重，否则生重"""
+    weight = getattr(ingredient, "weight", None)
+    if weight is None:
+        weight = getattr(ingredient, "net_weight", None) or getattr(ingredient, "raw_weight", 0)
+    return float(weight or 0)
+
+
+class IngredientNutrientTable:
+    """食物营养数据库的每克营养素矩阵，并负责食材名到食物的匹配"""
+
+    def __init__(self, foods: Mapping):
+        """foods: {食物名: IntegratedFoodData}"""
+        self.food_names = list(foods)
+        self.food_index = {name: i for i, name in enumerate(self.food_names)}
+        self._bases = {name: name.split("(")[0] for name in self.food_names}
+        self._matches: Dict[str, Optional[int]] = {}
+        self.per_gram = np.array(
+            [[getattr(food.nutrition, field) for field in NUTRIENT_FIELDS] for food in foods.values()],
+            dtype=float).reshape(len(self.food_names), len(NUTRIENT_FIELDS)) / 100
+
+    def match(self, ingredient_name: str) -> Optional[int]:
+        """食材名对应的食物序号 (未匹配为 None)，结果按名称缓存"""
+        if ingredient_name not in self._matches:
+            food = match_food(ingredient_name, self._bases)
+            self._matches[ingredient_name] = None if food is None else self.food_index[food]
+        return self._matches[ingredient_name]
+
+    def ingredient_matrix(self, ingredient_names: Sequence[str]) -> sparse.csr_matrix:
+        """食材×营养素矩阵 (每克)，未匹配食材为空行"""
+        rows, foods = [], []
+        for row, name in enumerate(ingredient_names):
+            food = self.match(name)
+            if food is not None:
+                rows.append(row)
+                foods.append(food)
+        mapping = sparse.csr_matrix((np.ones(len(rows)), (rows, foods)),
+                                    shape=(len(ingredient_names), len(self.food_names)))
+        return sparse.csr_matrix(mapping @ self.per_gram)
+
+    def food_weights(self, foods_portions: Iterable[Tuple[str, float]]) -> sparse.csr_matrix:
+        """按食物名精确查找的 1×食物 重量行向量 (数据库中没有的食物不计入)"""
+        columns, weights = [], []
+        for food_name, portion in foods_portions:
+            column = self.food_index.get(food_name)
+            if column is not None:
+                columns.append(column)
+                weights.append(portion)
+        return sparse.csr_matrix((weights, ([0] * len(columns), columns)), shape=(1, len(self.food_names)))
+
+    def totals(self, foods_portions: Iterable[Tuple[str, float]]) -> np.ndarray:
+        """一组 (食物, 克数) 的营养素合计，顺序同 NUTRIENT_FIELDS"""
+        return np.asarray(self.food_weights(foods_portions) @ self.per_gram).ravel()
+
+
+class RecipeNutrientMatrix:
+    """
+    菜谱库的稀疏食材重量矩阵及菜谱营养 (行顺序与 RecipeStore.recipes 一致)
+    查询时若菜谱库已修改 (revision 变化) 先自动同步
+    """
+
+    def __init__(self, store, table: IngredientNutrientTable):
+        """
+        store: 菜谱库的 RecipeStore (菜谱需有 ingredients 列表)
+        table: 食材营养矩阵
+        """
+        self.store = store
+        self.table = table
+        self.ingredients: List[str] = []
+        self._ingredient_index: Dict[str, int] = {}
+        self._recipes: List = []
+        self._signatures: List[Tuple] = []
+        self._revision = None
+
+        self.weights = sparse.csr_matrix((0, 0))
+        self.ingredient_nutrients = sparse.csr_matrix((0, len(NUTRIENT_FIELDS)))
+        self.nutrients = np.zeros((0, len(NUTRIENT_FIELDS)))
+        self.coverage = np.zeros(0)
+        self.refresh()
+
+    def __len__(self) -> int:
+        return self.weights.shape[0]
+
+    @staticmethod
+    def _signature(recipe) -> Tuple:
+        return tuple((ingredient.name, edible_weight(ingredient)) for ingredient in recipe.ingredients)
+
+    def _ingredient_column(self, name: str) -> int:
+        column = self._ingredient_index.get(name)
+        if column is None:
+            column = self._ingredient_index[name] = len(self.ingredients)
+            self.ingredients.append(name)
+        return column
+
+    def _coverage(self, weights: sparse.csr_matrix) -> np.ndarray:
+        """每行已匹配到营养数据库的重量占比 (无食材的行为0)"""
+        total = np.asarray(weights.sum(axis=1)).ravel()
+        matched_mask = np.asarray(self.ingredient_nutrients.getnnz(axis=1) > 0, dtype=float)
+        matched = weights @ matched_mask
+        return np.divide(matched, total, out=np.zeros_like(total), where=total > 0)
+
+    def refresh(self) -> int:
+        """
+        与菜谱库同步：未变化的菜谱 (同一对象且食材、重量不变) 沿用原有行，只计算新增或修改的菜谱，
+        已删除菜谱的行随之移除；返回新增、修改和删除的菜谱数
+        """
+        recipes = self.store.recipes
+        signatures = [self._signature(recipe) for recipe in recipes]
+        previous = {}
+        for row, recipe in enumerate(self._recipes):
+            previous.setdefault(id(recipe), row)
+
+        kept_indices, kept_rows, changed = [], [], []
+        for index, (recipe, signature) in enumerate(zip(recipes, signatures)):
+            row = previous.pop(id(recipe), None)
+            if row is not None and signature == self._signatures[row]:
+                kept_indices.append(index)
+                kept_rows.append(row)
+            else:
+                changed.append(index)
+        self._revision = self.store.revision
+
+        if not changed and not previous and kept_rows == list(range(len(recipes))):
+            return 0
+
+        # 新出现的食材扩展列及食材营养矩阵
+        known = len(self.ingredients)
+        rows, columns, weights = [], [], []
+        for k, index in enumerate(changed):
+            for name, weight in signatures[index]:
+                rows.append(k)
+                columns.append(self._ingredient_column(name))
+                weights.append(weight)
+        if len(self.ingredients) > known:
+            added = self.table.ingredient_matrix(self.ingredients[known:])
+            self.ingredient_nutrients = sparse.vstack([self.ingredient_nutrients, added], format="csr")
+
+        # 同一道菜重复的食材在 CSR 中自动合并
+        changed_weights = sparse.csr_matrix((weights, (rows, columns)), shape=(len(changed), len(self.ingredients)))
+        kept_weights = self.weights[kept_rows] if kept_rows else sparse.csr_matrix((0, known))
+        kept_weights.resize((len(kept_rows), len(self.ingredients)))
+
+        # 拼接后的行顺序为 [沿用的行, 新计算的行]，按菜谱序号重排
+        order = np.argsort(np.array(kept_indices + changed, dtype=np.int64))
+        self.weights = sparse.vstack([kept_weights, changed_weights], format="csr")[order]
+        self.nutrients = np.vstack([self.nutrients[kept_rows],
+                                    (changed_weights @ self.ingredient_nutrients).toarray()])[order]
+        self.coverage = np.concatenate([self.coverage[kept_rows], self._coverage(changed_weights)])[order]
+        self._recipes = list(recipes)
+        self._signatures = signatures
+        return len(changed) + len(previous)
+
+    def _sync(self):
+        if self._revision != self.store.revision:
+            self.refresh()
+
+    def recipe_nutrition(self, index: int) -> Dict[str, float]:
+        """单道菜的营养合计 {营养素名称: 数值}"""
+        self._sync()
+        return {label: round(float(value), 1)
+                for label, value in zip(NUTRIENT_LABELS, self.nutrients[self._recipe_reference(index)])}
+
+    def _recipe_reference(self, recipe) -> int:
+        """菜谱序号或名称 → 行号"""
+        if isinstance(recipe, str):
+            index = self.store.name_index(recipe)
+            if index is None:
+                raise ValueError(f"未找到菜谱: {recipe}")
+            return index
+        index = int(recipe)
+        if not 0 <= index < len(self):
+            raise ValueError(f"菜谱序号超出范围: {recipe}")
+        return index
+
+    def selection_matrix(self, menus: Sequence[Iterable]) -> sparse.csr_matrix:
+        """
+        菜单×菜谱 选菜矩阵
+        menus: 每个菜单为菜谱序号/名称的列表，或 (菜谱序号/名称, 份数) 的列表
+        """
+        self._sync()
+        rows, columns, portions = [], [], []
+        for row, menu in enumerate(menus):
+            for item in menu:
+                recipe, portion = item if isinstance(item, tuple) else (item, 1.0)
+                rows.append(row)
+                columns.append(self._recipe_reference(recipe))
+                portions.append(portion)
+        return sparse.csr_matrix((portions, (rows, columns)), shape=(len(menus), len(self)))
+
+    def menu_nutrients(self, menus: Sequence[Iterable]) -> np.ndarray:
+        """每个菜单的营养素合计 (菜单数 × 营养素)"""
+        return np.asarray(self.selection_matrix(menus) @ self.nutrients)
+
+    def menu_coverage(self, menus: Sequence[Iterable]) -> np.ndarray:
+        """每个菜单已匹配到营养数据库的食材重量占比"""
+        selection = self.selection_matrix(menus)
+        recipe_weight = np.asarray(self.weights.sum(axis=1)).ravel()
+        total = selection @ recipe_weight
+        matched = selection @ (recipe_weight * self.coverage)
+        return np.divide(matched, total, out=np.zeros_like(total), where=total > 0)
+
+    def week_nutrients(self, daily_menus: Sequence[Iterable]) -> Tuple[np.ndarray, np.ndarray]:
+        """一周 (或任意天数) 菜单：返回 (每日营养素合计, 全周合计)"""
+        daily = self.menu_nutrients(daily_menus)
+        return daily, daily.sum(axis=0)
@@ -0,0 +1,196 @@
+"""
+营养数据注册表
+食物营养数据、GI数据库、GI列式表、食材营养矩阵、菜谱库、菜谱营养矩阵、菜单优化候选表、雷达图渲染缓存等在进程内只构建一次，所有系统共享同一份:
+- GI数据唯一来源为 GIDatabaseSystemV2 的数据库定义，整合营养系统不再保留副本
+- 字典以只读映射 (MappingProxyType) 对外提供，防止某个系统修改后影响其他系统
+- 简化菜谱库及其菜谱营养矩阵随注册表一起构建；其余对象首次访问时才构建 (惰性初始化)，多线程下只构建一次
+- 可选保存为本地快照文件，按格式版本和数据源模块内容校验，数据变化时自动重建
+"""
+
+import hashlib
+import importlib
+import os
+import pickle
+import sys
+import threading
+from types import MappingProxyType
+from typing import Optional
+
+# 注册表格式版本，数据结构变化时递增
+REGISTRY_VERSION = 1
+
+# 数据源模块，内容变化时快照失效
+_SOURCE_MODULES = ("gi_database_integration_v2", "integrated_nutrition_system_v2")
+
+_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_registry: Optional["NutritionRegistry"] = None
+_registry_lock = threading.Lock()
+
+
+def _sibling(module_name: str):
+    """
+    导入同目录模块，保证与调用方使用同一套类定义 (否则枚举比较等会失效):
+    作为 Core_Systems 包导入时按包内名称；直接运行某个模块脚本时该模块即 __main__
+    """
+    main_file = getattr(sys.modules.get("__main__"), "__file__", None)
+    if main_file and os.path.abspath(main_file) == os.path.join(_MODULE_DIR, f"{module_name}.py"):
+        return sys.modules["__main__"]
+    return importlib.import_module(f"{__package__}.{module_name}" if __package__ else module_name)
+
+
+def _source_key() -> str:
+    """注册表版本与数据源模块内容的指纹"""
+    digest = hashlib.sha1(f"registry:{REGISTRY_VERSION}".encode("utf-8"))
+    for module_name in _SOURCE_MODULES:
+        module_file = getattr(_sibling(module_name), "__file__", None)
+        if module_file and os.path.exists(module_file):
+            with open(module_file, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+class NutritionRegistry:
+    """进程内共享的只读营养数据注册表"""
+
+    def __init__(self, gi_foods: dict, integrated_foods: dict, snapshot_dir: Optional[str] = None):
+        GIFoodTable = _sibling("gi_database_integration_v2").GIFoodTable
+        nutrient_matrix = _sibling("nutrient_matrix")
+        SimpleRecipeManager = _sibling("simple_recipe_manager").SimpleRecipeManager
+
+        self.version = REGISTRY_VERSION
+        self.snapshot_dir = snapshot_dir
+        self.gi_foods = MappingProxyType(gi_foods)
+        self.integrated_foods = MappingProxyType(integrated_foods)
+        self.gi_table = GIFoodTable(gi_foods)
+        self.nutrient_table = nutrient_matrix.IngredientNutrientTable(integrated_foods)
+        self._lock = threading.Lock()
+        # 菜谱营养矩阵在构建注册表时整体计算，之后菜谱库修改时查询中增量同步
+        self._simple_recipe_manager = SimpleRecipeManager(self._snapshot_path("simple_recipes.pkl"))
+        self._simple_recipe_nutrients = nutrient_matrix.RecipeNutrientMatrix(
+            self._simple_recipe_manager.store, self.nutrient_table)
+        self._detailed_recipe_manager = None
+        self._weekly_menu_manager = None
+        self._menu_candidates = None
+        self._chart_renderer = None
+
+    def _snapshot_path(self, file_name: str) -> Optional[str]:
+        return os.path.join(self.snapshot_dir, file_name) if self.snapshot_dir else None
+
+    @property
+    def simple_recipe_manager(self):
+        """共享的简化菜谱管理器"""
+        return self._simple_recipe_manager
+
+    @property
+    def detailed_recipe_manager(self):
+        """共享的详细菜谱管理器"""
+        with self._lock:
+            if self._detailed_recipe_manager is None:
+                DetailedRecipeManager = _sibling("detailed_recipe_manager").DetailedRecipeManager
+                self._detailed_recipe_manager = DetailedRecipeManager(self._snapshot_path("detailed_recipes.pkl"))
+            return self._detailed_recipe_manager
+
+    @property
+    def weekly_menu_manager(self):
+        """共享的一周菜谱管理器"""
+        with self._lock:
+            if self._weekly_menu_manager is None:
+                WeeklyMenuManager = _sibling("weekly_menu_manager").WeeklyMenuManager
+                self._weekly_menu_manager = WeeklyMenuManager()
+            return self._weekly_menu_manager
+
+    @property
+    def menu_candidates(self):
+        """共享的一周菜单优化候选菜谱表 (由简化菜谱库和GI列式表编译，菜谱库修改后重新编译)"""
+        store = self.simple_recipe_manager.store
+        with self._lock:
+            if self._menu_candidates is None or self._menu_candidates.revision != store.revision:
+                RecipeCandidateTable = _sibling("menu_optimizer").RecipeCandidateTable
+                self._menu_candidates = RecipeCandidateTable(store, self.gi_table, self.nutrient_table)
+            return self._menu_candidates
+
+    @property
+    def simple_recipe_nutrients(self):
+        """共享的简化菜谱营养矩阵 (菜谱×食材重量 × 食材营养，菜谱库修改后查询时增量同步)"""
+        return self._simple_recipe_nutrients
+
+    @property
+    def chart_renderer(self):
+        """共享的营养雷达图渲染器 (指定快照目录时渲染结果同时缓存到其下 radar_charts 目录)"""
+        with self._lock:
+            if self._chart_renderer is None:
+                RadarChartRenderer = _sibling("radar_chart_renderer").RadarChartRenderer
+                self._chart_renderer = RadarChartRenderer(self._snapshot_path("radar_charts"))
+            return self._chart_renderer
+
+    @classmethod
+    def build(cls, snapshot_dir: Optional[str] = None) -> "NutritionRegistry":
+        """构建注册表；指定 snapshot_dir 时优先加载快照，缺失或过期则重新构建并写回"""
+        gi_module = _sibling("gi_database_integration_v2")
+        integrated_module = _sibling("integrated_nutrition_system_v2")
+        FoodGIData, GIDatabaseSystemV2 = gi_module.FoodGIData, gi_module.GIDatabaseSystemV2
+        IntegratedFoodData = integrated_module.IntegratedFoodData
+        IntegratedNutritionSystemV2 = integrated_module.IntegratedNutritionSystemV2
+
+        snapshot_path = os.path.join(snapshot_dir, "nutrition_registry.pkl") if snapshot_dir else None
+        source_key = _source_key() if snapshot_path else None
+
+        data = cls._load_snapshot(snapshot_path, source_key) if snapshot_path else None
+        # 快照中的对象须与当前导入的类一致，否则枚举比较等会失效
+        if data is not None and not (
+                all(isinstance(food, FoodGIData) for food in data["gi_foods"].values()) and
+                all(isinstance(food, IntegratedFoodData) for food in data["integrated_foods"].values())):
+            data = None
+
+        if data is None:
+            data = {
+                "gi_foods": GIDatabaseSystemV2._initialize_expanded_gi_database(),
+                "integrated_foods": IntegratedNutritionSystemV2._load_integrated_food_data()
+            }
+            if snapshot_path:
+                try:
+                    cls._save_snapshot(snapshot_path, source_key, data)
+                except OSError as e:
+                    print(f"⚠️ 营养数据注册表快照保存失败: {e}")
+
+        return cls(data["gi_foods"], data["integrated_foods"], snapshot_dir)
+
+    @staticmethod
+    def _save_snapshot(snapshot_path: str, source_key: str, data: dict):
+        directory = os.path.dirname(snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{snapshot_path}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump({"version": REGISTRY_VERSION, "source_key": source_key, **data},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, snapshot_path)
+
+    @staticmethod
+    def _load_snapshot(snapshot_path: str, source_key: str) -> Optional[dict]:
+        """加载快照；文件不存在、损坏、版本或数据源不一致时返回 None"""
+        if not os.path.exists(snapshot_path):
+            return None
+        try:
+            with open(snapshot_path, "rb") as f:
+                payload = pickle.load(f)
+        except Exception:
+            return None
+        if (not isinstance(payload, dict) or payload.get("version") != REGISTRY_VERSION or
+                payload.get("source_key") != source_key):
+            return None
+        return payload
+
+
+def get_registry(snapshot_dir: Optional[str] = None) -> NutritionRegistry:
+    """
+    获取进程内唯一的营养数据注册表 (首次调用时构建)
+    snapshot_dir: 可选的快照目录，仅首次构建时生效
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = NutritionRegistry.build(snapshot_dir)
+    return _registry
@@ -0,0 +1,276 @@
+"""
+营养雷达图渲染模块
+报告生成不再每次经 pyplot 新建图形:
+- 图表内容描述为可序列化的 RadarChartSpec (标签、数据系列、标题、注释框)，与食物数据库解耦
+- 直接使用 Agg 画布渲染 (无需图形界面)，同一布局的极坐标轴模板每个进程只构建一次，渲染后移除数据图元复用
+- 渲染结果 (PNG/SVG 字节) 按图表内容和输出格式的哈希缓存，可选写入本地缓存目录
+- 批量渲染时未命中缓存的图表可交给进程池并行渲染
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from io import BytesIO
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# 渲染格式版本，绘制逻辑变化时递增使缓存失效
+RENDERER_VERSION = 2
+
+SUPPORTED_FORMATS = ("png", "svg")
+
+# 中文字体 (与整合营养系统一致，进程池子进程中同样生效)
+matplotlib.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
+matplotlib.rcParams['axes.unicode_minus'] = False
+
+
+@dataclass(frozen=True)
+class RadarSeries:
+    """雷达图数据系列"""
+    values: Tuple[float, ...]            # 各指标数值 (与 labels 一一对应，不闭合)
+    color: str
+    label: Optional[str] = None
+    linestyle: str = "o-"
+    linewidth: float = 2
+    line_alpha: Optional[float] = None
+    fill_alpha: Optional[float] = None   # None 表示不填充
+    fill_edge: bool = True               # False 时填充区域不描边
+
+
+@dataclass(frozen=True)
+class RadarNote:
+    """图下方注释框"""
+    x: float
+    y: float
+    text: str
+    facecolor: str
+    fontsize: float = 12
+    pad: float = 0.3
+
+
+@dataclass(frozen=True)
+class RadarChartSpec:
+    """雷达图内容描述"""
+    labels: Tuple[str, ...]
+    series: Tuple[RadarSeries, ...]
+    title: str
+    figsize: Tuple[float, float] = (12, 10)
+    ylim: float = 150
+    yticks: Tuple[int, ...] = (25, 50, 75, 100, 125, 150)
+    notes: Tuple[RadarNote, ...] = ()
+    legend_anchor: Tuple[float, float] = (1.2, 1.0)
+
+    @property
+    def layout(self) -> Tuple:
+        """决定极坐标轴模板的布局部分"""
+        return self.labels, self.figsize, self.ylim, self.yticks
+
+    def cache_key(self, fmt: str, dpi: int) -> str:
+        payload = json.dumps([RENDERER_VERSION, fmt, dpi, asdict(self)], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _angles(count: int) -> List[float]:
+    """闭合的各指标角度"""
+    angles = np.linspace(0, 2 * np.pi, count, endpoint=False).tolist()
+    return angles + angles[:1]
+
+
+def _setup_axes(fig: Figure, spec: RadarChartSpec):
+    """在图形上建立极坐标轴 (刻度、标签、网格)"""
+    ax = fig.add_subplot(projection='polar')
+    angles = _angles(len(spec.labels))
+    ax.set_xticks(angles[:-1])
+    ax.set_xticklabels(spec.labels, fontsize=12)
+    ax.set_ylim(0, spec.ylim)
+    ax.set_yticks(spec.yticks)
+    ax.set_yticklabels([f"{tick}%" for tick in spec.yticks], fontsize=10)
+    ax.grid(True)
+    return ax
+
+
+def _draw_content(fig: Figure, ax, spec: RadarChartSpec) -> list:
+    """绘制数据系列、标题、注释框和图例，返回新增的图元 (复用模板时据此移除)"""
+    angles = _angles(len(spec.labels))
+    artists = []
+    for series in spec.series:
+        values = list(series.values) + list(series.values[:1])
+        artists += ax.plot(angles, values, series.linestyle, linewidth=series.linewidth,
+                           color=series.color, alpha=series.line_alpha, label=series.label)
+        if series.fill_alpha is not None:
+            fill_color = {'color': series.color} if series.fill_edge else {'facecolor': series.color, 'edgecolor': 'none'}
+            artists += ax.fill(angles, values, alpha=series.fill_alpha, **fill_color)
+
+    ax.set_title(spec.title, fontsize=16, fontweight='bold', pad=20)
+    for note in spec.notes:
+        artists.append(fig.text(note.x, note.y, note.text, fontsize=note.fontsize,
+                                bbox=dict(boxstyle=f"round,pad={note.pad}", facecolor=note.facecolor, alpha=0.7)))
+    if any(series.label for series in spec.series):
+        artists.append(ax.legend(loc='upper right', bbox_to_anchor=spec.legend_anchor))
+    return artists
+
+
+def draw_radar_chart(fig: Figure, spec: RadarChartSpec):
+    """在给定图形上完整绘制雷达图 (供需要返回 Figure 对象的接口使用)，返回极坐标轴"""
+    ax = _setup_axes(fig, spec)
+    _draw_content(fig, ax, spec)
+    fig.tight_layout()
+    return ax
+
+
+# 本进程的极坐标轴模板 {布局: (图形, 极坐标轴)}
+_templates: Dict[Tuple, Tuple[Figure, object]] = {}
+_render_lock = threading.Lock()
+_DEFAULT_SUBPLOT_PARAMS = {name: matplotlib.rcParams[f"figure.subplot.{name}"]
+                           for name in ("left", "bottom", "right", "top", "wspace", "hspace")}
+
+
+def _template(spec: RadarChartSpec):
+    template = _templates.get(spec.layout)
+    if template is None:
+        fig = Figure(figsize=spec.figsize)
+        FigureCanvasAgg(fig)
+        ax = _setup_axes(fig, spec)
+        template = _templates[spec.layout] = (fig, ax)
+    return template
+
+
+def render_spec(spec: RadarChartSpec, fmt: str = "png", dpi: int = 300) -> bytes:
+    """用本进程的模板渲染一张雷达图，返回图像字节"""
+    with _render_lock:
+        fig, ax = _template(spec)
+        artists = _draw_content(fig, ax, spec)
+        try:
+            # 从默认子图参数重新排版 (tight_layout 依赖当前位置)，与 draw_radar_chart 输出一致
+            fig.subplots_adjust(**_DEFAULT_SUBPLOT_PARAMS)
+            fig.tight_layout()
+            buffer = BytesIO()
+            fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight')
+            return buffer.getvalue()
+        finally:
+            for artist in artists:
+                artist.remove()
+            ax.set_title("")
+
+
+def _render_job(job: Tuple[RadarChartSpec, str, int]) -> bytes:
+    """进程池任务"""
+    return render_spec(*job)
+
+
+class RadarChartRenderer:
+    """带缓存的雷达图渲染器"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_cached: int = 256, dpi: int = 300):
+        """
+        cache_dir: 可选的本地缓存目录，渲染结果按哈希保存为 <哈希>.<格式>
+        max_cached: 进程内缓存的最大图表数 (LRU)
+        dpi: PNG 输出分辨率
+        """
+        if max_cached < 0:
+            raise ValueError(f"max_cached 不能为负数: {max_cached}")
+        self.cache_dir = cache_dir
+        self.max_cached = max_cached
+        self.dpi = dpi
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _check_format(fmt: str):
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的图片格式: {fmt} (可选: {', '.join(SUPPORTED_FORMATS)})")
+
+    def _cache_path(self, key: str, fmt: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, f"{key}.{fmt}") if self.cache_dir else None
+
+    def _lookup(self, key: str, fmt: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                return data
+        path = self._cache_path(key, fmt)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                return None
+            self._remember(key, data)
+            return data
+        return None
+
+    def _remember(self, key: str, data: bytes):
+        with self._lock:
+            self._cache[key] = data
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+    def _store(self, key: str, fmt: str, data: bytes):
+        self._remember(key, data)
+        path = self._cache_path(key, fmt)
+        if path:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                temp_path = f"{path}.tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"⚠️ 雷达图缓存保存失败: {e}")
+
+    def render(self, spec: RadarChartSpec, fmt: str = "png") -> bytes:
+        """渲染单张雷达图 (命中缓存时直接返回)"""
+        return self.render_many([spec], fmt)[0]
+
+    def render_many(self, specs: Sequence[RadarChartSpec], fmt: str = "png",
+                    workers: Optional[int] = None) -> List[bytes]:
+        """
+        批量渲染雷达图，结果顺序与 specs 一致
+        workers: 进程池大小；未命中缓存的图表多于1张且 workers>1 时并行渲染，否则在本进程渲染
+        """
+        self._check_format(fmt)
+        keys = [spec.cache_key(fmt, self.dpi) for spec in specs]
+        results: Dict[str, bytes] = {}
+        pending: Dict[str, RadarChartSpec] = {}
+        for key, spec in zip(keys, specs):
+            if key in results or key in pending:
+                continue
+            data = self._lookup(key, fmt)
+            if data is None:
+                pending[key] = spec
+            else:
+                results[key] = data
+
+        if pending:
+            jobs = [(spec, fmt, self.dpi) for spec in pending.values()]
+            if workers and workers > 1 and len(jobs) > 1:
+                with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+                    rendered = list(executor.map(_render_job, jobs))
+            else:
+                rendered = [_render_job(job) for job in jobs]
+            for key, data in zip(pending, rendered):
+                self._store(key, fmt, data)
+                results[key] = data
+
+        return [results[key] for key in keys]
+
+    def save(self, spec: RadarChartSpec, path: str) -> str:
+        """渲染并保存到文件 (格式由扩展名决定，默认PNG)，返回文件路径"""
+        fmt = os.path.splitext(path)[1].lstrip(".").lower() or "png"
+        data = self.render(spec, fmt)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
@@ -0,0 +1,212 @@
+"""
+菜谱索引存储模块
+将 {菜系: {餐次: [菜谱]}} 嵌套结构编译为扁平列表和倒排索引，查询不再逐层遍历:
+- 名称索引: 菜谱名 → 首个同名菜谱（与原遍历顺序一致）
+- 食材索引: 食材名的全部子串 → 菜谱序号（保持原有"包含"匹配语义）
+- 疾病索引: 适宜疾病 → 菜谱序号
+编译结果在进程内只编译一次 (各管理器取得独立副本，互不影响)，也可保存为本地快照文件，按数据源模块内容校验，数据变化时自动重建
+"""
+
+import copy
+import hashlib
+import os
+import pickle
+import sys
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 快照格式版本，索引结构变化时递增
+STORE_FORMAT_VERSION = 2
+
+# 进程内已编译的菜谱库 {(数据源模块, 构建函数名): RecipeStore}
+_compiled_stores: Dict[Tuple[str, str], "RecipeStore"] = {}
+
+
+def _substrings(text: str) -> set:
+    """字符串的全部非空子串（食材名通常2-5个字，子串数量很小）"""
+    return {text[i:j] for i in range(len(text)) for j in range(i + 1, len(text) + 1)}
+
+
+def _source_key(module_name: str) -> str:
+    """数据源模块的内容指纹，用于判断快照是否过期"""
+    digest = hashlib.sha1(f"{STORE_FORMAT_VERSION}:{module_name}".encode("utf-8"))
+    module_file = getattr(sys.modules.get(module_name), "__file__", None)
+    if module_file and os.path.exists(module_file):
+        with open(module_file, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class RecipeStore:
+    """带倒排索引的菜谱存储"""
+
+    def __init__(self, nested_recipes: Dict[str, Dict[str, list]],
+                 ingredients_attr: str = "ingredients",
+                 diseases_attr: str = "disease_suitability"):
+        """
+        nested_recipes: {菜系: {餐次: [菜谱]}}，菜谱需有 name 属性
+        ingredients_attr / diseases_attr: 菜谱对象上食材列表、适宜疾病列表的属性名
+        """
+        self.nested = nested_recipes
+        self.revision = 0
+        self._ingredients_attr = ingredients_attr
+        self._diseases_attr = diseases_attr
+        self._build_indexes()
+
+    def _build_indexes(self):
+        """由嵌套菜谱生成扁平列表和索引 (每次新建容器，副本之间共享的旧索引不受影响)"""
+        self.recipes: List = []
+        self.locations: List[Tuple[str, str]] = []
+        self._by_name: Dict[str, int] = {}
+        self._by_location: Dict[Tuple[str, str, str], int] = {}
+        self._by_ingredient: Dict[str, List[int]] = {}
+        self._by_disease: Dict[str, List[int]] = {}
+        self._with_ingredients: List[int] = []
+
+        for cuisine_type, meals in self.nested.items():
+            for meal_type, recipes in meals.items():
+                for recipe in recipes:
+                    index = len(self.recipes)
+                    self.recipes.append(recipe)
+                    self.locations.append((cuisine_type, meal_type))
+                    self._by_name.setdefault(recipe.name, index)
+                    self._by_location.setdefault((cuisine_type, meal_type, recipe.name), index)
+
+                    ingredients = getattr(recipe, self._ingredients_attr, [])
+                    if ingredients:
+                        self._with_ingredients.append(index)
+                    tokens = set()
+                    for ingredient in ingredients:
+                        tokens |= _substrings(ingredient.name)
+                    for token in tokens:
+                        self._by_ingredient.setdefault(token, []).append(index)
+
+                    for disease in dict.fromkeys(getattr(recipe, self._diseases_attr, [])):
+                        self._by_disease.setdefault(disease, []).append(index)
+
+    def reindex(self):
+        """
+        嵌套菜谱或菜谱对象修改后重建索引，并递增 revision
+        依赖菜谱库的编译结果 (菜单优化候选表、菜谱营养矩阵) 据此同步
+        """
+        self._build_indexes()
+        self.revision += 1
+
+    def add(self, cuisine_type: str, meal_type: str, recipe):
+        """添加菜谱"""
+        self.nested.setdefault(cuisine_type, {}).setdefault(meal_type, []).append(recipe)
+        self.reindex()
+
+    def replace(self, cuisine_type: str, meal_type: str, recipe_name: str, recipe) -> bool:
+        """替换指定菜系、餐次下首个同名菜谱；未找到时返回 False"""
+        recipes = self.nested.get(cuisine_type, {}).get(meal_type, [])
+        for i, existing in enumerate(recipes):
+            if existing.name == recipe_name:
+                recipes[i] = recipe
+                self.reindex()
+                return True
+        return False
+
+    def remove(self, cuisine_type: str, meal_type: str, recipe_name: str) -> bool:
+        """删除指定菜系、餐次下首个同名菜谱；未找到时返回 False"""
+        recipes = self.nested.get(cuisine_type, {}).get(meal_type, [])
+        for i, existing in enumerate(recipes):
+            if existing.name == recipe_name:
+                del recipes[i]
+                self.reindex()
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self.recipes)
+
+    def get(self, cuisine_type: str, meal_type: str, recipe_name: str):
+        """按菜系、餐次和名称获取菜谱"""
+        index = self._by_location.get((cuisine_type, meal_type, recipe_name))
+        return None if index is None else self.recipes[index]
+
+    def get_by_name(self, recipe_name: str):
+        """按名称获取菜谱（跨菜系和餐次，同名时返回最先出现的）"""
+        index = self._by_name.get(recipe_name)
+        return None if index is None else self.recipes[index]
+
+    def name_index(self, recipe_name: str) -> Optional[int]:
+        """按名称获取菜谱序号（对应 self.recipes，同名时为最先出现的）"""
+        return self._by_name.get(recipe_name)
+
+    def ingredient_indices(self, ingredient_name: str) -> List[int]:
+        """食材名包含 ingredient_name 的菜谱序号（对应 self.recipes）"""
+        return self._by_ingredient.get(ingredient_name, []) if ingredient_name else self._with_ingredients
+
+    def disease_indices(self, disease: str) -> List[int]:
+        """适宜特定疾病的菜谱序号（对应 self.recipes）"""
+        return self._by_disease.get(disease, [])
+
+    def search_by_ingredient(self, ingredient_name: str) -> List:
+        """食材名包含 ingredient_name 的菜谱"""
+        return [self.recipes[i] for i in self.ingredient_indices(ingredient_name)]
+
+    def get_by_disease(self, disease: str) -> List:
+        """适宜特定疾病的菜谱"""
+        return [self.recipes[i] for i in self.disease_indices(disease)]
+
+    def copy(self) -> "RecipeStore":
+        """独立副本：菜谱对象及嵌套字典深拷贝 (两者仍指向同一批菜谱)，编译后不再修改的索引共享"""
+        clone = copy.copy(self)
+        memo: dict = {}
+        clone.nested = copy.deepcopy(self.nested, memo)
+        clone.recipes = copy.deepcopy(self.recipes, memo)
+        clone.locations = list(self.locations)
+        return clone
+
+    def save(self, snapshot_path: str, source_key: str):
+        """保存编译结果快照"""
+        directory = os.path.dirname(snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{snapshot_path}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump({"source_key": source_key, "store": self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, snapshot_path)
+
+    @staticmethod
+    def load(snapshot_path: str, source_key: str) -> Optional["RecipeStore"]:
+        """加载快照；文件不存在、损坏或数据源已变化时返回 None"""
+        if not os.path.exists(snapshot_path):
+            return None
+        try:
+            with open(snapshot_path, "rb") as f:
+                payload = pickle.load(f)
+        except Exception:
+            return None
+        if not isinstance(payload, dict) or payload.get("source_key") != source_key:
+            return None
+        return payload.get("store")
+
+    @classmethod
+    def compile(cls, build_recipes: Callable[[], Dict[str, Dict[str, list]]],
+                snapshot_path: Optional[str] = None, **index_attrs) -> "RecipeStore":
+        """
+        获取编译后菜谱库的独立副本：进程内只编译一次；指定 snapshot_path 时优先加载本地快照，
+        快照缺失或过期则重新编译并写回
+        build_recipes: 返回嵌套菜谱字典的函数（即各管理器原有的初始化方法）
+        """
+        module_name = build_recipes.__module__
+        cache_key = (module_name, build_recipes.__qualname__)
+        store = _compiled_stores.get(cache_key)
+        if store is not None:
+            return store.copy()
+
+        source_key = _source_key(module_name) if snapshot_path else None
+        if snapshot_path:
+            store = cls.load(snapshot_path, source_key)
+
+        if store is None:
+            store = cls(build_recipes(), **index_attrs)
+            if snapshot_path:
+                try:
+                    store.save(snapshot_path, source_key)
+                except OSError as e:
+                    print(f"⚠️ 菜谱库快照保存失败: {e}")
+
+        _compiled_stores[cache_key] = store
+        return store.copy()
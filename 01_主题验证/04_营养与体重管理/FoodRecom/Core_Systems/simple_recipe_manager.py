@@ -6,6 +6,11 @@
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
+try:
+    from .recipe_store import RecipeStore
+except ImportError:
+    from recipe_store import RecipeStore
+
 @dataclass
 class SimpleIngredient:
     """简化食材信息"""
@@ -25,8 +30,12 @@ class SimpleRecipe:
 class SimpleRecipeManager:
     """简化菜谱管理器 - 大量菜谱数据库"""
 
-    def __init__(self):
-        self.recipes = self._load_recipes()
+    def __init__(self, snapshot_path: Optional[str] = None):
+        """
+        snapshot_path: 可选的菜谱库快照文件路径；菜谱库在进程内只编译一次，每个实例使用独立副本
+        """
+        self.store = RecipeStore.compile(self._load_recipes, snapshot_path, diseases_attr="disease_suitable")
+        self.recipes = self.store.nested
 
     def _load_recipes(self) -> Dict[str, Dict[str, List[SimpleRecipe]]]:
         """加载大量简化菜谱"""
@@ -981,12 +990,19 @@ class SimpleRecipeManager:
 
     def get_recipe_by_name(self, recipe_name: str) -> Optional[SimpleRecipe]:
         """根据名称查找菜谱"""
-        for cuisine_type in self.recipes:
-            for meal_type in self.recipes[cuisine_type]:
-                for recipe in self.recipes[cuisine_type][meal_type]:
-                    if recipe.name == recipe_name:
-                        return recipe
-        return None
+        return self.store.get_by_name(recipe_name)
+
+    def add_recipe(self, cuisine_type: str, meal_type: str, recipe: SimpleRecipe):
+        """添加菜谱 (索引和依赖菜谱库的优化候选表、营养矩阵随之更新)"""
+        self.store.add(cuisine_type, meal_type, recipe)
+
+    def update_recipe(self, cuisine_type: str, meal_type: str, recipe_name: str, recipe: SimpleRecipe) -> bool:
+        """替换同名菜谱，未找到时返回 False"""
+        return self.store.replace(cuisine_type, meal_type, recipe_name, recipe)
+
+    def remove_recipe(self, cuisine_type: str, meal_type: str, recipe_name: str) -> bool:
+        """删除菜谱，未找到时返回 False"""
+        return self.store.remove(cuisine_type, meal_type, recipe_name)
 
     def format_recipe_for_display(self, recipe: SimpleRecipe) -> str:
         """格式化菜谱显示"""
@@ -7,7 +7,11 @@
 import datetime
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
-from simple_recipe_manager import SimpleRecipeManager, SimpleRecipe
+
+try:
+    from .simple_recipe_manager import SimpleRecipeManager, SimpleRecipe
+except ImportError:
+    from simple_recipe_manager import SimpleRecipeManager, SimpleRecipe
 
 @dataclass
 class WeeklyMenuManager:
@@ -7,14 +7,16 @@
 import streamlit as st
 import sys
 import os
+import json
+import hashlib
+import io
 import datetime
+from dataclasses import asdict
 from datetime import date
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
-import math
-import random
 
 # 添加Core_Systems路径
 sys.path.append('Core_Systems')
@@ -23,6 +25,7 @@ try:
     from integrated_nutrition_system_v2 import IntegratedNutritionSystemV2, PatientProfile
     from gi_database_integration_v2 import GIDatabaseSystemV2
     from cgm_nutrition_integration import CGMNutritionIntegration
+    from nutrition_registry import get_registry
 except ImportError as e:
     st.error(f"导入核心系统失败: {e}")
     st.stop()
@@ -80,14 +83,56 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner=False)
+def get_nutrition_engines():
+    """营养/GI引擎 (进程内共享，底层数据来自只读注册表，所有会话和重跑复用同一实例)"""
+    return IntegratedNutritionSystemV2(), GIDatabaseSystemV2()
+
+# 各患者血糖敏感性模型的本地存储目录
+SENSITIVITY_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Patient_Data", "glucose_sensitivity")
+
+@st.cache_resource(show_spinner=False)
+def get_cgm_integration():
+    """CGM集成引擎 (进程内共享，构建后不保存会话状态)"""
+    return CGMNutritionIntegration(SENSITIVITY_STORE_DIR)
+
+def get_sensitivity_model():
+    """
+    当前患者的血糖敏感性增量模型 (本会话内缓存，切换患者时重新读取)
+    按病历号读取和保存本地模型；未填写病历号的患者只使用本会话内按档案区分的模型，不落盘
+    """
+    patient_data = st.session_state.get('patient_data', {})
+    patient_id = (getattr(patient_data.get('patient'), 'patient_id', None) or '').strip()
+    model_key = ('patient', patient_id) if patient_id else ('session', patient_data.get('profile_key'))
+    model = st.session_state.get('sensitivity_model')
+    if model is None or st.session_state.get('sensitivity_model_key') != model_key:
+        model = get_cgm_integration().load_sensitivity_model(patient_id)
+        st.session_state.sensitivity_model = model
+        st.session_state.sensitivity_model_key = model_key
+    return model
+
 def initialize_session_state():
     """初始化session state"""
     if 'patient_data' not in st.session_state:
         st.session_state.patient_data = {}
     if 'nutrition_system' not in st.session_state:
         with st.spinner('正在初始化营养管理系统...'):
-            st.session_state.nutrition_system = IntegratedNutritionSystemV2()
-            st.session_state.gi_system = GIDatabaseSystemV2()
+            st.session_state.nutrition_system, st.session_state.gi_system = get_nutrition_engines()
+
+def patient_profile_key(patient):
+    """患者档案指纹：档案字段完全相同则分析结果、图表可直接复用"""
+    payload = json.dumps(asdict(patient), ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def set_current_patient(patient):
+    """设置当前患者；档案变化时清除本会话基于旧档案生成的结果，返回档案指纹"""
+    profile_key = patient_profile_key(patient)
+    patient_data = st.session_state.patient_data
+    if patient_data.get("profile_key") != profile_key:
+        patient_data.pop("analysis", None)
+    patient_data["patient"] = patient
+    patient_data["profile_key"] = profile_key
+    return profile_key
 
 def render_main_header():
     """渲染主标题"""
@@ -115,6 +160,7 @@ def render_basic_info_form():
 
     with col1:
         name = st.text_input("患者姓名", value="", help="请输入患者真实姓名")
+        patient_id = st.text_input("病历号", value="", help="用于保存患者个人的血糖敏感性模型；不填写时只在本次会话内使用")
         age = st.number_input("年龄", min_value=1, max_value=120, value=35, help="患者当前年龄")
         gender = st.selectbox("性别", ["男", "女"], help="生理性别")
 
@@ -130,6 +176,7 @@ def render_basic_info_form():
 
     return {
         "name": name,
+        "patient_id": patient_id.strip() or None,
         "age": age,
         "gender": gender,
         "height": height,
@@ -282,6 +329,7 @@ def create_patient_profile(basic_info, health_status, dietary_preferences):
     try:
         patient = PatientProfile(
             name=basic_info["name"],
+            patient_id=basic_info["patient_id"],
             age=basic_info["age"],
             gender=basic_info["gender"],
             height=basic_info["height"],
@@ -305,33 +353,39 @@ def create_patient_profile(basic_info, health_status, dietary_preferences):
         st.error(f"创建患者档案失败: {e}")
         return None
 
-def generate_comprehensive_analysis(patient):
-    """生成综合分析"""
-    try:
-        # 营养系统分析
-        nutrition_system = st.session_state.nutrition_system
-        gi_system = st.session_state.gi_system
+@st.cache_data(show_spinner=False, max_entries=256)
+def compute_comprehensive_analysis(profile_key, menu_date, _patient):
+    """
+    综合分析 (按档案指纹和日期缓存)
+    一周菜谱按当天日期轮换，日期变化后重新计算；_patient 不参与缓存键
+    """
+    nutrition_system, gi_system = get_nutrition_engines()
 
-        # 获取个性化推荐
-        recommendations = nutrition_system._recommend_recipes(patient)
+    # 获取个性化推荐
+    recommendations = nutrition_system._recommend_recipes(_patient)
 
-        # 获取GI推荐
-        gi_recommendations = gi_system.generate_personalized_gi_recommendations(patient)
+    # 获取GI推荐
+    gi_recommendations = gi_system.generate_personalized_gi_recommendations(_patient)
 
-        # 生成糖尿病膳食计划
-        diabetes_plan = None
-        if "糖尿病" in patient.diagnosed_diseases:
-            diabetes_plan = gi_system.generate_diabetes_meal_plan(target_gl=15.0, patient=patient)
+    # 生成糖尿病膳食计划
+    diabetes_plan = None
+    if "糖尿病" in _patient.diagnosed_diseases:
+        diabetes_plan = gi_system.generate_diabetes_meal_plan(target_gl=15.0, patient=_patient)
 
-        # 生成完整报告
-        full_report = nutrition_system.generate_comprehensive_report_v2(patient)
+    # 生成完整报告
+    full_report = nutrition_system.generate_comprehensive_report_v2(_patient)
 
-        return {
-            "recommendations": recommendations,
-            "gi_recommendations": gi_recommendations,
-            "diabetes_plan": diabetes_plan,
-            "full_report": full_report
-        }
+    return {
+        "recommendations": recommendations,
+        "gi_recommendations": gi_recommendations,
+        "diabetes_plan": diabetes_plan,
+        "full_report": full_report
+    }
+
+def generate_comprehensive_analysis(patient):
+    """生成综合分析"""
+    try:
+        return compute_comprehensive_analysis(patient_profile_key(patient), date.today().isoformat(), patient)
     except Exception as e:
         st.error(f"分析生成失败: {e}")
         return None
@@ -457,8 +511,7 @@ def render_recipe_recommendations(recommendations, patient):
 
     # 获取一周菜谱
     try:
-        from Core_Systems.weekly_menu_manager import WeeklyMenuManager
-        weekly_manager = WeeklyMenuManager()
+        weekly_manager = get_registry().weekly_menu_manager
 
         # 根据患者偏好选择菜系
         selected_cuisine = "清淡"  # 默认
@@ -723,9 +776,13 @@ def create_health_radar_chart(patient):
         "甘油三酯": get_health_score("triglycerides", patient.triglycerides)
     }
 
-    # 创建雷达图
-    categories = list(health_scores.keys())
-    values = list(health_scores.values())
+    st.plotly_chart(build_health_radar_figure(tuple(health_scores.items())), use_container_width=True)
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def build_health_radar_figure(score_items):
+    """健康指标雷达图 (按各指标评分缓存)"""
+    categories = [name for name, _ in score_items]
+    values = [score for _, score in score_items]
 
     fig = go.Figure()
 
@@ -748,7 +805,7 @@ def create_health_radar_chart(patient):
         title="健康指标评估雷达图"
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
 def get_health_score(indicator, value):
     """获取健康指标评分"""
@@ -826,140 +883,137 @@ def create_preference_matching_chart(patient):
     fig.update_layout(yaxis_range=[0, 1])
     st.plotly_chart(fig, use_container_width=True)
 
-def create_meal_nutrition_radar_chart(recommended_dishes, patient):
-    """创建推荐菜谱的营养雷达图"""
-    if not recommended_dishes:
-        st.warning("暂无推荐菜谱用于分析")
-        return
-
-    # 定义营养维度和理想值
-    nutrition_dimensions = ["蛋白质", "碳水化合物", "脂肪", "纤维", "维生素", "矿物质", "抗氧化物", "适宜性"]
-
-    # 优化的高质量营养数据库 - 确保所有推荐菜品的关键指标都达到高标准
-    nutrition_database = {
-        # === 高质量早餐类 - 蛋白质≥8，适宜性≥9 ===
-        "燕麦鸡蛋套餐": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 6, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 7, "适宜性": 10},
-        "牛奶燕麦": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 4, "纤维": 7, "维生素": 8, "矿物质": 9, "抗氧化物": 6, "适宜性": 9},
-        "煎蛋三明治": {"蛋白质": 9, "碳水化合物": 6, "脂肪": 7, "纤维": 5, "维生素": 8, "矿物质": 7, "抗氧化物": 6, "适宜性": 9},
-        "豆腐脑配菜": {"蛋白质": 8, "碳水化合物": 5, "脂肪": 4, "纤维": 6, "维生素": 7, "矿物质": 8, "抗氧化物": 7, "适宜性": 9},
-        "蒸蛋羹配面包": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 6, "纤维": 4, "维生素": 8, "矿物质": 7, "抗氧化物": 6, "适宜性": 9},
-        "豆浆油条": {"蛋白质": 7, "碳水化合物": 8, "脂肪": 6, "纤维": 4, "维生素": 6, "矿物质": 7, "抗氧化物": 5, "适宜性": 7},
-        # 新增早餐菜品
-        "全麦面包加鸡蛋": {"蛋白质": 9, "碳水化合物": 6, "脂肪": 6, "纤维": 7, "维生素": 8, "矿物质": 7, "抗氧化物": 6, "适宜性": 9},
-        "鸡蛋灶饼配粥": {"蛋白质": 8, "碳水化合物": 8, "脂肪": 6, "纤维": 5, "维生素": 7, "矿物质": 7, "抗氧化物": 5, "适宜性": 9},
-        "蒸蛋羹配小米粥": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 5, "纤维": 6, "维生素": 8, "矿物质": 8, "抗氧化物": 6, "适宜性": 10},
-        "红薯鸡蛋粥": {"蛋白质": 8, "碳水化合物": 8, "脂肪": 4, "纤维": 7, "维生素": 9, "矿物质": 7, "抗氧化物": 8, "适宜性": 9},
-        "白粥配鸡蛋": {"蛋白质": 8, "碳水化合物": 8, "脂肪": 6, "纤维": 3, "维生素": 7, "矿物质": 6, "抗氧化物": 4, "适宜性": 8},
-        "红豆薄饬+鸡蛋": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 6, "纤维": 8, "维生素": 8, "矿物质": 8, "抗氧化物": 7, "适宜性": 9},
-        "牛奶麦片": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 4, "纤维": 6, "维生素": 8, "矿物质": 9, "抗氧化物": 6, "适宜性": 9},
-        "葱花鸡蛋饼": {"蛋白质": 9, "碳水化合物": 6, "脂肪": 7, "纤维": 4, "维生素": 7, "矿物质": 6, "抗氧化物": 5, "适宜性": 8},
-        "红薯糙米粥": {"蛋白质": 6, "碳水化合物": 8, "脂肪": 2, "纤维": 8, "维生素": 9, "矿物质": 7, "抗氧化物": 8, "适宜性": 9},
-        "豆浆加鸡蛋": {"蛋白质": 9, "碳水化合物": 5, "脂肪": 6, "纤维": 4, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
-        "小米鸡蛋粥": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 5, "纤维": 6, "维生素": 8, "矿物质": 8, "抗氧化物": 6, "适宜性": 10},
-
-        # === 优质午餐类 - 蛋白质≥9，营养均衡≥8，适宜性≥9 ===
-        "清蒸鲈鱼配糙米": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 4, "纤维": 6, "维生素": 8, "矿物质": 9, "抗氧化物": 7, "适宜性": 10},
-        "清炖鸡汤配饭": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 5, "纤维": 5, "维生素": 8, "矿物质": 8, "抗氧化物": 6, "适宜性": 10},
-        "清蒸鸡胸肉": {"蛋白质": 10, "碳水化合物": 1, "脂肪": 3, "纤维": 0, "维生素": 7, "矿物质": 6, "抗氧化物": 4, "适宜性": 10},
-        "豆腐蔬菜汤": {"蛋白质": 8, "碳水化合物": 5, "脂肪": 3, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 9, "适宜性": 10},
-        "白切鸡配米饭": {"蛋白质": 9, "碳水化合物": 8, "脂肪": 5, "纤维": 4, "维生素": 7, "矿物质": 7, "抗氧化物": 5, "适宜性": 9},
-        "水煮虾仁": {"蛋白质": 10, "碳水化合物": 1, "脂肪": 2, "纤维": 0, "维生素": 7, "矿物质": 9, "抗氧化物": 5, "适宜性": 9},
-        # 新增午餐菜品
-        "麦片鸡蛋粥": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 5, "纤维": 6, "维生素": 8, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
-        "蒸蛋羹配糙米": {"蛋白质": 8, "碳水化合物": 6, "脂肪": 5, "纤维": 5, "维生素": 8, "矿物质": 7, "抗氧化物": 6, "适宜性": 10},
-        "豆腐鱼头汤": {"蛋白质": 9, "碳水化合物": 4, "脂肪": 5, "纤维": 6, "维生素": 8, "矿物质": 9, "抗氧化物": 7, "适宜性": 10},
-        "清炒鸡丝配面条": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 5, "纤维": 5, "维生素": 7, "矿物质": 7, "抗氧化物": 6, "适宜性": 9},
-        "蒸虾仁配糙米": {"蛋白质": 10, "碳水化合物": 6, "脂肪": 3, "纤维": 5, "维生素": 8, "矿物质": 9, "抗氧化物": 6, "适宜性": 10},
-        "白灼菜心配鱼片": {"蛋白质": 9, "碳水化合物": 4, "脂肪": 4, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 8, "适宜性": 10},
-        "蒸水蛋配米饭": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 6, "纤维": 3, "维生素": 8, "矿物质": 7, "抗氧化物": 5, "适宜性": 9},
-        "鱼肉粥": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 4, "纤维": 4, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 10},
-        "白煮鸡蛋配米饭": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 6, "纤维": 3, "维生素": 8, "矿物质": 7, "抗氧化物": 5, "适宜性": 9},
-        "蒸虾仁配蔬菜": {"蛋白质": 10, "碳水化合物": 3, "脂肪": 2, "纤维": 8, "维生素": 9, "矿物质": 9, "抗氧化物": 8, "适宜性": 10},
-        "清炖肉片汤": {"蛋白质": 9, "碳水化合物": 3, "脂肪": 4, "纤维": 5, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
-
-        # === 优质晚餐类 - 清淡易消化，蛋白质≥7，适宜性≥9 ===
-        "蒸蛋羹+青菜": {"蛋白质": 8, "碳水化合物": 4, "脂肪": 5, "纤维": 8, "维生素": 8, "矿物质": 7, "抗氧化物": 8, "适宜性": 10},
-        "蔬菜豆腐汤": {"蛋白质": 8, "碳水化合物": 4, "脂肪": 3, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 9, "适宜性": 10},
-        "荞麦面配蔬菜": {"蛋白质": 7, "碳水化合物": 8, "脂肪": 2, "纤维": 9, "维生素": 8, "矿物质": 7, "抗氧化物": 8, "适宜性": 9},
-        "冬瓜排骨汤": {"蛋白质": 7, "碳水化合物": 3, "脂肪": 4, "纤维": 6, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
-        # 新增晚餐菜品
-        "冬瓜丸子汤": {"蛋白质": 7, "碳水化合物": 4, "脂肪": 4, "纤维": 7, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
-        "紫菜蛋花汤": {"蛋白质": 7, "碳水化合物": 3, "脂肪": 4, "纤维": 6, "维生素": 8, "矿物质": 9, "抗氧化物": 7, "适宜性": 10},
-        "青菜豆腐汤": {"蛋白质": 8, "碳水化合物": 4, "脂肪": 3, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 9, "适宜性": 10},
-        "白萝卜炒蛋": {"蛋白质": 8, "碳水化合物": 5, "脂肪": 6, "纤维": 7, "维生素": 8, "矿物质": 7, "抗氧化物": 7, "适宜性": 9},
-        "小白菜豆腐汤": {"蛋白质": 8, "碳水化合物": 4, "脂肪": 3, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 9, "适宜性": 10},
-        "蒸蛋羹": {"蛋白质": 8, "碳水化合物": 2, "脂肪": 6, "纤维": 0, "维生素": 7, "矿物质": 6, "抗氧化物": 4, "适宜性": 10},
-        "青菜瘦肉汤": {"蛋白质": 8, "碳水化合物": 3, "脂肪": 3, "纤维": 7, "维生素": 8, "矿物质": 8, "抗氧化物": 7, "适宜性": 9},
-
-        # === 优质加餐类 - 营养补充，适宜性≥9 ===
-        "水煮蛋": {"蛋白质": 9, "碳水化合物": 1, "脂肪": 7, "纤维": 0, "维生素": 8, "矿物质": 6, "抗氧化物": 4, "适宜性": 10},
-        "酸奶": {"蛋白质": 7, "碳水化合物": 5, "脂肪": 4, "纤维": 2, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
-        "蓝莓酸奶": {"蛋白质": 7, "碳水化合物": 6, "脂肪": 3, "纤维": 5, "维生素": 9, "矿物质": 6, "抗氧化物": 10, "适宜性": 9},
-        "牛奶": {"蛋白质": 8, "碳水化合物": 5, "脂肪": 4, "纤维": 0, "维生素": 8, "矿物质": 9, "抗氧化物": 5, "适宜性": 9},
-        "柚子片": {"蛋白质": 1, "碳水化合物": 6, "脂肪": 0, "纤维": 8, "维生素": 9, "矿物质": 5, "抗氧化物": 9, "适宜性": 10},
-        "苹果片": {"蛋白质": 1, "碳水化合物": 7, "脂肪": 0, "纤维": 7, "维生素": 8, "矿物质": 4, "抗氧化物": 8, "适宜性": 9},
-        "核桃仁": {"蛋白质": 6, "碳水化合物": 4, "脂肪": 8, "纤维": 6, "维生素": 7, "矿物质": 8, "抗氧化物": 8, "适宜性": 9},
-        "奶酸鸡蛋粥": {"蛋白质": 7, "碳水化合物": 6, "脂肪": 4, "纤维": 3, "维生素": 7, "矿物质": 7, "抗氧化物": 6, "适宜性": 9},
-        "红枣豆浆": {"蛋白质": 6, "碳水化合物": 6, "脂肪": 3, "纤维": 5, "维生素": 8, "矿物质": 8, "抗氧化物": 7, "适宜性": 9},
-        "香蕉": {"蛋白质": 2, "碳水化合物": 8, "脂肪": 0, "纤维": 6, "维生素": 8, "矿物质": 6, "抗氧化物": 7, "适宜性": 9},
-        "默认早餐": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 5, "纤维": 7, "维生素": 8, "矿物质": 8, "抗氧化物": 7, "适宜性": 9},
-        "默认午餐": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 5, "纤维": 7, "维生素": 8, "矿物质": 8, "抗氧化物": 7, "适宜性": 10},
-        "默认晚餐": {"蛋白质": 8, "碳水化合物": 6, "脂肪": 4, "纤维": 8, "维生素": 8, "矿物质": 7, "抗氧化物": 8, "适宜性": 9},
-        "默认加餐": {"蛋白质": 8, "碳水化合物": 5, "脂肪": 3, "纤维": 6, "维生素": 8, "矿物质": 7, "抗氧化物": 7, "适宜性": 9}
-    }
-
-    # 颜色配置 - 增强对比度和区分度
-    colors = {
-        "早餐推荐": "rgba(255, 99, 132, 0.3)",   # 红色，透明度降低
-        "午餐推荐": "rgba(54, 162, 235, 0.3)",   # 蓝色，透明度降低
-        "晚餐推荐": "rgba(75, 192, 192, 0.3)",   # 绿色，透明度降低
-        "加餐推荐": "rgba(255, 206, 86, 0.3)"    # 黄色，透明度降低
-    }
-
-    line_colors = {
-        "早餐推荐": "rgba(255, 99, 132, 1)",    # 红色边框
-        "午餐推荐": "rgba(54, 162, 235, 1)",    # 蓝色边框
-        "晚餐推荐": "rgba(75, 192, 192, 1)",    # 绿色边框
-        "加餐推荐": "rgba(255, 206, 86, 1)"     # 黄色边框
-    }
-
-    # 线条样式配置
-    line_styles = {
-        "早餐推荐": dict(width=3, dash=None),          # 实线
-        "午餐推荐": dict(width=3, dash=None),          # 实线
-        "晚餐推荐": dict(width=3, dash=None),          # 实线
-        "加餐推荐": dict(width=3, dash='dot')          # 点线
-    }
-
+# 菜谱营养雷达图的营养维度
+MEAL_NUTRITION_DIMENSIONS = ["蛋白质", "碳水化合物", "脂肪", "纤维", "维生素", "矿物质", "抗氧化物", "适宜性"]
+
+# 优化的高质量营养数据库 - 确保所有推荐菜品的关键指标都达到高标准
+MEAL_NUTRITION_DATABASE = {
+    # === 高质量早餐类 - 蛋白质≥8，适宜性≥9 ===
+    "燕麦鸡蛋套餐": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 6, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 7, "适宜性": 10},
+    "牛奶燕麦": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 4, "纤维": 7, "维生素": 8, "矿物质": 9, "抗氧化物": 6, "适宜性": 9},
+    "煎蛋三明治": {"蛋白质": 9, "碳水化合物": 6, "脂肪": 7, "纤维": 5, "维生素": 8, "矿物质": 7, "抗氧化物": 6, "适宜性": 9},
+    "豆腐脑配菜": {"蛋白质": 8, "碳水化合物": 5, "脂肪": 4, "纤维": 6, "维生素": 7, "矿物质": 8, "抗氧化物": 7, "适宜性": 9},
+    "蒸蛋羹配面包": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 6, "纤维": 4, "维生素": 8, "矿物质": 7, "抗氧化物": 6, "适宜性": 9},
+    "豆浆油条": {"蛋白质": 7, "碳水化合物": 8, "脂肪": 6, "纤维": 4, "维生素": 6, "矿物质": 7, "抗氧化物": 5, "适宜性": 7},
+    # 新增早餐菜品
+    "全麦面包加鸡蛋": {"蛋白质": 9, "碳水化合物": 6, "脂肪": 6, "纤维": 7, "维生素": 8, "矿物质": 7, "抗氧化物": 6, "适宜性": 9},
+    "鸡蛋灶饼配粥": {"蛋白质": 8, "碳水化合物": 8, "脂肪": 6, "纤维": 5, "维生素": 7, "矿物质": 7, "抗氧化物": 5, "适宜性": 9},
+    "蒸蛋羹配小米粥": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 5, "纤维": 6, "维生素": 8, "矿物质": 8, "抗氧化物": 6, "适宜性": 10},
+    "红薯鸡蛋粥": {"蛋白质": 8, "碳水化合物": 8, "脂肪": 4, "纤维": 7, "维生素": 9, "矿物质": 7, "抗氧化物": 8, "适宜性": 9},
+    "白粥配鸡蛋": {"蛋白质": 8, "碳水化合物": 8, "脂肪": 6, "纤维": 3, "维生素": 7, "矿物质": 6, "抗氧化物": 4, "适宜性": 8},
+    "红豆薄饬+鸡蛋": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 6, "纤维": 8, "维生素": 8, "矿物质": 8, "抗氧化物": 7, "适宜性": 9},
+    "牛奶麦片": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 4, "纤维": 6, "维生素": 8, "矿物质": 9, "抗氧化物": 6, "适宜性": 9},
+    "葱花鸡蛋饼": {"蛋白质": 9, "碳水化合物": 6, "脂肪": 7, "纤维": 4, "维生素": 7, "矿物质": 6, "抗氧化物": 5, "适宜性": 8},
+    "红薯糙米粥": {"蛋白质": 6, "碳水化合物": 8, "脂肪": 2, "纤维": 8, "维生素": 9, "矿物质": 7, "抗氧化物": 8, "适宜性": 9},
+    "豆浆加鸡蛋": {"蛋白质": 9, "碳水化合物": 5, "脂肪": 6, "纤维": 4, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
+    "小米鸡蛋粥": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 5, "纤维": 6, "维生素": 8, "矿物质": 8, "抗氧化物": 6, "适宜性": 10},
+
+    # === 优质午餐类 - 蛋白质≥9，营养均衡≥8，适宜性≥9 ===
+    "清蒸鲈鱼配糙米": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 4, "纤维": 6, "维生素": 8, "矿物质": 9, "抗氧化物": 7, "适宜性": 10},
+    "清炖鸡汤配饭": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 5, "纤维": 5, "维生素": 8, "矿物质": 8, "抗氧化物": 6, "适宜性": 10},
+    "清蒸鸡胸肉": {"蛋白质": 10, "碳水化合物": 1, "脂肪": 3, "纤维": 0, "维生素": 7, "矿物质": 6, "抗氧化物": 4, "适宜性": 10},
+    "豆腐蔬菜汤": {"蛋白质": 8, "碳水化合物": 5, "脂肪": 3, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 9, "适宜性": 10},
+    "白切鸡配米饭": {"蛋白质": 9, "碳水化合物": 8, "脂肪": 5, "纤维": 4, "维生素": 7, "矿物质": 7, "抗氧化物": 5, "适宜性": 9},
+    "水煮虾仁": {"蛋白质": 10, "碳水化合物": 1, "脂肪": 2, "纤维": 0, "维生素": 7, "矿物质": 9, "抗氧化物": 5, "适宜性": 9},
+    # 新增午餐菜品
+    "麦片鸡蛋粥": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 5, "纤维": 6, "维生素": 8, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
+    "蒸蛋羹配糙米": {"蛋白质": 8, "碳水化合物": 6, "脂肪": 5, "纤维": 5, "维生素": 8, "矿物质": 7, "抗氧化物": 6, "适宜性": 10},
+    "豆腐鱼头汤": {"蛋白质": 9, "碳水化合物": 4, "脂肪": 5, "纤维": 6, "维生素": 8, "矿物质": 9, "抗氧化物": 7, "适宜性": 10},
+    "清炒鸡丝配面条": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 5, "纤维": 5, "维生素": 7, "矿物质": 7, "抗氧化物": 6, "适宜性": 9},
+    "蒸虾仁配糙米": {"蛋白质": 10, "碳水化合物": 6, "脂肪": 3, "纤维": 5, "维生素": 8, "矿物质": 9, "抗氧化物": 6, "适宜性": 10},
+    "白灼菜心配鱼片": {"蛋白质": 9, "碳水化合物": 4, "脂肪": 4, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 8, "适宜性": 10},
+    "蒸水蛋配米饭": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 6, "纤维": 3, "维生素": 8, "矿物质": 7, "抗氧化物": 5, "适宜性": 9},
+    "鱼肉粥": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 4, "纤维": 4, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 10},
+    "白煮鸡蛋配米饭": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 6, "纤维": 3, "维生素": 8, "矿物质": 7, "抗氧化物": 5, "适宜性": 9},
+    "蒸虾仁配蔬菜": {"蛋白质": 10, "碳水化合物": 3, "脂肪": 2, "纤维": 8, "维生素": 9, "矿物质": 9, "抗氧化物": 8, "适宜性": 10},
+    "清炖肉片汤": {"蛋白质": 9, "碳水化合物": 3, "脂肪": 4, "纤维": 5, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
+
+    # === 优质晚餐类 - 清淡易消化，蛋白质≥7，适宜性≥9 ===
+    "蒸蛋羹+青菜": {"蛋白质": 8, "碳水化合物": 4, "脂肪": 5, "纤维": 8, "维生素": 8, "矿物质": 7, "抗氧化物": 8, "适宜性": 10},
+    "蔬菜豆腐汤": {"蛋白质": 8, "碳水化合物": 4, "脂肪": 3, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 9, "适宜性": 10},
+    "荞麦面配蔬菜": {"蛋白质": 7, "碳水化合物": 8, "脂肪": 2, "纤维": 9, "维生素": 8, "矿物质": 7, "抗氧化物": 8, "适宜性": 9},
+    "冬瓜排骨汤": {"蛋白质": 7, "碳水化合物": 3, "脂肪": 4, "纤维": 6, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
+    # 新增晚餐菜品
+    "冬瓜丸子汤": {"蛋白质": 7, "碳水化合物": 4, "脂肪": 4, "纤维": 7, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
+    "紫菜蛋花汤": {"蛋白质": 7, "碳水化合物": 3, "脂肪": 4, "纤维": 6, "维生素": 8, "矿物质": 9, "抗氧化物": 7, "适宜性": 10},
+    "青菜豆腐汤": {"蛋白质": 8, "碳水化合物": 4, "脂肪": 3, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 9, "适宜性": 10},
+    "白萝卜炒蛋": {"蛋白质": 8, "碳水化合物": 5, "脂肪": 6, "纤维": 7, "维生素": 8, "矿物质": 7, "抗氧化物": 7, "适宜性": 9},
+    "小白菜豆腐汤": {"蛋白质": 8, "碳水化合物": 4, "脂肪": 3, "纤维": 8, "维生素": 9, "矿物质": 8, "抗氧化物": 9, "适宜性": 10},
+    "蒸蛋羹": {"蛋白质": 8, "碳水化合物": 2, "脂肪": 6, "纤维": 0, "维生素": 7, "矿物质": 6, "抗氧化物": 4, "适宜性": 10},
+    "青菜瘦肉汤": {"蛋白质": 8, "碳水化合物": 3, "脂肪": 3, "纤维": 7, "维生素": 8, "矿物质": 8, "抗氧化物": 7, "适宜性": 9},
+
+    # === 优质加餐类 - 营养补充，适宜性≥9 ===
+    "水煮蛋": {"蛋白质": 9, "碳水化合物": 1, "脂肪": 7, "纤维": 0, "维生素": 8, "矿物质": 6, "抗氧化物": 4, "适宜性": 10},
+    "酸奶": {"蛋白质": 7, "碳水化合物": 5, "脂肪": 4, "纤维": 2, "维生素": 7, "矿物质": 8, "抗氧化物": 6, "适宜性": 9},
+    "蓝莓酸奶": {"蛋白质": 7, "碳水化合物": 6, "脂肪": 3, "纤维": 5, "维生素": 9, "矿物质": 6, "抗氧化物": 10, "适宜性": 9},
+    "牛奶": {"蛋白质": 8, "碳水化合物": 5, "脂肪": 4, "纤维": 0, "维生素": 8, "矿物质": 9, "抗氧化物": 5, "适宜性": 9},
+    "柚子片": {"蛋白质": 1, "碳水化合物": 6, "脂肪": 0, "纤维": 8, "维生素": 9, "矿物质": 5, "抗氧化物": 9, "适宜性": 10},
+    "苹果片": {"蛋白质": 1, "碳水化合物": 7, "脂肪": 0, "纤维": 7, "维生素": 8, "矿物质": 4, "抗氧化物": 8, "适宜性": 9},
+    "核桃仁": {"蛋白质": 6, "碳水化合物": 4, "脂肪": 8, "纤维": 6, "维生素": 7, "矿物质": 8, "抗氧化物": 8, "适宜性": 9},
+    "奶酸鸡蛋粥": {"蛋白质": 7, "碳水化合物": 6, "脂肪": 4, "纤维": 3, "维生素": 7, "矿物质": 7, "抗氧化物": 6, "适宜性": 9},
+    "红枣豆浆": {"蛋白质": 6, "碳水化合物": 6, "脂肪": 3, "纤维": 5, "维生素": 8, "矿物质": 8, "抗氧化物": 7, "适宜性": 9},
+    "香蕉": {"蛋白质": 2, "碳水化合物": 8, "脂肪": 0, "纤维": 6, "维生素": 8, "矿物质": 6, "抗氧化物": 7, "适宜性": 9},
+    "默认早餐": {"蛋白质": 8, "碳水化合物": 7, "脂肪": 5, "纤维": 7, "维生素": 8, "矿物质": 8, "抗氧化物": 7, "适宜性": 9},
+    "默认午餐": {"蛋白质": 9, "碳水化合物": 7, "脂肪": 5, "纤维": 7, "维生素": 8, "矿物质": 8, "抗氧化物": 7, "适宜性": 10},
+    "默认晚餐": {"蛋白质": 8, "碳水化合物": 6, "脂肪": 4, "纤维": 8, "维生素": 8, "矿物质": 7, "抗氧化物": 8, "适宜性": 9},
+    "默认加餐": {"蛋白质": 8, "碳水化合物": 5, "脂肪": 3, "纤维": 6, "维生素": 8, "矿物质": 7, "抗氧化物": 7, "适宜性": 9}
+}
+
+# 颜色配置 - 增强对比度和区分度
+MEAL_COLORS = {
+    "早餐推荐": "rgba(255, 99, 132, 0.3)",   # 红色，透明度降低
+    "午餐推荐": "rgba(54, 162, 235, 0.3)",   # 蓝色，透明度降低
+    "晚餐推荐": "rgba(75, 192, 192, 0.3)",   # 绿色，透明度降低
+    "加餐推荐": "rgba(255, 206, 86, 0.3)"    # 黄色，透明度降低
+}
+
+MEAL_LINE_COLORS = {
+    "早餐推荐": "rgba(255, 99, 132, 1)",    # 红色边框
+    "午餐推荐": "rgba(54, 162, 235, 1)",    # 蓝色边框
+    "晚餐推荐": "rgba(75, 192, 192, 1)",    # 绿色边框
+    "加餐推荐": "rgba(255, 206, 86, 1)"     # 黄色边框
+}
+
+# 线条样式配置
+MEAL_LINE_STYLES = {
+    "早餐推荐": dict(width=3, dash=None),          # 实线
+    "午餐推荐": dict(width=3, dash=None),          # 实线
+    "晚餐推荐": dict(width=3, dash=None),          # 实线
+    "加餐推荐": dict(width=3, dash='dot')          # 点线
+}
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def build_meal_nutrition_radar_figure(dish_items):
+    """推荐菜谱营养雷达图 (按 (餐次, 菜名) 元组缓存，相同菜单不重复构建)"""
     # 创建雷达图
     fig = go.Figure()
 
-    for meal_type, dish_name in recommended_dishes.items():
+    for meal_type, dish_name in dish_items:
         # 获取营养数据
-        nutrition_values = nutrition_database.get(dish_name, {
+        nutrition_values = MEAL_NUTRITION_DATABASE.get(dish_name, {
             "蛋白质": 5, "碳水化合物": 5, "脂肪": 5, "纤维": 5,
             "维生素": 5, "矿物质": 5, "抗氧化物": 5, "适宜性": 5
         })
 
         # 提取数值
-        values = [nutrition_values[dim] for dim in nutrition_dimensions]
+        values = [nutrition_values[dim] for dim in MEAL_NUTRITION_DIMENSIONS]
 
         # 添加轨迹 - 使用新的样式配置
         fig.add_trace(go.Scatterpolar(
             r=values,
-            theta=nutrition_dimensions,
+            theta=MEAL_NUTRITION_DIMENSIONS,
             fill='toself',
             name=f"{meal_type.replace('推荐', '')} - {dish_name}",
-            fillcolor=colors[meal_type],
-            line=dict(color=line_colors[meal_type], **line_styles[meal_type]),
-            marker=dict(size=8, color=line_colors[meal_type])
+            fillcolor=MEAL_COLORS[meal_type],
+            line=dict(color=MEAL_LINE_COLORS[meal_type], **MEAL_LINE_STYLES[meal_type]),
+            marker=dict(size=8, color=MEAL_LINE_COLORS[meal_type])
         ))
 
     # 添加理想营养线
     ideal_values = [8, 7, 5, 8, 8, 8, 7, 9]  # 理想营养值
     fig.add_trace(go.Scatterpolar(
         r=ideal_values,
-        theta=nutrition_dimensions,
+        theta=MEAL_NUTRITION_DIMENSIONS,
         fill=None,
         name="理想营养标准",
         line=dict(color='rgba(128, 128, 128, 0.8)', width=2, dash='dash'),
@@ -998,6 +1052,16 @@ def create_meal_nutrition_radar_chart(recommended_dishes, patient):
         margin=dict(l=50, r=150, t=80, b=50)
     )
 
+    return fig
+
+def create_meal_nutrition_radar_chart(recommended_dishes, patient):
+    """创建推荐菜谱的营养雷达图"""
+    if not recommended_dishes:
+        st.warning("暂无推荐菜谱用于分析")
+        return
+
+    fig = build_meal_nutrition_radar_figure(tuple(recommended_dishes.items()))
+
     st.plotly_chart(fig, use_container_width=True)
 
     # 添加营养分析说明
@@ -1022,13 +1086,13 @@ def create_meal_nutrition_radar_chart(recommended_dishes, patient):
         total_nutrition = {}
         st.write("**🔍 营养数据匹配检查**:")
 
-        for dim in nutrition_dimensions:
+        for dim in MEAL_NUTRITION_DIMENSIONS:
             total_nutrition[dim] = 0
             count = 0
             dim_details = []
 
             for meal_type, dish_name in recommended_dishes.items():
-                nutrition_values = nutrition_database.get(dish_name, {})
+                nutrition_values = MEAL_NUTRITION_DATABASE.get(dish_name, {})
                 if nutrition_values:
                     if dim in nutrition_values:
                         value = nutrition_values[dim]
@@ -1049,7 +1113,7 @@ def create_meal_nutrition_radar_chart(recommended_dishes, patient):
             st.write(f"- **{dim}**: {', '.join(dim_details)} → 平均{total_nutrition[dim]:.1f}分")
 
         # 营养均衡度评估（优化评分标准）
-        balance_score = sum(total_nutrition.values()) / len(nutrition_dimensions)
+        balance_score = sum(total_nutrition.values()) / len(MEAL_NUTRITION_DIMENSIONS)
 
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -1102,7 +1166,7 @@ def main():
                 patient = create_patient_profile(basic_info, health_status, dietary_preferences)
 
                 if patient:
-                    st.session_state.patient_data["patient"] = patient
+                    set_current_patient(patient)
 
                     # 生成分析
                     with st.spinner("正在生成个性化分析..."):
@@ -1213,7 +1277,7 @@ def render_cgm_management_page():
 
     # 初始化CGM集成系统
     if 'cgm_integration' not in st.session_state:
-        st.session_state.cgm_integration = CGMNutritionIntegration()
+        st.session_state.cgm_integration = get_cgm_integration()
 
     cgm_system = st.session_state.cgm_integration
 
@@ -1256,8 +1320,7 @@ def render_cgm_data_upload():
 
         if uploaded_file:
             try:
-                cgm_data = pd.read_csv(uploaded_file)
-                cgm_data['timestamp'] = pd.to_datetime(cgm_data['timestamp'])
+                cgm_data = load_cgm_csv(uploaded_file.getvalue())
 
                 # 数据预览
                 st.success(f"✅ 成功加载 {len(cgm_data)} 条血糖记录")
@@ -1353,33 +1416,50 @@ def render_cgm_data_upload():
             fig.add_hline(y=10.0, line_dash="dash", line_color="orange", annotation_text="高血糖线")
             st.plotly_chart(fig, use_container_width=True)
 
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_cgm_csv(file_bytes):
+    """解析上传的CGM文件 (按文件内容缓存，重跑时不重复解析)"""
+    cgm_data = pd.read_csv(io.BytesIO(file_bytes))
+    cgm_data['timestamp'] = pd.to_datetime(cgm_data['timestamp'])
+    return cgm_data
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def cgm_quality_metrics(cgm_data):
+    """CGM数据质量统计 (按数据内容缓存)"""
+    return {
+        "count": len(cgm_data),
+        "duration_days": (cgm_data['timestamp'].max() - cgm_data['timestamp'].min()).days,
+        "completeness": (1 - cgm_data['glucose'].isna().sum() / len(cgm_data)) * 100,
+        "avg_glucose": cgm_data['glucose'].mean()
+    }
+
 def render_cgm_data_quality_check(cgm_data):
     """CGM数据质量检查"""
     st.markdown("### 🔍 数据质量检查")
 
+    metrics = cgm_quality_metrics(cgm_data)
+    completeness = metrics["completeness"]
+
     # 基本统计
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("记录总数", len(cgm_data))
+        st.metric("记录总数", metrics["count"])
 
     with col2:
-        duration = (cgm_data['timestamp'].max() - cgm_data['timestamp'].min()).days
-        st.metric("监测天数", f"{duration}天")
+        st.metric("监测天数", f"{metrics['duration_days']}天")
 
     with col3:
-        completeness = (1 - cgm_data['glucose'].isna().sum() / len(cgm_data)) * 100
         st.metric("数据完整性", f"{completeness:.1f}%")
 
     with col4:
-        avg_glucose = cgm_data['glucose'].mean()
-        st.metric("平均血糖", f"{avg_glucose:.1f} mmol/L")
+        st.metric("平均血糖", f"{metrics['avg_glucose']:.1f} mmol/L")
 
     # 数据质量警告
     if completeness < 90:
         st.warning("⚠️ 数据完整性较低，可能影响分析结果的准确性")
 
-    if len(cgm_data) < 288:  # 24小时 × 12次/小时
+    if metrics["count"] < 288:  # 24小时 × 12次/小时
         st.warning("⚠️ 数据量较少，建议至少有24小时的连续监测数据")
 
 def render_meal_glucose_analysis():
@@ -1466,6 +1546,59 @@ def render_meal_glucose_analysis():
             else:
                 st.error("请至少选择一个菜品")
 
+    render_meal_log_batch_analysis(cgm_data, cgm_system)
+
+def render_meal_log_batch_analysis(cgm_data, cgm_system):
+    """批量分析餐食记录 (所有餐次一次向量化计算)"""
+    st.markdown("### 📚 批量分析餐食记录")
+
+    meal_log_file = st.file_uploader(
+        "上传餐食记录文件",
+        type=['csv'],
+        key="meal_log_upload",
+        help="CSV文件应包含 'meal_time' 列，可选 'meal_type'、'gi_total'、'gl_total'、'dishes' 列"
+    )
+    if not meal_log_file:
+        return
+
+    try:
+        meal_log = pd.read_csv(meal_log_file)
+        meal_times = pd.to_datetime(meal_log['meal_time'])
+    except Exception as e:
+        st.error(f"❌ 餐食记录读取失败: {str(e)}")
+        return
+
+    meal_compositions = [{
+        'dishes': str(row.get('dishes', '')).split('|') if pd.notna(row.get('dishes')) else [],
+        'gi_total': row['gi_total'] if pd.notna(row.get('gi_total')) else 55,
+        'gl_total': row['gl_total'] if pd.notna(row.get('gl_total')) else 15,
+        'meal_type': row.get('meal_type', '')
+    } for row in meal_log.to_dict('records')]
+
+    results = cgm_system.analyze_meal_glucose_responses(cgm_data, list(meal_times), meal_compositions)
+
+    rows = []
+    for meal_time, composition, result in zip(meal_times, meal_compositions, results):
+        row = {'用餐时间': meal_time, '餐次': composition['meal_type']}
+        if 'error' in result:
+            row['评级'] = result['error']
+        else:
+            row.update({
+                '基线血糖': result['baseline_glucose'],
+                '峰值血糖': result['peak_glucose'],
+                '上升幅度': result['glucose_excursion'],
+                '达峰时间(分钟)': result['time_to_peak'],
+                '2小时血糖': result['glucose_2h'],
+                '回归时间(分钟)': result['recovery_time'],
+                'AUC': result['auc'],
+                '评级': result['response_grade']['grade']
+            })
+        rows.append(row)
+
+    analyzed = sum('error' not in result for result in results)
+    st.success(f"✅ 已分析 {analyzed}/{len(results)} 餐")
+    st.dataframe(pd.DataFrame(rows))
+
 def render_meal_analysis_results(analysis_result):
     """显示餐后血糖分析结果"""
     st.markdown("### 📊 餐后血糖反应分析结果")
@@ -1554,6 +1687,7 @@ def render_meal_analysis_results(analysis_result):
         st.session_state.meal_analysis_history = []
 
     st.session_state.meal_analysis_history.append(analysis_result)
+    get_cgm_integration().record_meal_response(get_sensitivity_model(), analysis_result)
 
 def render_cgm_based_recommendations():
     """基于CGM数据的个性化推荐"""
@@ -1592,7 +1726,8 @@ def render_cgm_based_recommendations():
     if st.button("生成个性化推荐"):
         with st.spinner("基于CGM数据生成个性化推荐..."):
             recommendations = cgm_system.generate_personalized_recommendations(
-                history, current_glucose, next_meal, patient_profile
+                history, current_glucose, next_meal, patient_profile,
+                sensitivity_model=get_sensitivity_model()
             )
 
         if 'error' not in recommendations:
@@ -1709,42 +1844,27 @@ def render_glucose_trend_analysis():
 
     # 基本趋势图
     st.markdown("### 📊 血糖趋势图")
-
-    fig = px.line(
-        cgm_data,
-        x='timestamp',
-        y='glucose',
-        title="CGM血糖趋势",
-        labels={'glucose': '血糖值 (mmol/L)', 'timestamp': '时间'}
-    )
-
-    # 添加目标范围线
-    fig.add_hline(y=3.9, line_dash="dash", line_color="red", annotation_text="低血糖")
-    fig.add_hline(y=7.8, line_dash="dash", line_color="green", annotation_text="理想上限")
-    fig.add_hline(y=10.0, line_dash="dash", line_color="orange", annotation_text="高血糖")
-
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(build_glucose_trend_figure(cgm_data), use_container_width=True)
 
     # 统计指标
     st.markdown("### 📋 血糖控制指标")
 
+    metrics = glucose_control_metrics(cgm_data)
+    tir = metrics["tir"]
+
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        tir = ((cgm_data['glucose'] >= 3.9) & (cgm_data['glucose'] <= 10.0)).mean() * 100
         st.metric("目标范围内时间 (TIR)", f"{tir:.1f}%")
 
     with col2:
-        tbr = (cgm_data['glucose'] < 3.9).mean() * 100
-        st.metric("低血糖时间 (TBR)", f"{tbr:.1f}%")
+        st.metric("低血糖时间 (TBR)", f"{metrics['tbr']:.1f}%")
 
     with col3:
-        tar = (cgm_data['glucose'] > 10.0).mean() * 100
-        st.metric("高血糖时间 (TAR)", f"{tar:.1f}%")
+        st.metric("高血糖时间 (TAR)", f"{metrics['tar']:.1f}%")
 
     with col4:
-        cv = (cgm_data['glucose'].std() / cgm_data['glucose'].mean()) * 100
-        st.metric("血糖变异系数 (CV)", f"{cv:.1f}%")
+        st.metric("血糖变异系数 (CV)", f"{metrics['cv']:.1f}%")
 
     # TIR评价
     if tir >= 70:
@@ -1754,47 +1874,64 @@ def render_glucose_trend_analysis():
     else:
         st.warning("⚠️ 血糖控制需要改善 (TIR < 50%)")
 
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_glucose_trend_figure(cgm_data):
+    """CGM血糖趋势图 (按数据内容缓存)"""
+    fig = px.line(
+        cgm_data,
+        x='timestamp',
+        y='glucose',
+        title="CGM血糖趋势",
+        labels={'glucose': '血糖值 (mmol/L)', 'timestamp': '时间'}
+    )
+
+    # 添加目标范围线
+    fig.add_hline(y=3.9, line_dash="dash", line_color="red", annotation_text="低血糖")
+    fig.add_hline(y=7.8, line_dash="dash", line_color="green", annotation_text="理想上限")
+    fig.add_hline(y=10.0, line_dash="dash", line_color="orange", annotation_text="高血糖")
+    return fig
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def glucose_control_metrics(cgm_data):
+    """TIR/TBR/TAR/CV (按数据内容缓存)"""
+    glucose = cgm_data['glucose']
+    return {
+        "tir": ((glucose >= 3.9) & (glucose <= 10.0)).mean() * 100,
+        "tbr": (glucose < 3.9).mean() * 100,
+        "tar": (glucose > 10.0).mean() * 100,
+        "cv": (glucose.std() / glucose.mean()) * 100
+    }
+
 def generate_mock_cgm_data():
     """生成模拟CGM数据用于演示"""
-    # 生成24小时的模拟数据，每5分钟一个点
+    # 生成24小时的模拟数据，每5分钟一个点 (按时刻向量化计算)
     start_time = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    timestamps = [start_time + datetime.timedelta(minutes=5*i) for i in range(288)]
+    timestamps = pd.date_range(start_time, periods=288, freq="5min")
+    hour = timestamps.hour.to_numpy()
+    minute = timestamps.minute.to_numpy()
 
-    # 基于时间生成有规律的血糖模式
-    glucose_values = []
     base_glucose = 6.0  # 基础血糖
 
-    for i, ts in enumerate(timestamps):
-        hour = ts.hour
-        minute = ts.minute
-
-        # 模拟餐后血糖升高
-        if 7 <= hour <= 9:  # 早餐后
-            glucose_add = 2.0 * math.exp(-(hour-8)**2/2) * (1 + 0.3*math.sin(minute/10))
-        elif 12 <= hour <= 14:  # 午餐后
-            glucose_add = 2.5 * math.exp(-(hour-13)**2/2) * (1 + 0.3*math.sin(minute/10))
-        elif 18 <= hour <= 20:  # 晚餐后
-            glucose_add = 2.2 * math.exp(-(hour-19)**2/2) * (1 + 0.3*math.sin(minute/10))
-        else:
-            glucose_add = 0
-
-        # 添加随机波动
-        noise = random.gauss(0, 0.3)
+    # 模拟餐后血糖升高: (时段起, 时段止, 峰值时刻, 幅度)
+    glucose_add = np.zeros(len(timestamps))
+    wave = 1 + 0.3 * np.sin(minute / 10)
+    for start_hour, end_hour, peak_hour, amplitude in ((7, 9, 8, 2.0), (12, 14, 13, 2.5), (18, 20, 19, 2.2)):
+        in_window = (hour >= start_hour) & (hour <= end_hour)
+        glucose_add[in_window] = (amplitude * np.exp(-(hour[in_window] - peak_hour) ** 2 / 2)
+                                  * wave[in_window])
 
-        # 夜间基础值稍低
-        if 0 <= hour <= 6:
-            base_adjustment = -0.5
-        else:
-            base_adjustment = 0
+    # 添加随机波动
+    noise = np.random.normal(0, 0.3, len(timestamps))
 
-        glucose = base_glucose + base_adjustment + glucose_add + noise
-        glucose = max(3.0, min(15.0, glucose))  # 限制在合理范围内
+    # 夜间基础值稍低
+    base_adjustment = np.where(hour <= 6, -0.5, 0.0)
 
-        glucose_values.append(round(glucose, 1))
+    glucose = base_glucose + base_adjustment + glucose_add + noise
+    glucose = np.clip(glucose, 3.0, 15.0)  # 限制在合理范围内
 
     return pd.DataFrame({
         'timestamp': timestamps,
-        'glucose': glucose_values
+        'glucose': np.round(glucose, 1)
     })
 
 def generate_cgm_optimized_recommendations(original_recommendations, patient):
@@ -1804,8 +1941,7 @@ def generate_cgm_optimized_recommendations(original_recommendations, patient):
         return extract_original_dishes(original_recommendations)
 
     # 分析患者的血糖反应模式
-    cgm_history = st.session_state.meal_analysis_history
-    glucose_sensitivity = analyze_patient_glucose_sensitivity(cgm_history)
+    glucose_sensitivity = analyze_patient_glucose_sensitivity(get_sensitivity_model())
 
     # 根据血糖敏感性优化菜品选择
     optimized_dishes = {}
@@ -1855,39 +1991,25 @@ def extract_original_dishes(recommendations):
             dishes[meal_type] = dish_name
     return dishes
 
-def analyze_patient_glucose_sensitivity(cgm_history):
-    """分析患者血糖敏感性"""
-    if not cgm_history:
+# 血糖敏感性分级 (GlucoseSensitivityModel.summary) 对应的界面体质类型及说明
+SENSITIVITY_PROFILES = {
+    'low': ('低敏感体质', "血糖反应平缓，可选择相对宽松的食物"),
+    'moderate': ('中等敏感体质', "血糖反应适中，需要适度控制"),
+    'high': ('高敏感体质', "血糖反应敏感，需要严格控制碳水化合物"),
+}
+
+def analyze_patient_glucose_sensitivity(sensitivity_model):
+    """分析患者血糖敏感性 (分级与置信度取自增量模型的 summary，与CGM集成引擎一致)"""
+    summary = sensitivity_model.summary() if sensitivity_model is not None else None
+    if summary is None or summary['sensitivity_level'] not in SENSITIVITY_PROFILES:
         return {'level': '中等敏感体质', 'avg_excursion': 3.0, 'confidence': 0}
 
-    # 收集血糖上升幅度数据
-    excursions = []
-    for record in cgm_history:
-        if 'glucose_excursion' in record:
-            excursions.append(record['glucose_excursion'])
-
-    if len(excursions) == 0:
-        return {'level': '中等敏感体质', 'avg_excursion': 3.0, 'confidence': 0}
-
-    avg_excursion = sum(excursions) / len(excursions)
-    confidence = min(len(excursions) / 5.0, 1.0)  # 5次分析达到100%置信度
-
-    # 根据平均血糖上升幅度分类
-    if avg_excursion <= 2.0:
-        level = '低敏感体质'
-        description = "血糖反应平缓，可选择相对宽松的食物"
-    elif avg_excursion <= 3.5:
-        level = '中等敏感体质'
-        description = "血糖反应适中，需要适度控制"
-    else:
-        level = '高敏感体质'
-        description = "血糖反应敏感，需要严格控制碳水化合物"
-
+    level, description = SENSITIVITY_PROFILES[summary['sensitivity_level']]
     return {
         'level': level,
         'description': description,
-        'avg_excursion': round(avg_excursion, 1),
-        'confidence': round(confidence, 2)
+        'avg_excursion': summary['avg_excursion'],
+        'confidence': summary['confidence']
     }
 
 def get_cgm_optimization_info(dish_name, meal_type):
@@ -1896,8 +2018,7 @@ def get_cgm_optimization_info(dish_name, meal_type):
         return None
 
     # 根据历史CGM数据提供个性化信息
-    cgm_history = st.session_state.meal_analysis_history
-    sensitivity = analyze_patient_glucose_sensitivity(cgm_history)
+    sensitivity = analyze_patient_glucose_sensitivity(get_sensitivity_model())
 
     if sensitivity['level'] == '高敏感体质':
         return f"基于您的血糖反应模式，此菜品预期血糖上升{sensitivity['avg_excursion']:.1f}mmol/L（较温和）"
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cohort CGM analytics and batch runner tests: grouped reductions match a
+per-patient pandas computation; duplicate patient ids in one batch are
+rejected instead of sharing one analysis.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+FOODRECOM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOODRECOM_DIR, "Core_Systems"))
+
+from cgm_cohort_analysis import (CohortReadings, cohort_period_analysis, cohort_summary_metrics,
+                                 DAY_PERIODS)
+
+try:
+    import cgm_nutrition_pipeline
+except ImportError:  # ZS_HMC (zshmc_report) is not checked out
+    cgm_nutrition_pipeline = None
+
+
+def _frame(seed: int, days: int = 3, missing: float = 0.05) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range("2024-03-01", periods=days * 96, freq="15min")
+    glucose = 7 + 3 * np.sin(np.arange(len(timestamps)) / 12) + rng.normal(0, 1.5, len(timestamps))
+    glucose = np.clip(glucose, 2.2, None)
+    glucose[rng.random(len(timestamps)) < missing] = np.nan
+    # Unsorted input must not change the results
+    return pd.DataFrame({"timestamp": timestamps, "glucose_value": glucose}).sample(frac=1, random_state=seed)
+
+
+class TestCohortAnalysis(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.frames = {"p1": _frame(1), "p2": _frame(2, days=5), "empty": _frame(3).assign(glucose_value=np.nan)}
+        cls.readings = CohortReadings.from_frames(cls.frames)
+
+    def test_empty_patients_are_listed(self):
+        self.assertEqual(self.readings.patient_ids, ["p1", "p2"])
+        self.assertEqual(self.readings.empty_patients, ["empty"])
+
+    def test_summary_metrics_match_per_patient(self):
+        metrics = cohort_summary_metrics(self.readings)
+        for patient_id in self.readings.patient_ids:
+            df = self.frames[patient_id].dropna().sort_values("timestamp")
+            values = df["glucose_value"].to_numpy()
+            result = metrics[patient_id]
+            self.assertAlmostEqual(result["mean_glucose"], values.mean())
+            self.assertAlmostEqual(result["std"], values.std())
+            self.assertAlmostEqual(result["cv"], values.std() / values.mean() * 100)
+            self.assertAlmostEqual(result["tir"], np.mean((values >= 3.9) & (values <= 10.0)) * 100)
+            self.assertAlmostEqual(result["tbr"], np.mean(values < 3.9) * 100)
+            self.assertAlmostEqual(result["iqr"], round(np.percentile(values, 75) - np.percentile(values, 25), 1))
+            self.assertAlmostEqual(result["auc_all"], round(np.trapezoid(values) / len(values), 1))
+            self.assertEqual(result["monitoring_days"], df["timestamp"].dt.date.nunique())
+            self.assertEqual(result["total_points"], len(values))
+
+    def test_period_means_match_per_patient(self):
+        periods = cohort_period_analysis(self.readings)
+        for patient_id in self.readings.patient_ids:
+            df = self.frames[patient_id].dropna()
+            hours = df["timestamp"].dt.hour
+            for name, (start, end) in DAY_PERIODS.items():
+                values = df.loc[(hours >= start) & (hours < end), "glucose_value"]
+                details = periods[patient_id]["period_details"][name]
+                self.assertEqual(details["mean_glucose"], round(values.mean(), 1))
+                self.assertEqual(details["tir"], round(((values >= 3.9) & (values <= 10.0)).mean() * 100, 1))
+
+
+@unittest.skipIf(cgm_nutrition_pipeline is None, "zshmc_report (ZS_HMC) not available")
+class TestRunBatch(unittest.TestCase):
+
+    def test_duplicate_patient_ids_are_rejected(self):
+        frames = {"a.csv": _frame(1), "b.csv": _frame(2), "c.csv": _frame(4)}
+        pipeline = cgm_nutrition_pipeline.IntegratedCGMNutritionPipeline.__new__(
+            cgm_nutrition_pipeline.IntegratedCGMNutritionPipeline)
+        analysed = []
+        pipeline._assemble_analysis = lambda df, results, context: analysed.append(context.cgm_file) or results
+        pipeline._build_insights = lambda analysis, html_path: analysis
+        pipeline._recommend = lambda context, insights: insights["summary_metrics"]["mean_glucose"]
+
+        models = cgm_nutrition_pipeline
+        contexts = [models.IntegratedPatientContext(None, models.MedicationPlan(), models.DietQuestionnaire(),
+                                                    cgm_file, patient_id)
+                    for cgm_file, patient_id in (("a.csv", "dup"), ("b.csv", "solo"), ("c.csv", "dup"))]
+        metrics = models.CohortRunMetrics()
+        with mock.patch.object(models, "load_cgm_data", side_effect=lambda path: frames[path]):
+            results = list(pipeline._run_batch(contexts, write_html=False, metrics=metrics))
+
+        self.assertEqual([context.cgm_file for context, _, _ in results], ["a.csv", "b.csv", "c.csv"])
+        self.assertIsNone(results[0][1])
+        self.assertIn("Duplicate patient_id", results[0][2])
+        self.assertIn("Duplicate patient_id", results[2][2])
+        self.assertAlmostEqual(results[1][1], frames["b.csv"]["glucose_value"].mean())
+        self.assertEqual(analysed, ["b.csv"])
+        self.assertEqual((metrics.succeeded, metrics.failed), (1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式GI/GL食物表测试：批量餐食GI/GL与逐食物累加一致、布尔掩码餐食计划与逐食物过滤一致
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+
+FOODRECOM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOODRECOM_DIR, "Core_Systems"))
+
+from gi_database_integration_v2 import GIDatabaseSystemV2, PatientProfile
+
+
+def _reference_meal_gi_gl(system, meal_composition):
+    """原方式：逐个食物查表累加碳水与GL (返回未舍入的值)"""
+    total_carbs = weighted_gi_sum = total_gl = 0.0
+    for food_name, weight_g in meal_composition:
+        food_data = system.gi_database.get(food_name)
+        if not food_data:
+            continue
+        food_carbs = food_data.carb_per_portion * weight_g / food_data.portion_size_g
+        total_carbs += food_carbs
+        weighted_gi_sum += food_data.gi_value * food_carbs
+        total_gl += food_data.gi_value * food_carbs / 100
+    average_gi = weighted_gi_sum / total_carbs if total_carbs > 0 else 0
+    return average_gi, total_gl
+
+
+def _reference_plan_foods(system, target_gl, patient):
+    """原方式：逐个低GI食物按名称子串、素食规则过滤，按分类分组"""
+    avoid_foods = (patient.allergies + patient.disliked_foods) if patient else []
+    vegetarian = bool(patient and patient.dietary_restrictions and "素食" in patient.dietary_restrictions)
+    groups = {"主食类": [], "蛋白质类": [], "蔬菜类": [], "水果类": []}
+    for food in system.get_low_gi_foods():
+        if food.gl_value > target_gl or any(avoid in food.name for avoid in avoid_foods):
+            continue
+        if vegetarian and (food.category in ["肉类", "鱼类"] or
+                           any(meat in food.name for meat in ["鱼", "肉", "鸡", "鸭", "猪", "牛", "羊"])):
+            continue
+        label = f"{food.name} (GI:{food.gi_value}, GL:{food.gl_value:.1f})"
+        if food.category in ["谷物", "薯类"]:
+            groups["主食类"].append(label)
+        elif food.category in ["肉类", "鱼类", "蛋类", "豆类"]:
+            groups["蛋白质类"].append(label)
+        elif food.category == "蔬菜":
+            groups["蔬菜类"].append(label)
+        elif food.category == "水果":
+            groups["水果类"].append(label)
+    return groups
+
+
+class TestGIFoodTable(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.system = GIDatabaseSystemV2()
+        cls.names = list(cls.system.gi_database)
+
+    def test_meals_match_per_food_loop(self):
+        rng = random.Random(0)
+        meals = [[(rng.choice(self.names + ["未收录食物"]), rng.uniform(10, 300))
+                  for _ in range(rng.randint(0, 6))] for _ in range(500)]
+        meals.append([(self.names[0], 100), (self.names[0], 50)])  # 同一食物出现两次
+        table = self.system.food_table
+        raw_gi, raw_gl = table.meal_gi_gl(table.weight_matrix(meals))
+        average_gi, total_gl = self.system.calculate_meals_gi_gl(meals)
+        self.assertEqual(len(average_gi), len(meals))
+        for i, meal in enumerate(meals):
+            expected = _reference_meal_gi_gl(self.system, meal)
+            self.assertAlmostEqual(raw_gi[i], expected[0], places=9)
+            self.assertAlmostEqual(raw_gl[i], expected[1], places=9)
+            # 矩阵乘法与逐项累加的求和顺序不同，仅在恰好落在 x.x5 舍入边界时末位可能相差 0.1
+            for batch, single, reference in zip((average_gi[i], total_gl[i]),
+                                                self.system.calculate_meal_gi_gl(meal), expected):
+                self.assertEqual(batch, single)
+                if batch != round(reference, 1):
+                    self.assertAlmostEqual(reference * 10 % 1, 0.5, places=9)
+                    self.assertAlmostEqual(batch, round(reference, 1), delta=0.1 + 1e-9)
+
+    def test_meal_plans_match_per_food_filter(self):
+        rng = random.Random(1)
+        tokens = sorted({name[a:a + length] for name in self.names
+                         for length in (1, 2) for a in range(len(name) - length + 1)})
+        patients = [None]
+        for i in range(150):
+            patients.append(PatientProfile(
+                name=f"患者{i}", age=60, gender="男", height=170, weight=70,
+                allergies=rng.sample(tokens, rng.randint(0, 2)),
+                disliked_foods=rng.sample(tokens, rng.randint(0, 3)) + ["不存在的食物"] * (i % 7 == 0),
+                dietary_restrictions=["素食"] if i % 3 == 0 else []))
+        for target_gl in (5.0, 15.0):
+            plans = self.system.generate_diabetes_meal_plans(patients, target_gl)
+            for patient, plan in zip(patients, plans):
+                expected = _reference_plan_foods(self.system, target_gl, patient)
+                self.assertEqual({group: plan[group] for group in expected}, expected)
+                self.assertEqual(plan, self.system.generate_diabetes_meal_plan(target_gl, patient))
+        self.assertTrue(any(plan["蛋白质类"] for plan in plans))
+
+    def test_name_mask_matches_substring_search(self):
+        table = self.system.food_table
+        for terms in (["鱼"], ["米", "豆"], ["燕麦片"], ["不存在"], [""], []):
+            expected = [any(term in name for term in terms) for name in table.names]
+            np.testing.assert_array_equal(table.name_mask(terms), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
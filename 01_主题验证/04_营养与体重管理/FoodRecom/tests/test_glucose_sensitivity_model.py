@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+血糖敏感性增量模型测试：在线统计量与一次性计算一致、按病历号持久化、未标识患者不落盘
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+FOODRECOM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOODRECOM_DIR, "Core_Systems"))
+
+from cgm_nutrition_integration import CGMNutritionIntegration
+from glucose_sensitivity_model import GlucoseSensitivityModel, GlucoseSensitivityStore, gl_bucket
+
+
+def _history(seed: int, count: int = 30):
+    rng = np.random.default_rng(seed)
+    return [{'glucose_excursion': float(rng.uniform(0.5, 6)),
+             'meal_composition': {'gi_total': float(rng.uniform(30, 90)), 'gl_total': float(rng.uniform(5, 30)),
+                                  'meal_type': ('早餐', '午餐', '晚餐')[i % 3]}}
+            for i in range(count)]
+
+
+class TestGlucoseSensitivityModel(unittest.TestCase):
+
+    def test_running_statistics_match_batch(self):
+        history = _history(0) + [{'glucose_excursion': 3.0}]
+        model = GlucoseSensitivityModel.from_history(history, "P001")
+        excursion = np.array([item['glucose_excursion'] for item in history[:-1]])
+        gi = np.array([item['meal_composition']['gi_total'] for item in history[:-1]])
+        gl = np.array([item['meal_composition']['gl_total'] for item in history[:-1]])
+
+        self.assertEqual(model.sample_size, len(excursion))
+        self.assertAlmostEqual(model.excursion.mean, excursion.mean())
+        self.assertAlmostEqual(model.excursion.std, excursion.std())
+        self.assertAlmostEqual(model.gi_excursion.correlation, np.corrcoef(gi, excursion)[0, 1])
+        self.assertAlmostEqual(model.gl_excursion.correlation, np.corrcoef(gl, excursion)[0, 1])
+
+        groups = model.group_stats('午餐')
+        for key, stats in groups.items():
+            bucket = key.split('/')[1]
+            values = [item['glucose_excursion'] for item in history[:-1]
+                      if item['meal_composition']['meal_type'] == '午餐'
+                      and gl_bucket(item['meal_composition']['gl_total']) == bucket]
+            self.assertEqual(stats['sample_size'], len(values))
+            self.assertEqual(stats['avg_excursion'], round(float(np.mean(values)), 1))
+
+    def test_dict_round_trip(self):
+        model = GlucoseSensitivityModel.from_history(_history(1), "P001")
+        self.assertEqual(GlucoseSensitivityModel.from_dict(model.to_dict()).summary(), model.summary())
+
+
+class TestSensitivityPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self._tempdir = tempfile.TemporaryDirectory()
+        self.store_dir = self._tempdir.name
+        self.integration = CGMNutritionIntegration(self.store_dir)
+
+    def tearDown(self):
+        self._tempdir.cleanup()
+
+    def test_models_are_keyed_by_patient_id(self):
+        first = self.integration.load_sensitivity_model("P001")
+        second = self.integration.load_sensitivity_model("P002")
+        for result in _history(2, 4):
+            self.assertTrue(self.integration.record_meal_response(first, result))
+        self.integration.record_meal_response(second, _history(3, 1)[0])
+
+        self.assertEqual(self.integration.load_sensitivity_model("P001").sample_size, 4)
+        self.assertEqual(self.integration.load_sensitivity_model("P002").sample_size, 1)
+        self.assertEqual(len(os.listdir(self.store_dir)), 2)
+
+    def test_unidentified_patients_are_not_saved(self):
+        model = self.integration.load_sensitivity_model("")
+        for result in _history(4, 3):
+            self.assertTrue(self.integration.record_meal_response(model, result))
+        self.assertEqual(model.sample_size, 3)
+        self.assertEqual(os.listdir(self.store_dir), [])
+        self.assertEqual(self.integration.load_sensitivity_model("").sample_size, 0)
+        with self.assertRaises(ValueError):
+            GlucoseSensitivityStore(self.store_dir).save(model)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+餐后血糖反应批量分析测试：searchsorted 窗口 + 分段归约与逐餐 pandas 筛选计算一致
+(含数据缺口、缺失值、无数据餐次及乱序时间戳)
+"""
+
+import math
+import os
+import sys
+import unittest
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+FOODRECOM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOODRECOM_DIR, "Core_Systems"))
+
+from cgm_nutrition_integration import CGMNutritionIntegration
+
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+def _reference_meal_response(system, cgm_data, meal_time, meal_composition):
+    """原方式：逐餐布尔筛选餐前/餐后数据，pandas 求基线、峰值、回归时间，梯形积分求AUC"""
+    pre_meal_data = cgm_data[(cgm_data['timestamp'] >= meal_time - timedelta(minutes=30)) &
+                             (cgm_data['timestamp'] <= meal_time)]
+    post_meal_data = cgm_data[(cgm_data['timestamp'] > meal_time) &
+                              (cgm_data['timestamp'] <= meal_time + timedelta(hours=4))]
+    if pre_meal_data.empty or post_meal_data.empty:
+        return {'error': '数据不足，无法分析'}
+
+    baseline_glucose = pre_meal_data['glucose'].mean()
+    peak_glucose = post_meal_data['glucose'].max()
+    peak_time = post_meal_data.loc[post_meal_data['glucose'].idxmax(), 'timestamp']
+    post_2h_data = post_meal_data[post_meal_data['timestamp'] <= meal_time + timedelta(hours=2)]
+    glucose_2h = post_2h_data['glucose'].iloc[-1] if not post_2h_data.empty else None
+    glucose_excursion = peak_glucose - baseline_glucose
+    time_to_peak = (peak_time - meal_time).total_seconds() / 60
+
+    recovery_data = post_meal_data[post_meal_data['glucose'] <= baseline_glucose + 1.0]
+    recovery_time = None
+    if not recovery_data.empty:
+        recovery_time = (recovery_data.iloc[0]['timestamp'] - meal_time).total_seconds() / 60
+
+    auc = 0.0
+    if len(post_meal_data) >= 2:
+        times = [(t - post_meal_data.iloc[0]['timestamp']).total_seconds() / 60 for t in post_meal_data['timestamp']]
+        excess = post_meal_data['glucose'].values - baseline_glucose
+        excess[excess < 0] = 0
+        auc = _trapezoid(excess, times)
+
+    expected_response = system._predict_glucose_response(meal_composition)
+    return {
+        'baseline_glucose': round(baseline_glucose, 1),
+        'peak_glucose': round(peak_glucose, 1),
+        'glucose_excursion': round(glucose_excursion, 1),
+        'time_to_peak': round(time_to_peak, 1),
+        'glucose_2h': round(glucose_2h, 1) if glucose_2h else None,
+        'recovery_time': round(recovery_time, 1) if recovery_time else None,
+        'auc': round(auc, 1),
+        'response_grade': system._grade_glucose_response(glucose_excursion, glucose_2h, baseline_glucose, auc),
+        'expected_response': expected_response,
+        'response_match': system._compare_actual_vs_expected(glucose_excursion, expected_response),
+        'meal_composition': meal_composition
+    }
+
+
+def _cgm_frame(days=30, seed=0):
+    """5分钟间隔CGM数据：三餐后升高、随机缺口与缺失值"""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range("2025-03-01", periods=days * 288, freq="5min")
+    hours = timestamps.hour.to_numpy() + timestamps.minute.to_numpy() / 60
+    glucose = 5.5 + rng.normal(0, 0.4, len(timestamps))
+    for meal_hour in (7.5, 12.0, 18.5):
+        after = hours - meal_hour
+        glucose += np.where(after > 0, 3.0 * after * np.exp(-after), 0)
+    frame = pd.DataFrame({'timestamp': timestamps, 'glucose': np.round(glucose, 1)})
+    frame.loc[rng.random(len(frame)) < 0.03, 'glucose'] = np.nan
+    gap = (frame['timestamp'] >= "2025-03-05 06:00") & (frame['timestamp'] < "2025-03-05 16:00")
+    return frame[~gap & (rng.random(len(frame)) > 0.05)].reset_index(drop=True)
+
+
+def _same(a, b):
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+class TestMealGlucoseResponse(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.system = CGMNutritionIntegration()
+        cls.cgm_data = _cgm_frame()
+        rng = np.random.default_rng(1)
+        days = pd.Timestamp("2025-03-01") + pd.to_timedelta(rng.integers(0, 31, 100), unit="D")
+        cls.meal_times = [day + pd.Timedelta(hours=float(h)) for day, h in
+                          zip(days, rng.choice([7.5, 12.0, 18.5, 3.0], 100) + rng.normal(0, 0.2, 100))]
+        cls.meal_times += [pd.Timestamp("2025-03-05 10:00"), pd.Timestamp("2025-02-01 12:00")]  # 缺口内 / 数据之外
+        cls.compositions = [{'gi_total': float(gi), 'gl_total': float(gl)}
+                            for gi, gl in zip(rng.uniform(20, 90, 102), rng.uniform(5, 40, 102))]
+
+    def assertResultsEqual(self, results, cgm_data):
+        for meal_time, composition, result in zip(self.meal_times, self.compositions, results):
+            expected = _reference_meal_response(self.system, cgm_data, meal_time, composition)
+            self.assertTrue(_same(result, expected), f"{meal_time}: {result} != {expected}")
+
+    def test_batch_matches_per_meal(self):
+        results = self.system.analyze_meal_glucose_responses(self.cgm_data, self.meal_times, self.compositions)
+        self.assertEqual(len(results), len(self.meal_times))
+        self.assertResultsEqual(results, self.cgm_data)
+        self.assertEqual(results[-2:], [{'error': '数据不足，无法分析'}] * 2)
+        self.assertGreater(sum('error' not in result for result in results), 60)
+
+    def test_single_meal_and_unsorted_input(self):
+        shuffled = self.cgm_data.sample(frac=1, random_state=0)
+        for i in range(0, len(self.meal_times), 10):
+            result = self.system.analyze_meal_glucose_response(shuffled, self.meal_times[i], self.compositions[i])
+            expected = _reference_meal_response(self.system, self.cgm_data, self.meal_times[i], self.compositions[i])
+            self.assertTrue(_same(result, expected), f"{result} != {expected}")
+
+    def test_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            self.system.analyze_meal_glucose_responses(self.cgm_data, self.meal_times, self.compositions[:3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+一周菜单优化测试：单点移动的增量目标函数与整体重算一致、每餐次菜品重复次数、目标范围说明、
+GL上限为硬约束、候选菜谱碳水估算、批量求解 (共用可选项、进程池) 与逐个求解一致
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+FOODRECOM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOODRECOM_DIR, "Core_Systems"))
+
+from gi_database_integration_v2 import PatientProfile
+from menu_optimizer import (MEAL_SLOTS, MIN_MACRO_COVERAGE, NUTRIENT_LABELS, NUTRIENT_TOLERANCE, SLOT_DISHES,
+                            MenuTargets, WeeklyMenuOptimizer, _LocalSearch, _SlotOptions)
+from nutrition_registry import get_registry
+
+DIABETIC = PatientProfile(name="测试患者", age=52, gender="女", height=160, weight=68,
+                          blood_glucose_fasting=8.2, hba1c=7.5, diagnosed_diseases=["糖尿病"])
+TARGETS = MenuTargets(calories=1600, protein_g=70, carbs_g=200, fat_g=50, meal_gl_ceiling=20, daily_gl_ceiling=80)
+
+
+class TestWeeklyMenuOptimizer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.candidates = get_registry().menu_candidates
+        cls.optimizer = WeeklyMenuOptimizer(cls.candidates)
+
+    def _solver(self, targets: MenuTargets) -> _LocalSearch:
+        table = self.candidates
+        allowed, penalty, _ = self.optimizer._patient_rows(DIABETIC)
+        slots = [_SlotOptions(table, np.flatnonzero(allowed & (table.slot_code == s)), penalty, SLOT_DISHES[slot])
+                 for s, slot in enumerate(MEAL_SLOTS)]
+        solver = _LocalSearch(slots, targets, len(table.unique_names))
+        solver.solve(20)
+        return solver
+
+    def test_position_costs_match_total_cost(self):
+        """单点移动的向量化代价之差与赋值后整体重算的目标函数之差一致"""
+        solver = self._solver(TARGETS)
+        rng = np.random.default_rng(0)
+        for s, d, j in [(0, 0, 0), (1, 3, 2), (2, 6, 1), (3, 2, 0)]:
+            costs, feasible = solver._position_costs(s, d, j)
+            current = solver.choices[s][d, j]
+            base = solver.total_cost()
+            for k in rng.choice(np.flatnonzero(feasible), 5, replace=False):
+                solver._assign(s, d, j, int(k))
+                self.assertAlmostEqual(solver.total_cost() - base, costs[k] - costs[current], places=8)
+                solver._assign(s, d, j, current)
+            self.assertAlmostEqual(solver.total_cost(), base, places=8)
+
+    def test_repetition_is_counted_per_slot(self):
+        solver = self._solver(TARGETS)
+        for s, (options, choices) in enumerate(zip(solver.slots, solver.choices)):
+            counts = np.bincount(options.name[choices[choices >= 0]], minlength=solver.name_used.shape[1])
+            np.testing.assert_array_equal(solver.name_used[s], counts)
+            self.assertLessEqual(counts.max(), options.repeat_limit)
+            for day in choices:
+                self.assertEqual(len(set(options.name[day])), len(day))
+
+    def test_range_notes_match_daily_nutrition(self):
+        result = self.optimizer.optimize(DIABETIC, TARGETS)
+        targets = TARGETS.vector
+        for i, label in enumerate(NUTRIENT_LABELS):
+            values = np.array([day[label] for day in result["每日营养"].values()])
+            low = np.sum(values < targets[i] * (1 - NUTRIENT_TOLERANCE[i]) - 0.05)
+            high = np.sum(values > targets[i] * (1 + NUTRIENT_TOLERANCE[i]) + 0.05)
+            notes = " ".join(result["说明"])
+            self.assertEqual(f"{label}有{low}天低于" in notes, low > 0)
+            self.assertEqual(f"{label}有{high}天高于" in notes, high > 0)
+
+    def test_gl_ceilings_are_hard(self):
+        loose = self._solver(MenuTargets(1600, 70, 200, 50))
+        self.assertGreater(loose.slot_gl.max(), 8)
+        for meal_ceiling, daily_ceiling in [(20, 80), (8, 30), (3, 10)]:
+            tight = self._solver(MenuTargets(1600, 70, 200, 50, meal_gl_ceiling=meal_ceiling,
+                                             daily_gl_ceiling=daily_ceiling))
+            self.assertLessEqual(tight.slot_gl.max(), meal_ceiling + 1e-9)
+            self.assertLessEqual(tight.day_gl.max(), daily_ceiling + 1e-9)
+            # 累计量与所选菜品一致
+            gl = np.zeros_like(tight.slot_gl)
+            for s, (options, choices) in enumerate(zip(tight.slots, tight.choices)):
+                gl[:, s] = np.where(choices >= 0, options.gl[np.maximum(choices, 0)], 0).sum(axis=1)
+            np.testing.assert_allclose(gl, tight.slot_gl, atol=1e-9)
+
+        result = self.optimizer.optimize(DIABETIC, MenuTargets(1600, 70, 200, 50, meal_gl_ceiling=3, daily_gl_ceiling=10))
+        for day in result["一周计划"].values():
+            for dishes in day.values():
+                self.assertLessEqual(sum(dish["GL"] for dish in dishes), 3 + 0.5)
+
+    def test_candidate_macro_estimates(self):
+        table = self.candidates
+        recipes = table.store.recipes
+        self.assertTrue(np.all(table.macro_estimated == (table.macro_coverage >= MIN_MACRO_COVERAGE)))
+        calories, protein, carbs, fat = table.nutrients.T
+        np.testing.assert_allclose(fat, np.maximum(calories - 4 * (protein + carbs), 0) / 9)
+        # 干重大米按生重营养数据估算 (约每克0.77g碳水)，不再按熟米饭的碳水密度
+        row = next(i for i, recipe in enumerate(recipes) if recipe.name == "白粥配咸菜")
+        rice = next(ingredient.weight for ingredient in recipes[row].ingredients if ingredient.name == "大米")
+        self.assertGreater(carbs[row], 0.7 * rice)
+        # 没有任何食材碳水数据的菜谱不作为候选
+        self.assertFalse(table.macro_estimated[[i for i, recipe in enumerate(recipes) if recipe.name == "白灼芥蓝"]].any())
+        allowed, _, notes = self.optimizer._patient_rows(DIABETIC)
+        self.assertFalse((allowed & ~table.macro_estimated).any())
+        self.assertTrue(any("碳水/脂肪无法估算" in note for note in notes))
+
+    def test_batch_matches_single(self):
+        vegetarian = PatientProfile(name="素食患者", age=40, gender="男", height=175, weight=70,
+                                    dietary_restrictions=["素食"], allergies=["花生"])
+        other_targets = MenuTargets(2000, 90, 250, 60)
+        patients = [DIABETIC, vegetarian, DIABETIC, vegetarian, DIABETIC]
+        targets = [TARGETS, TARGETS, other_targets, TARGETS, TARGETS]
+        singles = [self.optimizer.optimize(patient, patient_targets)
+                   for patient, patient_targets in zip(patients, targets)]
+        for workers in (None, 2):
+            batch = self.optimizer.optimize_batch(patients, targets, workers=workers)
+            self.assertEqual(len(batch), len(patients))
+            for result, single in zip(batch, singles):
+                self.assertEqual(result["一周计划"], single["一周计划"])
+                self.assertEqual(result["说明"], single["说明"])
+            # 重复的 (患者约束, 目标) 只求解一次，但返回独立副本
+            self.assertIsNot(batch[0], batch[4])
+            self.assertIsNot(batch[0]["一周计划"], batch[4]["一周计划"])
+
+    def test_invalid_targets(self):
+        with self.assertRaises(ValueError):
+            MenuTargets(0, 70, 200, 50)
+        with self.assertRaises(ValueError):
+            self.optimizer.optimize_batch([DIABETIC], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+食材营养矩阵测试：稀疏乘积与逐食材累加一致、菜谱库增删改后的增量同步与整体重建一致
+"""
+
+import copy
+import os
+import sys
+import unittest
+
+import numpy as np
+
+FOODRECOM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOODRECOM_DIR, "Core_Systems"))
+
+from detailed_recipe_manager import DetailedRecipeManager
+from integrated_nutrition_system_v2 import IntegratedNutritionSystemV2
+from nutrient_matrix import NUTRIENT_FIELDS, RecipeNutrientMatrix, edible_weight
+from nutrition_registry import get_registry
+from simple_recipe_manager import SimpleIngredient, SimpleRecipe, SimpleRecipeManager
+
+
+def _reference_nutrients(table, recipe):
+    """原方式：逐个食材查表累加"""
+    total = np.zeros(len(NUTRIENT_FIELDS))
+    for ingredient in recipe.ingredients:
+        food = table.match(ingredient.name)
+        if food is not None:
+            total += edible_weight(ingredient) * table.per_gram[food]
+    return total
+
+
+class TestRecipeNutrientMatrix(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.table = get_registry().nutrient_table
+
+    def assertMatchesRebuild(self, matrix):
+        rebuilt = RecipeNutrientMatrix(matrix.store, self.table)
+        np.testing.assert_allclose(matrix.nutrients, rebuilt.nutrients)
+        np.testing.assert_allclose(matrix.coverage, rebuilt.coverage)
+        self.assertEqual(len(matrix), len(matrix.store.recipes))
+        expected = [_reference_nutrients(self.table, recipe) for recipe in matrix.store.recipes]
+        np.testing.assert_allclose(matrix.nutrients, np.array(expected).reshape(matrix.nutrients.shape))
+
+    def test_products_match_ingredient_loop(self):
+        for manager in (DetailedRecipeManager(), SimpleRecipeManager()):
+            self.assertMatchesRebuild(RecipeNutrientMatrix(manager.store, self.table))
+
+    def test_menu_and_week_totals(self):
+        matrix = RecipeNutrientMatrix(SimpleRecipeManager().store, self.table)
+        n = len(matrix)
+        days = [[(i % n, 1.0), ((3 * i + 1) % n, 0.5)] for i in range(7)]
+        daily, week = matrix.week_nutrients(days)
+        for d, menu in enumerate(days):
+            expected = sum(portion * matrix.nutrients[row] for row, portion in menu)
+            np.testing.assert_allclose(daily[d], expected)
+        np.testing.assert_allclose(week, daily.sum(axis=0))
+        name = matrix.store.recipes[0].name
+        np.testing.assert_allclose(matrix.menu_nutrients([[name]])[0], matrix.nutrients[0])
+
+    def test_refresh_after_deletion(self):
+        store = DetailedRecipeManager().store
+        matrix = RecipeNutrientMatrix(store, self.table)
+        count = len(store.recipes)
+        cuisine, meal = store.locations[3]
+        self.assertTrue(store.remove(cuisine, meal, store.recipes[3].name))
+
+        self.assertEqual(matrix.refresh(), 1)
+        self.assertEqual(len(matrix), count - 1)
+        self.assertMatchesRebuild(matrix)
+        with self.assertRaises(ValueError):
+            matrix.selection_matrix([[count - 1]])
+
+    def test_queries_sync_after_store_changes(self):
+        manager = SimpleRecipeManager()
+        matrix = RecipeNutrientMatrix(manager.store, self.table)
+        cuisine, meal = manager.store.locations[0]
+        first = manager.store.recipes[0]
+
+        edited = copy.deepcopy(manager.store.recipes[1])
+        edited.ingredients = edited.ingredients + [SimpleIngredient("西兰花碎", 80, "净重")]
+        cuisine_1, meal_1 = manager.store.locations[1]
+        self.assertTrue(manager.update_recipe(cuisine_1, meal_1, edited.name, edited))
+        manager.add_recipe("清淡", "加餐", SimpleRecipe("测试加餐", [SimpleIngredient("新食材苹果", 150, "净重")],
+                                                   80, 0.5, []))
+        self.assertTrue(manager.remove_recipe(cuisine, meal, first.name))
+
+        # 查询时按 revision 自动同步
+        nutrition = matrix.recipe_nutrition("测试加餐")
+        expected = _reference_nutrients(self.table, manager.store.get_by_name("测试加餐"))
+        self.assertEqual(list(nutrition.values()), [round(float(value), 1) for value in expected])
+        self.assertEqual(len(matrix), len(manager.store.recipes))
+        self.assertEqual(matrix.refresh(), 0)
+        self.assertMatchesRebuild(matrix)
+        self.assertIn("新食材苹果", matrix.ingredients)
+
+    def test_registry_candidates_follow_store_revision(self):
+        registry = get_registry()
+        candidates = registry.menu_candidates
+        self.assertIs(registry.menu_candidates, candidates)
+        self.assertEqual(candidates.revision, registry.simple_recipe_manager.store.revision)
+
+
+class TestMealRadarTotals(unittest.TestCase):
+    """整餐雷达图的营养合计与逐个食物累加一致"""
+
+    def test_meal_totals_match_food_loop(self):
+        system = IntegratedNutritionSystemV2()
+        meal = [("糙米", 100), ("鸡胸肉", 100), ("不存在", 30), ("西兰花", 150), ("糙米", 50)]
+        totals = get_registry().nutrient_table.totals(meal)
+        for field in NUTRIENT_FIELDS:
+            expected = sum(getattr(system.get_food_data(name).nutrition, field) * portion / 100
+                           for name, portion in meal if system.get_food_data(name))
+            self.assertAlmostEqual(totals[NUTRIENT_FIELDS.index(field)], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
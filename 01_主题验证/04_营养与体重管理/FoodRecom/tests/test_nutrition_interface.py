@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streamlit 界面缓存相关测试：向量化模拟CGM数据与逐点循环一致、缓存的血糖指标与直接计算一致、
+档案指纹只随档案内容变化 (未安装 streamlit/plotly 时跳过)
+"""
+
+import datetime
+import math
+import os
+import sys
+import unittest
+from dataclasses import replace
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+FOODRECOM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOODRECOM_DIR, "Core_Systems"))
+sys.path.insert(0, FOODRECOM_DIR)
+
+try:
+    import streamlit  # noqa: F401
+    import plotly  # noqa: F401
+    import nutrition_interface
+except ImportError:  # 界面依赖未安装
+    nutrition_interface = None
+
+from glucose_sensitivity_model import GlucoseSensitivityModel
+from integrated_nutrition_system_v2 import PatientProfile
+
+
+def _reference_mock_glucose(timestamps, noise):
+    """原方式：逐个时刻计算餐后升高、夜间下调并限幅取整"""
+    values = []
+    for ts, eps in zip(timestamps, noise):
+        hour, minute = ts.hour, ts.minute
+        if 7 <= hour <= 9:
+            glucose_add = 2.0 * math.exp(-(hour - 8) ** 2 / 2) * (1 + 0.3 * math.sin(minute / 10))
+        elif 12 <= hour <= 14:
+            glucose_add = 2.5 * math.exp(-(hour - 13) ** 2 / 2) * (1 + 0.3 * math.sin(minute / 10))
+        elif 18 <= hour <= 20:
+            glucose_add = 2.2 * math.exp(-(hour - 19) ** 2 / 2) * (1 + 0.3 * math.sin(minute / 10))
+        else:
+            glucose_add = 0
+        base_adjustment = -0.5 if hour <= 6 else 0
+        values.append(round(max(3.0, min(15.0, 6.0 + base_adjustment + glucose_add + eps)), 1))
+    return values
+
+
+@unittest.skipIf(nutrition_interface is None, "streamlit/plotly 未安装")
+class TestNutritionInterface(unittest.TestCase):
+
+    def test_mock_cgm_matches_loop(self):
+        noise = np.random.default_rng(0).normal(0, 0.3, 288)
+        with mock.patch.object(nutrition_interface.np.random, "normal", return_value=noise):
+            data = nutrition_interface.generate_mock_cgm_data()
+
+        midnight = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        expected_times = [midnight + datetime.timedelta(minutes=5 * i) for i in range(288)]
+        self.assertEqual(list(data["timestamp"]), [pd.Timestamp(ts) for ts in expected_times])
+        np.testing.assert_array_equal(data["glucose"].to_numpy(), _reference_mock_glucose(expected_times, noise))
+
+    def test_cached_metrics_match_direct(self):
+        rng = np.random.default_rng(1)
+        glucose = np.round(rng.normal(7.5, 2.5, 500), 1)
+        glucose[rng.random(500) < 0.05] = np.nan
+        cgm_data = pd.DataFrame({"timestamp": pd.date_range("2025-01-01", periods=500, freq="15min"),
+                                 "glucose": glucose})
+        series = cgm_data["glucose"]
+
+        metrics = nutrition_interface.glucose_control_metrics(cgm_data)
+        self.assertAlmostEqual(metrics["tir"], ((series >= 3.9) & (series <= 10.0)).mean() * 100)
+        self.assertAlmostEqual(metrics["tbr"], (series < 3.9).mean() * 100)
+        self.assertAlmostEqual(metrics["tar"], (series > 10.0).mean() * 100)
+        self.assertAlmostEqual(metrics["cv"], series.std() / series.mean() * 100)
+
+        quality = nutrition_interface.cgm_quality_metrics(cgm_data)
+        self.assertEqual(quality["count"], 500)
+        self.assertEqual(quality["duration_days"], 5)
+        self.assertAlmostEqual(quality["completeness"], series.notna().mean() * 100)
+
+        # 同内容的另一份数据命中缓存，结果不变
+        self.assertEqual(nutrition_interface.glucose_control_metrics(cgm_data.copy()), metrics)
+
+    def test_profile_key_tracks_profile_content(self):
+        patient = PatientProfile(name="张三", age=58, gender="男", height=172, weight=80,
+                                 allergies=["花生"], diagnosed_diseases=["2型糖尿病"])
+        key = nutrition_interface.patient_profile_key(patient)
+        self.assertEqual(key, nutrition_interface.patient_profile_key(replace(patient)))
+        self.assertNotEqual(key, nutrition_interface.patient_profile_key(replace(patient, weight=79.5)))
+        self.assertNotEqual(key, nutrition_interface.patient_profile_key(replace(patient, allergies=["虾"])))
+
+    def test_sensitivity_follows_model_summary(self):
+        model = GlucoseSensitivityModel()
+        for excursion in (1.5, 4.0, 4.5, 5.0):
+            sensitivity = nutrition_interface.analyze_patient_glucose_sensitivity(model)
+            summary = model.summary()
+            if summary['sensitivity_level'] == 'insufficient_data':
+                self.assertEqual(sensitivity['confidence'], 0)
+            else:
+                self.assertEqual(sensitivity['level'],
+                                 nutrition_interface.SENSITIVITY_PROFILES[summary['sensitivity_level']][0])
+                self.assertEqual(sensitivity['avg_excursion'], summary['avg_excursion'])
+                self.assertEqual(sensitivity['confidence'], summary['confidence'])
+            model.update({'glucose_excursion': excursion,
+                          'meal_composition': {'gi_total': 55, 'gl_total': 15, 'meal_type': '午餐'}})
+        self.assertEqual(nutrition_interface.analyze_patient_glucose_sensitivity(model)['confidence'], 0.4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+营养数据注册表测试：包内导入时全部属性可用、共享数据与直接构建一致、快照往返一致
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+FOODRECOM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOODRECOM_DIR, "Core_Systems"))
+
+from gi_database_integration_v2 import GIDatabaseSystemV2
+from integrated_nutrition_system_v2 import IntegratedNutritionSystemV2
+from nutrition_registry import NutritionRegistry, get_registry
+
+REGISTRY_PROPERTIES = ("simple_recipe_manager", "detailed_recipe_manager", "weekly_menu_manager",
+                       "menu_candidates", "simple_recipe_nutrients", "chart_renderer")
+
+
+class TestPackageImport(unittest.TestCase):
+    """作为 Core_Systems 包导入 (子进程中运行，避免与平铺导入的模块混用)"""
+
+    def test_every_property_through_package(self):
+        code = (
+            "import sys\n"
+            "import Core_Systems.nutrition_registry as nutrition_registry\n"
+            "registry = nutrition_registry.get_registry()\n"
+            f"for name in {REGISTRY_PROPERTIES!r}:\n"
+            "    assert getattr(registry, name) is getattr(registry, name), name\n"
+            "assert type(registry.simple_recipe_manager).__module__ == 'Core_Systems.simple_recipe_manager'\n"
+            "assert type(registry.menu_candidates).__module__ == 'Core_Systems.menu_optimizer'\n"
+            "flat = {'recipe_store', 'simple_recipe_manager', 'detailed_recipe_manager', 'weekly_menu_manager',\n"
+            "        'menu_optimizer', 'nutrient_matrix', 'gi_database_integration_v2'} & set(sys.modules)\n"
+            "assert not flat, flat\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=FOODRECOM_DIR, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class TestSharedData(unittest.TestCase):
+    """注册表共享的数据与各系统原有的构建方式一致"""
+
+    def test_properties_are_built_once(self):
+        registry = get_registry()
+        self.assertIs(get_registry(), registry)
+        for name in REGISTRY_PROPERTIES:
+            self.assertIs(getattr(registry, name), getattr(registry, name), name)
+        self.assertIs(registry.menu_candidates.store, registry.simple_recipe_manager.store)
+
+    def test_recipe_nutrients_built_with_registry(self):
+        registry = NutritionRegistry.build()
+        matrix = registry._simple_recipe_nutrients
+        self.assertIs(matrix.store, registry._simple_recipe_manager.store)
+        self.assertEqual(matrix._revision, matrix.store.revision)
+        self.assertEqual(matrix.weights.shape[0], len(matrix.store.recipes))
+        self.assertIs(registry.simple_recipe_nutrients, matrix)
+
+    def test_data_matches_direct_build(self):
+        registry = get_registry()
+        self.assertEqual(dict(registry.gi_foods), GIDatabaseSystemV2._initialize_expanded_gi_database())
+        self.assertEqual(dict(registry.integrated_foods), IntegratedNutritionSystemV2._load_integrated_food_data())
+        with self.assertRaises(TypeError):
+            registry.gi_foods["新食物"] = None
+
+    def test_snapshot_round_trip(self):
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            built = NutritionRegistry.build(snapshot_dir)
+            self.assertTrue(os.path.exists(os.path.join(snapshot_dir, "nutrition_registry.pkl")))
+            loaded = NutritionRegistry.build(snapshot_dir)
+        self.assertEqual(dict(loaded.gi_foods), dict(built.gi_foods))
+        self.assertEqual(dict(loaded.integrated_foods), dict(built.integrated_foods))
+
+
+if __name__ == "__main__":
+    unittest.main()
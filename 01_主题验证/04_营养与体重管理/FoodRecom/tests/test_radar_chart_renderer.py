@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+雷达图渲染测试：Agg 模板渲染与原 pyplot 逐图绘制的像素一致 (模板复用、进程池渲染后仍一致)，
+渲染缓存按内容命中、可从缓存目录读回
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import warnings
+from io import BytesIO
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.image as mpimg
+import matplotlib.pyplot as plt
+import numpy as np
+
+FOODRECOM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOODRECOM_DIR, "Core_Systems"))
+
+from integrated_nutrition_system_v2 import IntegratedNutritionSystemV2
+from radar_chart_renderer import RadarChartRenderer, render_spec
+
+DPI = 60
+DRV_VALUES = {
+    '蛋白质': 60, '碳水化合物': 300, '脂肪': 60, '膳食纤维': 30,
+    '维生素C': 100, '钙': 800, '铁': 15, '钾': 2000
+}
+PERCENT_TICKS_150 = ([25, 50, 75, 100, 125, 150], ['25%', '50%', '75%', '100%', '125%', '150%'])
+
+SINGLE = [("鸡胸肉", 100)]
+COMPARISON = [("糙米", 100), ("大米", 100), ("西兰花", 150)]
+MEAL = [("糙米", 100), ("鸡胸肉", 100), ("西兰花", 150), ("胡萝卜", 100)]
+
+
+def _percentages(nutrition, ratio, cap):
+    amounts = [nutrition.protein, nutrition.carbs, nutrition.fat, nutrition.fiber,
+               nutrition.vitamin_c, nutrition.calcium, nutrition.iron, nutrition.potassium]
+    return [min(amount * ratio / drv * 100, cap) for amount, drv in zip(amounts, DRV_VALUES.values())]
+
+
+def _polar_axes(figsize):
+    fig, ax = plt.subplots(figsize=figsize, subplot_kw=dict(projection='polar'))
+    angles = np.linspace(0, 2 * np.pi, len(DRV_VALUES), endpoint=False).tolist()
+    return fig, ax, angles + angles[:1]
+
+
+def _finish_axes(ax, angles, ylim, ticks):
+    """原实现在绘制数据之后设置刻度与范围"""
+    ax.set_xticks(angles[:-1])
+    ax.set_xticklabels(list(DRV_VALUES), fontsize=12)
+    ax.set_ylim(0, ylim)
+    ax.set_yticks(ticks[0])
+    ax.set_yticklabels(ticks[1], fontsize=10)
+    ax.grid(True)
+
+
+def _reference_single(system, food_name, portion_g):
+    """原方式：pyplot 新建单食物雷达图"""
+    food_data = system.get_food_data(food_name)
+    nutrition, ratio = food_data.nutrition, portion_g / 100
+    fig, ax, angles = _polar_axes((10, 10))
+    values = _percentages(nutrition, ratio, 150)
+    values += values[:1]
+    ax.plot(angles, values, 'o-', linewidth=2, label=f'{nutrition.name} ({portion_g}g)')
+    ax.fill(angles, values, alpha=0.25)
+    _finish_axes(ax, angles, 150, PERCENT_TICKS_150)
+    plt.title(f'{nutrition.name} 营养成分雷达图\n(每{portion_g}g，相对于每日推荐值的百分比)',
+              fontsize=16, fontweight='bold', pad=20)
+    plt.figtext(0.02, 0.02, f'热量: {nutrition.calories * ratio:.0f} 千卡/{portion_g}g',
+                fontsize=12, bbox=dict(boxstyle="round,pad=0.3", facecolor="yellow", alpha=0.7))
+    if food_data.gi_data:
+        gi_info = f'GI: {food_data.gi_data.gi_value} ({food_data.gi_data.gi_level.value})'
+        plt.figtext(0.02, 0.08, gi_info, fontsize=12,
+                    bbox=dict(boxstyle="round,pad=0.3", facecolor="lightgreen", alpha=0.7))
+    plt.legend(loc='upper right', bbox_to_anchor=(0.1, 0.1))
+    plt.tight_layout()
+    return fig
+
+
+def _reference_comparison(system, foods_portions):
+    """原方式：pyplot 新建多食物对比雷达图"""
+    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7']
+    fig, ax, angles = _polar_axes((12, 10))
+    for i, (food_name, portion) in enumerate(foods_portions):
+        food_data = system.get_food_data(food_name)
+        nutrition = food_data.nutrition
+        values = _percentages(nutrition, portion / 100, 150)
+        values += values[:1]
+        label = f'{nutrition.name} ({portion}g)'
+        if food_data.gi_data:
+            label += f' GI{food_data.gi_data.gi_value}'
+        ax.plot(angles, values, 'o-', linewidth=2, color=colors[i], label=label)
+        ax.fill(angles, values, alpha=0.1, color=colors[i])
+    _finish_axes(ax, angles, 150, PERCENT_TICKS_150)
+    plt.title('食物营养成分对比雷达图\n(相对于每日推荐值的百分比，含GI信息)',
+              fontsize=16, fontweight='bold', pad=20)
+    plt.legend(loc='upper right', bbox_to_anchor=(1.3, 1.0))
+    plt.tight_layout()
+    return fig
+
+
+def _reference_meal(system, meal_composition):
+    """原方式：pyplot 新建整餐雷达图 (逐食物累加营养素)"""
+    totals = {'protein': 0, 'carbs': 0, 'fat': 0, 'fiber': 0, 'vitamin_c': 0,
+              'calcium': 0, 'iron': 0, 'potassium': 0, 'calories': 0}
+    meal_details, meal_gi_info = [], []
+    for food_name, portion in meal_composition:
+        food_data = system.get_food_data(food_name)
+        nutrition, ratio = food_data.nutrition, portion / 100
+        for field in totals:
+            totals[field] += getattr(nutrition, field) * ratio
+        meal_details.append(f"{nutrition.name} {portion}g")
+        if food_data.gi_data:
+            meal_gi_info.append(f"{food_name}(GI{food_data.gi_data.gi_value})")
+
+    fig, ax, angles = _polar_axes((12, 10))
+    fields = ['protein', 'carbs', 'fat', 'fiber', 'vitamin_c', 'calcium', 'iron', 'potassium']
+    values = [min(totals[field] / drv * 100, 200) for field, drv in zip(fields, DRV_VALUES.values())]
+    values += values[:1]
+    ax.plot(angles, values, 'o-', linewidth=3, color='#FF6B6B')
+    ax.fill(angles, values, alpha=0.3, color='#FF6B6B')
+    ax.plot(angles, [100] * (len(DRV_VALUES) + 1), '--', linewidth=1, color='green', alpha=0.7,
+            label='每日推荐值(100%)')
+    _finish_axes(ax, angles, 200, ([50, 100, 150, 200], ['50%', '100%', '150%', '200%']))
+    plt.title('膳食营养成分雷达图\n(相对于每日推荐值的百分比)', fontsize=16, fontweight='bold', pad=20)
+    meal_info = f"膳食组成: {', '.join(meal_details)}\n总热量: {totals['calories']:.0f} 千卡"
+    if meal_gi_info:
+        meal_info += f"\nGI信息: {', '.join(meal_gi_info)}"
+    plt.figtext(0.02, 0.02, meal_info, fontsize=10,
+                bbox=dict(boxstyle="round,pad=0.5", facecolor="lightblue", alpha=0.7))
+    plt.legend(loc='upper right', bbox_to_anchor=(1.2, 1.0))
+    plt.tight_layout()
+    return fig
+
+
+def _pixels(image):
+    """PNG字节或 pyplot 图形 → 像素数组"""
+    if isinstance(image, bytes):
+        return mpimg.imread(BytesIO(image), format="png")
+    buffer = BytesIO()
+    image.savefig(buffer, format="png", dpi=DPI, bbox_inches='tight')
+    plt.close(image)
+    return mpimg.imread(BytesIO(buffer.getvalue()), format="png")
+
+
+class TestRadarChartRenderer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.system = IntegratedNutritionSystemV2()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            cls.cases = [
+                ("single", SINGLE, _reference_single(cls.system, *SINGLE[0])),
+                ("comparison", COMPARISON, _reference_comparison(cls.system, COMPARISON)),
+                ("meal", MEAL, _reference_meal(cls.system, MEAL)),
+            ]
+            cls.expected = {chart_type: _pixels(fig) for chart_type, _, fig in cls.cases}
+
+    def setUp(self):
+        # 缺少中文字体时 matplotlib 对每个字形告警，与测试内容无关
+        warnings.simplefilter("ignore", UserWarning)
+
+    def test_template_render_matches_pyplot(self):
+        """同一布局模板反复复用 (不同图表交替渲染) 后仍与 pyplot 逐图绘制一致"""
+        for _ in range(2):
+            for chart_type, foods_portions, _ in self.cases:
+                spec = self.system.radar_chart_spec(foods_portions, chart_type)
+                np.testing.assert_array_equal(_pixels(render_spec(spec, "png", DPI)), self.expected[chart_type])
+
+    def test_figure_interface_matches_pyplot(self):
+        for chart_type, foods_portions, _ in self.cases:
+            fig = self.system.create_nutrition_radar_chart(foods_portions, chart_type)
+            np.testing.assert_array_equal(_pixels(fig), self.expected[chart_type])
+
+    def test_process_pool_and_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            renderer = RadarChartRenderer(cache_dir, dpi=DPI)
+            specs = [self.system.radar_chart_spec(foods_portions, chart_type)
+                     for chart_type, foods_portions, _ in self.cases]
+            images = renderer.render_many(specs + specs[:1], workers=2)
+            self.assertEqual(images[0], images[-1])
+            for (chart_type, _, _), image in zip(self.cases, images):
+                np.testing.assert_array_equal(_pixels(image), self.expected[chart_type])
+            self.assertEqual(len(os.listdir(cache_dir)), len(specs))
+
+            # 命中进程内缓存返回同一对象；新渲染器从缓存目录读回相同字节
+            self.assertIs(renderer.render(specs[1]), images[1])
+            self.assertEqual(RadarChartRenderer(cache_dir, dpi=DPI).render_many(specs), images[:len(specs)])
+
+            svg = renderer.render(specs[2], "svg")
+            self.assertTrue(svg.lstrip().startswith(b"<?xml"))
+            with self.assertRaises(ValueError):
+                renderer.render(specs[0], "jpg")
+
+    def test_cache_key_follows_content(self):
+        spec = self.system.radar_chart_spec(MEAL, "meal")
+        same = self.system.radar_chart_spec(list(MEAL), "meal")
+        self.assertEqual(spec.cache_key("png", DPI), same.cache_key("png", DPI))
+        changed = self.system.radar_chart_spec(MEAL[:-1] + [("胡萝卜", 120)], "meal")
+        self.assertNotEqual(spec.cache_key("png", DPI), changed.cache_key("png", DPI))
+        self.assertNotEqual(spec.cache_key("png", DPI), spec.cache_key("svg", DPI))
+        self.assertNotEqual(spec.cache_key("png", DPI), spec.cache_key("png", 300))
+
+
+if __name__ == '__main__':
+    unittest.main()
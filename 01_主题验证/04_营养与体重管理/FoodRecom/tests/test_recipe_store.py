@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+菜谱索引存储测试：索引查询与原逐层遍历结果一致、包内导入、各管理器菜谱库互不影响
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+FOODRECOM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(FOODRECOM_DIR, "Core_Systems"))
+
+from detailed_recipe_manager import DetailedRecipeManager
+from simple_recipe_manager import SimpleRecipeManager
+
+
+def _all_recipes(nested):
+    for meals in nested.values():
+        for recipes in meals.values():
+            yield from recipes
+
+
+def _reference_by_name(nested, recipe_name):
+    """原实现：逐层遍历取第一个同名菜谱"""
+    return next((recipe for recipe in _all_recipes(nested) if recipe.name == recipe_name), None)
+
+
+def _reference_by_ingredient(nested, ingredient_name):
+    """原实现：任一食材名包含关键词的菜谱"""
+    return [recipe for recipe in _all_recipes(nested)
+            if any(ingredient_name in ingredient.name for ingredient in recipe.ingredients)]
+
+
+class TestRecipeStoreLookups(unittest.TestCase):
+    """索引查询与原遍历实现一致"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.detailed = DetailedRecipeManager()
+        cls.simple = SimpleRecipeManager()
+
+    def test_name_lookup_matches_traversal(self):
+        for manager, nested in ((self.detailed, self.detailed.detailed_recipes),
+                                (self.simple, self.simple.recipes)):
+            for recipe in _all_recipes(nested):
+                self.assertIs(manager.get_recipe_by_name(recipe.name), _reference_by_name(nested, recipe.name))
+            self.assertIsNone(manager.get_recipe_by_name("不存在的菜"))
+
+    def test_ingredient_search_matches_traversal(self):
+        nested = self.detailed.detailed_recipes
+        names = {ingredient.name for recipe in _all_recipes(nested) for ingredient in recipe.ingredients}
+        keywords = names | {name[:1] for name in names} | {"", "不存在"}
+        for keyword in keywords:
+            self.assertEqual(self.detailed.search_recipes_by_ingredient(keyword),
+                             _reference_by_ingredient(nested, keyword), keyword)
+
+    def test_disease_lookup_matches_traversal(self):
+        nested = self.detailed.detailed_recipes
+        diseases = {disease for recipe in _all_recipes(nested) for disease in recipe.disease_suitability}
+        for disease in diseases | {"不存在"}:
+            expected = [recipe for recipe in _all_recipes(nested) if disease in recipe.disease_suitability]
+            self.assertEqual(self.detailed.get_recipes_for_disease(disease), expected)
+
+    def test_managers_get_independent_copies(self):
+        first, second = SimpleRecipeManager(), SimpleRecipeManager()
+        self.assertIsNot(first.recipes, second.recipes)
+        self.assertIsNot(first.store.recipes[0], second.store.recipes[0])
+        # 嵌套字典与扁平列表指向同一批菜谱对象
+        self.assertIs(next(_all_recipes(second.recipes)), second.store.recipes[0])
+
+        original_name = first.store.recipes[0].name
+        second.store.recipes[0].name = "已修改"
+        next(iter(second.recipes.values())).clear()
+        self.assertEqual(first.store.recipes[0].name, original_name)
+        self.assertEqual(SimpleRecipeManager().store.recipes[0].name, original_name)
+        self.assertEqual(len(SimpleRecipeManager().recipes), len(first.recipes))
+
+
+class TestPackageImport(unittest.TestCase):
+    """作为 Core_Systems 包导入 (子进程中运行，避免与平铺导入的模块混用)"""
+
+    def test_recipe_managers_import_through_package(self):
+        code = ("import Core_Systems.detailed_recipe_manager as d, Core_Systems.simple_recipe_manager as s\n"
+                "assert d.DetailedRecipeManager().get_recipe_by_name('小米粥配蒸蛋') is not None\n"
+                "assert len(s.SimpleRecipeManager().store) > 0\n")
+        result = subprocess.run([sys.executable, "-c", code], cwd=FOODRECOM_DIR, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,12 +10,19 @@ ECG-Agent2智能脆性分析器 v1.0
 - 智能时间分段 (4种变化点检测算法)
 - 心血管风险分级预警
 - 临床导向治疗建议
+- 多通道并行分析 (信号矩阵共享内存 + 进程池)
 
 作者: AGPAI Team 
 版本: v1.0
 日期: 2025-09-03
 """
 
+import io
+import os
+import time
+import contextlib
+import multiprocessing
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 from scipy import signal, stats
@@ -27,6 +34,42 @@ from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from EDF_Stream_Reader import SharedSignalMatrix
+
+@lru_cache(maxsize=None)
+def _bandpass_coefficients(sampling_rate, low_hz=0.5, high_hz=40.0, order=4):
+    """带通滤波器系数 (按采样率缓存，多通道/多窗口共用)；截止频率超出奈奎斯特频率时返回 None"""
+    nyquist = sampling_rate / 2
+    low_freq = low_hz / nyquist
+    high_freq = high_hz / nyquist
+    if low_freq < 1 and high_freq < 1:
+        return signal.butter(order, [low_freq, high_freq], btype='band')
+    return None
+
+# 工作进程状态: 映射的共享信号矩阵与分析器 (由进程池初始化函数设置)
+_worker_state = {}
+
+def _init_channel_worker(descriptor, sampling_rate, timestamps):
+    """进程池初始化：映射共享信号矩阵，每个工作进程只创建一次分析器"""
+    _worker_state.update(
+        shared=SharedSignalMatrix.attach(descriptor),
+        analyzer=ECGAgent2Analyzer(sampling_rate=sampling_rate),
+        timestamps=timestamps
+    )
+
+def _analyze_channel_task(task):
+    """进程池任务：分析共享矩阵中的一个通道，返回 (行号, 报告, 耗时)；屏蔽逐步输出"""
+    row, patient_id = task
+    shared = _worker_state['shared']
+    timestamps = _worker_state['timestamps']
+    if timestamps is None:
+        timestamps = shared.times(row)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        report = _worker_state['analyzer'].analyze_ecg_intelligence(
+            shared.read_channel(row), timestamps, patient_id=patient_id)
+    return row, report, time.perf_counter() - start
+
 class ECGAgent2Analyzer:
     """ECG智能脆性分析器 - 基于Agent2混沌动力学架构"""
     
@@ -90,16 +133,65 @@ class ECGAgent2Analyzer:
                 "fallback_analysis": "ECG智能分析遇到技术问题，请检查数据格式"
             }
     
+    def analyze_channels_parallel(self, signal_matrix, channel_names=None, timestamps=None,
+                                  patient_id="Unknown", workers=None):
+        """
+        多通道并行智能分析
+        signal_matrix: 二维数组 (通道 × 采样点) 或 SharedSignalMatrix (可直接由 EDFStreamReader 逐块填充)
+        channel_names: 通道名称，默认取 SharedSignalMatrix 的通道名或 ch0, ch1, ...
+        timestamps: 公共时间轴，默认按采样率生成
+        workers: 工作进程数，None 为CPU核数，1 为串行
+        
+        信号矩阵置于共享内存，各工作进程按名称映射后分析不同通道，不序列化传输信号；
+        返回 {通道名: analyze_ecg_intelligence 报告}，通道顺序与输入一致
+        """
+        owns_shared = not isinstance(signal_matrix, SharedSignalMatrix)
+        if owns_shared:
+            matrix = np.atleast_2d(np.asarray(signal_matrix, dtype=float))
+            if channel_names is None:
+                channel_names = [f"ch{i}" for i in range(matrix.shape[0])]
+        else:
+            matrix = signal_matrix.array
+            if channel_names is None:
+                channel_names = signal_matrix.channels
+        channel_names = list(channel_names)
+        if len(channel_names) != matrix.shape[0]:
+            raise ValueError(f"通道名称数 {len(channel_names)} 与信号矩阵通道数 {matrix.shape[0]} 不符")
+        
+        patient_ids = [f"{patient_id}_{name}" for name in channel_names]
+        workers = min(workers or os.cpu_count() or 1, len(channel_names))
+        
+        if workers <= 1:
+            if timestamps is None:
+                timestamps = np.arange(matrix.shape[1]) / self.sampling_rate
+            return {name: self.analyze_ecg_intelligence(matrix[row], timestamps, patient_id=pid)
+                    for row, (name, pid) in enumerate(zip(channel_names, patient_ids))}
+        
+        shared = (SharedSignalMatrix.from_array(matrix, channel_names, [self.sampling_rate] * len(channel_names))
+                  if owns_shared else signal_matrix)
+        print(f"[ECG-Agent2] 并行分析 {len(channel_names)} 个通道 (工作进程: {workers})")
+        reports = {}
+        try:
+            with multiprocessing.Pool(workers, initializer=_init_channel_worker,
+                                      initargs=(shared.descriptor, self.sampling_rate, timestamps)) as pool:
+                tasks = list(enumerate(patient_ids))
+                for row, report, elapsed in pool.imap_unordered(_analyze_channel_task, tasks):
+                    reports[row] = report
+                    print(f"[ECG-Agent2] 通道 {channel_names[row]} 完成 ({elapsed:.2f}s)")
+        finally:
+            if owns_shared:
+                shared.close()
+        
+        return {channel_names[row]: reports[row] for row in range(len(channel_names))}
+    
     def preprocess_ecg_data(self, raw_ecg):
         """ECG数据预处理 - 滤波和基线校正"""
         
         # 带通滤波 (0.5-40Hz) - 去除工频干扰和基线漂移
-        nyquist = self.sampling_rate / 2
-        low_freq = 0.5 / nyquist
-        high_freq = 40 / nyquist
+        coefficients = _bandpass_coefficients(float(self.sampling_rate))
         
-        if low_freq < 1 and high_freq < 1:
-            b, a = signal.butter(4, [low_freq, high_freq], btype='band')
+        if coefficients is not None:
+            b, a = coefficients
             filtered_ecg = signal.filtfilt(b, a, raw_ecg)
         else:
             filtered_ecg = raw_ecg
@@ -2,10 +2,13 @@
 """
 EDF ECG文件分析器 - 基于ECG-Agent2系统
 专门用于分析EDF格式的胎儿心电数据
+EDF文件经 EDF_Stream_Reader 内存映射读取，逐通道/逐块处理，不整体载入内存
+多通道可放入共享内存后按通道并行分析 (-j/--workers)
 """
 
 import sys
 import os
+import argparse
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
@@ -14,29 +17,21 @@ import json
 # 添加ECG-Agent2分析器路径
 sys.path.append('/Users/williamsun/Documents/gplus/docs/HuaShan')
 
-try:
-    import mne  # 用于读取EDF文件
-except ImportError:
-    print("需要安装MNE库: pip install mne")
-    sys.exit(1)
+from EDF_Stream_Reader import EDFStreamReader, SharedSignalMatrix, stream_find_peaks
 
 def read_edf_file(edf_path):
     """
-    读取EDF文件并提取ECG数据
+    读取EDF文件头并映射数据区
+    信号数据按需通过 reader 逐通道或逐块读取
     """
     try:
         print(f"正在读取EDF文件: {edf_path}")
         
-        # 使用MNE读取EDF文件
-        raw = mne.io.read_raw_edf(edf_path, preload=True, verbose=False)
+        # 解析文件头，数据区内存映射
+        reader = EDFStreamReader(edf_path)
         
         # 获取基本信息
-        info = {
-            'sampling_rate': raw.info['sfreq'],
-            'channels': raw.ch_names,
-            'duration': raw.times[-1],
-            'n_samples': len(raw.times)
-        }
+        info = reader.info()
         
         print(f"采样频率: {info['sampling_rate']} Hz")
         print(f"通道数: {len(info['channels'])}")
@@ -44,24 +39,27 @@ def read_edf_file(edf_path):
         print(f"记录时长: {info['duration']:.2f} 秒")
         print(f"数据点数: {info['n_samples']}")
         
-        # 提取ECG数据
-        ecg_data = raw.get_data()
-        timestamps = raw.times
-        
         return {
-            'data': ecg_data,
-            'timestamps': timestamps,
-            'info': info,
-            'raw': raw
+            'reader': reader,
+            'info': info
         }
         
     except Exception as e:
         print(f"读取EDF文件失败: {e}")
         return None
 
-def analyze_fetal_ecg(edf_data):
+def print_brittleness_summary(result):
+    """打印ECG-Agent2报告中的关键脆性结果"""
+    if 'ECG脆性评估' in result:
+        brittleness = result['ECG脆性评估']
+        print(f"脆性分型: {brittleness.get('脆性分型', 'N/A')}")
+        print(f"脆性评分: {brittleness.get('脆性评分', 'N/A')}")
+        print(f"心血管风险: {brittleness.get('心血管风险评估', 'N/A')}")
+
+def analyze_fetal_ecg(edf_data, workers=1):
     """
     使用ECG-Agent2系统分析胎儿心电数据
+    workers > 1 时有效通道逐块填入共享内存，由进程池按通道并行分析
     """
     try:
         # 导入ECG-Agent2分析器
@@ -75,17 +73,45 @@ def analyze_fetal_ecg(edf_data):
         # 对每个通道进行分析
         analysis_results = {}
         
+        reader = edf_data['reader']
+        
+        if workers != 1:
+            # 数据质量检查 (逐块累积统计)
+            valid_channels = []
+            for i, channel_name in enumerate(edf_data['info']['channels']):
+                if reader.channel_stats(i).std < 1e-6:
+                    print(f"通道 {channel_name} 数据变化太小，跳过分析")
+                else:
+                    valid_channels.append(channel_name)
+            
+            try:
+                shared = SharedSignalMatrix.from_reader(reader, valid_channels)
+            except ValueError as e:
+                print(f"⚠️ {e}，改为串行分析")
+                return analyze_fetal_ecg(edf_data, workers=1)
+            
+            try:
+                analysis_results = analyzer.analyze_channels_parallel(
+                    shared, patient_id="r01_fetal", workers=workers)
+            finally:
+                shared.close()
+            
+            for channel_name, result in analysis_results.items():
+                print(f"\n=== 通道: {channel_name} ===")
+                print_brittleness_summary(result)
+            return analysis_results
+        
         for i, channel_name in enumerate(edf_data['info']['channels']):
             print(f"\n=== 分析通道: {channel_name} ===")
             
-            # 获取单通道数据
-            channel_data = edf_data['data'][i, :]
-            timestamps = edf_data['timestamps']
-            
-            # 数据质量检查
-            if np.std(channel_data) < 1e-6:
+            # 数据质量检查 (逐块累积统计，不载入整个通道)
+            if reader.channel_stats(i).std < 1e-6:
                 print(f"通道 {channel_name} 数据变化太小，跳过分析")
                 continue
+            
+            # 获取单通道数据 (ECG-Agent2 需要完整通道，同一时刻只载入一个通道)
+            channel_data = reader.read_channel(i)
+            timestamps = reader.times(i)
                 
             if np.any(np.isnan(channel_data)) or np.any(np.isinf(channel_data)):
                 print(f"通道 {channel_name} 包含无效数据，进行清理")
@@ -102,11 +128,7 @@ def analyze_fetal_ecg(edf_data):
                 analysis_results[channel_name] = result
                 
                 # 打印关键结果
-                if 'ECG脆性评估' in result:
-                    brittleness = result['ECG脆性评估']
-                    print(f"脆性分型: {brittleness.get('脆性分型', 'N/A')}")
-                    print(f"脆性评分: {brittleness.get('脆性评分', 'N/A')}")
-                    print(f"心血管风险: {brittleness.get('心血管风险评估', 'N/A')}")
+                print_brittleness_summary(result)
                 
             except Exception as e:
                 print(f"通道 {channel_name} 分析失败: {e}")
@@ -121,34 +143,24 @@ def analyze_fetal_ecg(edf_data):
 def analyze_basic_ecg(edf_data):
     """
     基础ECG分析（当ECG-Agent2不可用时）
+    统计量与R峰检测均分块进行，结果与整段读入计算一致
     """
     results = {}
+    reader = edf_data['reader']
     
     for i, channel_name in enumerate(edf_data['info']['channels']):
-        channel_data = edf_data['data'][i, :]
-        
-        # 基础统计分析
-        basic_stats = {
-            'mean': float(np.mean(channel_data)),
-            'std': float(np.std(channel_data)),
-            'min': float(np.min(channel_data)),
-            'max': float(np.max(channel_data)),
-            'range': float(np.ptp(channel_data)),
-            'rms': float(np.sqrt(np.mean(channel_data**2)))
-        }
+        # 基础统计分析 (逐块累积)
+        basic_stats = reader.channel_stats(i).to_dict()
+        sampling_rate = reader.channel_sampling_rate(i)
         
         # 估算心率（简单峰值检测）
-        try:
-            from scipy.signal import find_peaks
-            
-            # 标准化数据
-            normalized_data = (channel_data - np.mean(channel_data)) / np.std(channel_data)
-            
-            # 寻找R波峰值
-            peaks, _ = find_peaks(normalized_data, height=1.5, distance=int(0.4 * edf_data['info']['sampling_rate']))
+        if basic_stats['std'] > 0:
+            # 以整条记录的均值/标准差标准化，分块寻找R波峰值
+            peaks = stream_find_peaks(reader, i, height=1.5, distance=int(0.4 * sampling_rate),
+                                      center=basic_stats['mean'], scale=basic_stats['std'])
             
             if len(peaks) > 1:
-                rr_intervals = np.diff(peaks) / edf_data['info']['sampling_rate']
+                rr_intervals = np.diff(peaks) / sampling_rate
                 heart_rate = 60.0 / np.mean(rr_intervals)
                 heart_rate_var = np.std(rr_intervals) * 1000  # ms
                 
@@ -157,9 +169,6 @@ def analyze_basic_ecg(edf_data):
                     'heart_rate_variability': float(heart_rate_var),
                     'detected_beats': len(peaks)
                 })
-            
-        except ImportError:
-            print("SciPy未安装，跳过心率分析")
         
         results[channel_name] = {
             'basic_statistics': basic_stats,
@@ -223,11 +232,11 @@ def generate_summary_report(results, edf_info):
     
     print("\n" + "="*60)
 
-def main():
+def main(edf_file=None, workers=1):
     """
     主函数
     """
-    edf_file = "/Users/williamsun/Documents/gplus/docs/ECG/abdominal-and-direct-fetal-ecg-database-1.0.0/r01.edf"
+    edf_file = edf_file or "/Users/williamsun/Documents/gplus/docs/ECG/abdominal-and-direct-fetal-ecg-database-1.0.0/r01.edf"
     
     if not os.path.exists(edf_file):
         print(f"EDF文件不存在: {edf_file}")
@@ -243,7 +252,7 @@ def main():
     
     # 执行ECG分析
     print(f"\n开始ECG智能分析...")
-    analysis_results = analyze_fetal_ecg(edf_data)
+    analysis_results = analyze_fetal_ecg(edf_data, workers)
     
     # 生成报告
     generate_summary_report(analysis_results, edf_data['info'])
@@ -262,4 +271,9 @@ def main():
     }, output_file)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='胎儿ECG数据 ECG-Agent2 智能分析')
+    parser.add_argument('edf_file', nargs='?', default=None, help='EDF文件路径')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='并行工作进程数 (0 为CPU核数，默认1为串行)')
+    args = parser.parse_args()
+    main(args.edf_file, args.workers or None)
\ No newline at end of file
@@ -2,19 +2,26 @@
 """
 快速EDF ECG分析器 - 优化版本
 专注于核心脆性指标的快速计算
+EDF文件经 EDF_Stream_Reader 分块读取，信号统计与心率分析覆盖整条记录
+多通道可放入共享内存后由进程池按通道并行分析 (-j/--workers)
 """
 
 import sys
 import os
+import io
+import time
+import argparse
+import contextlib
+import multiprocessing
 import numpy as np
 from datetime import datetime
 import json
 
 try:
-    import mne
     from scipy.signal import find_peaks
+    from EDF_Stream_Reader import EDFStreamReader, SharedSignalMatrix, stream_find_peaks
 except ImportError:
-    print("需要安装依赖: pip install mne scipy")
+    print("需要安装依赖: pip install scipy")
     sys.exit(1)
 
 class FastECGAnalyzer:
@@ -77,38 +84,63 @@ class FastECGAnalyzer:
             min_distance = int(0.3 * effective_sr)  # 200 bpm最大
             peaks, _ = find_peaks(ecg_normalized, height=0.5, distance=min_distance)
             
-            if len(peaks) < 3:
-                return self._empty_hr_result()
-            
-            # RR间期计算
-            rr_intervals = np.diff(peaks) / effective_sr * 1000  # ms
-            
-            # 简单异常值过滤
-            rr_mean = np.median(rr_intervals)
-            valid_rr = rr_intervals[(rr_intervals > 0.5 * rr_mean) & 
-                                   (rr_intervals < 2.0 * rr_mean)]
+            return self._heart_rate_from_peaks(peaks, effective_sr)
             
-            if len(valid_rr) < 2:
+        except Exception as e:
+            print(f"    心率计算错误: {e}")
+            return self._empty_hr_result()
+    
+    def calculate_heart_rate_stream(self, reader, channel, signal_stats, block_seconds=60.0):
+        """全分辨率分块心率计算，不降采样，标准化参数取自整条记录的统计量"""
+        
+        sampling_rate = reader.channel_sampling_rate(channel)
+        
+        try:
+            if signal_stats['std'] < 1e-10:
                 return self._empty_hr_result()
             
-            # 统计计算
-            rr_mean = np.mean(valid_rr)
-            rr_std = np.std(valid_rr)
-            mean_hr = 60000.0 / rr_mean
-            hr_cv = (rr_std / rr_mean) * 100
+            min_distance = int(0.3 * sampling_rate)  # 200 bpm最大
+            peaks = stream_find_peaks(reader, channel, height=0.5, distance=min_distance,
+                                      center=signal_stats['mean'], scale=signal_stats['std'],
+                                      block_seconds=block_seconds)
             
-            return {
-                'mean_hr': float(mean_hr),
-                'hr_cv': float(hr_cv),
-                'rr_mean': float(rr_mean),
-                'rr_std': float(rr_std),
-                'detected_beats': len(peaks)
-            }
+            return self._heart_rate_from_peaks(peaks, sampling_rate)
             
         except Exception as e:
             print(f"    心率计算错误: {e}")
             return self._empty_hr_result()
     
+    def _heart_rate_from_peaks(self, peaks, sampling_rate):
+        """由R峰位置计算心率统计"""
+        
+        if len(peaks) < 3:
+            return self._empty_hr_result()
+        
+        # RR间期计算
+        rr_intervals = np.diff(peaks) / sampling_rate * 1000  # ms
+        
+        # 简单异常值过滤
+        rr_mean = np.median(rr_intervals)
+        valid_rr = rr_intervals[(rr_intervals > 0.5 * rr_mean) & 
+                               (rr_intervals < 2.0 * rr_mean)]
+        
+        if len(valid_rr) < 2:
+            return self._empty_hr_result()
+        
+        # 统计计算
+        rr_mean = np.mean(valid_rr)
+        rr_std = np.std(valid_rr)
+        mean_hr = 60000.0 / rr_mean
+        hr_cv = (rr_std / rr_mean) * 100
+        
+        return {
+            'mean_hr': float(mean_hr),
+            'hr_cv': float(hr_cv),
+            'rr_mean': float(rr_mean),
+            'rr_std': float(rr_std),
+            'detected_beats': len(peaks)
+        }
+    
     def _empty_hr_result(self):
         """空心率结果"""
         return {
@@ -196,6 +228,40 @@ class FastECGAnalyzer:
             'range': float(np.ptp(ecg_data))
         }
         
+        return self._analyze_channel(
+            channel_name, signal_stats,
+            lambda: self.calculate_simple_chaos_indicators(ecg_data),
+            lambda: self.calculate_heart_rate_fast(ecg_data)
+        )
+    
+    def analyze_channel_stream(self, reader, channel, channel_name, block_seconds=60.0,
+                               chaos_max_samples=10000):
+        """
+        分块通道分析，内存占用与记录时长无关
+        - 信号统计: 逐块累积
+        - 混沌指标: 全程等间隔抽样 (与 calculate_simple_chaos_indicators 的降采样相同)
+        - 心率: 全分辨率分块R峰检测
+        """
+        
+        print(f"  - 分块统计...")
+        
+        running = reader.channel_stats(channel, block_seconds)
+        signal_stats = {
+            'mean': float(running.mean),
+            'std': running.std,
+            'range': float(running.max - running.min)
+        }
+        
+        return self._analyze_channel(
+            channel_name, signal_stats,
+            lambda: self.calculate_simple_chaos_indicators(
+                reader.read_decimated(channel, chaos_max_samples, block_seconds)[0], chaos_max_samples),
+            lambda: self.calculate_heart_rate_stream(reader, channel, signal_stats, block_seconds)
+        )
+    
+    def _analyze_channel(self, channel_name, signal_stats, compute_chaos, compute_hr):
+        """质量检查后依次计算混沌指标、心率与脆性分型"""
+        
         # 信号质量检查
         if signal_stats['std'] < 1e-6:
             return {
@@ -206,10 +272,10 @@ class FastECGAnalyzer:
             }
         
         print(f"  - 计算混沌指标...")
-        chaos_indicators = self.calculate_simple_chaos_indicators(ecg_data)
+        chaos_indicators = compute_chaos()
         
         print(f"  - 心率分析...")
-        hr_stats = self.calculate_heart_rate_fast(ecg_data)
+        hr_stats = compute_hr()
         
         print(f"  - 脆性分型...")
         brittleness = self.classify_fast_brittleness(chaos_indicators, hr_stats)
@@ -223,44 +289,92 @@ class FastECGAnalyzer:
             "信号统计": signal_stats
         }
 
-def main():
+# 工作进程状态: 映射的共享信号矩阵与分析器 (由进程池初始化函数设置)
+_worker_state = {}
+
+def _init_channel_worker(descriptor, block_seconds):
+    """进程池初始化：映射共享信号矩阵，每个工作进程只创建一次分析器"""
+    shared = SharedSignalMatrix.attach(descriptor)
+    _worker_state.update(
+        shared=shared,
+        analyzer=FastECGAnalyzer(sampling_rate=shared.sampling_rate),
+        block_seconds=block_seconds
+    )
+
+def _analyze_channel_task(row):
+    """进程池任务：分析共享矩阵中的一个通道，返回 (行号, 结果, 耗时)；屏蔽逐步输出"""
+    shared = _worker_state['shared']
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = _worker_state['analyzer'].analyze_channel_stream(
+            shared, row, shared.channels[row], _worker_state['block_seconds'])
+    return row, result, time.perf_counter() - start
+
+def analyze_channels_parallel(reader, workers=1, block_seconds=60.0):
+    """
+    通道并行分析
+    信号矩阵逐块填入共享内存后，各工作进程按名称映射同一块内存并分析不同通道；
+    返回 {通道名: 结果}，格式与通道顺序均与串行逐通道分析相同
+    workers: 工作进程数，None 为CPU核数，1 为串行 (直接分块读取文件，不建共享矩阵)
+    """
+    channels = list(reader.channels)
+    workers = min(workers or os.cpu_count() or 1, len(channels))
+    
+    shared = None
+    if workers > 1:
+        try:
+            shared = SharedSignalMatrix.from_reader(reader, block_seconds=block_seconds)
+        except ValueError as e:
+            print(f"⚠️ {e}，改为串行分析")
+    
+    if shared is None:
+        analyzer = FastECGAnalyzer(sampling_rate=reader.sampling_rate)
+        results = {}
+        for i, channel_name in enumerate(channels):
+            print(f"\n=== 分析通道 {i+1}/{len(channels)}: {channel_name} ===")
+            results[channel_name] = analyzer.analyze_channel_stream(reader, i, channel_name, block_seconds)
+        return results
+    
+    print(f"🚀 并行分析 {len(channels)} 个通道 (工作进程: {workers})")
+    start = time.perf_counter()
+    results_by_row = {}
+    try:
+        with multiprocessing.Pool(workers, initializer=_init_channel_worker,
+                                  initargs=(shared.descriptor, block_seconds)) as pool:
+            for row, result, elapsed in pool.imap_unordered(_analyze_channel_task, range(len(channels))):
+                results_by_row[row] = result
+                print(f"  ✅ {channels[row]} 完成 ({elapsed:.2f}s)")
+    finally:
+        shared.close()
+    print(f"⏱️ 并行分析耗时 {time.perf_counter() - start:.2f}s")
+    
+    return {channels[row]: results_by_row[row] for row in range(len(channels))}
+
+def main(edf_file=None, workers=1):
     """主函数"""
     
-    edf_file = "/Users/williamsun/Documents/gplus/docs/ECG/abdominal-and-direct-fetal-ecg-database-1.0.0/r01.edf"
+    edf_file = edf_file or "/Users/williamsun/Documents/gplus/docs/ECG/abdominal-and-direct-fetal-ecg-database-1.0.0/r01.edf"
     
     print("快速胎儿ECG脆性分析")
     print("优化算法，专注核心指标\n")
     
     try:
-        # 读取EDF文件
+        # 读取EDF文件头 (数据区内存映射，分块读取)
         print("读取EDF数据...")
-        raw = mne.io.read_raw_edf(edf_file, preload=True, verbose=False)
+        reader = EDFStreamReader(edf_file)
         
-        info = {
-            'sampling_rate': raw.info['sfreq'],
-            'channels': raw.ch_names,
-            'duration': raw.times[-1]
-        }
+        info = reader.info()
         
         print(f"文件信息:")
         print(f"  采样率: {info['sampling_rate']} Hz")
         print(f"  通道: {info['channels']}")
         print(f"  时长: {info['duration']:.1f} 秒")
         
-        # 创建分析器
-        analyzer = FastECGAnalyzer(sampling_rate=info['sampling_rate'])
+        # 分析每个通道 (workers > 1 时按通道并行)
+        results = analyze_channels_parallel(reader, workers)
         
-        # 获取数据
-        ecg_data = raw.get_data()
-        results = {}
-        
-        # 分析每个通道
-        for i, channel_name in enumerate(info['channels']):
-            print(f"\n=== 分析通道 {i+1}/{len(info['channels'])}: {channel_name} ===")
-            
-            channel_data = ecg_data[i, :]
-            result = analyzer.analyze_channel_fast(channel_data, channel_name)
-            results[channel_name] = result
+        for channel_name, result in results.items():
+            print(f"\n=== 通道 {channel_name} ===")
             
             # 显示结果
             if result['状态'] == '分析完成':
@@ -320,4 +434,9 @@ def main():
         print(f"分析过程出错: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='快速胎儿ECG脆性分析')
+    parser.add_argument('edf_file', nargs='?', default=None, help='EDF文件路径')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='并行工作进程数 (0 为CPU核数，默认1为串行)')
+    args = parser.parse_args()
+    main(args.edf_file, args.workers or None)
\ No newline at end of file
@@ -2,6 +2,7 @@
 """
 简化版EDF ECG文件分析器 - 专注于混沌动力学和脆性分析
 绕过复杂的分段分析，直接进行脆性评估
+EDF文件经 EDF_Stream_Reader 分块读取，心率统计及混沌指标覆盖整条记录 (全分辨率)，结果与整段读入一致
 """
 
 import sys
@@ -12,19 +13,19 @@ from datetime import datetime
 import json
 
 try:
-    import mne
     from scipy.signal import find_peaks
     from scipy import stats
+    from EDF_Stream_Reader import EDFStreamReader, RunningRegression, stream_find_peaks
 except ImportError:
-    print("需要安装依赖: pip install mne scipy")
+    print("需要安装依赖: pip install scipy")
     sys.exit(1)
 
 class SimplifiedECGAnalyzer:
     def __init__(self, sampling_rate=1000.0):
         self.sampling_rate = sampling_rate
     
-    def calculate_lyapunov_exponent(self, data, m=3, delay=1):
-        """计算Lyapunov指数"""
+    def calculate_lyapunov_exponent(self, data, m=3, delay=1, sampling_rate=None):
+        """计算Lyapunov指数 (sampling_rate 为 data 的实际采样率，默认取分析器采样率)"""
         try:
             N = len(data)
             if N < 100:
@@ -53,7 +54,7 @@ class SimplifiedECGAnalyzer:
                 # 线性拟合斜率作为Lyapunov指数估计
                 x = np.arange(len(diffs))
                 slope, _, _, _, _ = stats.linregress(x, diffs)
-                return max(0, slope * self.sampling_rate)
+                return max(0, slope * (sampling_rate or self.sampling_rate))
             
             return 0.0
             
@@ -91,6 +92,99 @@ class SimplifiedECGAnalyzer:
         except Exception:
             return 0.0
     
+    def calculate_lyapunov_exponent_stream(self, reader, channel, m=3, delay=1, sampling_rate=None,
+                                           block_samples=65536):
+        """
+        分块计算整条通道的Lyapunov指数，结果与整段读入后 calculate_lyapunov_exponent 相同
+        每个相空间向量只与其后第10~49个向量比较，块间只需多读该邻域；
+        各向量的最近邻距离向量化求出，对数距离的线性回归跨块累积
+        """
+        try:
+            N = reader.n_samples(channel)
+            if N < 100:
+                return 0.0
+            
+            n_vectors = N - m * delay
+            lookahead = 49 + (m - 1) * delay
+            regression = RunningRegression()
+            for start in range(0, n_vectors, block_samples):
+                count = min(block_samples, n_vectors - start)
+                x = reader.read_samples(channel, start, start + count + lookahead)
+                # 相空间坐标: embedded[c][t] = x[t + c * delay]
+                length = len(x) - (m - 1) * delay
+                embedded = [x[c * delay:c * delay + length] for c in range(m)]
+                
+                min_dist = np.full(count, np.inf)
+                for k in range(10, 50):
+                    # 近邻 j = i + k 需满足 j < N - m * delay
+                    valid = min(count, n_vectors - start - k)
+                    if valid <= 0:
+                        break
+                    dist = np.sqrt(sum((e[:valid] - e[k:k + valid]) ** 2 for e in embedded))
+                    closer = (dist > 0) & (dist < min_dist[:valid])
+                    min_dist[:valid][closer] = dist[closer]
+                
+                log_dist = np.log(min_dist[np.isfinite(min_dist)])
+                regression.update(np.arange(regression.count, regression.count + len(log_dist)), log_dist)
+            
+            if regression.count > 1:
+                return max(0, regression.slope * (sampling_rate or self.sampling_rate))
+            
+            return 0.0
+            
+        except Exception:
+            return 0.0
+    
+    def calculate_approximate_entropy_stream(self, reader, channel, r, m=2, block_samples=1024):
+        """
+        整条通道全分辨率的近似熵，结果与整段读入后 calculate_approximate_entropy 相同
+        模板两两比较本身为 O(N²)：按模板块两两计数 (匹配关系对称，只计算上三角块)，
+        每次只读入两个模板块，另需每个采样点两个计数
+        r: 相似容限 (整段计算时为 0.2 × 全程标准差)
+        """
+        try:
+            N = reader.n_samples(channel)
+            if N < 20:
+                return 0.0
+            
+            n_templates = N - m + 1   # m 维模板数；m+1 维模板数为 N - m
+            
+            def templates(start, stop):
+                """[start, stop) 起点的 m+1 维模板，超出记录的末位为 NaN (不与任何模板匹配)"""
+                x = reader.read_samples(channel, start, stop + m)
+                x = np.concatenate([x, np.full(stop - start + m - len(x), np.nan)])
+                return np.lib.stride_tricks.sliding_window_view(x, m + 1)
+            
+            counts_m = np.zeros(n_templates, dtype=np.int64)
+            counts_m1 = np.zeros(n_templates, dtype=np.int64)
+            starts = range(0, n_templates, block_samples)
+            for a in starts:
+                b = min(a + block_samples, n_templates)
+                ti = templates(a, b)
+                for c in starts[a // block_samples:]:
+                    d = min(c + block_samples, n_templates)
+                    tj = ti if c == a else templates(c, d)
+                    dist = np.abs(ti[:, np.newaxis, 0] - tj[np.newaxis, :, 0])
+                    for k in range(1, m):
+                        np.maximum(dist, np.abs(ti[:, np.newaxis, k] - tj[np.newaxis, :, k]), out=dist)
+                    match = dist <= r
+                    counts_m[a:b] += match.sum(axis=1)
+                    np.maximum(dist, np.abs(ti[:, np.newaxis, m] - tj[np.newaxis, :, m]), out=dist)
+                    match_m1 = dist <= r
+                    counts_m1[a:b] += match_m1.sum(axis=1)
+                    if c != a:
+                        counts_m[c:d] += match.sum(axis=0)
+                        counts_m1[c:d] += match_m1.sum(axis=0)
+            
+            def _phi(counts, n):
+                C = counts[:n] / float(n)
+                return np.log(C[C > 0]).sum() / n
+            
+            return _phi(counts_m, n_templates) - _phi(counts_m1, n_templates - 1)
+            
+        except Exception:
+            return 0.0
+    
     def calculate_heart_rate_statistics(self, ecg_data):
         """计算心率统计信息"""
         try:
@@ -101,46 +195,27 @@ class SimplifiedECGAnalyzer:
             # 寻找峰值
             peaks, _ = find_peaks(normalized, height=1.0, distance=int(0.4 * self.sampling_rate))
             
-            if len(peaks) < 2:
-                return {
-                    'mean_hr': 0,
-                    'hr_cv': 0,
-                    'rr_mean': 0,
-                    'rr_std': 0,
-                    'detected_beats': 0
-                }
-            
-            # 计算RR间期
-            rr_intervals = np.diff(peaks) / self.sampling_rate * 1000  # ms
-            
-            # 过滤异常值
-            rr_mean = np.mean(rr_intervals)
-            rr_intervals = rr_intervals[(rr_intervals > 0.3 * rr_mean) & 
-                                      (rr_intervals < 3.0 * rr_mean)]
-            
-            if len(rr_intervals) < 2:
-                return {
-                    'mean_hr': 0,
-                    'hr_cv': 0,
-                    'rr_mean': 0,
-                    'rr_std': 0,
-                    'detected_beats': 0
-                }
-            
-            # 心率统计
-            rr_mean = np.mean(rr_intervals)
-            rr_std = np.std(rr_intervals)
-            mean_hr = 60000.0 / rr_mean  # bpm
-            hr_cv = (rr_std / rr_mean) * 100  # %
+            return self._heart_rate_from_peaks(peaks, self.sampling_rate)
             
+        except Exception as e:
+            print(f"心率计算错误: {e}")
             return {
-                'mean_hr': float(mean_hr),
-                'hr_cv': float(hr_cv),
-                'rr_mean': float(rr_mean),
-                'rr_std': float(rr_std),
-                'detected_beats': len(peaks),
-                'rr_intervals': rr_intervals.tolist()
+                'mean_hr': 0,
+                'hr_cv': 0,
+                'rr_mean': 0,
+                'rr_std': 0,
+                'detected_beats': 0
             }
+    
+    def calculate_heart_rate_statistics_stream(self, reader, channel, signal_stats, block_seconds=60.0):
+        """分块计算整条记录的心率统计，结果与整段读入后 calculate_heart_rate_statistics 相同"""
+        try:
+            sampling_rate = reader.channel_sampling_rate(channel)
+            peaks = stream_find_peaks(reader, channel, height=1.0, distance=int(0.4 * sampling_rate),
+                                      center=signal_stats['mean'], scale=signal_stats['std'],
+                                      block_seconds=block_seconds)
+            
+            return self._heart_rate_from_peaks(peaks, sampling_rate)
             
         except Exception as e:
             print(f"心率计算错误: {e}")
@@ -152,6 +227,49 @@ class SimplifiedECGAnalyzer:
                 'detected_beats': 0
             }
     
+    def _heart_rate_from_peaks(self, peaks, sampling_rate):
+        """由R峰位置计算心率统计"""
+        if len(peaks) < 2:
+            return {
+                'mean_hr': 0,
+                'hr_cv': 0,
+                'rr_mean': 0,
+                'rr_std': 0,
+                'detected_beats': 0
+            }
+        
+        # 计算RR间期
+        rr_intervals = np.diff(peaks) / sampling_rate * 1000  # ms
+        
+        # 过滤异常值
+        rr_mean = np.mean(rr_intervals)
+        rr_intervals = rr_intervals[(rr_intervals > 0.3 * rr_mean) & 
+                                  (rr_intervals < 3.0 * rr_mean)]
+        
+        if len(rr_intervals) < 2:
+            return {
+                'mean_hr': 0,
+                'hr_cv': 0,
+                'rr_mean': 0,
+                'rr_std': 0,
+                'detected_beats': 0
+            }
+        
+        # 心率统计
+        rr_mean = np.mean(rr_intervals)
+        rr_std = np.std(rr_intervals)
+        mean_hr = 60000.0 / rr_mean  # bpm
+        hr_cv = (rr_std / rr_mean) * 100  # %
+        
+        return {
+            'mean_hr': float(mean_hr),
+            'hr_cv': float(hr_cv),
+            'rr_mean': float(rr_mean),
+            'rr_std': float(rr_std),
+            'detected_beats': len(peaks),
+            'rr_intervals': rr_intervals.tolist()
+        }
+    
     def classify_brittleness(self, chaos_indicators, hr_stats):
         """ECG脆性分型"""
         
@@ -246,6 +364,43 @@ class SimplifiedECGAnalyzer:
         # 心率统计
         hr_stats = self.calculate_heart_rate_statistics(ecg_data)
         
+        return self._build_channel_result(channel_name, chaos_indicators, hr_stats)
+    
+    def analyze_ecg_channel_stream(self, reader, channel, channel_name, signal_stats,
+                                   block_seconds=60.0, chaos_max_samples=None):
+        """
+        分块分析单个ECG通道，信号本身不整段读入内存
+        Lyapunov指数与近似熵默认使用全分辨率数据 (与整段读入计算一致)；近似熵为 O(N²)，
+        长记录可指定 chaos_max_samples，改用全程等间隔抽样的至多约该点数计算 (显式选择，会丢弃数据)；
+        心率统计使用全分辨率分块R峰检测
+        """
+        
+        print(f"  - 计算混沌动力学指标...")
+        
+        if chaos_max_samples:
+            sampled, step = reader.read_decimated(channel, chaos_max_samples, block_seconds)
+            sampled_rate = reader.channel_sampling_rate(channel) / step
+            chaos_indicators = {
+                'lyapunov_exponent': self.calculate_lyapunov_exponent(sampled, sampling_rate=sampled_rate),
+                'approximate_entropy': self.calculate_approximate_entropy(sampled)
+            }
+        else:
+            chaos_indicators = {
+                'lyapunov_exponent': self.calculate_lyapunov_exponent_stream(
+                    reader, channel, sampling_rate=reader.channel_sampling_rate(channel)),
+                'approximate_entropy': self.calculate_approximate_entropy_stream(
+                    reader, channel, r=0.2 * signal_stats['std'])
+            }
+        
+        print(f"  - 计算心率统计...")
+        
+        hr_stats = self.calculate_heart_rate_statistics_stream(reader, channel, signal_stats, block_seconds)
+        
+        return self._build_channel_result(channel_name, chaos_indicators, hr_stats)
+    
+    def _build_channel_result(self, channel_name, chaos_indicators, hr_stats):
+        """脆性分型并组装通道结果"""
+        
         print(f"  - 进行脆性分型...")
         
         # 脆性分型
@@ -267,16 +422,11 @@ def main():
     print("开始简化版胎儿ECG分析...")
     print("专注于混沌动力学和脆性评估")
     
-    # 读取EDF文件
+    # 读取EDF文件头 (数据区内存映射，分块读取)
     print(f"\n读取EDF文件: {edf_file}")
-    raw = mne.io.read_raw_edf(edf_file, preload=True, verbose=False)
+    reader = EDFStreamReader(edf_file)
     
-    info = {
-        'sampling_rate': raw.info['sfreq'],
-        'channels': raw.ch_names,
-        'duration': raw.times[-1],
-        'n_samples': len(raw.times)
-    }
+    info = reader.info()
     
     print(f"采样频率: {info['sampling_rate']} Hz")
     print(f"通道数: {len(info['channels'])}")
@@ -289,21 +439,18 @@ def main():
     results = {}
     
     # 分析每个通道
-    ecg_data = raw.get_data()
-    
     for i, channel_name in enumerate(info['channels']):
         print(f"\n=== 分析通道: {channel_name} ===")
         
-        channel_data = ecg_data[i, :]
-        
-        # 数据质量检查
-        if np.std(channel_data) < 1e-6:
+        # 数据质量检查 (逐块累积统计)
+        signal_stats = reader.channel_stats(i).to_dict()
+        if signal_stats['std'] < 1e-6:
             print(f"  跳过：信号变化太小")
             continue
         
         # 执行分析
         try:
-            result = analyzer.analyze_ecg_channel(channel_data, channel_name)
+            result = analyzer.analyze_ecg_channel_stream(reader, i, channel_name, signal_stats)
             results[channel_name] = result
             
             # 显示关键结果
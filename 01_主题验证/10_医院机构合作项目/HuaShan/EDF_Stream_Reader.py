@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+轻量级EDF/EDF+流式读取器
+不依赖MNE，自行解析文件头，数据区以 np.memmap 映射:
+- 按固定时长(整数个数据记录)逐块产出单通道物理量信号，内存占用与记录总长无关
+- 支持按采样点区间随机读取、全程等间隔抽样
+- RunningStats 跨块累积均值/标准差/极值/RMS，RunningRegression 跨块累积线性回归
+- stream_find_peaks 分块峰值检测，结果与整条信号调用 find_peaks 一致
+- SharedSignalMatrix 将多通道信号放入共享内存，供进程池按通道并行分析
+物理量单位与 mne.io.read_raw_edf 相同 (uV/mV 换算为 V)
+"""
+
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+from scipy.signal import find_peaks
+
+# EDF+ 注释通道标签
+ANNOTATION_LABEL = 'EDF Annotations'
+
+# 物理单位 -> 伏特 的换算系数
+UNIT_SCALES = {'v': 1.0, 'mv': 1e-3, 'uv': 1e-6, 'µv': 1e-6, 'μv': 1e-6, 'nv': 1e-9}
+
+
+class RunningStats:
+    """跨数据块累积的基本统计量 (Chan 并行合并公式，数值稳定)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._sum_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, block):
+        """合并一个数据块"""
+        block = np.asarray(block, dtype=float)
+        n = block.size
+        if n == 0:
+            return
+        block_mean = float(block.mean())
+        block_m2 = float(np.square(block - block_mean).sum())
+        total = self.count + n
+        delta = block_mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += block_m2 + delta * delta * self.count * n / total
+        self._sum_sq += float(np.dot(block, block))
+        self.count = total
+        self.min = min(self.min, float(block.min()))
+        self.max = max(self.max, float(block.max()))
+
+    @property
+    def var(self):
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.var))
+
+    @property
+    def rms(self):
+        return float(np.sqrt(self._sum_sq / self.count)) if self.count else 0.0
+
+    def to_dict(self):
+        """与 np.mean/np.std/np.min/np.max/np.ptp 对应的字典"""
+        return {
+            'mean': float(self.mean),
+            'std': self.std,
+            'min': float(self.min),
+            'max': float(self.max),
+            'range': float(self.max - self.min),
+            'rms': self.rms
+        }
+
+
+class RunningRegression:
+    """跨数据块累积的一元线性回归 (Chan 并行合并公式)，斜率与 scipy.stats.linregress 一致"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+
+    def update(self, x, y):
+        """合并一个数据块的 (x, y) 点"""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        n = x.size
+        if n == 0:
+            return
+        block_mean_x, block_mean_y = float(x.mean()), float(y.mean())
+        block_sxx = float(np.dot(x - block_mean_x, x - block_mean_x))
+        block_sxy = float(np.dot(x - block_mean_x, y - block_mean_y))
+        total = self.count + n
+        dx, dy = block_mean_x - self.mean_x, block_mean_y - self.mean_y
+        self._sxx += block_sxx + dx * dx * self.count * n / total
+        self._sxy += block_sxy + dx * dy * self.count * n / total
+        self.mean_x += dx * n / total
+        self.mean_y += dy * n / total
+        self.count = total
+
+    @property
+    def slope(self):
+        return self._sxy / self._sxx if self._sxx > 0 else 0.0
+
+
+class SignalSource:
+    """
+    分块信号源的公共接口
+    子类提供 channels/sampling_rates、n_samples、channel_sampling_rate、read_samples、iter_blocks
+    """
+
+    @property
+    def sampling_rate(self):
+        """采样率 (各通道不同时取最高值，与MNE一致)"""
+        return max(self.sampling_rates) if self.sampling_rates else 0.0
+
+    def info(self):
+        """与原 mne 读取流程相同字段的文件信息"""
+        n_samples = self.n_samples(0) if self.channels else 0
+        return {
+            'sampling_rate': self.sampling_rate,
+            'channels': list(self.channels),
+            'duration': (n_samples - 1) / self.sampling_rate if n_samples else 0.0,
+            'n_samples': n_samples
+        }
+
+    def times(self, channel=0):
+        """通道采样时间轴 (秒)"""
+        return np.arange(self.n_samples(channel)) / self.channel_sampling_rate(channel)
+
+    def read_channel(self, channel):
+        """读取整个通道"""
+        return self.read_samples(channel)
+
+    def channel_stats(self, channel, block_seconds=60.0):
+        """分块累积整个通道的基本统计量"""
+        stats = RunningStats()
+        for _, block in self.iter_blocks(channel, block_seconds):
+            stats.update(block)
+        return stats
+
+    def read_decimated(self, channel, max_samples, block_seconds=60.0):
+        """
+        全程等间隔抽样，结果与 data[::len(data) // max_samples] 相同
+        返回 (抽样序列, 抽样步长)
+        """
+        n = self.n_samples(channel)
+        step = n // max_samples if n > max_samples else 1
+        if step == 1:
+            return self.read_channel(channel), 1
+        parts = [block[(-start) % step::step] for start, block in self.iter_blocks(channel, block_seconds)]
+        return np.concatenate(parts), step
+
+
+class EDFStreamReader(SignalSource):
+    """EDF/EDF+ 文件的内存映射分块读取器"""
+
+    def __init__(self, edf_path, to_volts=True):
+        """
+        解析文件头并映射数据区
+        edf_path: EDF/EDF+ 文件路径
+        to_volts: 是否按物理单位换算为伏特 (与MNE一致)
+        """
+        self.path = str(edf_path)
+        with open(self.path, 'rb') as f:
+            header = f.read(256)
+            if len(header) < 256:
+                raise ValueError(f"EDF文件头不完整: {self.path}")
+            if header[0:1] == b'\xff':
+                raise ValueError(f"不支持BDF(24位)格式: {self.path}")
+
+            try:
+                self.header_bytes = int(header[184:192])
+                self.n_records = int(header[236:244])
+                self.record_duration = float(header[244:252])
+                n_signals = int(header[252:256])
+            except ValueError:
+                raise ValueError(f"EDF文件头格式错误: {self.path}")
+
+            self.patient = header[8:88].decode('latin-1').strip()
+            self.recording = header[88:168].decode('latin-1').strip()
+            self.start_date = header[168:176].decode('latin-1').strip()
+            self.start_time = header[176:184].decode('latin-1').strip()
+            self.edf_type = header[192:236].decode('latin-1').strip()  # 'EDF+C' / 'EDF+D' / ''
+            signal_header = f.read(256 * n_signals)
+
+        if len(signal_header) < 256 * n_signals:
+            raise ValueError(f"EDF信号头不完整: {self.path}")
+
+        fields = {}
+        offset = 0
+        for name, width in (('label', 16), ('transducer', 80), ('dimension', 8),
+                            ('phys_min', 8), ('phys_max', 8), ('dig_min', 8), ('dig_max', 8),
+                            ('prefilter', 80), ('samples', 8), ('reserved', 32)):
+            fields[name] = [signal_header[offset + i * width: offset + (i + 1) * width]
+                            .decode('latin-1').strip() for i in range(n_signals)]
+            offset += width * n_signals
+
+        self.labels = fields['label']
+        self.dimensions = fields['dimension']
+        self.prefilters = fields['prefilter']
+        samples_per_record = np.array(fields['samples'], dtype=np.int64)
+        phys_min = np.array(fields['phys_min'], dtype=float)
+        phys_max = np.array(fields['phys_max'], dtype=float)
+        dig_min = np.array(fields['dig_min'], dtype=float)
+        dig_max = np.array(fields['dig_max'], dtype=float)
+
+        record_width = int(samples_per_record.sum())
+        data_bytes = os.path.getsize(self.path) - self.header_bytes
+        available_records = data_bytes // (2 * record_width)
+        if self.n_records < 0:  # 记录过程中写入的文件，记录数未知
+            self.n_records = available_records
+        elif available_records < self.n_records:
+            print(f"⚠️ EDF文件被截断: 头部声明 {self.n_records} 个记录，实际 {available_records} 个")
+            self.n_records = available_records
+        if self.edf_type.startswith('EDF+D'):
+            print("⚠️ EDF+D 非连续记录，数据记录按连续时间处理")
+
+        self._records = np.memmap(self.path, dtype='<i2', mode='r', offset=self.header_bytes,
+                                  shape=(self.n_records, record_width))
+        self._bounds = np.concatenate([[0], np.cumsum(samples_per_record)])
+        self._samples_per_record = samples_per_record
+
+        # 数字量 -> 物理量: value * gain + offset
+        unit_scale = np.array([UNIT_SCALES.get(dim.lower(), 1.0) if to_volts else 1.0
+                               for dim in self.dimensions])
+        gain = (phys_max - phys_min) / np.where(dig_max != dig_min, dig_max - dig_min, 1.0)
+        self._gain = gain * unit_scale
+        self._offset = (phys_min - dig_min * gain) * unit_scale
+
+        # 数据通道 (不含EDF+注释通道)
+        self.signal_indices = [i for i, label in enumerate(self.labels) if label != ANNOTATION_LABEL]
+        self.channels = [self.labels[i] for i in self.signal_indices]
+        self.sampling_rates = [float(samples_per_record[i] / self.record_duration) for i in self.signal_indices]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """释放内存映射"""
+        self._records = None
+
+    def _signal_index(self, channel):
+        """通道名或数据通道序号 -> 文件内信号序号"""
+        if isinstance(channel, str):
+            if channel not in self.channels:
+                raise ValueError(f"通道不存在: {channel}")
+            return self.signal_indices[self.channels.index(channel)]
+        if not 0 <= channel < len(self.signal_indices):
+            raise ValueError(f"通道序号越界: {channel}")
+        return self.signal_indices[channel]
+
+    def channel_sampling_rate(self, channel):
+        return float(self._samples_per_record[self._signal_index(channel)] / self.record_duration)
+
+    def n_samples(self, channel=0):
+        return int(self.n_records * self._samples_per_record[self._signal_index(channel)])
+
+    def _read_records(self, index, first, last):
+        """读取 [first, last) 数据记录中某信号的物理量"""
+        digital = self._records[first:last, self._bounds[index]:self._bounds[index + 1]]
+        return digital.reshape(-1) * self._gain[index] + self._offset[index]
+
+    def read_samples(self, channel, start=0, stop=None):
+        """按采样点区间 [start, stop) 读取单通道物理量，只访问覆盖该区间的数据记录"""
+        index = self._signal_index(channel)
+        spr = int(self._samples_per_record[index])
+        total = self.n_records * spr
+        start = max(0, int(start))
+        stop = total if stop is None else min(total, int(stop))
+        if stop <= start:
+            return np.empty(0)
+        first, last = start // spr, -(-stop // spr)
+        values = self._read_records(index, first, last)
+        return values[start - first * spr: stop - first * spr]
+
+    def iter_blocks(self, channel, block_seconds=60.0):
+        """
+        按固定时长逐块产出单通道物理量
+        块长取整为数据记录时长的整数倍，产出 (起始采样点, 数据块)
+        """
+        if block_seconds <= 0:
+            raise ValueError(f"块时长必须为正数: {block_seconds}")
+        index = self._signal_index(channel)
+        spr = int(self._samples_per_record[index])
+        records_per_block = max(1, int(round(block_seconds / self.record_duration)))
+        for first in range(0, self.n_records, records_per_block):
+            last = min(first + records_per_block, self.n_records)
+            yield first * spr, self._read_records(index, first, last)
+
+
+class SharedSignalMatrix(SignalSource):
+    """
+    多通道等长信号矩阵 (通道 × 采样点, float64) 的共享内存副本
+    主进程创建并填充一次，工作进程凭 descriptor 按名称映射同一块内存，无需序列化传输信号
+    """
+
+    def __init__(self, shape, channels, sampling_rates, name=None):
+        self._owner = name is None
+        size = max(1, int(np.prod(shape)) * np.dtype(np.float64).itemsize)
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size)
+        self.array = np.ndarray(shape, dtype=np.float64, buffer=self._shm.buf)
+        self.channels = list(channels)
+        self.sampling_rates = [float(rate) for rate in sampling_rates]
+
+    @classmethod
+    def from_array(cls, matrix, channels, sampling_rates):
+        """由内存中的二维信号矩阵创建"""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.ndim != 2 or matrix.shape[0] != len(channels):
+            raise ValueError(f"信号矩阵形状 {matrix.shape} 与通道数 {len(channels)} 不符")
+        shared = cls(matrix.shape, channels, sampling_rates)
+        shared.array[:] = matrix
+        return shared
+
+    @classmethod
+    def from_reader(cls, reader, channels=None, block_seconds=60.0):
+        """由分块信号源逐块填充创建，峰值内存为共享矩阵本身加一个数据块"""
+        channels = list(reader.channels) if channels is None else list(channels)
+        lengths = {reader.n_samples(channel) for channel in channels}
+        if len(lengths) != 1:
+            raise ValueError("共享信号矩阵要求各通道采样点数相同")
+        names = [channel if isinstance(channel, str) else reader.channels[channel] for channel in channels]
+        shared = cls((len(channels), lengths.pop()), names,
+                     [reader.channel_sampling_rate(channel) for channel in channels])
+        for row, channel in enumerate(channels):
+            for start, block in reader.iter_blocks(channel, block_seconds):
+                shared.array[row, start:start + len(block)] = block
+        return shared
+
+    @property
+    def descriptor(self):
+        """工作进程重新映射所需的信息 (可序列化)"""
+        return self._shm.name, self.array.shape, self.channels, self.sampling_rates
+
+    @classmethod
+    def attach(cls, descriptor):
+        """在工作进程中按 descriptor 映射已有的共享内存"""
+        name, shape, channels, sampling_rates = descriptor
+        return cls(shape, channels, sampling_rates, name=name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """解除映射；创建者同时释放共享内存"""
+        if self._shm is None:
+            return
+        self.array = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # 仍有外部视图引用该内存，映射随进程结束释放
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def _row(self, channel):
+        if isinstance(channel, str):
+            if channel not in self.channels:
+                raise ValueError(f"通道不存在: {channel}")
+            return self.channels.index(channel)
+        if not 0 <= channel < len(self.channels):
+            raise ValueError(f"通道序号越界: {channel}")
+        return channel
+
+    def channel_sampling_rate(self, channel):
+        return self.sampling_rates[self._row(channel)]
+
+    def n_samples(self, channel=0):
+        return int(self.array.shape[1])
+
+    def read_samples(self, channel, start=0, stop=None):
+        """返回共享内存中的只读视图 (不复制)"""
+        view = self.array[self._row(channel), max(0, int(start)):stop]
+        view.flags.writeable = False
+        return view
+
+    def iter_blocks(self, channel, block_seconds=60.0):
+        """按固定时长逐块产出 (起始采样点, 数据块视图)"""
+        if block_seconds <= 0:
+            raise ValueError(f"块时长必须为正数: {block_seconds}")
+        row = self._row(channel)
+        block = max(1, int(round(block_seconds * self.sampling_rates[row])))
+        for start in range(0, self.n_samples(), block):
+            yield start, self.read_samples(row, start, start + block)
+
+
+def stream_find_peaks(reader, channel, height, distance, center=0.0, scale=1.0, block_seconds=60.0):
+    """
+    分块峰值检测
+    结果与 find_peaks((x - center) / scale, height=height, distance=distance) 完全一致:
+    每块两侧各扩展 distance 个采样点以正确判断块边界处的局部极大值(含平台峰)，
+    块内只做高度筛选，候选峰汇总后按 find_peaks 相同的优先顺序做一次全局最小间距筛选
+    """
+    distance = max(1, int(np.ceil(distance)))
+    n = reader.n_samples(channel)
+    block = max(distance, int(block_seconds * reader.channel_sampling_rate(channel)))
+
+    peak_parts, height_parts = [], []
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        left = max(0, start - distance)
+        normalized = (reader.read_samples(channel, left, stop + distance) - center) / scale
+        peaks, props = find_peaks(normalized, height=height)
+        core = (peaks >= start - left) & (peaks < stop - left)
+        peak_parts.append(peaks[core] + left)
+        height_parts.append(props['peak_heights'][core])
+
+    if not peak_parts:
+        return np.empty(0, dtype=np.int64)
+    peaks = np.concatenate(peak_parts)
+    heights = np.concatenate(height_parts)
+    return peaks[_select_by_distance(peaks, heights, distance)]
+
+
+def _select_by_distance(peaks, heights, distance):
+    """按峰高从高到低保留，剔除间距小于 distance 的其余峰 (与 find_peaks 的排序及规则相同)"""
+    keep = np.ones(len(peaks), dtype=bool)
+    for i in np.argsort(heights)[::-1]:
+        if not keep[i]:
+            continue
+        lo = np.searchsorted(peaks, peaks[i] - distance, side='right')
+        hi = np.searchsorted(peaks, peaks[i] + distance, side='left')
+        keep[lo:hi] = False
+        keep[i] = True
+    return keep
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+通道并行分析测试
+- SharedSignalMatrix 逐块填充后与逐通道读取一致，工作进程映射同一块内存
+- Fast/Agent2 分析器多进程按通道并行的结果与串行逐通道分析完全一致
+- 通道采样点数不同时拒绝建共享矩阵，并行分析回退为串行
+"""
+
+import io
+import os
+import contextlib
+import tempfile
+import unittest
+
+import numpy as np
+
+from EDF_Stream_Reader import ANNOTATION_LABEL, EDFStreamReader, SharedSignalMatrix
+from EDF_Fast_Analyzer import analyze_channels_parallel
+from ECG_Agent2_Intelligent_Analyzer import ECGAgent2Analyzer
+from test_edf_stream_reader import SIGNALS, synthetic_ecg, write_edf
+
+# 四个等长ECG通道 + 注释通道
+ECG_SIGNALS = [(f'Abdomen_{i}', 500, 'uV', -5000.0, 5000.0) for i in range(1, 5)] + \
+              [(ANNOTATION_LABEL, 60, '', -1.0, 1.0)]
+
+
+def without_report_time(report):
+    """去掉报告生成时间 (串行与并行运行时刻不同)"""
+    header = {k: v for k, v in report.get('报告头信息', {}).items() if k != '分析时间'}
+    return {**report, '报告头信息': header}
+
+
+class TestChannelParallel(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'r02.edf')
+        write_edf(self.path, n_records=40, seed=3, signals=ECG_SIGNALS)
+        self.reader = EDFStreamReader(self.path)
+
+    def tearDown(self):
+        self.reader.close()
+        self.tmp.cleanup()
+
+    def test_shared_matrix_matches_reader(self):
+        with SharedSignalMatrix.from_reader(self.reader, block_seconds=7) as shared:
+            self.assertEqual(shared.channels, self.reader.channels)
+            self.assertEqual(shared.array.shape, (4, 40 * 500))
+            attached = SharedSignalMatrix.attach(shared.descriptor)
+            try:
+                for row, channel in enumerate(self.reader.channels):
+                    expected = self.reader.read_channel(row)
+                    np.testing.assert_array_equal(shared.read_channel(channel), expected)
+                    np.testing.assert_array_equal(attached.read_channel(row), expected)
+                    np.testing.assert_array_equal(
+                        np.concatenate([b for _, b in attached.iter_blocks(row, 3)]), expected)
+                    np.testing.assert_array_equal(shared.channel_stats(row).to_dict()['max'], expected.max())
+                self.assertFalse(attached.read_samples(0, 10, 20).flags.writeable)
+            finally:
+                attached.close()
+
+    def test_unequal_channel_lengths_rejected(self):
+        path = os.path.join(self.tmp.name, 'mixed.edf')
+        write_edf(path, n_records=10, signals=SIGNALS)
+        with EDFStreamReader(path) as reader:
+            with self.assertRaises(ValueError):
+                SharedSignalMatrix.from_reader(reader)
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(analyze_channels_parallel(reader, workers=3),
+                                 analyze_channels_parallel(reader, workers=1))
+
+    def test_fast_analyzer_parallel_matches_serial(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            serial = analyze_channels_parallel(self.reader, workers=1, block_seconds=5)
+            parallel = analyze_channels_parallel(self.reader, workers=3, block_seconds=5)
+        self.assertEqual(list(parallel), self.reader.channels)
+        self.assertEqual(parallel, serial)
+        self.assertTrue(all(result['心率统计']['detected_beats'] > 50 for result in serial.values()))
+
+    def test_agent2_parallel_matches_serial(self):
+        matrix = np.vstack([synthetic_ecg(250 * 30, 250, seed=seed) * 1e-6 for seed in range(3)])
+        analyzer = ECGAgent2Analyzer(sampling_rate=250)
+        with contextlib.redirect_stdout(io.StringIO()):
+            serial = analyzer.analyze_channels_parallel(matrix, patient_id='P1', workers=1)
+            parallel = analyzer.analyze_channels_parallel(matrix, patient_id='P1', workers=3)
+            with SharedSignalMatrix.from_array(matrix, ['a', 'b', 'c'], [250] * 3) as shared:
+                from_shared = analyzer.analyze_channels_parallel(shared, workers=2)
+        self.assertEqual(list(parallel), ['ch0', 'ch1', 'ch2'])
+        self.assertNotIn('error', serial['ch0'])
+        for name in serial:
+            self.assertEqual(without_report_time(parallel[name]), without_report_time(serial[name]))
+        self.assertEqual(list(from_shared), ['a', 'b', 'c'])
+        self.assertEqual(without_report_time(from_shared['b'])['心律混沌动力学指标'],
+                         without_report_time(serial['ch1'])['心律混沌动力学指标'])
+        with self.assertRaises(ValueError):
+            analyzer.analyze_channels_parallel(matrix, channel_names=['a', 'b'], workers=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+EDF流式读取测试
+- 分块读取、区间读取、等间隔抽样与整个文件一次解码的结果一致
+- RunningStats 跨块累积与 numpy 整段统计一致
+- stream_find_peaks 与整条信号 find_peaks 一致 (不同块长)
+- Simple/Fast 分析器的分块心率统计与整段读入的计算结果一致
+- Simple 分析器分块计算的全分辨率混沌指标 (Lyapunov指数、近似熵) 与整段读入一致
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from scipy.signal import find_peaks
+from scipy.stats import linregress
+
+from EDF_Stream_Reader import (ANNOTATION_LABEL, EDFStreamReader, RunningRegression, RunningStats,
+                               stream_find_peaks)
+from EDF_Simple_Analyzer import SimplifiedECGAnalyzer
+from EDF_Fast_Analyzer import FastECGAnalyzer
+
+RECORD_SECONDS = 1.0
+N_RECORDS = 90
+# (标签, 每记录采样点数, 物理单位, 物理最小/最大值)
+SIGNALS = [('Direct_1', 1000, 'uV', -5000.0, 5000.0),
+           ('Abdomen_1', 1000, 'uV', -2500.0, 2500.0),
+           ('Resp', 250, 'mV', -10.0, 10.0),
+           (ANNOTATION_LABEL, 60, '', -1.0, 1.0)]
+DIG_MIN, DIG_MAX = -32768, 32767
+
+
+def synthetic_ecg(n_samples, sampling_rate, mean_rr=0.45, seed=0):
+    """高斯QRS波 + 基线漂移 + 噪声 (物理量, 单位与通道一致)"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / sampling_rate
+    beats = np.cumsum(rng.normal(mean_rr, 0.05 * mean_rr, int(t[-1] / mean_rr) + 5))
+    ecg = 150 * np.sin(2 * np.pi * 0.3 * t) + 40 * rng.standard_normal(n_samples)
+    for beat in beats[beats < t[-1]]:
+        window = slice(max(0, int((beat - 0.05) * sampling_rate)), int((beat + 0.05) * sampling_rate))
+        ecg[window] += rng.uniform(1500, 2500) * np.exp(-((t[window] - beat) / 0.01) ** 2)
+    return ecg
+
+
+def write_edf(path, n_records=N_RECORDS, seed=0, signals=SIGNALS):
+    """写入EDF+文件 (含注释通道)，返回各数据通道的数字量 {标签: int16数组}"""
+    rng = np.random.default_rng(seed)
+    digital = {}
+    for i, (label, spr, _, phys_min, phys_max) in enumerate(signals):
+        n = n_records * spr
+        if label == ANNOTATION_LABEL:
+            digital[label] = np.zeros(n, dtype='<i2')
+            continue
+        physical = synthetic_ecg(n, spr / RECORD_SECONDS, seed=seed + i)
+        if label == 'Resp':
+            physical = 5 * np.sin(2 * np.pi * 0.25 * np.arange(n) / spr) + rng.normal(0, 0.2, n)
+        scaled = (physical - phys_min) / (phys_max - phys_min) * (DIG_MAX - DIG_MIN) + DIG_MIN
+        digital[label] = np.clip(np.round(scaled), DIG_MIN, DIG_MAX).astype('<i2')
+
+    field = lambda value, width: str(value).ljust(width)[:width].encode('latin-1')
+    n_signals = len(signals)
+    header = b''.join([field(0, 8), field('X X X X', 80), field('Startdate X X X X', 80),
+                       field('01.01.25', 8), field('00.00.00', 8), field(256 * (n_signals + 1), 8),
+                       field('EDF+C', 44), field(n_records, 8), field(RECORD_SECONDS, 8), field(n_signals, 4)])
+    # 信号头按字段分组: 每个字段依次写出全部信号的值
+    columns = [(16, lambda s: s[0]), (80, lambda s: ''), (8, lambda s: s[2]), (8, lambda s: s[3]),
+               (8, lambda s: s[4]), (8, lambda s: DIG_MIN), (8, lambda s: DIG_MAX), (80, lambda s: ''),
+               (8, lambda s: s[1]), (32, lambda s: '')]
+    for width, value in columns:
+        header += b''.join(field(value(signal), width) for signal in signals)
+
+    records = np.concatenate([digital[label].reshape(n_records, spr) for label, spr, *_ in signals], axis=1)
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(records.astype('<i2').tobytes())
+    return {label: digital[label] for label, *_ in signals if label != ANNOTATION_LABEL}
+
+
+def reference_physical(digital, label, signals=SIGNALS):
+    """整段解码：EDF 线性换算后统一为伏特"""
+    _, _, unit, phys_min, phys_max = next(s for s in signals if s[0] == label)
+    physical = (digital.astype(float) - DIG_MIN) * (phys_max - phys_min) / (DIG_MAX - DIG_MIN) + phys_min
+    return physical * {'uV': 1e-6, 'mV': 1e-3}[unit]
+
+
+class TestEDFStreamReader(unittest.TestCase):
+
+    def assertSignalEqual(self, actual, expected):
+        """换算顺序不同只带来浮点舍入差异 (伏特量级 1e-3，容差 1e-15)"""
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-15)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'r01.edf')
+        self.digital = write_edf(self.path)
+        self.reader = EDFStreamReader(self.path)
+        self.full = {label: reference_physical(values, label) for label, values in self.digital.items()}
+
+    def tearDown(self):
+        self.reader.close()
+        self.tmp.cleanup()
+
+    def test_header_and_channels(self):
+        self.assertEqual(self.reader.channels, ['Direct_1', 'Abdomen_1', 'Resp'])
+        self.assertEqual(self.reader.sampling_rates, [1000.0, 1000.0, 250.0])
+        info = self.reader.info()
+        self.assertEqual(info['n_samples'], N_RECORDS * 1000)
+        self.assertEqual(info['sampling_rate'], 1000.0)
+        with self.assertRaises(ValueError):
+            self.reader.read_channel(ANNOTATION_LABEL)
+
+    def test_blocks_and_windows_match_full_decode(self):
+        for channel, expected in enumerate(self.full.values()):
+            self.assertSignalEqual(self.reader.read_channel(channel), expected)
+            for block_seconds in (1, 7, 60, 1000):
+                blocks = list(self.reader.iter_blocks(channel, block_seconds))
+                self.assertEqual([start for start, _ in blocks],
+                                 list(np.cumsum([0] + [len(b) for _, b in blocks[:-1]])))
+                self.assertSignalEqual(np.concatenate([b for _, b in blocks]), expected)
+            for start, stop in [(0, 1), (999, 1001), (12345, 54321), (len(expected) - 3, None), (50, 50)]:
+                self.assertSignalEqual(self.reader.read_samples(channel, start, stop), expected[start:stop])
+
+    def test_running_stats_and_decimation(self):
+        for channel, expected in enumerate(self.full.values()):
+            stats = self.reader.channel_stats(channel, block_seconds=7).to_dict()
+            np.testing.assert_allclose([stats['mean'], stats['std'], stats['min'], stats['max'], stats['rms']],
+                                       [np.mean(expected), np.std(expected), np.min(expected),
+                                        np.max(expected), np.sqrt(np.mean(expected ** 2))], rtol=1e-9)
+            for max_samples in (1000, 7777, len(expected) * 2):
+                decimated, step = self.reader.read_decimated(channel, max_samples, block_seconds=13)
+                self.assertEqual(step, max(1, len(expected) // max_samples))
+                self.assertSignalEqual(decimated, expected[::step])
+
+        stats = RunningStats()
+        stats.update([])
+        self.assertEqual((stats.count, stats.std, stats.rms), (0, 0.0, 0.0))
+
+    def test_stream_find_peaks_matches_full_signal(self):
+        for channel in (0, 1):
+            data = self.reader.read_channel(channel)
+            center, scale = np.mean(data), np.std(data)
+            for height, distance in [(1.0, 400), (0.5, 300), (1.5, 37)]:
+                expected, _ = find_peaks((data - center) / scale, height=height, distance=distance)
+                self.assertGreater(len(expected), 50)
+                for block_seconds in (1, 4.5, 60):
+                    peaks = stream_find_peaks(self.reader, channel, height, distance, center, scale, block_seconds)
+                    np.testing.assert_array_equal(peaks, expected)
+
+    def test_analyzers_stream_matches_full_array(self):
+        simple, fast = SimplifiedECGAnalyzer(1000.0), FastECGAnalyzer(1000.0)
+        for channel in (0, 1):
+            data = self.reader.read_channel(channel)
+            stats = {'mean': np.mean(data), 'std': np.std(data)}
+            self.assertEqual(simple.calculate_heart_rate_statistics_stream(self.reader, channel, stats, 5),
+                             simple.calculate_heart_rate_statistics(data))
+
+            normalized = (data - stats['mean']) / stats['std']
+            peaks, _ = find_peaks(normalized, height=0.5, distance=300)
+            self.assertEqual(fast.calculate_heart_rate_stream(self.reader, channel, stats, 5),
+                             fast._heart_rate_from_peaks(peaks, 1000.0))
+
+    def test_chaos_stream_matches_full_array(self):
+        """短记录上与整段计算对比 (近似熵参考实现为 O(N²) 的纯 Python 循环)"""
+        path = os.path.join(self.tmp.name, 'short.edf')
+        write_edf(path, n_records=2, seed=3)
+        simple = SimplifiedECGAnalyzer(1000.0)
+        with EDFStreamReader(path) as reader:
+            data = reader.read_channel(0)
+            expected = simple.calculate_lyapunov_exponent(data)
+            self.assertGreater(expected, 0)
+            for block_samples in (97, 600, 65536):
+                self.assertAlmostEqual(
+                    simple.calculate_lyapunov_exponent_stream(reader, 0, block_samples=block_samples),
+                    expected, places=8)
+
+            resp = reader.read_channel(2)
+            expected = simple.calculate_approximate_entropy(resp)
+            self.assertGreater(expected, 0)
+            for block_samples in (64, 150, 1024):
+                self.assertAlmostEqual(
+                    simple.calculate_approximate_entropy_stream(reader, 2, r=0.2 * np.std(resp),
+                                                                block_samples=block_samples),
+                    expected, places=10)
+
+        regression = RunningRegression()
+        x = np.arange(500.0)
+        y = np.sin(x / 17) + 0.01 * x
+        for start in range(0, 500, 73):
+            regression.update(x[start:start + 73], y[start:start + 73])
+        self.assertAlmostEqual(regression.slope, linregress(x, y).slope, places=12)
+
+    def test_truncated_file(self):
+        self.reader.close()
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 10)
+        with EDFStreamReader(self.path) as reader:
+            self.assertEqual(reader.n_records, N_RECORDS - 1)
+            self.assertSignalEqual(reader.read_channel(0), self.full['Direct_1'][:-1000])
+
+
+if __name__ == '__main__':
+    unittest.main()